@@ -0,0 +1,84 @@
+"""วัดเวลาอัปเดตจุดสั่งซื้อทีละประวัติการผลิตด้วย StockMonitor เทียบกับคิดใหม่จากประวัติทั้งหมด
+
+ประวัติสังเคราะห์กระจายตลอด 2 ปี การเพิ่มประวัติหนึ่งรายการใช้เวลาตามจำนวนวัตถุดิบ
+ในสูตรนั้น ส่วนการคิดใหม่ทั้งหมดต้องอ่านประวัติทุกรายการ
+
+วิธีใช้: python benchmarks/bench_alerts.py [จำนวนประวัติ] [จำนวนประวัติที่เพิ่ม]
+(ค่าเริ่มต้น 100000 รายการ, เพิ่ม 1000 รายการ)
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_storage import make_raw_data  # noqa: E402
+from recipe_store import RecipeStore  # noqa: E402
+from stock_alerts import StockMonitor  # noqa: E402
+
+TODAY = date(2026, 1, 1)
+HISTORY_DAYS = 730
+
+
+def log_entry(store, rng, day):
+    recipe = store.recipes[rng.choice(list(store.recipes))]
+    return {
+        "recipe_id": recipe.id,
+        "recipe_name": recipe.name,
+        "batches": rng.randint(1, 5),
+        "total_servings": recipe.servings,
+        "total_cost": 0.0,
+        "date": f"{day} {rng.randint(8, 20):02d}:00:00",
+    }
+
+
+def full_rescan(store):
+    """คิดยอดใช้ทั้งหมดใหม่จากประวัติทุกรายการ (ทางที่ไม่มียอดสะสม)"""
+    used = {}
+    for entry in store.production_log:
+        if entry.recipe_id not in store.recipes:
+            continue
+        for ing_id, qty in store.recipe_demand(entry.recipe_id)[0].items():
+            used[ing_id] = used.get(ing_id, 0.0) + qty * entry.batches
+    return used
+
+
+def main(history, appends):
+    rng = random.Random(0)
+    store = RecipeStore(make_raw_data(0, num_ingredients=500, num_recipes=200))
+    for i in range(history):
+        day = TODAY - timedelta(days=HISTORY_DAYS - 1 - i * HISTORY_DAYS // history)
+        store.append_log(log_entry(store, rng, day))
+
+    t0 = time.perf_counter()
+    monitor = StockMonitor(store, today=TODAY)
+    build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for _ in range(appends):
+        store.append_log(log_entry(store, rng, TODAY))
+    incremental = (time.perf_counter() - t0) / appends
+
+    t0 = time.perf_counter()
+    monitor.alerts(today=TODAY)
+    query = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    full_rescan(store)
+    rescan = time.perf_counter() - t0
+
+    print(f"ประวัติ {history:,} รายการ ({HISTORY_DAYS} วัน)")
+    print(f"  สร้างจากช่วงล่าสุด       {build * 1000:>10.1f} ms")
+    print(f"  เพิ่มประวัติหนึ่งรายการ     {incremental * 1e6:>10.1f} µs")
+    print(f"  คิดรายการแจ้งเตือน         {query * 1000:>10.1f} ms")
+    print(f"  คิดใหม่จากประวัติทั้งหมด    {rescan * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 1000,
+    )
@@ -0,0 +1,99 @@
+"""วัดปริมาณงานเมื่อหลายโปรแกรมบันทึกข้อมูลชุดเดียวกันพร้อมกัน
+
+แต่ละ process โหลดข้อมูลเอง แล้วเพิ่มสต๊อควัตถุดิบแบบสุ่มทีละรายการผ่าน
+storage.transaction (ล็อก → อ่านการเปลี่ยนแปลงของ process อื่น → แก้ไข → บันทึก)
+เทียบ backend แบบ journal กับการเขียนทับทั้งไฟล์ (use_journal=False) ซึ่งเป็นวิธีเดิม
+หลังจบตรวจว่าสต๊อครวมเพิ่มขึ้นเท่าจำนวนครั้งที่เพิ่มจริง (ไม่มีการบันทึกทับกันจนหาย)
+
+วิธีใช้: python benchmarks/bench_concurrency.py [จำนวนวัตถุดิบ] [รายการต่อ process]
+(ค่าเริ่มต้น 2000 วัตถุดิบ, 200 รายการต่อ process, 1/2/4/8 process)
+"""
+
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_storage import make_raw_data  # noqa: E402
+from recipe_storage import JsonStorage, LineStorage, SqliteStorage  # noqa: E402
+from recipe_store import RecipeStore  # noqa: E402
+
+PROCESS_COUNTS = (1, 2, 4, 8)
+BACKENDS = {
+    "json (เขียนทับทั้งไฟล์)": lambda d: JsonStorage(
+        os.path.join(d, "recipe_data.json"), use_journal=False
+    ),
+    "json + journal": lambda d: JsonStorage(os.path.join(d, "recipe_data.json")),
+    "lines + journal": lambda d: LineStorage(os.path.join(d, "recipe_data.jsonl")),
+    "sqlite": lambda d: SqliteStorage(os.path.join(d, "recipe_data.db")),
+}
+
+
+def prepare(make_storage, data_dir, num_ingredients):
+    """สร้างข้อมูลตั้งต้นของ backend คืนสต๊อครวม"""
+    raw = make_raw_data(0, num_ingredients=num_ingredients, num_recipes=num_ingredients // 2)
+    storage = make_storage(data_dir)
+    store = RecipeStore(raw)
+    if isinstance(storage, SqliteStorage):
+        storage.import_store(store)
+    else:
+        storage.compact(store)
+    return sum(ing.stock for ing in store.ingredients.values())
+
+
+def worker(name, data_dir, seed, ops, start):
+    """เพิ่มสต๊อค ops ครั้ง คืนเวลาที่ใช้ (วินาที)"""
+    storage = BACKENDS[name](data_dir)
+    store = storage.load()
+    ids = sorted(store.ingredients)
+    rng = random.Random(seed)
+    start.wait()
+    t0 = time.perf_counter()
+    for _ in range(ops):
+        ing_id = rng.choice(ids)
+        with storage.transaction(store):
+            store.update_ingredient(ing_id, stock=store.ingredients[ing_id].stock + 1)
+    return time.perf_counter() - t0
+
+
+def run(name, processes, num_ingredients, ops):
+    """คืน (รายการต่อวินาที, ไม่มีการบันทึกหาย)"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        make_storage = BACKENDS[name]
+        initial = prepare(make_storage, data_dir, num_ingredients)
+        ctx = multiprocessing.get_context()
+        with ctx.Manager() as manager:
+            start = manager.Barrier(processes)
+            with ctx.Pool(processes) as pool:
+                t0 = time.perf_counter()
+                pool.starmap(
+                    worker, [(name, data_dir, seed, ops, start) for seed in range(processes)]
+                )
+                elapsed = time.perf_counter() - t0
+        final = make_storage(data_dir).load()
+        total = sum(ing.stock for ing in final.ingredients.values())
+        return processes * ops / elapsed, abs(total - initial - processes * ops) < 1e-6
+
+
+def main(num_ingredients, ops):
+    print(f"วัตถุดิบ {num_ingredients:,} รายการ, เพิ่มสต๊อค {ops} ครั้งต่อ process")
+    header = "".join(f"{n} proc".rjust(12) for n in PROCESS_COUNTS)
+    print(f"  {'backend':<26}{header}   (รายการ/วินาที)")
+    for name in BACKENDS:
+        cells = []
+        for processes in PROCESS_COUNTS:
+            rate, consistent = run(name, processes, num_ingredients, ops)
+            cells.append(f"{rate:>11.0f}{'' if consistent else '!'}")
+        print(f"  {name:<26}{''.join(cells)}")
+    print("  (! = สต๊อครวมไม่ตรงกับจำนวนครั้งที่เพิ่ม)")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 200,
+    )
@@ -0,0 +1,75 @@
+"""เปรียบเทียบความเร็วการบันทึกของแต่ละระดับ durability ("off", "normal", "full")
+
+ทำรายการเพิ่มสต๊อคทีละรายการผ่าน storage.transaction (หนึ่งรายการต่อการบันทึก)
+และแบบรวมหลายรายการต่อการบันทึก (group commit แบบที่คิวเขียนของ recipe_service ทำ)
+ผลขึ้นกับดิสก์: บน SSD/tmpfs fsync เร็ว บนดิสก์จริงหรือ network storage จะเห็นความต่างชัด
+
+วิธีใช้: python benchmarks/bench_durability.py [จำนวนรายการ] [รายการต่อการบันทึกแบบรวม]
+(ค่าเริ่มต้น 500 รายการ, รวม 16 รายการต่อการบันทึก)
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_storage import make_raw_data  # noqa: E402
+from recipe_storage import (  # noqa: E402
+    DURABILITY_LEVELS, JsonStorage, LineStorage, SqliteStorage,
+)
+from recipe_store import RecipeStore  # noqa: E402
+
+NUM_INGREDIENTS = 2000
+BACKENDS = {
+    "json + journal": lambda d, level: JsonStorage(
+        os.path.join(d, "recipe_data.json"), durability=level
+    ),
+    "lines + journal": lambda d, level: LineStorage(
+        os.path.join(d, "recipe_data.jsonl"), durability=level
+    ),
+    "sqlite": lambda d, level: SqliteStorage(os.path.join(d, "recipe_data.db"), durability=level),
+}
+
+
+def run(make_storage, level, ops, group):
+    """คืนจำนวนรายการต่อวินาที เมื่อบันทึกครั้งละ group รายการ"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        storage = make_storage(data_dir, level)
+        store = RecipeStore(make_raw_data(0, num_ingredients=NUM_INGREDIENTS, num_recipes=100))
+        if isinstance(storage, SqliteStorage):
+            storage.import_store(store)
+        else:
+            storage.compact(store)
+        store = storage.load()
+        ids = sorted(store.ingredients)
+        rng = random.Random(0)
+        t0 = time.perf_counter()
+        for _ in range(ops // group):
+            with storage.transaction(store):
+                for _ in range(group):
+                    ing_id = rng.choice(ids)
+                    store.update_ingredient(ing_id, stock=store.ingredients[ing_id].stock + 1)
+        return ops / (time.perf_counter() - t0)
+
+
+def main(ops, group):
+    print(f"{ops} รายการ, วัตถุดิบ {NUM_INGREDIENTS:,} รายการ (รายการ/วินาที)")
+    header = "".join(f"{level:>10}{'x' + str(group):>8}" for level in DURABILITY_LEVELS)
+    print(f"  {'backend':<18}{header}")
+    for name, make_storage in BACKENDS.items():
+        cells = [
+            f"{run(make_storage, level, ops, 1):>10.0f}{run(make_storage, level, ops, group):>8.0f}"
+            for level in DURABILITY_LEVELS
+        ]
+        print(f"  {name:<18}{''.join(cells)}")
+    print(f"  (x{group} = บันทึกรวม {group} รายการต่อครั้ง)")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 16,
+    )
@@ -0,0 +1,113 @@
+"""เปรียบเทียบการคำนวณต้นทุน/จำนวนรอบที่ผลิตได้ แบบวนลูปกับ CostEngine (NumPy)
+
+วิธีใช้: python benchmarks/bench_engine.py [จำนวนสูตร] [จำนวนวัตถุดิบ]
+(ค่าเริ่มต้น 10000 สูตร × 50000 วัตถุดิบ)
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recipe_engine import CostEngine  # noqa: E402
+from recipe_management import max_producible  # noqa: E402
+from recipe_store import RecipeStore  # noqa: E402
+
+LINES_PER_RECIPE = 8
+
+
+def make_store(num_recipes, num_ingredients, seed=42):
+    """สร้าง RecipeStore สังเคราะห์"""
+    rng = random.Random(seed)
+    return RecipeStore({
+        "ingredients": [
+            {
+                "id": i,
+                "name": f"วัตถุดิบ {i}",
+                "unit": "กก.",
+                "price_per_unit": round(rng.uniform(5, 500), 2),
+                "stock": round(rng.uniform(0, 1000), 2),
+            }
+            for i in range(1, num_ingredients + 1)
+        ],
+        "recipes": [
+            {
+                "id": r,
+                "name": f"สูตร {r}",
+                "servings": rng.randint(1, 20),
+                "ingredients": [
+                    {"ingredient_id": ing_id, "quantity": round(rng.uniform(0.1, 5), 2)}
+                    for ing_id in rng.sample(range(1, num_ingredients + 1), LINES_PER_RECIPE)
+                ],
+            }
+            for r in range(1, num_recipes + 1)
+        ],
+    })
+
+
+def python_costs(store):
+    """ต้นทุนทุกสูตรแบบวนลูป (ไม่ใช้แคช)"""
+    costs = {}
+    for recipe in store.recipes.values():
+        total = 0.0
+        for item in recipe.ingredients:
+            ing = store.ingredients.get(item.ingredient_id)
+            if ing:
+                total += item.quantity * ing.price_per_unit
+        costs[recipe.id] = total
+    return costs
+
+
+def python_producibility(store):
+    """จำนวนรอบที่ผลิตได้ทุกสูตรแบบวนลูป"""
+    return {r.id: max_producible(store, r) for r in store.recipes.values()}
+
+
+def best_of(fn, repeat=5):
+    """เวลาที่เร็วที่สุดจากการเรียกหลายครั้ง (วินาที)"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(num_recipes, num_ingredients):
+    store = make_store(num_recipes, num_ingredients)
+    print(f"{num_recipes:,} สูตร × {num_ingredients:,} วัตถุดิบ")
+
+    start = time.perf_counter()
+    engine = CostEngine(store)
+    print(f"  สร้าง engine             {(time.perf_counter() - start) * 1000:>9.1f} ms")
+
+    # ตรวจว่าผลตรงกันก่อนจับเวลา
+    expected = python_costs(store)
+    actual = engine.recipe_costs()
+    assert all(abs(expected[k] - actual[k]) < 1e-6 for k in expected)
+    assert python_producibility(store) == engine.producibility()
+
+    for label, py_fn, np_fn in [
+        ("ต้นทุนทุกสูตร", python_costs, engine.recipe_costs),
+        ("ผลิตได้กี่รอบ", python_producibility, engine.producibility),
+    ]:
+        py_time = best_of(lambda: py_fn(store))
+        np_time = best_of(np_fn)
+        print(
+            f"  {label:<16} python {py_time * 1000:>9.1f} ms | numpy {np_time * 1000:>9.1f} ms"
+            f" | เร็วขึ้น {py_time / np_time:>5.1f}x"
+        )
+
+    # อัปเดตราคาวัตถุดิบหนึ่งรายการ แล้วคำนวณใหม่ (ไม่สร้างเมทริกซ์ใหม่)
+    def price_edit():
+        store.update_ingredient(1, price_per_unit=store.ingredients[1].price_per_unit + 1)
+        engine.recipe_costs()
+
+    print(f"  แก้ราคา + คำนวณใหม่      {best_of(price_edit) * 1000:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*(args or [10_000, 50_000]))
@@ -0,0 +1,33 @@
+"""วัดเวลาและคุณภาพของแผนจาก production_planner
+
+วิธีใช้: python benchmarks/bench_planner.py [จำนวนสูตร] [จำนวนวัตถุดิบ]
+(ค่าเริ่มต้น 5000 สูตร × 2000 วัตถุดิบ)
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import production_planner  # noqa: E402
+from bench_engine import make_store  # noqa: E402
+
+
+def main(num_recipes, num_ingredients):
+    store = make_store(num_recipes, num_ingredients)
+    print(f"{num_recipes:,} สูตร × {num_ingredients:,} วัตถุดิบ")
+    for objective in ("servings", "margin"):
+        start = time.perf_counter()
+        plan = production_planner.plan_production(store, objective)
+        elapsed = time.perf_counter() - start
+        print(
+            f"  {objective:<9} {elapsed * 1000:>8.1f} ms  "
+            f"{len(plan['batches']):>5} สูตร  มูลค่า {plan['value']:>14.2f}"
+        )
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*(args or [5_000, 2_000]))
@@ -0,0 +1,114 @@
+"""เปรียบเทียบหน่วยความจำต่อรายการ ระหว่าง dict (แบบเดิม) กับ Record ที่ใช้ __slots__
+
+วัดด้วย tracemalloc: สร้างข้อมูลชนิดเดียวกัน n รายการจากค่าชุดเดียวกัน
+แล้วหารหน่วยความจำที่เพิ่มขึ้นด้วย n ค่าตัวเลข/ข้อความเป็น object เดียวกันทั้งสองแบบ
+ผลจึงเป็นค่าใช้จ่ายของตัวเก็บข้อมูลต่อรายการ
+
+วิธีใช้: python benchmarks/bench_records.py [จำนวนรายการ]
+(ค่าเริ่มต้น 100000)
+"""
+
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recipe_records import Ingredient, LogEntry, Recipe, RecipeLine  # noqa: E402
+
+LINES_PER_RECIPE = 8
+
+
+def make_rows(n, seed=42):
+    """สร้างข้อมูลสังเคราะห์ตามโครงสร้าง recipe_data.json"""
+    rng = random.Random(seed)
+    ingredients = [
+        {
+            "id": i,
+            "name": f"วัตถุดิบ {i}",
+            "unit": "กก.",
+            "price_per_unit": round(rng.uniform(5, 500), 2),
+            "stock": round(rng.uniform(0, 1000), 2),
+        }
+        for i in range(1, n + 1)
+    ]
+    recipes = [
+        {
+            "id": r,
+            "name": f"สูตร {r}",
+            "servings": rng.randint(1, 20),
+            "ingredients": [
+                {"ingredient_id": rng.randint(1, n), "quantity": round(rng.uniform(0.1, 5), 2)}
+                for _ in range(LINES_PER_RECIPE)
+            ],
+        }
+        for r in range(1, n + 1)
+    ]
+    log = [
+        {
+            "id": i,
+            "recipe_id": rng.randint(1, n),
+            "recipe_name": "สูตร",
+            "batches": rng.randint(1, 5),
+            "total_servings": rng.randint(1, 100),
+            "total_cost": round(rng.uniform(10, 5000), 2),
+            "date": "2026-01-01 12:00:00",
+        }
+        for i in range(1, n + 1)
+    ]
+    return ingredients, recipes, log
+
+
+def measure(build):
+    """หน่วยความจำ (byte) ที่ build() ใช้ในผลลัพธ์ที่คืนมา"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return used
+
+
+def main(n):
+    ingredients, recipes, log = make_rows(n)
+    cases = [
+        (
+            "วัตถุดิบ", n,
+            lambda: [dict(ing) for ing in ingredients],
+            lambda: [Ingredient.from_dict(ing) for ing in ingredients],
+        ),
+        (
+            "บรรทัดในสูตร", n * LINES_PER_RECIPE,
+            lambda: [dict(item) for r in recipes for item in r["ingredients"]],
+            lambda: [
+                RecipeLine.from_dict(item) for r in recipes for item in r["ingredients"]
+            ],
+        ),
+        (
+            "สูตร (รวมบรรทัด)", n,
+            lambda: [
+                {**r, "ingredients": [dict(item) for item in r["ingredients"]]} for r in recipes
+            ],
+            lambda: [Recipe.from_dict(r) for r in recipes],
+        ),
+        (
+            "ประวัติการผลิต", n,
+            lambda: [dict(entry) for entry in log],
+            lambda: [LogEntry.from_dict(entry) for entry in log],
+        ),
+    ]
+    print(f"{n:,} รายการต่อชนิด (byte ต่อรายการ ไม่รวมค่าที่ใช้ร่วมกัน)")
+    print(f"  {'ชนิด':<20}{'dict':>10}{'__slots__':>12}{'ลดลง':>10}")
+    for label, count, as_dict, as_record in cases:
+        dict_bytes = measure(as_dict) / count
+        record_bytes = measure(as_record) / count
+        print(
+            f"  {label:<20}{dict_bytes:>10.0f}{record_bytes:>12.0f}"
+            f"{(1 - record_bytes / dict_bytes) * 100:>9.0f}%"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
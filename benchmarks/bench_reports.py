@@ -0,0 +1,68 @@
+"""วัดเวลาทำรายงาน costs/producible/margin ด้วย recipe_reports ตามจำนวน process
+
+สูตรครึ่งหนึ่งมีสูตรย่อยซ้อนกันสองชั้น เทียบกับการคิดแบบเดิมใน process เดียว
+(recipe_cost + max_producible ทีละสูตร) ผลจะเร็วขึ้นตามจำนวน core ที่มีจริงเท่านั้น
+
+วิธีใช้: python benchmarks/bench_reports.py [จำนวนสูตร] [จำนวนวัตถุดิบ]
+(ค่าเริ่มต้น 50000 สูตร, 5000 วัตถุดิบ, 1/2/4/8 process)
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_storage import make_raw_data  # noqa: E402
+from recipe_management import max_producible  # noqa: E402
+from recipe_reports import REPORT_KINDS, generate_reports, take_snapshot  # noqa: E402
+from recipe_store import RecipeStore  # noqa: E402
+
+WORKER_COUNTS = (1, 2, 4, 8)
+
+
+def make_store(num_recipes, num_ingredients):
+    raw = make_raw_data(0, num_ingredients=num_ingredients, num_recipes=num_recipes, lines_per_recipe=12)
+    rng = random.Random(1)
+    # สูตรครึ่งหลังใช้สูตรจากครึ่งแรกเป็นสูตรย่อย (ซ้อนได้สองชั้น)
+    half = num_recipes // 2
+    for recipe in raw["recipes"][half:]:
+        for sub_id in rng.sample(range(1, half + 1), 2):
+            recipe["ingredients"].append({"recipe_id": sub_id, "quantity": rng.randint(1, 3)})
+    return RecipeStore(raw)
+
+
+def serial(store):
+    """ทางเดิม: คิดต้นทุนและจำนวนรอบทีละสูตรใน process เดียว"""
+    for recipe in store.recipes.values():
+        store.recipe_cost(recipe.id)
+        max_producible(store, recipe)
+
+
+def main(num_recipes, num_ingredients):
+    store = make_store(num_recipes, num_ingredients)
+    print(f"สูตร {num_recipes:,} | วัตถุดิบ {num_ingredients:,} | CPU {os.cpu_count()}")
+
+    t0 = time.perf_counter()
+    serial(store)
+    print(f"  {'เดิม (process เดียว)':<24}{time.perf_counter() - t0:>8.2f} วินาที")
+
+    t0 = time.perf_counter()
+    snapshot = take_snapshot(store)
+    print(f"  {'สร้าง snapshot':<24}{time.perf_counter() - t0:>8.2f} วินาที")
+
+    base = None
+    for workers in WORKER_COUNTS:
+        t0 = time.perf_counter()
+        generate_reports(snapshot, REPORT_KINDS, workers)
+        elapsed = time.perf_counter() - t0
+        base = base or elapsed
+        print(f"  {f'{workers} process':<24}{elapsed:>8.2f} วินาที  (x{base / elapsed:.2f})")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 50000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 5000,
+    )
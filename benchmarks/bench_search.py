@@ -0,0 +1,103 @@
+"""วัดเวลาค้นหาชื่อวัตถุดิบด้วย NameSearch เทียบกับการวนเทียบชื่อทุกรายการ
+
+ชื่อสังเคราะห์สุ่มจากพยางค์ไทยและคำภาษาอังกฤษ คำค้นมีสามแบบ:
+ต้นชื่อ (prefix), กลางชื่อ (substring) และสะกดผิดหนึ่งตัวอักษร (typo)
+แสดงเวลาสร้างดัชนี เวลาอัปเดตทีละรายการ และเวลาค้นหา p50/p99
+
+วิธีใช้: python benchmarks/bench_search.py [จำนวนวัตถุดิบ] [จำนวนคำค้นต่อแบบ]
+(ค่าเริ่มต้น 20000 รายการ, 500 คำค้น)
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recipe_search import NameSearch, normalize  # noqa: E402
+from recipe_store import RecipeStore  # noqa: E402
+
+SYLLABLES = (
+    "แป้ง", "ข้าว", "เจ้า", "น้ำ", "ตาล", "ทราย", "มะ", "พร้าว", "กะ", "ทิ", "ไข่", "ไก่",
+    "หมู", "เนื้อ", "กุ้ง", "ปลา", "พริก", "กระ", "เทียม", "หอม", "ใบ", "เตย", "ถั่ว", "งา",
+)
+WORDS = ("flour", "sugar", "butter", "cream", "milk", "cocoa", "salt", "yeast", "vanilla")
+LIMIT = 10
+
+
+def make_names(count, rng):
+    names = set()
+    while len(names) < count:
+        if rng.random() < 0.7:
+            name = "".join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))
+        else:
+            name = " ".join(rng.choices(WORDS, k=rng.randint(1, 3)))
+        names.add(f"{name} {rng.randint(1, 999)}" if rng.random() < 0.3 else name)
+    return sorted(names)
+
+
+def make_queries(names, count, rng):
+    """คำค้นแต่ละแบบ {ชื่อแบบ: [คำค้น]}"""
+    picked = rng.sample(names, count)
+    typo = []
+    for name in picked:
+        pos = rng.randrange(len(name))
+        typo.append(name[:pos] + rng.choice("กขคงabc") + name[pos + 1:])
+    return {
+        "prefix": [name[:rng.randint(2, max(2, len(name) // 2))] for name in picked],
+        "substring": [name[len(name) // 3:len(name) // 3 + 4] for name in picked],
+        "typo": typo,
+    }
+
+
+def scan(names, query):
+    """วนเทียบทุกชื่อ (ทางเดิมที่ต้องอ่านรายการทั้งหมด)"""
+    query = normalize(query)
+    return [name for name in names if query in normalize(name)][:LIMIT]
+
+
+def timings(func, queries):
+    times = []
+    for query in queries:
+        t0 = time.perf_counter()
+        func(query)
+        times.append(time.perf_counter() - t0)
+    times.sort()
+    return times[len(times) // 2] * 1000, times[min(len(times) - 1, len(times) * 99 // 100)] * 1000
+
+
+def main(count, num_queries):
+    rng = random.Random(0)
+    names = make_names(count, rng)
+    store = RecipeStore({
+        "ingredients": [
+            {"id": i, "name": name, "unit": "กก.", "price_per_unit": 1.0, "stock": 0.0}
+            for i, name in enumerate(names, 1)
+        ],
+        "recipes": [],
+    })
+    t0 = time.perf_counter()
+    search = NameSearch(store)
+    build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for ing_id in range(1, 1001):
+        store.update_ingredient(ing_id, name=names[ing_id - 1] + " ใหม่")
+    update = (time.perf_counter() - t0) / 1000
+
+    print(f"วัตถุดิบ {count:,} รายการ: สร้างดัชนี {build:.2f} วินาที, "
+          f"อัปเดตชื่อ {update * 1e6:.0f} µs/รายการ")
+    print(f"  {'คำค้น':<12}{'ดัชนี p50':>12}{'p99 (ms)':>10}{'วนทุกชื่อ p50':>16}{'p99 (ms)':>10}")
+    for kind, queries in make_queries(names, num_queries, rng).items():
+        indexed = timings(lambda q: search.search("ingredients", q, LIMIT), queries)
+        scanned = timings(lambda q: scan(names, q), queries)
+        print(f"  {kind:<12}{indexed[0]:>12.3f}{indexed[1]:>10.3f}{scanned[0]:>16.3f}{scanned[1]:>10.3f}")
+    print("  (วนทุกชื่อหาได้เฉพาะข้อความที่ตรงทุกตัวอักษร ไม่รองรับคำสะกดผิด)")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 500,
+    )
@@ -0,0 +1,168 @@
+"""ทดสอบโหลดของโหมดบริการ HTTP/JSON (recipe_service.py)
+
+เปิดบริการเป็น process แยกบนข้อมูลสังเคราะห์ในโฟลเดอร์ชั่วคราว แล้วยิงคำขอจาก
+การเชื่อมต่อแบบ keep-alive หลายการเชื่อมต่อพร้อมกันเป็นเวลาที่กำหนด
+คำขอผสมระหว่างอ่านต้นทุนสูตร อ่านวัตถุดิบ และเพิ่มสต๊อค (คำขอแก้ไขผ่านคิวเขียน)
+รายงานคำขอต่อวินาทีและ latency p50/p99 แยกตามชนิด หลังจบตรวจว่าสต๊อครวม
+เพิ่มขึ้นเท่าจำนวนครั้งที่เพิ่มสต๊อคสำเร็จ และแสดงจำนวนครั้งที่บันทึกลงไฟล์
+
+วิธีใช้: python benchmarks/bench_service.py [จำนวนการเชื่อมต่อ] [วินาที] [backend]
+(ค่าเริ่มต้น 32 การเชื่อมต่อ, 10 วินาที, backend json)
+"""
+
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_storage import make_raw_data  # noqa: E402
+from recipe_storage import SqliteStorage  # noqa: E402
+from recipe_store import RecipeStore  # noqa: E402
+
+PORT = 8765
+NUM_INGREDIENTS = 2000
+NUM_RECIPES = 1000
+# สัดส่วนคำขอ: (ชื่อ, น้ำหนัก)
+MIX = (("recipe cost", 6), ("ingredient", 3), ("restock", 1))
+
+
+async def request(reader, writer, method, path, body=None):
+    """ส่งคำขอหนึ่งครั้งบนการเชื่อมต่อเดิม คืน (status, JSON)"""
+    payload = json.dumps(body).encode("utf-8") if body is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+        f"Content-Length: {len(payload)}\r\n\r\n".encode("latin-1") + payload
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line == b"\r\n":
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(seed, deadline, latencies, restocks):
+    """ยิงคำขอแบบสุ่มจนถึง deadline เก็บ latency ตามชนิดคำขอ"""
+    rng = random.Random(seed)
+    names = [name for name, _ in MIX]
+    weights = [weight for _, weight in MIX]
+    reader, writer = await asyncio.open_connection("127.0.0.1", PORT)
+    try:
+        while time.perf_counter() < deadline:
+            kind = rng.choices(names, weights)[0]
+            if kind == "recipe cost":
+                args = ("GET", f"/recipes/{rng.randint(1, NUM_RECIPES)}/cost")
+            elif kind == "ingredient":
+                args = ("GET", f"/ingredients/{rng.randint(1, NUM_INGREDIENTS)}")
+            else:
+                args = (
+                    "POST", f"/ingredients/{rng.randint(1, NUM_INGREDIENTS)}/restock",
+                    {"quantity": 1},
+                )
+            t0 = time.perf_counter()
+            status, _ = await request(reader, writer, *args)
+            latencies[kind].append(time.perf_counter() - t0)
+            if status >= 400:
+                raise RuntimeError(f"{args[0]} {args[1]} → {status}")
+            if kind == "restock":
+                restocks[0] += 1
+    finally:
+        writer.close()
+
+
+async def total_stock():
+    reader, writer = await asyncio.open_connection("127.0.0.1", PORT)
+    try:
+        _, ingredients = await request(reader, writer, "GET", "/ingredients")
+        _, stats = await request(reader, writer, "GET", "/stats")
+    finally:
+        writer.close()
+    return sum(ing["stock"] for ing in ingredients), stats
+
+
+async def wait_ready(proc):
+    """รอจนบริการรับการเชื่อมต่อได้"""
+    for _ in range(200):
+        if proc.poll() is not None:
+            raise RuntimeError("บริการหยุดทำงานก่อนเริ่มทดสอบ")
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", PORT)
+        except OSError:
+            await asyncio.sleep(0.05)
+            continue
+        writer.close()
+        return
+    raise RuntimeError("บริการไม่พร้อมภายในเวลาที่กำหนด")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def load_test(connections, seconds):
+    initial, _ = await total_stock()
+    latencies = {name: [] for name, _ in MIX}
+    restocks = [0]
+    t0 = time.perf_counter()
+    await asyncio.gather(*(
+        client(seed, t0 + seconds, latencies, restocks) for seed in range(connections)
+    ))
+    elapsed = time.perf_counter() - t0
+    final, stats = await total_stock()
+    return latencies, elapsed, abs(final - initial - restocks[0]) < 1e-6, stats
+
+
+def main(connections, seconds, backend):
+    with tempfile.TemporaryDirectory() as data_dir:
+        raw = make_raw_data(0, num_ingredients=NUM_INGREDIENTS, num_recipes=NUM_RECIPES)
+        if backend == "sqlite":
+            SqliteStorage(os.path.join(data_dir, "recipe_data.db")).import_store(RecipeStore(raw))
+        else:
+            # backend lines ย้ายจาก recipe_data.json ให้เองตอนเปิดครั้งแรก
+            with open(os.path.join(data_dir, "recipe_data.json"), "w", encoding="utf-8") as f:
+                json.dump(raw, f, ensure_ascii=False)
+        env = {**os.environ, "PYTHONPATH": ROOT, "RECIPE_BACKEND": backend}
+        proc = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "recipe_service.py"), "--port", str(PORT)],
+            cwd=data_dir, env=env, stdout=subprocess.DEVNULL,
+        )
+        try:
+            asyncio.run(wait_ready(proc))
+            latencies, elapsed, consistent, stats = asyncio.run(load_test(connections, seconds))
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    print(f"backend {backend}, {connections} การเชื่อมต่อ, {elapsed:.1f} วินาที")
+    print(f"  {'คำขอ':<16}{'จำนวน':>10}{'คำขอ/วินาที':>14}{'p50 (ms)':>10}{'p99 (ms)':>10}")
+    everything = [t for values in latencies.values() for t in values]
+    for name, values in [*latencies.items(), ("รวม", everything)]:
+        if not values:
+            continue
+        print(
+            f"  {name:<16}{len(values):>10}{len(values) / elapsed:>14.0f}"
+            f"{percentile(values, 50) * 1000:>10.2f}{percentile(values, 99) * 1000:>10.2f}"
+        )
+    print(f"  บันทึกลงไฟล์ {stats['batches']} ครั้ง สำหรับคำขอแก้ไข {stats['writes']} รายการ")
+    print(f"  สต๊อครวม{'ตรง' if consistent else 'ไม่ตรง'}กับจำนวนครั้งที่เพิ่มสต๊อค")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 32,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 10,
+        sys.argv[3] if len(sys.argv) > 3 else "json",
+    )
@@ -0,0 +1,124 @@
+"""เปรียบเทียบเวลาเปิดโปรแกรมและหน่วยความจำ (RSS สูงสุด) ของแต่ละวิธีโหลดข้อมูล
+
+แต่ละแบบวัดใน process ใหม่: เวลา load_data, เวลาเปิดรายการวัตถุดิบหน้าแรก
+และคำนวณต้นทุนหนึ่งสูตร แล้วอ่าน RSS สูงสุดของ process
+
+วิธีใช้: python benchmarks/bench_startup.py [จำนวนวัตถุดิบ] [จำนวนสูตร] [จำนวนประวัติ]
+(ค่าเริ่มต้น 50000 วัตถุดิบ × 200000 สูตร × 500000 ประวัติ ประมาณ 200 MB)
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_storage import make_raw_data  # noqa: E402
+from recipe_storage import JsonStorage, LineStorage  # noqa: E402
+from recipe_store import RecipeStore  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows ไม่มี resource จึงไม่แสดง RSS
+    resource = None
+
+PAGE_SIZE = 20
+
+
+def peak_rss_mb():
+    """RSS สูงสุดของ process นี้ (MB) หรือ None ถ้าวัดไม่ได้"""
+    # Linux: ru_maxrss ติดค่าของ process แม่มาตอน fork จึงอ่าน VmHWM แทน
+    if os.path.exists("/proc/self/status"):
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux รายงานเป็น KB ส่วน macOS เป็น byte
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def child(kind, path):
+    """วัดใน process ลูก แล้วพิมพ์ผลเป็น JSON หนึ่งบรรทัด"""
+    start = time.perf_counter()
+    if kind == "whole":
+        # load_data แบบเดิม: แปลงทั้งไฟล์รวมประวัติการผลิตเป็น dict
+        with open(path, "r", encoding="utf-8") as f:
+            store = RecipeStore(json.load(f))
+    elif kind == "json":
+        store = JsonStorage(path).load()
+    else:
+        store = LineStorage(path).load()
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in list(store.ingredients)[:PAGE_SIZE]:
+        store.ingredients[key].name
+    store.recipe_cost(next(iter(store.recipes)))
+    first_use = time.perf_counter() - start
+    print(json.dumps({"load": load_time, "first_use": first_use, "rss": peak_rss_mb()}))
+
+
+def measure(kind, path):
+    """รัน child ใน process ใหม่ คืนผลการวัด"""
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", kind, path],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.splitlines()[-1])
+
+
+def file_mb(*paths):
+    """ขนาดรวมของไฟล์/โฟลเดอร์ (MB)"""
+    total = 0
+    for path in paths:
+        if os.path.isdir(path):
+            total += sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+        elif os.path.exists(path):
+            total += os.path.getsize(path)
+    return total / (1024 * 1024)
+
+
+def main(num_ingredients, num_recipes, log_entries):
+    print(
+        f"วัตถุดิบ {num_ingredients:,} × สูตร {num_recipes:,} × ประวัติ {log_entries:,}"
+    )
+    raw = make_raw_data(log_entries, num_ingredients=num_ingredients, num_recipes=num_recipes)
+    with tempfile.TemporaryDirectory() as tmp:
+        whole = os.path.join(tmp, "whole", "recipe_data.json")
+        split = os.path.join(tmp, "json", "recipe_data.json")
+        lines = os.path.join(tmp, "lines", "recipe_data.jsonl")
+        for path in (whole, split, lines):
+            os.makedirs(os.path.dirname(path))
+        with open(whole, "w", encoding="utf-8") as f:
+            json.dump(raw, f, ensure_ascii=False, indent=2)
+        JsonStorage(split).compact(RecipeStore(raw))
+        LineStorage(lines).compact(RecipeStore(raw))
+        del raw
+
+        cases = [
+            ("json ทั้งไฟล์ (เดิม)", "whole", whole, [whole]),
+            ("json + log รายเดือน", "json", split, [split, split[:-5] + "_log"]),
+            ("lines (mmap)", "lines", lines, [lines, lines[:-6] + "_log"]),
+        ]
+        print(f"  {'แบบ':<22}{'ไฟล์':>10}{'load':>12}{'ใช้งานครั้งแรก':>16}{'RSS สูงสุด':>14}")
+        for label, kind, path, files in cases:
+            result = measure(kind, path)
+            rss = f"{result['rss']:>10.1f} MB" if result["rss"] is not None else f"{'-':>13}"
+            print(
+                f"  {label:<22}{file_mb(*files):>7.1f} MB{result['load'] * 1000:>9.1f} ms"
+                f"{result['first_use'] * 1000:>13.1f} ms {rss}"
+            )
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        child(sys.argv[2], sys.argv[3])
+    else:
+        args = [int(arg) for arg in sys.argv[1:]]
+        main(*(args or [50_000, 200_000, 500_000]))
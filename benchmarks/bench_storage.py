@@ -0,0 +1,112 @@
+"""เปรียบเทียบความเร็ว backend JSON กับ SQLite ตามจำนวนประวัติการผลิต
+
+วิธีใช้: python benchmarks/bench_storage.py [จำนวนประวัติ ...]
+(ค่าเริ่มต้น 10000 100000 1000000)
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recipe_storage import JsonStorage, SqliteStorage  # noqa: E402
+from recipe_store import RecipeStore  # noqa: E402
+
+NUM_INGREDIENTS = 1000
+NUM_RECIPES = 500
+LINES_PER_RECIPE = 8
+# ประวัติการผลิตหนึ่งรายการทุก 10 นาที (ประมาณ 4,300 รายการต่อเดือน)
+LOG_START = datetime(2020, 1, 1)
+LOG_INTERVAL = timedelta(minutes=10)
+
+
+def make_raw_data(log_entries, seed=42, num_ingredients=NUM_INGREDIENTS,
+                  num_recipes=NUM_RECIPES, lines_per_recipe=LINES_PER_RECIPE):
+    """สร้างข้อมูลสังเคราะห์ตามโครงสร้าง recipe_data.json (seed เดียวกันได้ข้อมูลเดิมเสมอ)"""
+    rng = random.Random(seed)
+    ingredients = [
+        {
+            "id": i,
+            "name": f"วัตถุดิบ {i}",
+            "unit": "กก.",
+            "price_per_unit": round(rng.uniform(5, 500), 2),
+            "stock": round(rng.uniform(0, 1000), 2),
+        }
+        for i in range(1, num_ingredients + 1)
+    ]
+    recipes = [
+        {
+            "id": r,
+            "name": f"สูตร {r}",
+            "servings": rng.randint(1, 20),
+            "ingredients": [
+                {"ingredient_id": ing_id, "quantity": round(rng.uniform(0.1, 5), 2)}
+                for ing_id in rng.sample(
+                    range(1, num_ingredients + 1), min(lines_per_recipe, num_ingredients)
+                )
+            ],
+        }
+        for r in range(1, num_recipes + 1)
+    ]
+    production_log = [
+        {
+            "id": n,
+            "recipe_id": (n % num_recipes) + 1,
+            "recipe_name": f"สูตร {(n % num_recipes) + 1}",
+            "batches": 1,
+            "total_servings": 4,
+            "total_cost": 100.0,
+            "date": (LOG_START + n * LOG_INTERVAL).strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        for n in range(1, log_entries + 1)
+    ]
+    return {"ingredients": ingredients, "recipes": recipes, "production_log": production_log}
+
+
+def timed(fn):
+    """เรียกฟังก์ชันแล้วคืน (เวลาที่ใช้, ผลลัพธ์)"""
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def bench_backend(name, storage, store, mutations=50):
+    """วัดเวลาโหลดและเวลาบันทึกการแก้ไขหนึ่งครั้ง"""
+    load_time, loaded = timed(storage.load)
+    start = time.perf_counter()
+    for i in range(mutations):
+        ing_id = (i % NUM_INGREDIENTS) + 1
+        loaded.update_ingredient(ing_id, stock=loaded.get_ingredient(ing_id).stock + 1)
+        storage.save(loaded)
+    save_time = (time.perf_counter() - start) / mutations
+    print(f"  {name:<14} load {load_time * 1000:>10.1f} ms   save/mutation {save_time * 1000:>9.3f} ms")
+
+
+def run(log_entries):
+    print(f"\nproduction_log = {log_entries:,} รายการ")
+    store = RecipeStore(make_raw_data(log_entries))
+    with tempfile.TemporaryDirectory() as tmp:
+        json_file = os.path.join(tmp, "recipe_data.json")
+        full = JsonStorage(json_file, use_journal=False)
+        full.compact(store)
+        # เขียนทับ snapshot ทุกครั้ง จึงวัดแค่ไม่กี่ครั้ง
+        bench_backend("json (full)", full, store, mutations=5)
+
+        journal = JsonStorage(json_file, use_journal=True)
+        journal.compact(store)
+        bench_backend("json (journal)", journal, store)
+
+        sqlite = SqliteStorage(os.path.join(tmp, "recipe_data.db"))
+        sqlite.import_store(store)
+        bench_backend("sqlite", sqlite, store)
+        sqlite.close()
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for size in sizes:
+        run(size)
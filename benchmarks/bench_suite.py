@@ -0,0 +1,299 @@
+"""ชุดวัดความเร็วของฟังก์ชันหลักใน recipe_management พร้อมเทียบกับผลที่บันทึกไว้ (baseline)
+
+สร้างข้อมูลสังเคราะห์ด้วย make_raw_data (seed เดียวกันได้ข้อมูลเดิมเสมอ) ลงไดเรกทอรีชั่วคราว
+แล้วเรียกฟังก์ชันเดียวกับที่เมนูเรียก คำตอบของ input() ถูกกำหนดไว้ล่วงหน้าในแต่ละ scenario
+และข้อความที่พิมพ์ถูกทิ้ง (ไม่ต้องมีผู้ใช้) แต่ละ scenario เริ่มจากข้อมูลที่โหลดใหม่
+(แคชต้นทุนยังว่าง) และวัดสองแบบ:
+    เวลา         ค่ามัธยฐานและค่าต่ำสุดจากหลายรอบ
+    หน่วยความจำ  peak ของหน่วยความจำที่จองระหว่าง scenario (tracemalloc แยกอีกรอบ
+                 เพราะ tracemalloc ทำให้ช้าลง)
+
+baseline เก็บเป็น JSON (ค่าเริ่มต้น benchmarks/baselines/<ขนาด>-<backend>.json)
+--compare แสดงอัตราส่วนเทียบ baseline และจบด้วย exit code 1 ถ้ามี scenario ที่ช้าลง
+หรือใช้หน่วยความจำมากขึ้นเกิน --threshold (ผลขึ้นกับเครื่อง ควรเทียบบนเครื่องเดียวกัน)
+
+วิธีใช้:
+    python benchmarks/bench_suite.py [--size small|medium|large] [--backend json|lines|sqlite]
+        [--ingredients N] [--recipes N] [--lines N] [--log N] [--seed N]
+        [--repeat N] [--only ชื่อ ...] [--save-baseline [ไฟล์]] [--compare [ไฟล์]]
+"""
+
+import argparse
+import builtins
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import recipe_management as rm  # noqa: E402
+from bench_storage import make_raw_data  # noqa: E402
+from recipe_storage import JsonStorage, SqliteStorage  # noqa: E402
+from recipe_store import RecipeStore  # noqa: E402
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+# ขนาดข้อมูล: (วัตถุดิบ, สูตร, บรรทัดต่อสูตร, ประวัติการผลิต)
+SIZES = {
+    "small": (200, 100, 8, 10_000),
+    "medium": (1_000, 500, 8, 100_000),
+    "large": (5_000, 2_000, 12, 1_000_000),
+}
+# ยอมให้ช้าลง/ใช้หน่วยความจำมากขึ้นได้เท่านี้ก่อนถือว่าถดถอย (0.25 = 25%)
+DEFAULT_THRESHOLD = 0.25
+# peak หน่วยความจำต่ำกว่านี้ (byte) ไม่นำมาเทียบ เพราะแกว่งตามรายละเอียดของ allocator
+MIN_COMPARED_PEAK = 256 * 1024
+
+
+class ScriptExhausted(RuntimeError):
+    """ฟังก์ชันถาม input() มากกว่าคำตอบที่ scenario เตรียมไว้ (ขั้นตอนของเมนูเปลี่ยนไป)"""
+
+
+@contextlib.contextmanager
+def scripted_input(answers):
+    """แทน input() ด้วยคำตอบที่กำหนด และทิ้งข้อความที่พิมพ์ระหว่างนั้น"""
+    answers = iter(answers)
+
+    def fake_input(prompt=""):
+        try:
+            return next(answers)
+        except StopIteration:
+            raise ScriptExhausted(f"ไม่มีคำตอบสำหรับ: {prompt!r}") from None
+
+    original = builtins.input
+    builtins.input = fake_input
+    try:
+        with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+            yield
+    finally:
+        builtins.input = original
+
+
+# ==================== scenario ====================
+# แต่ละ scenario คืนฟังก์ชัน run(data) และรายการคำตอบของ input()
+
+def _first_recipe(data):
+    return next(iter(data.recipes.values()))
+
+
+def _stock_up(data, recipe):
+    """เติมสต๊อควัตถุดิบของสูตรให้พอผลิต แล้วบันทึก (ทำก่อนจับเวลา)"""
+    demand, _ = data.recipe_demand(recipe.id)
+    for ing_id, qty in demand.items():
+        data.update_ingredient(ing_id, stock=data.ingredients[ing_id].stock + qty * 10)
+    rm.save_data(data)
+
+
+def scenario_load(data):
+    return lambda _: rm.load_data(), []
+
+
+def scenario_save(data):
+    ing_id = next(iter(data.ingredients))
+
+    def run(data):
+        data.update_ingredient(ing_id, stock=data.ingredients[ing_id].stock + 1)
+        rm.save_data(data)
+
+    return run, []
+
+
+def scenario_list_recipes(data):
+    return rm.list_recipes, []
+
+
+def scenario_compare_costs(data):
+    return rm.compare_costs, []
+
+
+def scenario_check_producible(data):
+    return rm.check_producible, []
+
+
+def scenario_produce_recipe(data):
+    recipe = _first_recipe(data)
+    _stock_up(data, recipe)
+    return rm.produce_recipe, [str(recipe.id), "1", "y"]
+
+
+def scenario_show_production_log(data):
+    # ทั้งช่วงวันที่ แล้วย้อนกลับสองหน้า
+    return rm.show_production_log, ["", "", "p", "p", ""]
+
+
+SCENARIOS = {
+    "load": scenario_load,
+    "save": scenario_save,
+    "list_recipes": scenario_list_recipes,
+    "compare_costs": scenario_compare_costs,
+    "check_producible": scenario_check_producible,
+    "produce_recipe": scenario_produce_recipe,
+    "show_production_log": scenario_show_production_log,
+}
+
+
+# ==================== วัดผล ====================
+
+def prepare_storage(data_dir, backend, raw):
+    """เขียนข้อมูลสังเคราะห์ลงไดเรกทอรี แล้วตั้ง storage ของ recipe_management ให้ใช้ไฟล์นั้น"""
+    store = RecipeStore(raw)
+    os.chdir(data_dir)
+    if backend == "sqlite":
+        storage = rm.create_storage(backend)
+        storage.import_store(store)
+    else:
+        # backend lines ย้ายข้อมูลจาก recipe_data.json ให้เองตอนโหลดครั้งแรก
+        JsonStorage(rm.DATA_FILE, rm.JOURNAL_FILE).compact(store)
+        storage = rm.create_storage(backend)
+    rm.storage = storage
+    rm.load_data()
+    return storage
+
+
+def measure(name, repeat):
+    """วัด scenario หนึ่งรายการ คืน dict ผลลัพธ์"""
+    times = []
+    for _ in range(repeat):
+        data = rm.load_data()
+        run, answers = SCENARIOS[name](data)
+        with scripted_input(answers):
+            start = time.perf_counter()
+            run(data)
+            times.append(time.perf_counter() - start)
+
+    data = rm.load_data()
+    run, answers = SCENARIOS[name](data)
+    with scripted_input(answers):
+        tracemalloc.start()
+        try:
+            run(data)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {"median": statistics.median(times), "min": min(times), "peak": peak}
+
+
+def run_suite(config, backend, names, repeat):
+    raw = make_raw_data(
+        config["log"], seed=config["seed"], num_ingredients=config["ingredients"],
+        num_recipes=config["recipes"], lines_per_recipe=config["lines"],
+    )
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as data_dir:
+        storage = prepare_storage(data_dir, backend, raw)
+        try:
+            return {name: measure(name, repeat) for name in names}
+        finally:
+            if isinstance(storage, SqliteStorage):
+                storage.close()
+            os.chdir(cwd)
+
+
+# ==================== baseline ====================
+
+def default_baseline(size, backend):
+    return os.path.join(BASELINE_DIR, f"{size}-{backend}.json")
+
+
+def save_baseline(path, config, backend, results):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    payload = {
+        "config": config,
+        "backend": backend,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    print(f"บันทึก baseline: {path}")
+
+
+def compare(path, config, backend, results, threshold):
+    """พิมพ์อัตราส่วนเทียบ baseline คืนรายชื่อ scenario ที่ถดถอย"""
+    with open(path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline["config"] != config or baseline["backend"] != backend:
+        print("⚠️  ขนาดข้อมูลหรือ backend ไม่ตรงกับ baseline ผลเทียบอาจไม่มีความหมาย")
+
+    print(f"\nเทียบกับ {path} ({baseline['created']}, Python {baseline['python']})")
+    print(f"  {'scenario':<22}{'เวลา':>10}{'หน่วยความจำ':>14}")
+    regressions = []
+    for name, result in results.items():
+        old = baseline["results"].get(name)
+        if old is None:
+            print(f"  {name:<22}{'(ไม่มีใน baseline)':>24}")
+            continue
+        time_ratio = result["median"] / old["median"]
+        mem_ratio = result["peak"] / old["peak"] if old["peak"] else 1.0
+        slower = time_ratio > 1 + threshold
+        bigger = old["peak"] >= MIN_COMPARED_PEAK and mem_ratio > 1 + threshold
+        mark = " ❌" if slower or bigger else ""
+        print(f"  {name:<22}{time_ratio:>9.2f}x{mem_ratio:>13.2f}x{mark}")
+        if slower or bigger:
+            regressions.append(name)
+    return regressions
+
+
+def print_results(config, backend, results):
+    print(
+        f"วัตถุดิบ {config['ingredients']:,} | สูตร {config['recipes']:,} "
+        f"({config['lines']} บรรทัด/สูตร) | ประวัติ {config['log']:,} | backend {backend}"
+    )
+    print(f"  {'scenario':<22}{'median (ms)':>12}{'min (ms)':>12}{'peak (KB)':>12}")
+    for name, result in results.items():
+        print(
+            f"  {name:<22}{result['median'] * 1000:>12.2f}{result['min'] * 1000:>12.2f}"
+            f"{result['peak'] / 1024:>12.0f}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="วัดความเร็วฟังก์ชันหลักของ recipe_management")
+    parser.add_argument("--size", choices=SIZES, default="small")
+    parser.add_argument("--backend", choices=["json", "lines", "sqlite"], default="json")
+    parser.add_argument("--ingredients", type=int)
+    parser.add_argument("--recipes", type=int)
+    parser.add_argument("--lines", type=int, help="จำนวนวัตถุดิบต่อสูตร")
+    parser.add_argument("--log", type=int, help="จำนวนประวัติการผลิต")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="+", choices=SCENARIOS, help="วัดเฉพาะ scenario ที่ระบุ")
+    parser.add_argument("--save-baseline", nargs="?", const="", metavar="FILE")
+    parser.add_argument("--compare", nargs="?", const="", metavar="FILE")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    ingredients, recipes, lines, log = SIZES[args.size]
+    config = {
+        "ingredients": args.ingredients or ingredients,
+        "recipes": args.recipes or recipes,
+        "lines": args.lines or lines,
+        "log": log if args.log is None else args.log,
+        "seed": args.seed,
+    }
+    results = run_suite(config, args.backend, args.only or list(SCENARIOS), args.repeat)
+    print_results(config, args.backend, results)
+
+    if args.save_baseline is not None:
+        save_baseline(args.save_baseline or default_baseline(args.size, args.backend),
+                      config, args.backend, results)
+    if args.compare is not None:
+        regressions = compare(args.compare or default_baseline(args.size, args.backend),
+                              config, args.backend, results, args.threshold)
+        if regressions:
+            print(f"❌ ช้าลงหรือใช้หน่วยความจำมากขึ้นเกิน {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+        print("✅ ไม่มี scenario ที่ถดถอยเกินเกณฑ์")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
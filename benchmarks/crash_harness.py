@@ -0,0 +1,248 @@
+"""ทดสอบว่าข้อมูลโหลดได้และไม่เสียเสมอ เมื่อโปรแกรมหยุดกลางคันระหว่างบันทึก (crash injection)
+
+แต่ละรอบสร้างข้อมูลใหม่ในโฟลเดอร์ชั่วคราว แล้วเปิด process ลูกที่ทำรายการ OPS ครั้ง
+(เพิ่มสต๊อคครั้งละ 1 และเพิ่มประวัติการผลิตทุก LOG_EVERY ครั้ง โดยวันที่วนหลายเดือน
+ให้มีการปิด/บีบอัดไฟล์รายเดือน) และรวม journal บ่อย ๆ process ลูกแจ้งผ่าน pipe
+ทุกครั้งที่บันทึกเสร็จ แล้วถูกทำให้หยุดกลางคันด้วยสองวิธี:
+
+    inject  แทน open/os.replace/os.remove ให้หยุดทันที (os._exit) ที่จุดเขียนไฟล์ที่สุ่มไว้
+            การเขียนที่จุดนั้นเขียนได้เพียงบางส่วน (จำลองไฟล์ที่เขียนไม่ครบ)
+    kill    ส่ง SIGKILL ในเวลาที่สุ่ม (ใช้ได้กับ SQLite ที่เขียนไฟล์จากโค้ด C)
+
+หลังหยุด process แม่โหลดข้อมูลใหม่และตรวจว่า
+    - โหลดได้
+    - สต๊อคที่เพิ่มเท่ากับจำนวนรายการที่บันทึกเสร็จ (หรือมากกว่า 1 ถ้าหยุดหลังบันทึกแต่ก่อนแจ้ง)
+    - ประวัติการผลิตตรงกับรายการชุดเดียวกัน (สต๊อคกับประวัติไม่บันทึกแยกกัน) และ ID ไม่ซ้ำ/ไม่ขาด
+    - บันทึกต่อหลังกู้คืนได้
+ไม่ได้จำลองไฟดับ (ข้อมูลใน page cache ของระบบปฏิบัติการยังอยู่) ส่วนนั้นขึ้นกับระดับ durability
+
+วิธีใช้: python benchmarks/crash_harness.py [จำนวนรอบต่อ backend] [seed]
+(ค่าเริ่มต้น 100 รอบ, seed 1) คืน exit code 1 ถ้ามีรอบที่ไม่ผ่าน
+"""
+
+import builtins
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recipe_storage import JsonStorage, LineStorage, SqliteStorage  # noqa: E402
+from recipe_store import RecipeStore  # noqa: E402
+
+OPS = 60
+LOG_EVERY = 3
+NUM_INGREDIENTS = 20
+COMPACT_EVERY = 7
+CRASHED = 70
+BACKENDS = {
+    "json": lambda d: JsonStorage(
+        os.path.join(d, "recipe_data.json"), compact_threshold=COMPACT_EVERY
+    ),
+    "json (เขียนทับทั้งไฟล์)": lambda d: JsonStorage(
+        os.path.join(d, "recipe_data.json"), use_journal=False
+    ),
+    "lines": lambda d: LineStorage(
+        os.path.join(d, "recipe_data.jsonl"), compact_threshold=COMPACT_EVERY
+    ),
+    "sqlite": lambda d: SqliteStorage(os.path.join(d, "recipe_data.db")),
+}
+# SQLite เขียนไฟล์จากโค้ด C แทน open ของ Python ไม่ได้
+INJECTABLE = {"json", "json (เขียนทับทั้งไฟล์)", "lines"}
+
+
+# ==================== process ลูก ====================
+
+def install_crash(crash_at, rng):
+    """ทำให้ process หยุดทันทีที่จุดเขียนไฟล์ลำดับที่ crash_at (0 = ไม่หยุด) คืนตัวนับจุด"""
+    points = [0]
+
+    def reached():
+        points[0] += 1
+        return points[0] == crash_at
+
+    class CrashingFile:
+        def __init__(self, f):
+            self._f = f
+
+        def write(self, data):
+            if reached():
+                self._f.write(data[:rng.randrange(len(data) + 1)])
+                self._f.flush()
+                os._exit(CRASHED)
+            return self._f.write(data)
+
+        def __getattr__(self, name):
+            return getattr(self._f, name)
+
+        def __iter__(self):
+            return iter(self._f)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return self._f.__exit__(*exc)
+
+    real_open = builtins.open
+
+    def crashing_open(file, mode="r", *args, **kwargs):
+        f = real_open(file, mode, *args, **kwargs)
+        return CrashingFile(f) if any(c in mode for c in "wa+") else f
+
+    def crash_before(func):
+        def wrapper(*args, **kwargs):
+            if reached():
+                os._exit(CRASHED)
+            return func(*args, **kwargs)
+        return wrapper
+
+    builtins.open = crashing_open
+    os.replace = crash_before(os.replace)
+    os.remove = crash_before(os.remove)
+    return points
+
+
+def child(backend, data_dir, crash_at, seed):
+    """ทำรายการ OPS ครั้ง เขียนจำนวนจุดเขียนไฟล์สะสมลง stdout หลังบันทึกเสร็จแต่ละครั้ง"""
+    storage = BACKENDS[backend](data_dir)
+    store = storage.load()
+    points = install_crash(crash_at, random.Random(seed)) if backend in INJECTABLE else [0]
+    ids = sorted(store.ingredients)
+    for i in range(OPS):
+        with storage.transaction(store):
+            ing_id = ids[i % len(ids)]
+            store.update_ingredient(ing_id, stock=store.ingredients[ing_id].stock + 1)
+            if i % LOG_EVERY == 0:
+                store.append_log({
+                    "recipe_id": 1,
+                    "recipe_name": "สูตร 1",
+                    "batches": 1,
+                    "total_servings": 1,
+                    "total_cost": 1.0,
+                    "date": f"2026-{i % 12 + 1:02d}-01 12:00:00",
+                })
+        os.write(1, f"{points[0]}\n".encode())
+
+
+# ==================== process แม่ ====================
+
+def prepare(backend, data_dir):
+    """สร้างข้อมูลตั้งต้น คืนสต๊อครวม"""
+    store = RecipeStore({
+        "ingredients": [
+            {"id": i, "name": f"วัตถุดิบ {i}", "unit": "กก.", "price_per_unit": 10.0, "stock": 0.0}
+            for i in range(1, NUM_INGREDIENTS + 1)
+        ],
+        "recipes": [],
+    })
+    storage = BACKENDS[backend](data_dir)
+    if isinstance(storage, SqliteStorage):
+        storage.import_store(store)
+        storage.close()
+    else:
+        storage.compact(store)
+    return 0.0
+
+
+def spawn(backend, data_dir, crash_at=0, seed=0, kill_after=None):
+    """เรียก process ลูก คืน (จำนวนรายการที่บันทึกเสร็จ, จุดเขียนไฟล์สะสมหลังแต่ละรายการ, exit code)"""
+    proc = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--child", backend, data_dir,
+         str(crash_at), str(seed)],
+        stdout=subprocess.PIPE,
+    )
+    if kill_after is not None:
+        time.sleep(kill_after)
+        if proc.poll() is None:
+            proc.send_signal(signal.SIGKILL)
+    out, _ = proc.communicate()
+    acks = [int(line) for line in out.decode().split()]
+    return len(acks), acks, proc.returncode
+
+
+def verify(backend, data_dir, acked):
+    """ตรวจข้อมูลหลังหยุดกลางคัน คืนข้อความปัญหา (None ถ้าผ่าน)"""
+    try:
+        storage = BACKENDS[backend](data_dir)
+        store = storage.load()
+    except Exception as e:
+        return f"โหลดไม่ได้: {e!r}"
+    done = round(sum(ing.stock for ing in store.ingredients.values()))
+    if done not in (acked, acked + 1):
+        return f"สต๊อคเพิ่ม {done} แต่บันทึกเสร็จ {acked} รายการ"
+    ids = sorted(entry.id for entry in store.production_log)
+    expected = len(range(0, done, LOG_EVERY))
+    if ids != list(range(1, expected + 1)):
+        return f"ประวัติการผลิต {ids} ไม่ตรงกับ {done} รายการ (ควรมี {expected})"
+    try:
+        with storage.transaction(store):
+            store.update_ingredient(1, stock=store.ingredients[1].stock + 1)
+        reloaded = BACKENDS[backend](data_dir).load()
+    except Exception as e:
+        return f"บันทึกต่อหลังกู้คืนไม่ได้: {e!r}"
+    if round(sum(ing.stock for ing in reloaded.ingredients.values())) != done + 1:
+        return "รายการที่บันทึกหลังกู้คืนหายไป"
+    return None
+
+
+def main(trials, seed):
+    rng = random.Random(seed)
+    failed = 0
+    for backend in BACKENDS:
+        # รอบทดลองไม่หยุดกลางคัน: นับจุดเขียนไฟล์ของแต่ละรายการและเวลาที่ใช้
+        with tempfile.TemporaryDirectory() as data_dir:
+            prepare(backend, data_dir)
+            t0 = time.perf_counter()
+            acked, acks, code = spawn(backend, data_dir)
+            duration = time.perf_counter() - t0
+            if code != 0 or acked != OPS:
+                print(f"❌ {backend}: รอบทดลองไม่สำเร็จ (exit {code})")
+                failed += 1
+                continue
+        total_points = acks[-1]
+
+        problems = []
+        crashed = 0
+        for trial in range(trials):
+            with tempfile.TemporaryDirectory() as data_dir:
+                prepare(backend, data_dir)
+                if backend in INJECTABLE and trial % 2 == 0:
+                    mode = "inject"
+                    # สุ่มรายการก่อน แล้วสุ่มจุดในรายการนั้น ให้ทุกรายการมีโอกาสเท่ากัน
+                    # (ไม่ให้จุดเขียน snapshot ที่มีจำนวนมากกลบจุดอื่น)
+                    op = rng.randrange(OPS)
+                    first = acks[op - 1] if op else 0
+                    crash_at = rng.randint(first + 1, max(first + 1, acks[op]))
+                    acked, _, code = spawn(backend, data_dir, crash_at, rng.randrange(1 << 30))
+                else:
+                    mode = "kill"
+                    acked, _, code = spawn(backend, data_dir, kill_after=rng.uniform(0, duration))
+                crashed += code != 0
+                problem = verify(backend, data_dir, acked)
+                if problem:
+                    problems.append(f"รอบ {trial} ({mode}, บันทึกเสร็จ {acked}): {problem}")
+
+        failed += bool(problems)
+        mark = "❌" if problems else "✅"
+        print(
+            f"{mark} {backend}: {trials} รอบ, หยุดกลางคัน {crashed} รอบ, "
+            f"จุดเขียนไฟล์ {total_points} จุดต่อ {OPS} รายการ, ไม่ผ่าน {len(problems)} รอบ"
+        )
+        for problem in problems[:5]:
+            print(f"    {problem}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        child(sys.argv[2], sys.argv[3], int(sys.argv[4]), int(sys.argv[5]))
+    else:
+        sys.exit(main(
+            int(sys.argv[1]) if len(sys.argv) > 1 else 100,
+            int(sys.argv[2]) if len(sys.argv) > 2 else 1,
+        ))
@@ -0,0 +1,89 @@
+"""คิดต้นทุนของประวัติการผลิตใหม่ตามราคาวัตถุดิบ ณ วันที่ผลิต (ใช้ตรวจสอบ price_cost ที่บันทึกไว้)
+
+เทียบกับ price_cost ซึ่งคิดจากราคาวัตถุดิบตอนผลิตแบบเดียวกัน ไม่ใช่ total_cost ที่เป็นต้นทุน
+ของล็อตที่ถูกตัดแบบ FIFO (ต่างจากราคา ณ วันที่ผลิตได้เสมอเมื่อล็อตเก่ายังเหลือ)
+ประวัติรุ่นเก่าที่ไม่มี price_cost จึงไม่มีค่าให้เทียบ
+
+ไล่ประวัติตามเวลาครั้งเดียว พร้อมไล่รายการเปลี่ยนราคาของทุกวัตถุดิบที่เรียงตามเวลาไปด้วย
+ต้นทุนต่อรอบของแต่ละสูตรถูกจำไว้จนกว่าราคาวัตถุดิบในสูตร (หรือในสูตรย่อย) จะเปลี่ยน
+ประวัติหลายแสนรายการจึงใช้เวลาตามจำนวนประวัติ + จำนวนครั้งที่ราคาเปลี่ยน × สูตรที่ได้รับผล
+ไม่ต้องค้นราคาทีละบรรทัดของทุกรายการ
+
+ใช้บรรทัดสูตรปัจจุบัน (สูตรไม่ได้เก็บประวัติ) ผลต่างจึงมาจากทั้งราคาและสูตรที่ถูกแก้ภายหลัง
+"""
+
+from itertools import chain
+
+
+def recost_history(store, start=None, end=None):
+    """คืนแถวเทียบ price_cost ที่บันทึกไว้ (logged_cost) กับต้นทุนตามราคา ณ วันที่ผลิต (cost)
+    ของประวัติในช่วงวันที่ พร้อม total_cost (ต้นทุนล็อต FIFO) ไว้ดูประกอบ
+
+    cost เป็น None ถ้าสูตรถูกลบไปแล้ว logged_cost เป็น None ถ้าประวัติไม่มี price_cost
+    difference เป็น None ถ้าค่าใดค่าหนึ่งเป็น None
+    """
+    # ไล่ประวัติทีละช่วงเดือน ไม่โหลดประวัติเก่าทั้งหมดเข้าหน่วยความจำพร้อมกัน
+    entries = store.production_log.iter_between(start, end)
+    first_entry = next(entries, None)
+    if first_entry is None:
+        return
+    first = first_entry.date
+    prices = {ing.id: ing.price_at(first) for ing in store.ingredients.values()}
+    events = sorted(
+        (since, ing.id, price)
+        for ing in store.ingredients.values()
+        for since, price in ing.price_history
+        if since > first
+    )
+    next_event = 0
+    costs = {}
+
+    def batch_cost(recipe_id):
+        cost = costs.get(recipe_id)
+        if cost is None:
+            cost = 0.0
+            for item in store.recipes[recipe_id].ingredients:
+                if item.recipe_id is not None:
+                    if item.recipe_id in store.recipes:
+                        cost += item.quantity * batch_cost(item.recipe_id)
+                    continue
+                price = prices.get(item.ingredient_id)
+                if price is not None:
+                    cost += item.quantity * price
+            costs[recipe_id] = cost
+        return cost
+
+    now = first
+    for entry in chain([first_entry], entries):
+        recipe_id = entry.recipe_id
+        if recipe_id not in store.recipes:
+            cost = None
+        elif entry.date < now:
+            # นาฬิกาเครื่องถอยหลัง: ค้นราคาของรายการนี้ตรงๆ
+            cost = store.recipe_cost_at(recipe_id, entry.date) * entry.batches
+        else:
+            now = entry.date
+            while next_event < len(events) and events[next_event][0] <= now:
+                _, ing_id, price = events[next_event]
+                next_event += 1
+                prices[ing_id] = price
+                for recipe in store.recipes_using(ing_id):
+                    costs.pop(recipe.id, None)
+                    for parent_id in store.ancestors(recipe.id):
+                        costs.pop(parent_id, None)
+            cost = batch_cost(recipe_id) * entry.batches
+        if cost is not None:
+            # price_cost ถูกบันทึกแบบปัดสองตำแหน่ง เทียบกันหลังปัดแล้ว
+            cost = round(cost, 2)
+        logged = entry.price_cost
+        yield {
+            "id": entry.id,
+            "date": entry.date,
+            "recipe_id": recipe_id,
+            "recipe_name": entry.recipe_name,
+            "batches": entry.batches,
+            "logged_cost": logged,
+            "total_cost": entry.total_cost,
+            "cost": cost,
+            "difference": None if cost is None or logged is None else round(cost - logged, 2),
+        }
@@ -0,0 +1,301 @@
+"""ประวัติการผลิตพร้อมดัชนีวันที่และยอดสรุปรายวัน/รายสูตรที่อัปเดตทีละรายการ
+
+ประวัติเก่าถูกแบ่งเป็นช่วงรายเดือน (LogSegment) ที่มีเพียงยอดสรุปอยู่ในหน่วยความจำ
+และอ่านรายการจริงจากไฟล์เมื่อต้องใช้เท่านั้น
+"""
+
+from bisect import bisect_left, bisect_right
+
+
+def _empty_totals():
+    """ยอดรวมเริ่มต้น"""
+    return {"count": 0, "batches": 0, "servings": 0, "cost": 0.0}
+
+
+def _add_totals(totals, entry):
+    """บวกประวัติหนึ่งรายการเข้ายอดรวม"""
+    totals["count"] += 1
+    totals["batches"] += entry.batches
+    totals["servings"] += entry.total_servings
+    totals["cost"] += entry.total_cost
+
+
+def _merge_totals(totals, other):
+    """บวกยอดรวม other เข้า totals"""
+    for key, value in other.items():
+        totals[key] += value
+
+
+def segment_key(entry):
+    """คีย์ช่วงเวลาของประวัติ (เดือน YYYY-MM)"""
+    return entry.date[:7]
+
+
+def summarize(entries, summary=None):
+    """สร้าง/ต่อยอดสรุปของช่วงประวัติ (จำนวน, ID/วันที่แรก-สุดท้าย, ยอดรายวัน)"""
+    summary = summary or {
+        "count": 0, "first_id": None, "last_id": 0,
+        "first_date": None, "last_date": None, "daily": {},
+    }
+    for entry in entries:
+        summary["count"] += 1
+        if summary["first_id"] is None:
+            summary["first_id"] = entry.id
+        summary["last_id"] = max(summary["last_id"], entry.id)
+        if summary["first_date"] is None or entry.date < summary["first_date"]:
+            summary["first_date"] = entry.date
+        if summary["last_date"] is None or entry.date > summary["last_date"]:
+            summary["last_date"] = entry.date
+        _add_totals(summary["daily"].setdefault(entry.date[:10], _empty_totals()), entry)
+    return summary
+
+
+def summarize_by_recipe(entries, by_recipe=None):
+    """สร้าง/ต่อยอดยอดรวมรายสูตร (คีย์เป็นข้อความเพื่อเก็บเป็น JSON ได้)"""
+    by_recipe = {} if by_recipe is None else by_recipe
+    for entry in entries:
+        _add_totals(by_recipe.setdefault(str(entry.recipe_id), _empty_totals()), entry)
+    return by_recipe
+
+
+def _select_range(entries, dates, ordered, start, end):
+    """เลือกรายการในช่วงวันที่ (ใช้ bisect เมื่อรายการเรียงตามเวลา)"""
+    if not ordered:
+        return [
+            e for e in entries
+            if (start is None or e.date[:10] >= start)
+            and (end is None or e.date[:10] <= end)
+        ]
+    lo = 0 if start is None else bisect_left(dates, start)
+    hi = len(dates) if end is None else bisect_right(dates, end + "\uffff")
+    return entries[lo:hi]
+
+
+def page_bounds(count, page_no, page_size):
+    """คืน (เลขหน้าที่ใช้จริง, จำนวนหน้าทั้งหมด) ของรายการ count รายการ
+
+    เลขหน้าเริ่มที่ 0 และ page_no เป็น None หมายถึงหน้าสุดท้าย
+    """
+    pages = max(1, -(-count // page_size))
+    if page_no is None:
+        page_no = pages - 1
+    return min(max(page_no, 0), pages - 1), pages
+
+
+def paginate(entries, page_no, page_size):
+    """คืน (รายการในหน้า page_no, เลขหน้าที่ใช้จริง, จำนวนหน้าทั้งหมด) เลขหน้าเริ่มที่ 0"""
+    page_no, pages = page_bounds(len(entries), page_no, page_size)
+    start = page_no * page_size
+    return entries[start:start + page_size], page_no, pages
+
+
+class LogSegment:
+    """ประวัติการผลิตหนึ่งเดือนที่ถูกเก็บไว้ในไฟล์
+
+    รายการถูกอ่านจากไฟล์ทุกครั้งที่ใช้และไม่ถูกเก็บไว้ในหน่วยความจำ
+    จำนวนรายการในช่วงวันที่ใดๆ ได้จากยอดรายวันในสรุปโดยไม่ต้องอ่านไฟล์
+    """
+
+    def __init__(self, key, summary, loader):
+        self.key = key
+        self.summary = summary
+        self._loader = loader
+
+    def __len__(self):
+        return self.summary["count"]
+
+    def entries(self):
+        """รายการในช่วงนี้ (อ่านจากไฟล์)"""
+        return self._loader()
+
+    def count(self, start, end):
+        """จำนวนรายการในช่วงวันที่ start..end (จากยอดรายวัน ไม่ต้องอ่านไฟล์)"""
+        if start is None and end is None:
+            return self.summary["count"]
+        return sum(
+            totals["count"] for day, totals in self.summary["daily"].items()
+            if (start is None or day >= start) and (end is None or day <= end)
+        )
+
+    def select(self, start, end):
+        """รายการในช่วงวันที่ start..end
+
+        ถ้ารายการในไฟล์เรียงตามเวลา ตำแหน่งต้น/ท้ายของช่วงได้จากยอดรายวันของวันก่อนหน้า
+        """
+        entries = self.entries()
+        if start is None and end is None:
+            return entries
+        dates = [entry.date for entry in entries]
+        if not all(a <= b for a, b in zip(dates, dates[1:])):
+            return _select_range(entries, dates, False, start, end)
+        lo = hi = 0
+        for day, totals in self.summary["daily"].items():
+            if start is not None and day < start:
+                lo += totals["count"]
+            if end is None or day <= end:
+                hi += totals["count"]
+        return entries[lo:hi]
+
+    def overlaps(self, start, end):
+        """ช่วงนี้มีวันที่ใน start..end หรือไม่ (ดูจากสรุป ไม่ต้องอ่านไฟล์)"""
+        if start is not None and self.summary["last_date"][:10] < start:
+            return False
+        if end is not None and self.summary["first_date"][:10] > end:
+            return False
+        return True
+
+
+class ProductionLog:
+    """รายการประวัติการผลิต (LogEntry เรียงตามเวลาที่เพิ่ม) พร้อมดัชนีวันที่
+
+    entries คือประวัติช่วงปัจจุบันที่อยู่ในหน่วยความจำ ส่วน archived คือช่วงเก่า
+    ที่อ่านจากไฟล์เมื่อต้องใช้ ประวัติถูกเพิ่มต่อท้ายตามเวลาจึงค้นช่วงวันที่ด้วย
+    bisect ได้ ยอดรวมรายวันและทั้งหมดรวมจากสรุปของช่วงเก่า ยอดรายสูตรของช่วงเก่า
+    ส่งมาเป็นก้อนเดียวใน archived_by_recipe (dict หรือฟังก์ชันที่คืน dict ซึ่งจะถูกเรียก
+    เมื่อใช้ by_recipe ครั้งแรก) และทุกยอดถูกบวกเพิ่มทุกครั้งที่ append
+    """
+
+    def __init__(self, entries=(), archived=(), archived_by_recipe=None):
+        self.archived = sorted(archived, key=lambda seg: seg.key)
+        self.entries = []
+        self._dates = []
+        self._ordered = True
+        self.daily = {}
+        self._by_recipe = {}
+        self._archived_by_recipe = archived_by_recipe
+        self.totals = _empty_totals()
+        self._archived_last_id = 0
+        for segment in self.archived:
+            summary = segment.summary
+            self._archived_last_id = max(self._archived_last_id, summary["last_id"])
+            for day, totals in summary["daily"].items():
+                _merge_totals(self.daily.setdefault(day, _empty_totals()), totals)
+                _merge_totals(self.totals, totals)
+        self._days = sorted(self.daily)
+        for entry in entries:
+            self.append(entry)
+
+    def __len__(self):
+        return sum(len(seg) for seg in self.archived) + len(self.entries)
+
+    def __iter__(self):
+        return self.iter_between()
+
+    @property
+    def last_id(self):
+        """ID ล่าสุดของประวัติทั้งหมด (ไม่ต้องโหลดช่วงเก่า)"""
+        return max(self._archived_last_id, max((e.id for e in self.entries), default=0))
+
+    @property
+    def by_recipe(self):
+        """ยอดรวมรายสูตร recipe_id → ยอดรวม (รวมยอดของช่วงเก่าในครั้งแรกที่เรียก)"""
+        if self._archived_by_recipe is not None:
+            archived = self._archived_by_recipe
+            if callable(archived):
+                archived = archived()
+            for recipe_id, totals in archived.items():
+                _merge_totals(self._by_recipe.setdefault(int(recipe_id), _empty_totals()), totals)
+            self._archived_by_recipe = None
+        return self._by_recipe
+
+    def append(self, entry):
+        """เพิ่มประวัติหนึ่งรายการ และอัปเดตดัชนี/ยอดรวม"""
+        date = entry.date
+        if self._dates and date < self._dates[-1]:
+            # นาฬิกาเครื่องถอยหลัง: ค้นช่วงวันที่แบบไล่ทั้งหมดแทน bisect
+            self._ordered = False
+        self.entries.append(entry)
+        self._dates.append(date)
+
+        day = date[:10]
+        if day not in self.daily:
+            self.daily[day] = _empty_totals()
+            if self._days and day < self._days[-1]:
+                self._days.insert(bisect_left(self._days, day), day)
+            else:
+                self._days.append(day)
+        _add_totals(self.daily[day], entry)
+        _add_totals(self._by_recipe.setdefault(entry.recipe_id, _empty_totals()), entry)
+        _add_totals(self.totals, entry)
+
+    def archive(self, keys, make_segment):
+        """ย้ายประวัติของช่วง keys ออกจากหน่วยความจำไปเป็น LogSegment
+
+        make_segment(key) ต้องคืน LogSegment ของช่วงนั้นจากไฟล์ที่เขียนไว้แล้ว
+        ถ้ามีช่วงเดิมของ key เดียวกันอยู่ (ประวัติย้อนหลังเข้ามาทีหลัง) จะถูกแทนที่
+        """
+        keys = set(keys)
+        moved = {}
+        kept = []
+        for entry in self.entries:
+            if segment_key(entry) in keys:
+                moved.setdefault(segment_key(entry), []).append(entry)
+            else:
+                kept.append(entry)
+        self.archived = [seg for seg in self.archived if seg.key not in moved]
+        for key in moved:
+            segment = make_segment(key)
+            self._archived_last_id = max(self._archived_last_id, segment.summary["last_id"])
+            self.archived.append(segment)
+        self.archived.sort(key=lambda seg: seg.key)
+        self.entries = kept
+        self._dates = [entry.date for entry in kept]
+        self._ordered = all(a <= b for a, b in zip(self._dates, self._dates[1:]))
+
+    # ---------- ค้นหา ----------
+
+    def iter_between(self, start=None, end=None):
+        """ไล่ประวัติในช่วงวันที่ start..end (YYYY-MM-DD, รวมวันปลาย)
+
+        อ่านไฟล์เฉพาะช่วงเก่าที่คาบเกี่ยวกับช่วงวันที่ที่ขอ ทีละช่วง
+        จึงมีรายการของช่วงเก่าอยู่ในหน่วยความจำครั้งละหนึ่งเดือนเท่านั้น
+        """
+        for segment in self.archived:
+            if segment.overlaps(start, end):
+                yield from segment.select(start, end)
+        yield from _select_range(self.entries, self._dates, self._ordered, start, end)
+
+    def between(self, start=None, end=None):
+        """คืนประวัติในช่วงวันที่ start..end เป็นรายการ (ใช้กับช่วงสั้น ช่วงยาวใช้ iter_between/page)"""
+        return list(self.iter_between(start, end))
+
+    def page(self, page_no, page_size, start=None, end=None):
+        """คืน (รายการในหน้า page_no, เลขหน้าที่ใช้จริง, จำนวนหน้าทั้งหมด) ของประวัติในช่วงวันที่
+
+        page_no เป็น None หมายถึงหน้าสุดท้าย จำนวนรายการของแต่ละช่วงเก่าได้จากยอดรายวัน
+        จึงอ่านไฟล์เฉพาะช่วงที่หน้านั้นคาบเกี่ยว
+        """
+        page_no, pages = page_bounds(self.range_totals(start, end)["count"], page_no, page_size)
+        lo = page_no * page_size
+        hi = lo + page_size
+        rows = []
+        offset = 0
+        for segment in self.archived:
+            if offset >= hi:
+                break
+            if not segment.overlaps(start, end):
+                continue
+            count = segment.count(start, end)
+            if offset + count > lo:
+                selected = segment.select(start, end)
+                rows.extend(selected[max(lo - offset, 0):hi - offset])
+            offset += count
+        if offset < hi:
+            current = _select_range(self.entries, self._dates, self._ordered, start, end)
+            rows.extend(current[max(lo - offset, 0):hi - offset])
+        return rows, page_no, pages
+
+    def range_totals(self, start=None, end=None):
+        """ยอดรวมในช่วงวันที่ จากยอดรายวัน (ไม่ต้องไล่ประวัติทั้งหมด)"""
+        if start is None and end is None:
+            return dict(self.totals)
+        totals = _empty_totals()
+        for _, day_totals in self.daily_totals(start, end):
+            _merge_totals(totals, day_totals)
+        return totals
+
+    def daily_totals(self, start=None, end=None):
+        """ยอดรวมรายวันในช่วงวันที่ คืน [(วัน, ยอดรวม), ...]"""
+        lo = 0 if start is None else bisect_left(self._days, start)
+        hi = len(self._days) if end is None else bisect_right(self._days, end)
+        return [(day, self.daily[day]) for day in self._days[lo:hi]]
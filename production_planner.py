@@ -0,0 +1,171 @@
+"""วางแผนการผลิตหลายสูตรที่แย่งสต๊อควัตถุดิบเดียวกัน ให้ได้จำนวนเสิร์ฟหรือกำไรมากที่สุด
+
+ถ้ามี scipy จะแก้ LP relaxation (interior point ภายในเวลาจำกัด) แล้วปัดลงและเติม
+ส่วนที่เหลือด้วย greedy ถ้าไม่มีหรือแก้ไม่ทันจะใช้ heuristic แบบ greedy ที่ให้
+ราคาเงา (shadow price) กับวัตถุดิบที่ขาดแคลนแล้วปรับราคาซ้ำหลายรอบ
+"""
+
+try:
+    import numpy as np
+    from scipy.optimize import linprog
+    from scipy.sparse import csr_matrix
+except ImportError:  # ไม่มี scipy ใช้ heuristic อย่างเดียว
+    linprog = None
+
+DEFAULT_MARGIN_PCT = 30
+ITERATIONS = 6
+# เวลาสูงสุดที่ให้ LP solver (วินาที) เพื่อให้ใช้งานแบบโต้ตอบได้
+LP_TIME_LIMIT = 0.4
+
+
+def _candidates(store, objective, margin_pct, targets, weights):
+    """สร้างรายการสูตรที่วางแผนได้ [(recipe_id, มูลค่าต่อรอบ, บรรทัด, รอบสูงสุด)]"""
+    candidates = []
+    for recipe in store.recipes.values():
+        # สูตรย่อยกระจายเป็นวัตถุดิบแล้ว สูตรที่สูตรย่อยถูกลบวางแผนไม่ได้
+        demand, missing = store.recipe_demand(recipe.id)
+        lines = [(ing_id, qty) for ing_id, qty in demand.items() if qty > 0]
+        if missing or not lines or any(ing_id not in store.ingredients for ing_id, _ in lines):
+            continue
+        if weights and recipe.id in weights:
+            value = weights[recipe.id]
+        elif objective == "margin":
+            value = store.recipe_cost(recipe.id) * margin_pct / 100
+        else:
+            value = recipe.servings
+        cap = targets.get(recipe.id) if targets else None
+        if value <= 0 or cap == 0:
+            continue
+        candidates.append((recipe.id, value, lines, cap))
+    return candidates
+
+
+def _greedy(candidates, stock, order, plan=None):
+    """จัดสรรรอบผลิตตามลำดับ order ให้มากที่สุดเท่าที่สต๊อคเหลือ"""
+    remaining = dict(stock)
+    plan = dict(plan or {})
+    for recipe_id, _, lines, _ in candidates:
+        if recipe_id in plan:
+            for ing_id, qty in lines:
+                remaining[ing_id] -= qty * plan[recipe_id]
+    for index in order:
+        recipe_id, _, lines, cap = candidates[index]
+        batches = float("inf") if cap is None else cap - plan.get(recipe_id, 0)
+        for ing_id, qty in lines:
+            possible = remaining[ing_id] // qty
+            if possible < batches:
+                batches = possible
+                if batches < 1:
+                    break
+        if batches < 1:
+            continue
+        batches = int(batches)
+        plan[recipe_id] = plan.get(recipe_id, 0) + batches
+        for ing_id, qty in lines:
+            remaining[ing_id] -= qty * batches
+    return plan
+
+
+def _plan_value(candidates, plan):
+    """มูลค่ารวมของแผนการผลิต"""
+    return sum(value * plan.get(recipe_id, 0) for recipe_id, value, _, _ in candidates)
+
+
+def _shadow_price_plan(candidates, stock, iterations):
+    """greedy ตามมูลค่าต่อการใช้ทรัพยากร ปรับราคาเงาของวัตถุดิบที่ใช้จนหมดซ้ำหลายรอบ"""
+    # ราคาเริ่มต้น = ความต้องการรวม / สต๊อค (วัตถุดิบที่ถูกแย่งมากจะแพง)
+    pressure = {}
+    for _, _, lines, _ in candidates:
+        for ing_id, qty in lines:
+            pressure[ing_id] = pressure.get(ing_id, 0.0) + qty
+    price = {
+        ing_id: total / stock[ing_id] if stock[ing_id] > 0 else float("inf")
+        for ing_id, total in pressure.items()
+    }
+
+    best_plan, best_value = {}, 0.0
+    for _ in range(iterations):
+        scores = []
+        for index, (_, value, lines, _) in enumerate(candidates):
+            usage = sum(qty * price[ing_id] for ing_id, qty in lines)
+            scores.append((value / usage if usage > 0 else 0.0, index))
+        order = [index for score, index in sorted(scores, reverse=True) if score > 0]
+        plan = _greedy(candidates, stock, order)
+        value = _plan_value(candidates, plan)
+        if value > best_value:
+            best_plan, best_value = plan, value
+
+        # เพิ่มราคาวัตถุดิบตามสัดส่วนที่ถูกใช้ไป
+        used = {}
+        for recipe_id, _, lines, _ in candidates:
+            batches = plan.get(recipe_id, 0)
+            if batches:
+                for ing_id, qty in lines:
+                    used[ing_id] = used.get(ing_id, 0.0) + qty * batches
+        for ing_id, amount in used.items():
+            if stock[ing_id] > 0:
+                price[ing_id] *= 1 + amount / stock[ing_id]
+    return best_plan
+
+
+def _lp_plan(candidates, stock):
+    """แก้ LP relaxation ด้วย scipy แล้วปัดลง เติมส่วนที่เหลือด้วย greedy"""
+    columns = {ing_id: col for col, ing_id in enumerate(stock)}
+    rows, cols, data = [], [], []
+    for col, (_, _, lines, _) in enumerate(candidates):
+        for ing_id, qty in lines:
+            rows.append(columns[ing_id])
+            cols.append(col)
+            data.append(qty)
+    matrix = csr_matrix((data, (rows, cols)), shape=(len(columns), len(candidates)))
+    result = linprog(
+        c=-np.array([value for _, value, _, _ in candidates]),
+        A_ub=matrix,
+        b_ub=np.array([stock[ing_id] for ing_id in columns]),
+        bounds=[(0, cap) for _, _, _, cap in candidates],
+        method="highs-ipm",
+        options={"time_limit": LP_TIME_LIMIT},
+    )
+    if not result.success:
+        return None
+    plan = {
+        candidates[col][0]: int(x)
+        for col, x in enumerate(np.floor(result.x + 1e-9))
+        if x >= 1
+    }
+    # ปัดลงแล้วอาจเหลือสต๊อค เติมด้วยสูตรที่ LP ให้ค่ามากก่อน
+    order = sorted(range(len(candidates)), key=lambda i: -result.x[i])
+    return _greedy(candidates, stock, order, plan)
+
+
+def plan_production(store, objective="servings", margin_pct=DEFAULT_MARGIN_PCT,
+                    targets=None, weights=None, iterations=ITERATIONS):
+    """คำนวณแผนการผลิตที่ทำได้จริงจากสต๊อคปัจจุบัน
+
+    objective: "servings" (จำนวนเสิร์ฟรวม) หรือ "margin" (กำไรตาม margin_pct ของต้นทุน)
+    targets: dict recipe_id → จำนวนรอบสูงสุดที่ต้องการ
+    weights: dict recipe_id → มูลค่าต่อรอบ (แทนค่าจาก objective)
+    คืน dict: batches (recipe_id → รอบ), value, servings, cost
+    """
+    candidates = _candidates(store, objective, margin_pct, targets, weights)
+    stock = {
+        ing_id: max(store.ingredients[ing_id].stock, 0.0)
+        for _, _, lines, _ in candidates
+        for ing_id, _ in lines
+    }
+    plan = None
+    if linprog is not None and candidates:
+        plan = _lp_plan(candidates, stock)
+    if plan is None:
+        plan = _shadow_price_plan(candidates, stock, iterations)
+
+    return {
+        "batches": plan,
+        "value": _plan_value(candidates, plan),
+        "servings": sum(
+            store.recipes[recipe_id].servings * batches for recipe_id, batches in plan.items()
+        ),
+        "cost": sum(
+            store.recipe_cost(recipe_id) * batches for recipe_id, batches in plan.items()
+        ),
+    }
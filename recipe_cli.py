@@ -0,0 +1,376 @@
+"""โหมดคำสั่งแบบไม่โต้ตอบ: นำเข้าวัตถุดิบ/สูตร เพิ่มสต๊อค ผลิต และออกรายงาน
+
+อ่านไฟล์ CSV หรือ JSON Lines ทีละแถว ตรวจข้อมูลด้วยกฎเดียวกับเมนู
+แล้วบันทึกทั้งชุดด้วย save_data ครั้งเดียว (ถ้ามีแถวผิดจะไม่บันทึกเลย
+เว้นแต่ใช้ --skip-invalid) ถ้าระหว่างนั้นมีโปรแกรมอื่นแก้ record เดียวกัน
+จะโหลดข้อมูลใหม่แล้วอ่านไฟล์และทำทั้งไฟล์อีกครั้ง (สูงสุด MAX_ATTEMPTS ครั้ง ข้อมูลจาก stdin
+อ่านซ้ำไม่ได้ จึงจบด้วย exit code 1 แทน)
+
+ตัวอย่าง:
+    python recipe_cli.py import-ingredients suppliers.csv
+    python recipe_cli.py import-recipes recipes.jsonl
+    python recipe_cli.py restock deliveries.csv
+    python recipe_cli.py produce orders.csv
+    python recipe_cli.py report costs --format csv
+    python recipe_cli.py report reorder   (วัตถุดิบที่ถึงจุดสั่งซื้อ ดู stock_alerts.py)
+    python recipe_cli.py report recost --start 2024-01-01   (ต้นทุนประวัติการผลิตตามราคา ณ วันที่ผลิต)
+    python recipe_cli.py report all --workers 0 --format json --out-dir reports
+        (costs, producible และ margin จาก snapshot เดียวกัน คิดหลาย process ดู recipe_reports.py)
+    python recipe_cli.py serve --port 8080   (โหมดบริการ HTTP/JSON ดู recipe_service.py)
+
+คอลัมน์ที่ใช้:
+    import-ingredients: [id], name, unit, price_per_unit, [stock]
+        (แถวที่มี id หรือชื่อตรงกับวัตถุดิบเดิมจะเป็นการอัปเดต)
+    import-recipes: JSON Lines {"name", "servings", "ingredients": [{ingredient_id|ingredient_name, quantity}]}
+        หรือ CSV name, servings, ingredient_id|ingredient_name, quantity (แถวติดกันชื่อเดียวกัน = สูตรเดียว)
+        สูตรย่อยใช้ recipe_id|recipe_name แทน ingredient_id|ingredient_name (quantity เป็นจำนวนสูตร)
+        สูตรย่อยต้องมีอยู่แล้วหรืออยู่ก่อนหน้าในไฟล์เดียวกัน
+        [unit] ระบุหน่วยของ quantity เองได้ (เช่น กรัม สำหรับวัตถุดิบที่เก็บเป็น กก.)
+    restock: ingredient_id|ingredient_name, quantity, [unit_cost], [received_at]
+        (แต่ละแถวเป็นล็อตใหม่ การผลิตตัดจากล็อตที่รับเข้าก่อน ดู RecipeStore.consume_stock)
+    produce: recipe_id, batches
+"""
+
+import argparse
+import csv
+import json
+import sys
+
+import recipe_management as rm
+from price_history import recost_history
+from production_planner import DEFAULT_MARGIN_PCT
+from recipe_metrics import session
+from recipe_records import RecipeLine
+from recipe_reports import REPORT_KINDS, generate_reports, take_snapshot, write_reports, write_rows
+from recipe_store import StaleRecordError
+
+# จำนวนครั้งที่ลองทำทั้งไฟล์ใหม่เมื่อชนกับการแก้ไขจากโปรแกรมอื่น
+MAX_ATTEMPTS = 3
+
+
+# ==================== อ่านไฟล์ ====================
+
+def read_records(path, fmt):
+    """อ่านไฟล์ทีละแถว คืน (เลขบรรทัด, แถว) โดยแถว JSON ยังเป็นข้อความ"""
+    f = sys.stdin if path == "-" else open(path, "r", encoding="utf-8-sig", newline="")
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_no, line in enumerate(f, 1):
+                if line.strip():
+                    yield line_no, line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def group_recipe_rows(records):
+    """รวมแถว CSV ที่ติดกันและชื่อเดียวกันเป็นสูตรเดียว"""
+    current_line, current = None, None
+    for line_no, row in records:
+        name = (row.get("name") or "").strip()
+        if current is None or current["name"] != name:
+            if current is not None:
+                yield current_line, current
+            current_line = line_no
+            current = {"name": name, "servings": row.get("servings"), "ingredients": []}
+        current["ingredients"].append(row)
+    if current is not None:
+        yield current_line, current
+
+
+def _number(row, key, cast=float, default=None):
+    """ดึงค่าตัวเลขจากแถว (CSV เป็นข้อความ, JSON เป็นตัวเลข)"""
+    value = row.get(key)
+    if value is None or str(value).strip() == "":
+        if default is not None:
+            return default
+        raise ValueError(f"ไม่มีค่า '{key}'")
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"ค่า '{key}' ไม่ถูกต้อง: {value}") from None
+
+
+def _text(row, key):
+    """ดึงค่าข้อความจากแถว"""
+    return str(row.get(key) or "").strip()
+
+
+class NameIndex:
+    """ดัชนีชื่อวัตถุดิบ/สูตร → ID สำหรับไฟล์ที่อ้างวัตถุดิบหรือสูตรย่อยด้วยชื่อ"""
+
+    def __init__(self, data):
+        self.data = data
+        self.ids = {ing.name: ing.id for ing in data.ingredients.values()}
+        self.recipe_ids = {recipe.name: recipe.id for recipe in data.recipes.values()}
+
+    def resolve(self, row, id_key="ingredient_id", name_key="ingredient_name"):
+        """หาวัตถุดิบจาก ID หรือชื่อในแถว"""
+        if _text(row, id_key):
+            return rm.find_ingredient_by_id(self.data, _number(row, id_key, int))
+        ing_id = self.ids.get(_text(row, name_key))
+        return rm.find_ingredient_by_id(self.data, ing_id) if ing_id is not None else None
+
+    def resolve_recipe(self, row, id_key="recipe_id", name_key="recipe_name"):
+        """หาสูตรจาก ID หรือชื่อในแถว"""
+        if _text(row, id_key):
+            return rm.find_recipe_by_id(self.data, _number(row, id_key, int))
+        recipe_id = self.recipe_ids.get(_text(row, name_key))
+        return rm.find_recipe_by_id(self.data, recipe_id) if recipe_id is not None else None
+
+
+# ==================== คำสั่ง ====================
+
+def import_ingredient(data, names, row):
+    """นำเข้าวัตถุดิบหนึ่งแถว คืนข้อความข้อผิดพลาดหรือ None"""
+    existing = names.resolve(row, id_key="id", name_key="name")
+    if not existing and _text(row, "id"):
+        # ระบุ ID มาแต่ไม่มีในข้อมูล (เช่นถูกลบไปแล้ว) ไม่สร้างวัตถุดิบใหม่แทน
+        return f"ไม่พบวัตถุดิบ ID {_text(row, 'id')}"
+    if existing:
+        changes = {key: _text(row, key) for key in ("name", "unit") if _text(row, key)}
+        for key in ("price_per_unit", "stock"):
+            if _text(row, key):
+                changes[key] = _number(row, key)
+        merged = {**existing.to_dict(), **changes}
+        error = rm.validate_ingredient(
+            merged["name"], merged["unit"], merged["price_per_unit"], merged["stock"]
+        )
+        if not error and "unit" in changes:
+            error = rm.validate_unit_change(data, existing.id, changes["unit"])
+        if error:
+            return error
+        data.update_ingredient(existing.id, **changes)
+        names.ids[merged["name"]] = existing.id
+        return None
+
+    name, unit = _text(row, "name"), _text(row, "unit")
+    price = _number(row, "price_per_unit")
+    stock = _number(row, "stock", default=0.0)
+    error = rm.validate_ingredient(name, unit, price, stock)
+    if error:
+        return error
+    ingredient = data.insert_ingredient({
+        "name": name,
+        "unit": unit,
+        "price_per_unit": price,
+        "stock": stock,
+    })
+    names.ids[name] = ingredient.id
+    return None
+
+
+def import_recipe(data, names, row):
+    """นำเข้าสูตรหนึ่งสูตร คืนข้อความข้อผิดพลาดหรือ None"""
+    name = _text(row, "name")
+    lines = []
+    for item in row.get("ingredients") or []:
+        if _text(item, "recipe_id") or _text(item, "recipe_name"):
+            sub = names.resolve_recipe(item)
+            if not sub:
+                ref = _text(item, "recipe_id") or _text(item, "recipe_name")
+                return f"{name}: ไม่พบสูตรย่อย {ref}"
+            lines.append(RecipeLine(None, _number(item, "quantity"), sub.id))
+            continue
+        ingredient = names.resolve(item)
+        if not ingredient:
+            ref = _text(item, "ingredient_id") or _text(item, "ingredient_name")
+            return f"{name}: ไม่พบวัตถุดิบ {ref}"
+        if _text(item, "unit"):
+            lines.append(RecipeLine.measured(
+                ingredient.id, _number(item, "quantity"), _text(item, "unit")
+            ))
+        else:
+            lines.append(RecipeLine(ingredient.id, _number(item, "quantity")))
+    servings = _number(row, "servings", int)
+    error = rm.validate_recipe(data, name, servings, lines)
+    if error:
+        return f"{name}: {error}"
+    recipe = data.insert_recipe({"name": name, "servings": servings, "ingredients": lines})
+    names.recipe_ids[name] = recipe.id
+    return None
+
+
+def restock_row(data, names, row):
+    """เพิ่มสต๊อคหนึ่งแถว คืนข้อความข้อผิดพลาดหรือ None"""
+    ingredient = names.resolve(row)
+    if not ingredient:
+        return "ไม่พบวัตถุดิบ"
+    qty = _number(row, "quantity")
+    # ไม่ระบุต้นทุนของล็อต = ใช้ราคาต่อหน่วยปัจจุบัน
+    unit_cost = _number(row, "unit_cost") if str(row.get("unit_cost") or "").strip() else None
+    error = rm.validate_restock(qty, unit_cost)
+    if error:
+        return error
+    data.receive_stock(ingredient.id, qty, unit_cost, _text(row, "received_at") or None)
+    return None
+
+
+def run_rows(handler, data, records):
+    """เรียก handler ทีละแถว คืนรายการปัญหา [(เลขบรรทัด, ข้อความ)]"""
+    names = NameIndex(data)
+    problems = []
+    for line_no, row in records:
+        try:
+            if isinstance(row, str):
+                row = json.loads(row)
+            error = handler(data, names, row)
+        except ValueError as exc:
+            error = str(exc)
+        if error:
+            problems.append((line_no, error))
+    return problems
+
+
+def run_produce(data, records):
+    """ผลิตตามคำสั่งทั้งไฟล์ในครั้งเดียวผ่าน produce_batch"""
+    orders = []
+    problems = []
+    for line_no, row in records:
+        try:
+            if isinstance(row, str):
+                row = json.loads(row)
+            orders.append((_number(row, "recipe_id", int), _number(row, "batches", int)))
+        except ValueError as exc:
+            problems.append((line_no, str(exc)))
+    if problems:
+        return problems
+    entries, batch_problems = rm.produce_batch(data, orders)
+    if not batch_problems:
+        print(f"ผลิต {len(entries)} รายการ")
+    return [(None, problem) for problem in batch_problems]
+
+
+# ==================== รายงาน ====================
+
+def report_rows(data, kind, workers=1, margin_pct=DEFAULT_MARGIN_PCT, start=None, end=None):
+    """สร้างแถวรายงาน: costs, producible, margin, reorder, recost หรือ log
+
+    costs/producible/margin คิดจาก snapshot ของข้อมูล แบ่งให้ workers process (ดู recipe_reports)
+    recost คิดต้นทุนของประวัติการผลิตช่วง start..end ใหม่ตามราคา ณ วันที่ผลิต (ดู price_history)
+    """
+    if kind in REPORT_KINDS:
+        yield from generate_reports(take_snapshot(data), (kind,), workers, margin_pct)[kind]
+    elif kind == "reorder":
+        yield from rm.get_stock_monitor(data).alerts()
+    elif kind == "recost":
+        yield from recost_history(data, start, end)
+    else:
+        for entry in data.production_log:
+            yield entry.to_dict()
+
+
+def write_report(rows, fmt, out=None):
+    """เขียนรายงานเป็น CSV, JSON Lines หรือ JSON ทีละแถว"""
+    write_rows(rows, fmt, out or sys.stdout)
+
+
+# ==================== main ====================
+
+ROW_COMMANDS = {
+    "import-ingredients": import_ingredient,
+    "import-recipes": import_recipe,
+    "restock": restock_row,
+}
+
+
+def build_parser():
+    """สร้างตัวอ่านอาร์กิวเมนต์"""
+    parser = argparse.ArgumentParser(description="ระบบจัดการสูตรอาหาร (โหมดคำสั่ง)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in [*ROW_COMMANDS, "produce"]:
+        cmd = sub.add_parser(name)
+        cmd.add_argument("file", help="ไฟล์ CSV หรือ JSON Lines (ใช้ - สำหรับ stdin)")
+        cmd.add_argument("--format", choices=["csv", "jsonl"], help="รูปแบบไฟล์ (ปกติดูจากนามสกุล)")
+        cmd.add_argument(
+            "--skip-invalid", action="store_true",
+            help="ข้ามแถวที่ผิดแล้วบันทึกแถวที่ถูกต้อง (ปกติจะไม่บันทึกเลย)",
+        )
+    report = sub.add_parser("report")
+    report.add_argument("kind", choices=[*REPORT_KINDS, "reorder", "recost", "log", "all"])
+    report.add_argument("--format", choices=["csv", "jsonl", "json"], default="csv")
+    report.add_argument(
+        "--workers", type=int, default=1,
+        help="จำนวน process ที่ใช้คิด costs/producible/margin (0 = จำนวน CPU)",
+    )
+    report.add_argument(
+        "--margin", type=float, default=DEFAULT_MARGIN_PCT, help="กำไร (%% ของต้นทุน) ของรายงาน margin",
+    )
+    report.add_argument("--out-dir", default=".", help="โฟลเดอร์ที่เขียนรายงานเมื่อใช้ all")
+    report.add_argument("--start", help="วันที่เริ่มต้นของรายงาน recost (YYYY-MM-DD)")
+    report.add_argument("--end", help="วันที่สิ้นสุดของรายงาน recost (YYYY-MM-DD)")
+    serve = sub.add_parser("serve")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8080)
+    return parser
+
+
+def main(argv=None):
+    """จุดเริ่มโหมดคำสั่ง คืน exit code"""
+    args = build_parser().parse_args(argv)
+    if args.command == "serve":
+        import recipe_service
+        return recipe_service.run(args.host, args.port)
+
+    data = rm.load_data()
+
+    if args.command == "report":
+        workers = args.workers or None
+        if args.kind == "all":
+            # ทุกรายงานคิดจาก snapshot เดียวกันในรอบเดียว
+            reports = generate_reports(take_snapshot(data), REPORT_KINDS, workers, args.margin)
+            for path in write_reports(reports, args.out_dir, args.format):
+                print(f"✅ {path}")
+            return 0
+        write_report(
+            report_rows(data, args.kind, workers, args.margin, args.start, args.end), args.format
+        )
+        return 0
+
+    fmt = args.format or ("csv" if args.file.lower().endswith(".csv") else "jsonl")
+    if args.command == "produce":
+        # คำสั่งผลิตตัดสต๊อคทั้งหมดหรือไม่ตัดเลย จึงไม่มีการข้ามแถว
+        args.skip_invalid = False
+
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        if attempt > 1 and args.file == "-":
+            # stdin อ่านซ้ำไม่ได้ จึงทำรายการใหม่กับข้อมูลล่าสุดไม่ได้
+            print("❌ อ่านข้อมูลจาก stdin ซ้ำไม่ได้ ไม่มีการบันทึกข้อมูล", file=sys.stderr)
+            return 1
+        # เปิดไฟล์ใหม่ทุกรอบ (generator ของรอบก่อนถูกอ่านหมดแล้ว)
+        records = read_records(args.file, fmt)
+        if args.command == "import-recipes" and fmt == "csv":
+            records = group_recipe_rows(records)
+        if args.command == "produce":
+            problems = run_produce(data, records)
+        else:
+            problems = run_rows(ROW_COMMANDS[args.command], data, records)
+
+        for line_no, problem in problems:
+            where = f"บรรทัด {line_no}: " if line_no else ""
+            print(f"❌ {where}{problem}", file=sys.stderr)
+        if problems and not args.skip_invalid:
+            print("ยกเลิก ไม่มีการบันทึกข้อมูล", file=sys.stderr)
+            return 1
+
+        try:
+            rm.get_storage().save(data)
+        except StaleRecordError as exc:
+            # storage โหลดข้อมูลล่าสุดแล้ว ตรวจแถวทั้งหมดใหม่ (เช่น สต๊อคที่ถูกตัดไปแล้ว)
+            print(f"⚠️  {exc} ทำรายการใหม่ ({attempt}/{MAX_ATTEMPTS})", file=sys.stderr)
+            continue
+        print(f"✅ {args.command} เรียบร้อย")
+        return 0
+
+    print("❌ ข้อมูลถูกแก้ไขจากโปรแกรมอื่นตลอด ไม่มีการบันทึกข้อมูล", file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    with session():
+        exit_code = main()
+    sys.exit(exit_code)
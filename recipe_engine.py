@@ -0,0 +1,211 @@
+"""engine คำนวณต้นทุนและจำนวนรอบที่ผลิตได้ของทุกสูตรด้วย NumPy
+
+เก็บสูตรเป็นเมทริกซ์ sparse (สูตร × วัตถุดิบ) แบบ COO พร้อมเวกเตอร์ราคาและสต๊อค
+และอัปเดตทีละส่วนตามการเปลี่ยนแปลงใน RecipeStore แทนการสร้างใหม่ทั้งหมด
+แถวของสูตรที่มีสูตรย่อยเก็บปริมาณวัตถุดิบหลังกระจายสูตรย่อยแล้ว (RecipeStore.recipe_demand)
+ราคาที่เปลี่ยนจึงไม่ต้องแก้เมทริกซ์ ส่วนสูตรย่อยที่บรรทัดเปลี่ยนจะสร้างแถวใหม่ให้สูตรที่ใช้มันด้วย
+"""
+
+import numpy as np
+
+INITIAL_CAPACITY = 1024
+
+
+def _grow(array, size):
+    """ขยายอาร์เรย์ให้จุได้อย่างน้อย size ช่อง (เพิ่มทีละสองเท่า)"""
+    if size <= len(array):
+        return array
+    capacity = max(size, len(array) * 2)
+    grown = np.zeros(capacity, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class CostEngine:
+    """คำนวณต้นทุนและจำนวนรอบที่ผลิตได้ของทุกสูตรด้วยการคำนวณแบบอาร์เรย์"""
+
+    def __init__(self, store):
+        self.store = store
+        self._build()
+        store.subscribe(self._on_change)
+
+    # ---------- สร้าง/อัปเดตโครงสร้าง ----------
+
+    def _build(self):
+        """สร้างเมทริกซ์และเวกเตอร์ทั้งหมดจากข้อมูลใน store"""
+        # คอลัมน์ = วัตถุดิบ
+        self._col = {}
+        self._col_ids = []
+        self._price = np.zeros(INITIAL_CAPACITY)
+        self._stock = np.zeros(INITIAL_CAPACITY)
+        self._present = np.zeros(INITIAL_CAPACITY, dtype=bool)
+        # แถว = สูตร
+        self._row = {}
+        self._row_ids = []
+        self._active = np.zeros(INITIAL_CAPACITY, dtype=bool)
+        # สูตรที่อ้างถึงสูตรย่อยที่ถูกลบไปแล้ว (ผลิตไม่ได้)
+        self._broken = np.zeros(INITIAL_CAPACITY, dtype=bool)
+        # รายการในเมทริกซ์ (แถว, คอลัมน์, ปริมาณ) เรียงตามลำดับบรรทัดในสูตร
+        self._rows = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        self._cols = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        self._qty = np.zeros(INITIAL_CAPACITY)
+        self._alive = np.zeros(INITIAL_CAPACITY, dtype=bool)
+        self._size = 0
+        self._dead = 0
+        self._entries = {}
+
+        for ingredient in self.store.ingredients.values():
+            self._set_ingredient(ingredient)
+        for recipe in self.store.recipes.values():
+            self._set_recipe(recipe)
+
+    def _column(self, ing_id):
+        """คืนคอลัมน์ของวัตถุดิบ (สร้างใหม่ถ้ายังไม่มี)"""
+        col = self._col.get(ing_id)
+        if col is None:
+            col = len(self._col_ids)
+            self._col[ing_id] = col
+            self._col_ids.append(ing_id)
+            self._price = _grow(self._price, col + 1)
+            self._stock = _grow(self._stock, col + 1)
+            self._present = _grow(self._present, col + 1)
+        return col
+
+    def _set_ingredient(self, ingredient):
+        """อัปเดตราคาและสต๊อคของวัตถุดิบในเวกเตอร์"""
+        col = self._column(ingredient.id)
+        self._price[col] = ingredient.price_per_unit
+        self._stock[col] = ingredient.stock
+        self._present[col] = True
+
+    def _set_recipe(self, recipe):
+        """ใส่ปริมาณวัตถุดิบของสูตรลงเมทริกซ์ (บรรทัดเดิมถูกทำเครื่องหมายว่าเลิกใช้)"""
+        recipe_id = recipe.id
+        self._drop_entries(recipe_id)
+        row = self._row.get(recipe_id)
+        if row is None:
+            row = len(self._row_ids)
+            self._row[recipe_id] = row
+            self._row_ids.append(recipe_id)
+            self._active = _grow(self._active, row + 1)
+            self._broken = _grow(self._broken, row + 1)
+        self._active[row] = True
+
+        demand, missing = self.store.recipe_demand(recipe_id)
+        self._broken[row] = bool(missing)
+        start, end = self._size, self._size + len(demand)
+        self._rows = _grow(self._rows, end)
+        self._cols = _grow(self._cols, end)
+        self._qty = _grow(self._qty, end)
+        self._alive = _grow(self._alive, end)
+        for pos, (ing_id, qty) in enumerate(demand.items(), start):
+            self._rows[pos] = row
+            self._cols[pos] = self._column(ing_id)
+            self._qty[pos] = qty
+        self._alive[start:end] = True
+        self._size = end
+        self._entries[recipe_id] = (start, end)
+
+    def _drop_entries(self, recipe_id):
+        """ทำเครื่องหมายบรรทัดเดิมของสูตรว่าเลิกใช้"""
+        span = self._entries.pop(recipe_id, None)
+        if span is None:
+            return
+        start, end = span
+        self._alive[start:end] = False
+        self._qty[start:end] = 0.0
+        self._dead += end - start
+
+    def _on_change(self, change):
+        """อัปเดตเฉพาะส่วนที่ได้รับผลจากการเปลี่ยนแปลงใน store"""
+        kind, op = change["kind"], change["op"]
+        if op == "reload":
+            # store ถูกโหลดใหม่ทั้งหมด (เช่น โปรแกรมอื่นรวม journal) สร้างเมทริกซ์ใหม่
+            self._build()
+        elif kind == "ingredients":
+            if op == "delete":
+                col = self._col.get(change["id"])
+                if col is not None:
+                    self._present[col] = False
+            else:
+                self._set_ingredient(change["record"])
+        elif kind == "recipes":
+            recipe_id = change["id"] if op == "delete" else change["record"].id
+            if op == "delete":
+                self._drop_entries(recipe_id)
+                row = self._row.get(recipe_id)
+                if row is not None:
+                    self._active[row] = False
+            else:
+                self._set_recipe(change["record"])
+            # สูตรที่ใช้สูตรนี้เป็นสูตรย่อยได้รับผลด้วย
+            for ancestor_id in self.store.ancestors(recipe_id):
+                ancestor = self.store.recipes.get(ancestor_id)
+                if ancestor is not None:
+                    self._set_recipe(ancestor)
+            # จัดเมทริกซ์ใหม่เมื่อบรรทัดที่เลิกใช้มีมากกว่าครึ่ง
+            if self._dead > self._size // 2 and self._dead > INITIAL_CAPACITY:
+                self._build()
+
+    # ---------- คำนวณ ----------
+
+    def recipe_costs(self):
+        """ต้นทุนรวมของทุกสูตร คืน dict recipe_id → ต้นทุน"""
+        n = self._size
+        price = np.where(self._present, self._price, 0.0)
+        weights = self._qty[:n] * price[self._cols[:n]]
+        totals = np.bincount(self._rows[:n], weights=weights, minlength=len(self._row_ids))
+        return {
+            recipe_id: float(totals[row])
+            for recipe_id, row in self._row.items()
+            if self._active[row]
+        }
+
+    def producibility(self):
+        """จำนวนรอบที่ผลิตได้ของทุกสูตร
+
+        คืน dict recipe_id → (รอบสูงสุด, ID วัตถุดิบที่จำกัด, ID วัตถุดิบที่ถูกลบ)
+        ให้ผลเหมือน max_producible ที่วนตรวจวัตถุดิบทีละรายการ
+        """
+        n = self._size
+        num_rows = len(self._row_ids)
+        rows, cols, qty = self._rows[:n], self._cols[:n], self._qty[:n]
+        alive = self._alive[:n]
+        entry_index = np.arange(n)
+        no_entry = np.full(num_rows, n, dtype=np.int64)
+
+        # บรรทัดแรกของแต่ละสูตรที่อ้างถึงวัตถุดิบที่ถูกลบ
+        missing = alive & ~self._present[cols]
+        first_missing = no_entry.copy()
+        np.minimum.at(first_missing, rows[missing], entry_index[missing])
+
+        # stock / quantity ต่ำสุดของแต่ละสูตร และบรรทัดแรกที่ให้ค่าต่ำสุดนั้น
+        usable = alive & ~missing & (qty > 0)
+        ratio = np.full(n, np.inf)
+        ratio[usable] = self._stock[cols[usable]] / qty[usable]
+        lowest = np.full(num_rows, np.inf)
+        np.minimum.at(lowest, rows[usable], ratio[usable])
+        at_lowest = usable & (ratio == lowest[rows])
+        first_lowest = no_entry.copy()
+        np.minimum.at(first_lowest, rows[at_lowest], entry_index[at_lowest])
+
+        has_missing = first_missing < n
+        batches = np.where(
+            has_missing | np.isinf(lowest), 0.0, np.trunc(lowest)
+        ).astype(np.int64)
+
+        result = {}
+        for recipe_id, row in self._row.items():
+            if not self._active[row]:
+                continue
+            if self._broken[row]:
+                result[recipe_id] = (0, None, None)
+            elif has_missing[row]:
+                missing_id = self._col_ids[cols[first_missing[row]]]
+                result[recipe_id] = (0, None, missing_id)
+            elif first_lowest[row] < n:
+                limiting_id = self._col_ids[cols[first_lowest[row]]]
+                result[recipe_id] = (int(batches[row]), limiting_id, None)
+            else:
+                result[recipe_id] = (0, None, None)
+        return result
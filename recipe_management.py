@@ -1,30 +1,264 @@
-import json
 import os
+from datetime import datetime
+
+from price_history import recost_history
+from production_planner import DEFAULT_MARGIN_PCT, plan_production
+from recipe_records import RecipeLine
+from recipe_metrics import counted, session, timed
+from recipe_storage import JsonStorage, LineStorage, SqliteStorage
+from recipe_search import NameSearch, normalize
+from recipe_store import KIND_NAMES, StaleRecordError
+from recipe_units import conversion_factor, mismatch_message, parse_amount
+from stock_alerts import LEAD_TIME_DAYS, REVIEW_DAYS, WINDOW_DAYS, StockMonitor
+
+try:
+    from recipe_engine import CostEngine
+except ImportError:  # ไม่มี numpy ใช้การคำนวณแบบวนลูปปกติ
+    CostEngine = None
 
 DATA_FILE = "recipe_data.json"
+JOURNAL_FILE = "recipe_data.journal"
+DB_FILE = "recipe_data.db"
+LINES_FILE = "recipe_data.jsonl"
+
+# เลือก backend ตอนเริ่มโปรแกรม: "json" (ค่าเริ่มต้น), "lines" (เปิดเร็วสำหรับไฟล์ใหญ่) หรือ "sqlite"
+BACKEND = os.environ.get("RECIPE_BACKEND", "json")
+# เลือกวิธีคำนวณต้นทุน/ความสามารถในการผลิต: "python" (ค่าเริ่มต้น) หรือ "numpy"
+ENGINE = os.environ.get("RECIPE_ENGINE", "python")
+# ระดับการ fsync ตอนบันทึก: "off", "normal" (ค่าเริ่มต้น) หรือ "full" (ดู recipe_storage)
+DURABILITY = os.environ.get("RECIPE_DURABILITY", "normal")
+# จำนวนรายการต่อหน้าในประวัติการผลิต
+LOG_PAGE_SIZE = 20
+# ตอนเลือกวัตถุดิบ/สูตร แสดงรายการทั้งหมดเมื่อมีไม่เกินจำนวนนี้ (มากกว่านี้ให้ค้นหาด้วยชื่อ)
+PICK_LIST_LIMIT = 30
+# จำนวนผลการค้นหาที่แสดงให้เลือก
+SEARCH_RESULTS = 10
 
 
 # ==================== ฟังก์ชันจัดการข้อมูล ====================
 
+def create_storage(backend, durability=DURABILITY):
+    """สร้าง backend สำหรับบันทึกข้อมูลตามชื่อที่เลือก"""
+    if backend == "sqlite":
+        return SqliteStorage(DB_FILE, durability=durability)
+    if backend == "lines":
+        # อ่านเฉพาะดัชนีตอนเปิดโปรแกรม ย้ายจาก recipe_data.json ให้อัตโนมัติครั้งแรก
+        return LineStorage(LINES_FILE, JOURNAL_FILE, legacy_file=DATA_FILE, durability=durability)
+    if backend == "json":
+        # use_journal=False จะเขียนทับไฟล์ทั้งหมดทุกครั้งแบบเดิม
+        return JsonStorage(DATA_FILE, JOURNAL_FILE, use_journal=True, durability=durability)
+    raise ValueError(f"ไม่รู้จัก backend: {backend}")
+
+
+# storage ของโปรแกรม สร้างเมื่อใช้ครั้งแรก (ดู get_storage)
+# การ import โมดูลนี้ (จาก recipe_cli, recipe_service หรือ process ของรายงาน) จึงไม่เปิด/สร้างไฟล์ข้อมูล
+storage = None
+
+
+def get_storage():
+    """storage ตาม BACKEND (สร้างในครั้งแรกที่เรียก)"""
+    global storage
+    if storage is None:
+        storage = create_storage(BACKEND)
+    return storage
+
+
+@timed("load_data")
 def load_data():
-    """โหลดข้อมูลจากไฟล์ JSON"""
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {"ingredients": [], "recipes": [], "production_log": []}
+    """โหลดข้อมูลจากไฟล์ JSON และ journal"""
+    return get_storage().load()
 
 
+@timed("save_data")
 def save_data(data):
-    """บันทึกข้อมูลลงไฟล์ JSON"""
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    """บันทึกการเปลี่ยนแปลงลง journal (หรือไฟล์ JSON ทั้งหมด)
+
+    คืน False ถ้าชนกับการแก้ไขจากเครื่องอื่น (การแก้ไขนี้ไม่ถูกบันทึก storage โหลดข้อมูลใหม่ให้แล้ว)
+    """
+    try:
+        get_storage().save(data)
+    except StaleRecordError as e:
+        print(f"⚠️  {e} การแก้ไขล่าสุดไม่ถูกบันทึก โหลดข้อมูลใหม่แล้ว")
+        return False
+    return True
+
+
+def refresh_data(data):
+    """อ่านการเปลี่ยนแปลงที่เครื่องอื่นบันทึกไว้ ให้ข้อมูลที่แสดงเป็นยอดล่าสุด"""
+    save_data(data)
+
+
+def transaction(data):
+    """ล็อกข้อมูลระหว่างตรวจและแก้ไข: อ่านยอดล่าสุดก่อนเข้าบล็อก แล้วบันทึกเมื่อจบบล็อก
+
+    ใช้ครอบเฉพาะส่วนที่ไม่ต้องรอผู้ใช้ เครื่องอื่นจะรอเท่าที่บล็อกนี้ทำงาน
+    """
+    return get_storage().transaction(data)
+
+
+def changed_elsewhere(record, version):
+    """record ถูกแก้ไขหรือลบจากเครื่องอื่นหลังจากที่ผู้ใช้เห็น version นี้หรือไม่"""
+    return record is None or record.version != version
+
+
+# ==================== ตรวจสอบข้อมูล ====================
+
+def validate_ingredient(name, unit, price, stock):
+    """ตรวจข้อมูลวัตถุดิบ คืนข้อความข้อผิดพลาด (None ถ้าถูกต้อง)"""
+    if not name:
+        return "กรุณาระบุชื่อวัตถุดิบ"
+    if not unit:
+        return "กรุณาระบุหน่วย"
+    if price < 0 or stock < 0:
+        return "ราคาและจำนวนต้องไม่ติดลบ"
+    return None
+
+
+def validate_recipe(data, name, servings, lines, recipe_id=None):
+    """ตรวจข้อมูลสูตรอาหาร คืนข้อความข้อผิดพลาด (None ถ้าถูกต้อง)
+
+    recipe_id คือสูตรที่กำลังแก้ไข (None = สูตรใหม่) ใช้ตรวจว่าสูตรย่อยไม่อ้างถึงกันเป็นวงจร
+    """
+    if not name:
+        return "กรุณาระบุชื่อสูตร"
+    if servings <= 0:
+        return "จำนวนต้องมากกว่า 0"
+    if not lines:
+        return "สูตรต้องมีวัตถุดิบอย่างน้อย 1 รายการ"
+    seen = set()
+    for item in lines:
+        if item.recipe_id is not None:
+            sub_id = item.recipe_id
+            key = ("recipes", sub_id)
+            if not find_recipe_by_id(data, sub_id):
+                return f"ไม่พบสูตร ID {sub_id}"
+            if key in seen:
+                return f"สูตร ID {sub_id} ถูกเพิ่มแล้ว"
+            if recipe_id is not None and data.creates_cycle(recipe_id, sub_id):
+                return f"สูตร ID {sub_id} ใช้สูตรนี้อยู่แล้ว (สูตรจะอ้างถึงกันเป็นวงจร)"
+        else:
+            ing_id = item.ingredient_id
+            key = ("ingredients", ing_id)
+            ingredient = find_ingredient_by_id(data, ing_id)
+            if not ingredient:
+                return f"ไม่พบวัตถุดิบ ID {ing_id}"
+            if key in seen:
+                return f"วัตถุดิบ ID {ing_id} ถูกเพิ่มแล้ว"
+            if item.unit is not None:
+                if conversion_factor(item.unit, ingredient.unit) is None:
+                    return f"{ingredient.name}: {mismatch_message(item.unit, ingredient.unit)}"
+                if item.amount <= 0:
+                    return "จำนวนต้องมากกว่า 0"
+        if item.quantity <= 0:
+            return "จำนวนต้องมากกว่า 0"
+        seen.add(key)
+    return None
+
+
+def validate_unit_change(data, ing_id, unit):
+    """ตรวจว่าเปลี่ยนหน่วยของวัตถุดิบได้ (บรรทัดสูตรที่ระบุหน่วยเองต้องแปลงเป็นหน่วยใหม่ได้)"""
+    for recipe in data.recipes_using(ing_id):
+        for item in recipe.ingredients:
+            if item.recipe_id is None and item.ingredient_id == ing_id and item.unit is not None:
+                if conversion_factor(item.unit, unit) is None:
+                    return f"สูตร '{recipe.name}': {mismatch_message(item.unit, unit)}"
+    return None
+
+
+def validate_restock(qty, unit_cost=None):
+    """ตรวจจำนวนและต้นทุนต่อหน่วยของล็อตที่เพิ่มสต๊อค คืนข้อความข้อผิดพลาด (None ถ้าถูกต้อง)"""
+    if qty <= 0:
+        return "จำนวนต้องมากกว่า 0"
+    if unit_cost is not None and unit_cost < 0:
+        return "ต้นทุนต้องไม่ติดลบ"
+    return None
+
+
+# ==================== ค้นหาและเลือกรายการ ====================
+
+def get_search(data):
+    """คืนดัชนีค้นหาชื่อของข้อมูลชุดนี้ (สร้างเมื่อเรียกครั้งแรก แล้วอัปเดตตามการแก้ไข)"""
+    if data.name_search is None:
+        data.name_search = NameSearch(data)
+    return data.name_search
+
+
+def get_stock_monitor(data):
+    """คืนตัวติดตามยอดใช้วัตถุดิบของข้อมูลชุดนี้ (สร้างเมื่อเรียกครั้งแรก แล้วอัปเดตตามประวัติการผลิต)"""
+    if data.stock_monitor is None:
+        data.stock_monitor = StockMonitor(data)
+    return data.stock_monitor
+
+
+def search_records(data, kind, query, limit=SEARCH_RESULTS):
+    """ค้นหาวัตถุดิบ/สูตรจากชื่อ (บางส่วนหรือสะกดต่างเล็กน้อย) คืนรายการที่ตรงที่สุดก่อน"""
+    return get_search(data).search(kind, query, limit)
+
+
+def lookup_record(data, kind, text):
+    """หาวัตถุดิบ/สูตรจากข้อความที่ผู้ใช้พิมพ์ (ID หรือชื่อ) ถ้าชื่อตรงหลายรายการให้เลือก
+
+    คืน record (None ถ้าไม่พบหรือยกเลิก พร้อมแจ้งผู้ใช้แล้ว)
+    """
+    label = KIND_NAMES[kind]
+    text = text.strip()
+    if text.isdigit():
+        record = getattr(data, kind).get(int(text))
+        if not record:
+            print(f"❌ ไม่พบ{label} ID นี้")
+        return record
+    if not text:
+        print("❌ ID ไม่ถูกต้อง")
+        return None
+
+    matches = search_records(data, kind, text)
+    if not matches:
+        print(f"❌ ไม่พบ{label}ที่ชื่อตรงกับ '{text}'")
+        return None
+    if len(matches) == 1 or normalize(matches[0].name) == normalize(text):
+        print(f"  → [ID: {matches[0].id}] {matches[0].name}")
+        return matches[0]
+
+    for number, record in enumerate(matches, 1):
+        print(f"  {number}. [ID: {record.id}] {record.name}")
+    choice = input(f"เลือกลำดับ (1-{len(matches)}, Enter = ยกเลิก): ").strip()
+    if not choice:
+        return None
+    if not choice.isdigit() or not 1 <= int(choice) <= len(matches):
+        print("❌ ลำดับไม่ถูกต้อง")
+        return None
+    return matches[int(choice) - 1]
+
+
+def _choose(data, kind, action, show_all):
+    """ให้ผู้ใช้เลือกวัตถุดิบ/สูตรด้วย ID หรือชื่อ คืน record (None ถ้าไม่พบหรือยกเลิก)"""
+    label = KIND_NAMES[kind]
+    table = getattr(data, kind)
+    if not table:
+        print(f"\n(ยังไม่มี{label})")
+        return None
+    if len(table) <= PICK_LIST_LIMIT:
+        show_all(data)
+    return lookup_record(
+        data, kind, input(f"\nระบุ ID หรือชื่อ{label}ที่ต้องการ{action}: ")
+    )
+
+
+def _show_recipe_names(data):
+    """แสดงชื่อสูตรทั้งหมดแบบย่อ (ไม่คำนวณต้นทุน)"""
+    print("\n===== รายการสูตรอาหาร =====")
+    for recipe in data.recipes.values():
+        print(f"  [ID: {recipe.id}] {recipe.name} (ผลิตได้ {recipe.servings} เสิร์ฟ/สูตร)")
+
 
+def choose_ingredient(data, action):
+    """ให้ผู้ใช้เลือกวัตถุดิบด้วย ID หรือชื่อ"""
+    return _choose(data, "ingredients", action, list_ingredients)
 
-def get_next_id(items):
-    """สร้าง ID ถัดไป"""
-    if not items:
-        return 1
-    return max(item["id"] for item in items) + 1
+
+def choose_recipe(data, action):
+    """ให้ผู้ใช้เลือกสูตรด้วย ID หรือชื่อ"""
+    return _choose(data, "recipes", action, _show_recipe_names)
 
 
 # ==================== จัดการวัตถุดิบ ====================
@@ -49,104 +283,92 @@ def add_ingredient(data):
         print("❌ กรุณาระบุตัวเลขที่ถูกต้อง")
         return
 
-    if price < 0 or stock < 0:
-        print("❌ ราคาและจำนวนต้องไม่ติดลบ")
+    error = validate_ingredient(name, unit, price, stock)
+    if error:
+        print(f"❌ {error}")
         return
 
-    ingredient = {
-        "id": get_next_id(data["ingredients"]),
-        "name": name,
-        "unit": unit,
-        "price_per_unit": price,
-        "stock": stock,
-    }
-    data["ingredients"].append(ingredient)
-    save_data(data)
-    print(f"✅ เพิ่มวัตถุดิบ '{name}' เรียบร้อย (ID: {ingredient['id']})")
+    with transaction(data):
+        ingredient = data.insert_ingredient({
+            "name": name,
+            "unit": unit,
+            "price_per_unit": price,
+            "stock": stock,
+        })
+    print(f"✅ เพิ่มวัตถุดิบ '{name}' เรียบร้อย (ID: {ingredient.id})")
 
 
+@timed("render.list_ingredients")
 def list_ingredients(data):
     """แสดงรายการวัตถุดิบทั้งหมด"""
     print("\n===== รายการวัตถุดิบ =====")
-    if not data["ingredients"]:
+    if not data.ingredients:
         print("(ยังไม่มีวัตถุดิบ)")
         return
 
     print(f"{'ID':<5} {'ชื่อ':<20} {'หน่วย':<10} {'ราคา/หน่วย':>12} {'สต๊อค':>10}")
     print("-" * 60)
-    for ing in data["ingredients"]:
+    for ing in data.ingredients.values():
         print(
-            f"{ing['id']:<5} {ing['name']:<20} {ing['unit']:<10} "
-            f"{ing['price_per_unit']:>10.2f}  {ing['stock']:>10.2f}"
+            f"{ing.id:<5} {ing.name:<20} {ing.unit:<10} "
+            f"{ing.price_per_unit:>10.2f}  {ing.stock:>10.2f}"
         )
 
 
 def edit_ingredient(data):
     """แก้ไขวัตถุดิบ"""
-    list_ingredients(data)
-    if not data["ingredients"]:
-        return
-
-    try:
-        ing_id = int(input("\nระบุ ID วัตถุดิบที่ต้องการแก้ไข: "))
-    except ValueError:
-        print("❌ ID ไม่ถูกต้อง")
-        return
-
-    ingredient = next((i for i in data["ingredients"] if i["id"] == ing_id), None)
+    ingredient = choose_ingredient(data, "แก้ไข")
     if not ingredient:
-        print("❌ ไม่พบวัตถุดิบ ID นี้")
         return
+    ing_id = ingredient.id
 
-    print(f"\nกำลังแก้ไข: {ingredient['name']} (กด Enter เพื่อข้ามไม่แก้ไข)")
+    version = ingredient.version
+    print(f"\nกำลังแก้ไข: {ingredient.name} (กด Enter เพื่อข้ามไม่แก้ไข)")
 
-    name = input(f"  ชื่อ [{ingredient['name']}]: ").strip()
-    unit = input(f"  หน่วย [{ingredient['unit']}]: ").strip()
-    price = input(f"  ราคา/หน่วย [{ingredient['price_per_unit']}]: ").strip()
-    stock = input(f"  สต๊อค [{ingredient['stock']}]: ").strip()
+    name = input(f"  ชื่อ [{ingredient.name}]: ").strip()
+    unit = input(f"  หน่วย [{ingredient.unit}]: ").strip()
+    price = input(f"  ราคา/หน่วย [{ingredient.price_per_unit}]: ").strip()
+    stock = input(f"  สต๊อค [{ingredient.stock}]: ").strip()
 
+    changes = {}
     if name:
-        ingredient["name"] = name
+        changes["name"] = name
     if unit:
-        ingredient["unit"] = unit
+        changes["unit"] = unit
     if price:
         try:
-            ingredient["price_per_unit"] = float(price)
+            changes["price_per_unit"] = float(price)
         except ValueError:
             print("❌ ราคาไม่ถูกต้อง ข้ามการแก้ไขราคา")
     if stock:
         try:
-            ingredient["stock"] = float(stock)
+            changes["stock"] = float(stock)
         except ValueError:
             print("❌ จำนวนไม่ถูกต้อง ข้ามการแก้ไขสต๊อค")
 
-    save_data(data)
+    with transaction(data):
+        if changed_elsewhere(find_ingredient_by_id(data, ing_id), version):
+            print("⚠️  วัตถุดิบนี้ถูกแก้ไขจากเครื่องอื่นระหว่างนี้ กรุณาแก้ไขใหม่อีกครั้ง")
+            return
+        if "unit" in changes:
+            error = validate_unit_change(data, ing_id, changes["unit"])
+            if error:
+                print(f"❌ {error}")
+                return
+        data.update_ingredient(ing_id, **changes)
     print("✅ แก้ไขวัตถุดิบเรียบร้อย")
 
 
 def delete_ingredient(data):
     """ลบวัตถุดิบ"""
-    list_ingredients(data)
-    if not data["ingredients"]:
-        return
-
-    try:
-        ing_id = int(input("\nระบุ ID วัตถุดิบที่ต้องการลบ: "))
-    except ValueError:
-        print("❌ ID ไม่ถูกต้อง")
-        return
-
-    ingredient = next((i for i in data["ingredients"] if i["id"] == ing_id), None)
+    ingredient = choose_ingredient(data, "ลบ")
     if not ingredient:
-        print("❌ ไม่พบวัตถุดิบ ID นี้")
         return
+    ing_id = ingredient.id
 
     # ตรวจสอบว่ามีสูตรใช้วัตถุดิบนี้อยู่หรือไม่
-    used_in = [
-        r["name"]
-        for r in data["recipes"]
-        if any(item["ingredient_id"] == ing_id for item in r["ingredients"])
-    ]
+    version = ingredient.version
+    used_in = [r.name for r in data.recipes_using(ing_id)]
     if used_in:
         print(f"⚠️  วัตถุดิบนี้ถูกใช้ในสูตร: {', '.join(used_in)}")
         confirm = input("ต้องการลบต่อหรือไม่? (y/n): ").strip().lower()
@@ -154,58 +376,226 @@ def delete_ingredient(data):
             print("ยกเลิกการลบ")
             return
 
-    data["ingredients"].remove(ingredient)
-    save_data(data)
-    print(f"✅ ลบวัตถุดิบ '{ingredient['name']}' เรียบร้อย")
+    with transaction(data):
+        if changed_elsewhere(find_ingredient_by_id(data, ing_id), version):
+            print("⚠️  วัตถุดิบนี้ถูกแก้ไขจากเครื่องอื่นระหว่างนี้ ยกเลิกการลบ")
+            return
+        data.remove_ingredient(ing_id)
+    print(f"✅ ลบวัตถุดิบ '{ingredient.name}' เรียบร้อย")
 
 
 def restock_ingredient(data):
     """เพิ่มสต๊อควัตถุดิบ"""
-    list_ingredients(data)
-    if not data["ingredients"]:
+    ingredient = choose_ingredient(data, "เพิ่มสต๊อค")
+    if not ingredient:
         return
+    ing_id = ingredient.id
 
     try:
-        ing_id = int(input("\nระบุ ID วัตถุดิบที่ต้องการเพิ่มสต๊อค: "))
+        qty = float(input(f"จำนวนที่ต้องการเพิ่ม ({ingredient.unit}): "))
+        unit_cost = input(
+            f"ต้นทุนต่อหน่วยของล็อตนี้ (บาท, Enter = {ingredient.price_per_unit:.2f}): "
+        ).strip()
+        unit_cost = float(unit_cost) if unit_cost else None
     except ValueError:
-        print("❌ ID ไม่ถูกต้อง")
+        print("❌ จำนวนไม่ถูกต้อง")
+        return
+
+    error = validate_restock(qty, unit_cost)
+    if error:
+        print(f"❌ {error}")
         return
 
-    ingredient = next((i for i in data["ingredients"] if i["id"] == ing_id), None)
+    version = ingredient.version
+    with transaction(data):
+        # เพิ่มจากยอดล่าสุดเสมอ ถ้าเครื่องอื่นเปลี่ยนสต๊อคระหว่างที่รอกรอกจำนวนจะไม่ทับยอดนั้น
+        ingredient = find_ingredient_by_id(data, ing_id)
+        if not ingredient:
+            print("❌ วัตถุดิบนี้ถูกลบจากเครื่องอื่นแล้ว")
+            return
+        if ingredient.version != version:
+            print(
+                f"⚠️  สต๊อค '{ingredient.name}' ถูกแก้ไขจากเครื่องอื่น "
+                f"เพิ่มจากยอดล่าสุด {ingredient.stock} {ingredient.unit}"
+            )
+        data.receive_stock(ing_id, qty, unit_cost)
+    print(
+        f"✅ เพิ่มสต๊อค '{ingredient.name}' จำนวน {qty} {ingredient.unit} "
+        f"(คงเหลือ: {ingredient.stock} {ingredient.unit})"
+    )
+
+
+def show_ingredient_usage(data):
+    """แสดงสูตรที่ใช้วัตถุดิบ (สูตรที่ต้นทุนเปลี่ยนเมื่อราคาวัตถุดิบเปลี่ยน)"""
+    ingredient = choose_ingredient(data, "ตรวจสอบ")
     if not ingredient:
-        print("❌ ไม่พบวัตถุดิบ ID นี้")
         return
+    ing_id = ingredient.id
 
-    try:
-        qty = float(input(f"จำนวนที่ต้องการเพิ่ม ({ingredient['unit']}): "))
-    except ValueError:
-        print("❌ จำนวนไม่ถูกต้อง")
+    recipes = data.recipes_using(ing_id)
+    print(f"\n===== สูตรที่ใช้ '{ingredient.name}' =====")
+    if not recipes:
+        print("(ไม่มีสูตรที่ใช้วัตถุดิบนี้)")
         return
 
-    if qty <= 0:
-        print("❌ จำนวนต้องมากกว่า 0")
+    # สูตรที่ใช้วัตถุดิบผ่านสูตรย่อยก็ได้รับผลจากราคาที่เปลี่ยนด้วย
+    direct = {recipe.id for recipe in recipes}
+    via_sub = set()
+    for recipe in recipes:
+        via_sub |= data.ancestors(recipe.id)
+    for recipe_id in sorted(direct | via_sub):
+        recipe = find_recipe_by_id(data, recipe_id)
+        if recipe is None:
+            continue
+        qty = data.recipe_demand(recipe_id)[0].get(ing_id, 0)
+        note = "" if recipe_id in direct else " (ผ่านสูตรย่อย)"
+        print(f"  [ID: {recipe.id}] {recipe.name}: ใช้ {qty:g} {ingredient.unit}/สูตร{note}")
+
+
+def show_price_history(data):
+    """แสดงราคาต่อหน่วยของวัตถุดิบที่เคยใช้ เรียงตามเวลา"""
+    ingredient = choose_ingredient(data, "ดูประวัติราคา")
+    if not ingredient:
         return
 
-    ingredient["stock"] += qty
-    save_data(data)
-    print(
-        f"✅ เพิ่มสต๊อค '{ingredient['name']}' จำนวน {qty} {ingredient['unit']} "
-        f"(คงเหลือ: {ingredient['stock']} {ingredient['unit']})"
-    )
+    print(f"\n===== ประวัติราคา '{ingredient.name}' (บาท/{ingredient.unit}) =====")
+    history = ingredient.price_history or [["", ingredient.price_per_unit]]
+    previous = None
+    for since, price in history:
+        change = f"{(price - previous) / previous:>+9.1%}" if previous else ""
+        print(f"  {since or '(ก่อนเริ่มเก็บประวัติ)':<22} {price:>12.2f} {change}")
+        previous = price
+
+
+def show_stock_lots(data):
+    """แสดงล็อตที่ยังเหลือของวัตถุดิบ (ตัดออกตามลำดับนี้) และมูลค่าสต๊อคทั้งหมด"""
+    ingredient = choose_ingredient(data, "ดูล็อตสต๊อค")
+    if not ingredient:
+        return
+
+    lots = ingredient.lots
+    print(f"\n===== ล็อตสต๊อค '{ingredient.name}' (ตัดออกจากล็อตแรกก่อน) =====")
+    if not lots:
+        print("(ไม่มีสต๊อค)")
+    else:
+        print(f"{'รับเข้าเมื่อ':<22} {'คงเหลือ':>12} {'ต้นทุน/หน่วย':>14} {'มูลค่า':>14}")
+        print("-" * 65)
+        for received_at, quantity, unit_cost in lots:
+            print(
+                f"{received_at or '(ยอดยกมา)':<22} {quantity:>12.2f} "
+                f"{unit_cost:>14.2f} {quantity * unit_cost:>14.2f}"
+            )
+        print("-" * 65)
+        print(
+            f"{'รวม':<22} {lots.total:>12.2f} {lots.unit_cost:>14.2f} {lots.value:>14.2f}"
+            f"  ({ingredient.unit})"
+        )
+
+    total_value = sum(ing.lots.value for ing in data.ingredients.values())
+    print(f"\nมูลค่าสต๊อควัตถุดิบทั้งหมดตามต้นทุนล็อต: {total_value:,.2f} บาท")
 
 
 # ==================== จัดการสูตรอาหาร ====================
 
+@counted("ingredient_lookups")
 def find_ingredient_by_id(data, ing_id):
     """ค้นหาวัตถุดิบจาก ID"""
-    return next((i for i in data["ingredients"] if i["id"] == ing_id), None)
+    return data.get_ingredient(ing_id)
+
+
+@counted("recipe_lookups")
+def find_recipe_by_id(data, recipe_id):
+    """ค้นหาสูตรอาหารจาก ID"""
+    return data.get_recipe(recipe_id)
+
+
+def read_recipe_lines(data, recipe_id=None):
+    """รับรายการวัตถุดิบของสูตรจากผู้ใช้
+
+    ระบุวัตถุดิบด้วย ID หรือชื่อ และสูตรย่อยด้วย r<ID> หรือ r:<ชื่อ>
+    recipe_id คือสูตรที่กำลังแก้ไข ใช้ตัดสูตรย่อยที่จะทำให้สูตรอ้างถึงกันเป็นวงจร
+    """
+    if len(data.ingredients) <= PICK_LIST_LIMIT:
+        list_ingredients(data)
+    subs = [
+        recipe for recipe in data.recipes.values()
+        if recipe_id is None or not data.creates_cycle(recipe_id, recipe.id)
+    ]
+    if subs and len(subs) <= PICK_LIST_LIMIT:
+        print("\nสูตรที่ใช้เป็นสูตรย่อยได้ (ระบุเป็น r<ID> เช่น r3):")
+        for recipe in subs:
+            print(f"  [r{recipe.id}] {recipe.name} (ผลิตได้ {recipe.servings} เสิร์ฟ/สูตร)")
+
+    lines = []
+    while True:
+        item_input = input(
+            "\nระบุ ID หรือชื่อวัตถุดิบ, r<ID> หรือ r:<ชื่อ> สำหรับสูตรย่อย "
+            "(หรือ Enter เพื่อเสร็จสิ้น): "
+        ).strip()
+        if not item_input:
+            break
+
+        if item_input[:1] in "rR" and item_input[1:].isdigit():
+            is_sub, text = True, item_input[1:]
+        elif item_input[:2].lower() == "r:":
+            is_sub, text = True, item_input[2:]
+        else:
+            is_sub, text = False, item_input
+        record = lookup_record(data, "recipes" if is_sub else "ingredients", text)
+        if not record:
+            continue
+        item_id = record.id
+
+        if is_sub:
+            sub = record
+            if recipe_id is not None and data.creates_cycle(recipe_id, item_id):
+                print("❌ สูตรนี้ใช้สูตรที่กำลังแก้ไขอยู่แล้ว (สูตรจะอ้างถึงกันเป็นวงจร)")
+                continue
+            if any(line.recipe_id == item_id for line in lines):
+                print("⚠️  สูตรนี้ถูกเพิ่มแล้ว")
+                continue
+            label, unit = sub.name, f"สูตร ({sub.servings} เสิร์ฟ/สูตร)"
+        else:
+            ingredient = record
+            # ตรวจสอบว่าเพิ่มซ้ำหรือไม่
+            if any(line.recipe_id is None and line.ingredient_id == item_id for line in lines):
+                print("⚠️  วัตถุดิบนี้ถูกเพิ่มแล้ว")
+                continue
+            label, unit = ingredient.name, ingredient.unit
+
+        prompt = f"จำนวน '{label}' ที่ใช้ ({unit}"
+        prompt += "): " if is_sub else " หรือระบุหน่วย เช่น 250 กรัม): "
+        try:
+            qty, qty_unit = parse_amount(input(prompt))
+        except ValueError:
+            print("❌ จำนวนไม่ถูกต้อง")
+            continue
+
+        if qty <= 0:
+            print("❌ จำนวนต้องมากกว่า 0")
+            continue
+
+        if is_sub:
+            lines.append(RecipeLine(None, qty, item_id))
+        elif qty_unit is None or qty_unit == unit:
+            lines.append(RecipeLine(item_id, qty))
+        else:
+            factor = conversion_factor(qty_unit, unit)
+            if factor is None:
+                print(f"❌ {mismatch_message(qty_unit, unit)}")
+                continue
+            lines.append(RecipeLine.measured(item_id, qty, qty_unit))
+            print(f"  + {label} {qty} {qty_unit} (= {qty * factor:g} {unit})")
+            continue
+        print(f"  + {label} {qty} {unit}")
+    return lines
 
 
 def add_recipe(data):
     """เพิ่มสูตรอาหารใหม่"""
     print("\n===== เพิ่มสูตรอาหาร =====")
 
-    if not data["ingredients"]:
+    if not data.ingredients:
         print("❌ ยังไม่มีวัตถุดิบ กรุณาเพิ่มวัตถุดิบก่อน")
         return
 
@@ -225,104 +615,70 @@ def add_recipe(data):
         return
 
     print("\n--- เลือกวัตถุดิบ ---")
-    list_ingredients(data)
-
-    recipe_ingredients = []
-    while True:
-        ing_input = input("\nระบุ ID วัตถุดิบ (หรือ Enter เพื่อเสร็จสิ้น): ").strip()
-        if not ing_input:
-            break
+    recipe_ingredients = read_recipe_lines(data)
 
-        try:
-            ing_id = int(ing_input)
-        except ValueError:
-            print("❌ ID ไม่ถูกต้อง")
-            continue
-
-        ingredient = find_ingredient_by_id(data, ing_id)
-        if not ingredient:
-            print("❌ ไม่พบวัตถุดิบ ID นี้")
-            continue
-
-        # ตรวจสอบว่าเพิ่มซ้ำหรือไม่
-        if any(ri["ingredient_id"] == ing_id for ri in recipe_ingredients):
-            print("⚠️  วัตถุดิบนี้ถูกเพิ่มแล้ว")
-            continue
-
-        try:
-            qty = float(
-                input(
-                    f"จำนวน '{ingredient['name']}' ที่ใช้ ({ingredient['unit']}): "
-                )
-            )
-        except ValueError:
-            print("❌ จำนวนไม่ถูกต้อง")
-            continue
-
-        if qty <= 0:
-            print("❌ จำนวนต้องมากกว่า 0")
-            continue
-
-        recipe_ingredients.append({"ingredient_id": ing_id, "quantity": qty})
-        print(f"  + {ingredient['name']} {qty} {ingredient['unit']}")
-
-    if not recipe_ingredients:
-        print("❌ สูตรต้องมีวัตถุดิบอย่างน้อย 1 รายการ")
-        return
-
-    recipe = {
-        "id": get_next_id(data["recipes"]),
-        "name": name,
-        "servings": servings,
-        "ingredients": recipe_ingredients,
-    }
-    data["recipes"].append(recipe)
-    save_data(data)
-    print(f"✅ เพิ่มสูตร '{name}' เรียบร้อย (ID: {recipe['id']})")
+    with transaction(data):
+        # ตรวจกับข้อมูลล่าสุด วัตถุดิบที่เลือกอาจถูกลบจากเครื่องอื่นระหว่างนี้
+        error = validate_recipe(data, name, servings, recipe_ingredients)
+        if error:
+            print(f"❌ {error}")
+            return
+        recipe = data.insert_recipe({
+            "name": name,
+            "servings": servings,
+            "ingredients": recipe_ingredients,
+        })
+    print(f"✅ เพิ่มสูตร '{name}' เรียบร้อย (ID: {recipe.id})")
 
 
+@timed("render.list_recipes")
 def list_recipes(data):
     """แสดงรายการสูตรอาหารทั้งหมด"""
     print("\n===== รายการสูตรอาหาร =====")
-    if not data["recipes"]:
+    if not data.recipes:
         print("(ยังไม่มีสูตรอาหาร)")
         return
 
-    for recipe in data["recipes"]:
+    for recipe in data.recipes.values():
         cost = calculate_recipe_cost(data, recipe)
-        print(f"\n[ID: {recipe['id']}] {recipe['name']} (ผลิตได้ {recipe['servings']} เสิร์ฟ/สูตร)")
-        print(f"  ต้นทุนรวม: {cost:.2f} บาท | ต้นทุนต่อเสิร์ฟ: {cost / recipe['servings']:.2f} บาท")
+        print(f"\n[ID: {recipe.id}] {recipe.name} (ผลิตได้ {recipe.servings} เสิร์ฟ/สูตร)")
+        print(f"  ต้นทุนรวม: {cost:.2f} บาท | ต้นทุนต่อเสิร์ฟ: {cost / recipe.servings:.2f} บาท")
         print("  วัตถุดิบ:")
-        for item in recipe["ingredients"]:
-            ing = find_ingredient_by_id(data, item["ingredient_id"])
+        for item in recipe.ingredients:
+            if item.recipe_id is not None:
+                sub = find_recipe_by_id(data, item.recipe_id)
+                if sub:
+                    item_cost = item.quantity * calculate_recipe_cost(data, sub)
+                    print(
+                        f"    - [สูตรย่อย] {sub.name}: {item.quantity} สูตร "
+                        f"(= {item_cost:.2f} บาท)"
+                    )
+                else:
+                    print(f"    - [สูตรย่อย ID {item.recipe_id} ถูกลบแล้ว]")
+                continue
+            ing = find_ingredient_by_id(data, item.ingredient_id)
             if ing:
-                item_cost = item["quantity"] * ing["price_per_unit"]
+                item_cost = item.quantity * ing.price_per_unit
+                amount = f"{item.quantity} {ing.unit}"
+                if item.unit is not None:
+                    amount = f"{item.amount:g} {item.unit} (= {item.quantity:g} {ing.unit})"
                 print(
-                    f"    - {ing['name']}: {item['quantity']} {ing['unit']} "
-                    f"(หน่วยละ {ing['price_per_unit']:.2f} = {item_cost:.2f} บาท)"
+                    f"    - {ing.name}: {amount} "
+                    f"(หน่วยละ {ing.price_per_unit:.2f} = {item_cost:.2f} บาท)"
                 )
             else:
-                print(f"    - [วัตถุดิบ ID {item['ingredient_id']} ถูกลบแล้ว]")
+                print(f"    - [วัตถุดิบ ID {item.ingredient_id} ถูกลบแล้ว]")
 
 
 def edit_recipe(data):
     """แก้ไขสูตรอาหาร"""
-    list_recipes(data)
-    if not data["recipes"]:
-        return
-
-    try:
-        recipe_id = int(input("\nระบุ ID สูตรที่ต้องการแก้ไข: "))
-    except ValueError:
-        print("❌ ID ไม่ถูกต้อง")
-        return
-
-    recipe = next((r for r in data["recipes"] if r["id"] == recipe_id), None)
+    recipe = choose_recipe(data, "แก้ไข")
     if not recipe:
-        print("❌ ไม่พบสูตร ID นี้")
         return
+    recipe_id = recipe.id
 
-    print(f"\nกำลังแก้ไขสูตร: {recipe['name']}")
+    version = recipe.version
+    print(f"\nกำลังแก้ไขสูตร: {recipe.name}")
     print("1. แก้ไขชื่อสูตร/จำนวนเสิร์ฟ")
     print("2. แก้ไขวัตถุดิบในสูตร (ตั้งค่าใหม่ทั้งหมด)")
     print("0. ยกเลิก")
@@ -330,53 +686,41 @@ def edit_recipe(data):
     choice = input("เลือก: ").strip()
 
     if choice == "1":
-        name = input(f"  ชื่อสูตร [{recipe['name']}]: ").strip()
-        servings = input(f"  จำนวนเสิร์ฟ [{recipe['servings']}]: ").strip()
+        name = input(f"  ชื่อสูตร [{recipe.name}]: ").strip()
+        servings = input(f"  จำนวนเสิร์ฟ [{recipe.servings}]: ").strip()
+        changes = {}
         if name:
-            recipe["name"] = name
+            changes["name"] = name
         if servings:
             try:
-                recipe["servings"] = int(servings)
+                changes["servings"] = int(servings)
             except ValueError:
                 print("❌ จำนวนไม่ถูกต้อง")
-        save_data(data)
+        with transaction(data):
+            if changed_elsewhere(find_recipe_by_id(data, recipe_id), version):
+                print("⚠️  สูตรนี้ถูกแก้ไขจากเครื่องอื่นระหว่างนี้ กรุณาแก้ไขใหม่อีกครั้ง")
+                return
+            data.update_recipe(recipe_id, **changes)
         print("✅ แก้ไขสูตรเรียบร้อย")
 
     elif choice == "2":
         print("\n--- เลือกวัตถุดิบใหม่ ---")
-        list_ingredients(data)
-        new_ingredients = []
-        while True:
-            ing_input = input("\nระบุ ID วัตถุดิบ (หรือ Enter เพื่อเสร็จสิ้น): ").strip()
-            if not ing_input:
-                break
-            try:
-                ing_id = int(ing_input)
-            except ValueError:
-                print("❌ ID ไม่ถูกต้อง")
-                continue
-            ingredient = find_ingredient_by_id(data, ing_id)
-            if not ingredient:
-                print("❌ ไม่พบวัตถุดิบ ID นี้")
-                continue
-            if any(ri["ingredient_id"] == ing_id for ri in new_ingredients):
-                print("⚠️  วัตถุดิบนี้ถูกเพิ่มแล้ว")
-                continue
-            try:
-                qty = float(
-                    input(f"จำนวน '{ingredient['name']}' ({ingredient['unit']}): ")
-                )
-            except ValueError:
-                print("❌ จำนวนไม่ถูกต้อง")
-                continue
-            if qty <= 0:
-                print("❌ จำนวนต้องมากกว่า 0")
-                continue
-            new_ingredients.append({"ingredient_id": ing_id, "quantity": qty})
+        new_ingredients = read_recipe_lines(data, recipe_id)
 
         if new_ingredients:
-            recipe["ingredients"] = new_ingredients
-            save_data(data)
+            with transaction(data):
+                current = find_recipe_by_id(data, recipe_id)
+                if changed_elsewhere(current, version):
+                    print("⚠️  สูตรนี้ถูกแก้ไขจากเครื่องอื่นระหว่างนี้ กรุณาแก้ไขใหม่อีกครั้ง")
+                    return
+                # ตรวจกับข้อมูลล่าสุด สูตรอื่นอาจถูกแก้ให้ใช้สูตรนี้จากเครื่องอื่นระหว่างนี้
+                error = validate_recipe(
+                    data, current.name, current.servings, new_ingredients, recipe_id
+                )
+                if error:
+                    print(f"❌ {error}")
+                    return
+                data.update_recipe(recipe_id, ingredients=new_ingredients)
             print("✅ แก้ไขวัตถุดิบในสูตรเรียบร้อย")
         else:
             print("❌ ไม่มีวัตถุดิบ ยกเลิกการแก้ไข")
@@ -384,78 +728,93 @@ def edit_recipe(data):
 
 def delete_recipe(data):
     """ลบสูตรอาหาร"""
-    list_recipes(data)
-    if not data["recipes"]:
-        return
-
-    try:
-        recipe_id = int(input("\nระบุ ID สูตรที่ต้องการลบ: "))
-    except ValueError:
-        print("❌ ID ไม่ถูกต้อง")
+    recipe = choose_recipe(data, "ลบ")
+    if not recipe:
         return
+    recipe_id = recipe.id
 
-    recipe = next((r for r in data["recipes"] if r["id"] == recipe_id), None)
-    if not recipe:
-        print("❌ ไม่พบสูตร ID นี้")
+    parents = data.recipes_containing(recipe_id)
+    if parents:
+        names = ", ".join(parent.name for parent in parents)
+        print(f"❌ สูตรนี้ถูกใช้เป็นสูตรย่อยใน: {names} กรุณานำออกจากสูตรเหล่านั้นก่อน")
         return
 
-    confirm = input(f"ยืนยันลบสูตร '{recipe['name']}'? (y/n): ").strip().lower()
+    version = recipe.version
+    confirm = input(f"ยืนยันลบสูตร '{recipe.name}'? (y/n): ").strip().lower()
     if confirm == "y":
-        data["recipes"].remove(recipe)
-        save_data(data)
-        print(f"✅ ลบสูตร '{recipe['name']}' เรียบร้อย")
+        with transaction(data):
+            if changed_elsewhere(find_recipe_by_id(data, recipe_id), version):
+                print("⚠️  สูตรนี้ถูกแก้ไขจากเครื่องอื่นระหว่างนี้ ยกเลิกการลบ")
+                return
+            if data.recipes_containing(recipe_id):
+                print("⚠️  สูตรนี้ถูกใช้เป็นสูตรย่อยจากเครื่องอื่นระหว่างนี้ ยกเลิกการลบ")
+                return
+            data.remove_recipe(recipe_id)
+        print(f"✅ ลบสูตร '{recipe.name}' เรียบร้อย")
     else:
         print("ยกเลิกการลบ")
 
 
 # ==================== คำนวณต้นทุน ====================
 
-def calculate_recipe_cost(data, recipe):
-    """คำนวณต้นทุนของสูตร"""
-    total = 0.0
-    for item in recipe["ingredients"]:
-        ing = find_ingredient_by_id(data, item["ingredient_id"])
-        if ing:
-            total += item["quantity"] * ing["price_per_unit"]
-    return total
+def get_engine(data):
+    """คืน CostEngine ของข้อมูลชุดนี้ (None ถ้าไม่ได้เลือกใช้หรือไม่มี numpy)"""
+    if ENGINE != "numpy" or CostEngine is None:
+        return None
+    if data.engine is None:
+        data.engine = CostEngine(data)
+    return data.engine
 
 
-def show_cost_detail(data):
-    """แสดงรายละเอียดต้นทุนของสูตร"""
-    list_recipes(data)
-    if not data["recipes"]:
-        return
+@timed("recipe_cost")
+def calculate_recipe_cost(data, recipe, as_of=None):
+    """คำนวณต้นทุนของสูตร (ผ่านแคชต้นทุนของ store)
+
+    as_of ("YYYY-MM-DD" หรือ "YYYY-MM-DD HH:MM:SS") คิดตามราคาวัตถุดิบ ณ เวลานั้นแทนราคาปัจจุบัน
+    """
+    if as_of is not None:
+        return data.recipe_cost_at(recipe.id, as_of)
+    return data.recipe_cost(recipe.id)
 
-    try:
-        recipe_id = int(input("\nระบุ ID สูตรที่ต้องการดูต้นทุน: "))
-    except ValueError:
-        print("❌ ID ไม่ถูกต้อง")
-        return
 
-    recipe = next((r for r in data["recipes"] if r["id"] == recipe_id), None)
+def show_cost_detail(data):
+    """แสดงรายละเอียดต้นทุนของสูตร"""
+    recipe = choose_recipe(data, "ดูต้นทุน")
     if not recipe:
-        print("❌ ไม่พบสูตร ID นี้")
         return
 
-    print(f"\n===== ต้นทุนสูตร: {recipe['name']} =====")
-    print(f"จำนวนเสิร์ฟต่อสูตร: {recipe['servings']}")
+    print(f"\n===== ต้นทุนสูตร: {recipe.name} =====")
+    print(f"จำนวนเสิร์ฟต่อสูตร: {recipe.servings}")
     print(f"\n{'วัตถุดิบ':<20} {'จำนวน':>8} {'หน่วย':<8} {'ราคา/หน่วย':>12} {'รวม':>12}")
     print("-" * 65)
 
     total = 0.0
-    for item in recipe["ingredients"]:
-        ing = find_ingredient_by_id(data, item["ingredient_id"])
+    for item in recipe.ingredients:
+        if item.recipe_id is not None:
+            sub = find_recipe_by_id(data, item.recipe_id)
+            if sub:
+                sub_cost = calculate_recipe_cost(data, sub)
+                item_cost = item.quantity * sub_cost
+                total += item_cost
+                print(
+                    f"{'* ' + sub.name:<20} {item.quantity:>8.2f} {'สูตร':<8} "
+                    f"{sub_cost:>10.2f}  {item_cost:>10.2f}"
+                )
+            continue
+        ing = find_ingredient_by_id(data, item.ingredient_id)
         if ing:
-            item_cost = item["quantity"] * ing["price_per_unit"]
+            item_cost = item.quantity * ing.price_per_unit
             total += item_cost
             print(
-                f"{ing['name']:<20} {item['quantity']:>8.2f} {ing['unit']:<8} "
-                f"{ing['price_per_unit']:>10.2f}  {item_cost:>10.2f}"
+                f"{ing.name:<20} {item.quantity:>8.2f} {ing.unit:<8} "
+                f"{ing.price_per_unit:>10.2f}  {item_cost:>10.2f}"
             )
 
     print("-" * 65)
     print(f"{'ต้นทุนรวมต่อสูตร':>52} {total:>10.2f} บาท")
-    cost_per_serving = total / recipe["servings"]
+    if any(item.recipe_id is not None for item in recipe.ingredients):
+        print("(* = สูตรย่อย ราคาต่อหน่วยคือต้นทุนต่อสูตรของสูตรย่อย)")
+    cost_per_serving = total / recipe.servings
     print(f"{'ต้นทุนต่อเสิร์ฟ':>52} {cost_per_serving:>10.2f} บาท")
 
     # คำนวณราคาขายแนะนำ
@@ -465,9 +824,10 @@ def show_cost_detail(data):
         print(f"  กำไร {margin_pct}%: {sell_price:>10.2f} บาท")
 
 
+@timed("render.compare_costs")
 def compare_costs(data):
     """เปรียบเทียบต้นทุนสูตรทั้งหมด"""
-    if not data["recipes"]:
+    if not data.recipes:
         print("\n(ยังไม่มีสูตรอาหาร)")
         return
 
@@ -475,36 +835,123 @@ def compare_costs(data):
     print(f"{'ID':<5} {'ชื่อสูตร':<25} {'ต้นทุน/สูตร':>12} {'เสิร์ฟ':>6} {'ต้นทุน/เสิร์ฟ':>14}")
     print("-" * 65)
 
-    for recipe in data["recipes"]:
-        cost = calculate_recipe_cost(data, recipe)
-        cost_per_serving = cost / recipe["servings"]
+    engine = get_engine(data)
+    costs = engine.recipe_costs() if engine else None
+    for recipe in data.recipes.values():
+        if costs is not None:
+            cost = costs[recipe.id]
+        else:
+            cost = calculate_recipe_cost(data, recipe)
+        cost_per_serving = cost / recipe.servings
         print(
-            f"{recipe['id']:<5} {recipe['name']:<25} {cost:>10.2f}  "
-            f"{recipe['servings']:>6} {cost_per_serving:>12.2f}"
+            f"{recipe.id:<5} {recipe.name:<25} {cost:>10.2f}  "
+            f"{recipe.servings:>6} {cost_per_serving:>12.2f}"
         )
 
 
-# ==================== การผลิตและตัดสต๊อค ====================
+def _read_date(prompt):
+    """ถามวันที่ (YYYY-MM-DD) คืนข้อความวันที่ หรือ None ถ้ารูปแบบผิด"""
+    value = input(prompt).strip()
+    try:
+        datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        print("❌ รูปแบบวันที่ไม่ถูกต้อง")
+        return None
+    return value
 
-def produce_recipe(data):
-    """ผลิตตามสูตรและตัดสต๊อค"""
-    list_recipes(data)
-    if not data["recipes"]:
+
+def show_cost_as_of(data):
+    """แสดงต้นทุนของสูตรตามราคาวัตถุดิบ ณ วันที่ที่เลือก เทียบกับราคาปัจจุบัน"""
+    recipe = choose_recipe(data, "ดูต้นทุนย้อนหลัง")
+    if not recipe:
+        return
+    as_of = _read_date("ต้นทุน ณ วันที่ (YYYY-MM-DD): ")
+    if as_of is None:
         return
 
-    try:
-        recipe_id = int(input("\nระบุ ID สูตรที่ต้องการผลิต: "))
-    except ValueError:
-        print("❌ ID ไม่ถูกต้อง")
+    print(f"\n===== ต้นทุนสูตร: {recipe.name} ณ {as_of} =====")
+    print(f"{'วัตถุดิบ':<20} {'จำนวน':>8} {'ราคา ณ วันนั้น':>14} {'ราคาปัจจุบัน':>14} {'รวม':>12}")
+    print("-" * 72)
+    for item in recipe.ingredients:
+        if item.recipe_id is not None:
+            sub = find_recipe_by_id(data, item.recipe_id)
+            if sub:
+                then = calculate_recipe_cost(data, sub, as_of)
+                print(
+                    f"{'* ' + sub.name:<20} {item.quantity:>8.2f} {then:>14.2f} "
+                    f"{calculate_recipe_cost(data, sub):>14.2f} {item.quantity * then:>12.2f}"
+                )
+            continue
+        ing = find_ingredient_by_id(data, item.ingredient_id)
+        if ing:
+            then = ing.price_at(as_of)
+            print(
+                f"{ing.name:<20} {item.quantity:>8.2f} {then:>14.2f} "
+                f"{ing.price_per_unit:>14.2f} {item.quantity * then:>12.2f}"
+            )
+    print("-" * 72)
+    then_total = calculate_recipe_cost(data, recipe, as_of)
+    now_total = calculate_recipe_cost(data, recipe)
+    print(f"{'ต้นทุนรวมต่อสูตร ณ ' + as_of:>58} {then_total:>12.2f} บาท")
+    print(f"{'ต้นทุนรวมต่อสูตรปัจจุบัน':>58} {now_total:>12.2f} บาท")
+    if then_total:
+        print(f"{'เปลี่ยนไป':>58} {(now_total - then_total) / then_total:>+12.1%}")
+    print("(ใช้บรรทัดสูตรปัจจุบัน * = สูตรย่อย)")
+
+
+def show_recost_history(data):
+    """คิดต้นทุนของประวัติการผลิตใหม่ตามราคา ณ วันที่ผลิต แล้วเทียบกับต้นทุนตามราคาที่บันทึกตอนผลิต"""
+    print("\n===== ตรวจต้นทุนประวัติการผลิตกับราคา ณ วันที่ผลิต =====")
+    if not data.production_log:
+        print("(ยังไม่มีประวัติการผลิต)")
+        return
+    date_range = _read_date_range()
+    if date_range is None:
         return
 
-    recipe = next((r for r in data["recipes"] if r["id"] == recipe_id), None)
+    count = unchecked = mismatched = 0
+    logged_total = cost_total = 0.0
+    largest = []
+    for row in recost_history(data, *date_range):
+        count += 1
+        if row["difference"] is None:
+            # สูตรถูกลบ หรือประวัติรุ่นเก่าที่ไม่ได้บันทึกต้นทุนตามราคา
+            unchecked += 1
+            continue
+        logged_total += row["logged_cost"]
+        cost_total += row["cost"]
+        if abs(row["difference"]) >= 0.01:
+            mismatched += 1
+            largest.append(row)
+    if not count:
+        print("(ไม่มีประวัติการผลิตในช่วงนี้)")
+        return
+
+    print(f"ประวัติ {count:,} รายการ (ตรวจไม่ได้ {unchecked:,} รายการ)")
+    print(f"  ต้นทุนตามราคาตอนผลิตรวม   {logged_total:>14,.2f} บาท")
+    print(f"  ต้นทุนตามราคา ณ วันที่ผลิต {cost_total:>14,.2f} บาท")
+    print(f"  รายการที่ต้นทุนไม่ตรง      {mismatched:>14,}")
+    if largest:
+        largest.sort(key=lambda row: -abs(row["difference"]))
+        print(f"\n{'ID':<7} {'วันที่':<20} {'สูตร':<20} {'บันทึกไว้':>12} {'คิดใหม่':>12} {'ต่าง':>10}")
+        print("-" * 86)
+        for row in largest[:10]:
+            print(
+                f"{row['id']:<7} {row['date']:<20} {row['recipe_name']:<20} "
+                f"{row['logged_cost']:>12.2f} {row['cost']:>12.2f} {row['difference']:>+10.2f}"
+            )
+
+
+# ==================== การผลิตและตัดสต๊อค ====================
+
+def produce_recipe(data):
+    """ผลิตตามสูตรและตัดสต๊อค"""
+    recipe = choose_recipe(data, "ผลิต")
     if not recipe:
-        print("❌ ไม่พบสูตร ID นี้")
         return
 
     try:
-        batches = int(input(f"จำนวนรอบที่ต้องการผลิต (1 รอบ = {recipe['servings']} เสิร์ฟ): "))
+        batches = int(input(f"จำนวนรอบที่ต้องการผลิต (1 รอบ = {recipe.servings} เสิร์ฟ): "))
     except ValueError:
         print("❌ จำนวนไม่ถูกต้อง")
         return
@@ -518,26 +965,32 @@ def produce_recipe(data):
     can_produce = True
     shortage_list = []
 
-    for item in recipe["ingredients"]:
-        ing = find_ingredient_by_id(data, item["ingredient_id"])
+    # สูตรย่อยถูกกระจายเป็นวัตถุดิบจริง (ไม่ได้เก็บสต๊อคของสูตรย่อยแยก)
+    demand, missing = data.recipe_demand(recipe.id)
+    if missing:
+        print(f"❌ สูตรย่อย ID {missing[0]} ถูกลบไปแล้ว ไม่สามารถผลิตได้")
+        return
+
+    for ing_id, qty in demand.items():
+        ing = find_ingredient_by_id(data, ing_id)
         if not ing:
-            print(f"❌ วัตถุดิบ ID {item['ingredient_id']} ถูกลบไปแล้ว ไม่สามารถผลิตได้")
+            print(f"❌ วัตถุดิบ ID {ing_id} ถูกลบไปแล้ว ไม่สามารถผลิตได้")
             return
 
-        needed = item["quantity"] * batches
-        available = ing["stock"]
+        needed = qty * batches
+        available = ing.stock
         status = "✅" if available >= needed else "❌"
 
         if available < needed:
             can_produce = False
             shortage = needed - available
             shortage_list.append(
-                f"  {ing['name']}: ขาด {shortage:.2f} {ing['unit']}"
+                f"  {ing.name}: ขาด {shortage:.2f} {ing.unit}"
             )
 
         print(
-            f"  {status} {ing['name']}: ต้องการ {needed:.2f} {ing['unit']} "
-            f"| มี {available:.2f} {ing['unit']}"
+            f"  {status} {ing.name}: ต้องการ {needed:.2f} {ing.unit} "
+            f"| มี {available:.2f} {ing.unit}"
         )
 
     if not can_produce:
@@ -547,72 +1000,328 @@ def produce_recipe(data):
         print("กรุณาเพิ่มสต๊อควัตถุดิบก่อนผลิต")
         return
 
-    # ยืนยันการผลิต
-    total_cost = calculate_recipe_cost(data, recipe) * batches
-    total_servings = recipe["servings"] * batches
-    print(f"\nสรุปการผลิต: {recipe['name']}")
+    # ยืนยันการผลิต (ต้นทุนตามล็อตที่จะถูกตัด)
+    total_cost = stock_cost(data, {ing_id: qty * batches for ing_id, qty in demand.items()})
+    total_servings = recipe.servings * batches
+    print(f"\nสรุปการผลิต: {recipe.name}")
     print(f"  จำนวน: {batches} รอบ = {total_servings} เสิร์ฟ")
     print(f"  ต้นทุนรวม: {total_cost:.2f} บาท")
 
+    orders = [(recipe.id, batches)]
+    versions = order_versions(data, orders)
     confirm = input("ยืนยันการผลิตและตัดสต๊อค? (y/n): ").strip().lower()
     if confirm != "y":
         print("ยกเลิกการผลิต")
         return
 
-    # ตัดสต๊อค
-    for item in recipe["ingredients"]:
-        ing = find_ingredient_by_id(data, item["ingredient_id"])
-        needed = item["quantity"] * batches
-        ing["stock"] -= needed
+    # ตัดสต๊อคและบันทึกประวัติการผลิต
+    entries, problems = produce_confirmed(data, orders, versions)
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        return
+
+    entry = entries[0]
+    print(f"\n✅ ผลิตเสร็จสิ้น! ตัดสต๊อคเรียบร้อย")
+    print(f"   สูตร: {recipe.name}")
+    print(f"   ผลิต: {entry.total_servings} เสิร์ฟ")
+    print(f"   ต้นทุน: {entry.total_cost:.2f} บาท")
+    warn_low_stock(data, demand)
+
+
+def production_demand(data, orders):
+    """รวมปริมาณวัตถุดิบที่ต้องใช้ของคำสั่งผลิต [(recipe_id, รอบ), ...]
+
+    สูตรย่อยถูกกระจายเป็นวัตถุดิบตามจำนวนสูตรย่อยที่ใช้ต่อรอบ
+    คืน (dict ingredient_id → ปริมาณรวม, รายการปัญหาที่พบ)
+    """
+    demand = {}
+    problems = []
+    for recipe_id, batches in orders:
+        recipe = find_recipe_by_id(data, recipe_id)
+        if not recipe:
+            problems.append(f"ไม่พบสูตร ID {recipe_id}")
+            continue
+        if batches <= 0:
+            problems.append(f"{recipe.name}: จำนวนรอบต้องมากกว่า 0")
+            continue
+        per_batch, missing = data.recipe_demand(recipe_id)
+        for sub_id in missing:
+            problems.append(f"{recipe.name}: สูตรย่อย ID {sub_id} ถูกลบไปแล้ว")
+        for ing_id, qty in per_batch.items():
+            if not find_ingredient_by_id(data, ing_id):
+                problems.append(f"{recipe.name}: วัตถุดิบ ID {ing_id} ถูกลบไปแล้ว")
+                continue
+            demand[ing_id] = demand.get(ing_id, 0.0) + qty * batches
+    return demand, problems
 
-    # บันทึกประวัติการผลิต
-    from datetime import datetime
 
-    log_entry = {
-        "id": get_next_id(data["production_log"]),
-        "recipe_id": recipe["id"],
-        "recipe_name": recipe["name"],
-        "batches": batches,
-        "total_servings": total_servings,
-        "total_cost": round(total_cost, 2),
-        "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-    }
-    data["production_log"].append(log_entry)
+def stock_cost(data, demand):
+    """ต้นทุนของการตัดสต๊อคตาม demand (ingredient_id → ปริมาณ) จากล็อตที่รับเข้าก่อน
 
-    save_data(data)
-    print(f"\n✅ ผลิตเสร็จสิ้น! ตัดสต๊อคเรียบร้อย")
-    print(f"   สูตร: {recipe['name']}")
-    print(f"   ผลิต: {total_servings} เสิร์ฟ")
-    print(f"   ต้นทุน: {total_cost:.2f} บาท")
+    ไม่ตัดสต๊อคจริง ใช้แสดงต้นทุนก่อนยืนยันการผลิต
+    """
+    total = 0.0
+    for ing_id, qty in demand.items():
+        ing = find_ingredient_by_id(data, ing_id)
+        total += ing.lots.cost_of(qty, ing.price_per_unit)
+    return total
 
 
+def find_shortages(data, demand):
+    """คืนรายการวัตถุดิบที่ไม่พอ [(วัตถุดิบ, ต้องการ, มี), ...]"""
+    shortages = []
+    for ing_id, needed in demand.items():
+        ing = find_ingredient_by_id(data, ing_id)
+        if ing.stock < needed:
+            shortages.append((ing, needed, ing.stock))
+    return shortages
+
+
+def produce_batch(data, orders):
+    """ผลิตหลายสูตรพร้อมกัน: ตัดสต๊อคทั้งหมดหรือไม่ตัดเลย
+
+    ตรวจความต้องการวัตถุดิบรวมของทุกคำสั่งในรอบเดียว ถ้าผ่านจึงตัดสต๊อค
+    และเพิ่มประวัติการผลิตทั้งหมด (ผู้เรียกต้อง save_data เองหนึ่งครั้ง)
+    สต๊อคถูกตัดจากล็อตที่รับเข้าก่อนทีละคำสั่งตามลำดับ total_cost ของแต่ละคำสั่ง
+    จึงเป็นต้นทุนจริงของล็อตที่ใช้ไป ไม่ใช่ราคาปัจจุบัน (ต้นทุนตามราคาปัจจุบันเก็บใน price_cost)
+    คืน (รายการประวัติการผลิตที่เพิ่ม, รายการปัญหา)
+    """
+    demand, problems = production_demand(data, orders)
+    for ing, needed, available in find_shortages(data, demand):
+        problems.append(f"{ing.name}: ขาด {needed - available:.2f} {ing.unit}")
+    if problems:
+        return [], problems
+
+    date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    entries = []
+    for recipe_id, batches in orders:
+        recipe = find_recipe_by_id(data, recipe_id)
+        cost = sum(
+            data.consume_stock(ing_id, qty * batches)
+            for ing_id, qty in data.recipe_demand(recipe_id)[0].items()
+        )
+        entries.append(data.append_log({
+            "recipe_id": recipe.id,
+            "recipe_name": recipe.name,
+            "batches": batches,
+            "total_servings": recipe.servings * batches,
+            "total_cost": round(cost, 2),
+            "date": date,
+            "price_cost": round(calculate_recipe_cost(data, recipe) * batches, 2),
+        }))
+    return entries, []
+
+
+def order_versions(data, orders):
+    """version ของสูตรและวัตถุดิบที่คำสั่งผลิตใช้ ณ ตอนที่แสดงให้ผู้ใช้ยืนยัน"""
+    versions = {}
+    for recipe_id, _ in orders:
+        recipe = find_recipe_by_id(data, recipe_id)
+        if not recipe:
+            continue
+        versions["recipes", recipe_id] = recipe.version
+        for sub_id in data.sub_recipes(recipe_id):
+            versions["recipes", sub_id] = data.recipes[sub_id].version
+        for ing_id in data.recipe_demand(recipe_id)[0]:
+            ing = find_ingredient_by_id(data, ing_id)
+            if ing:
+                versions["ingredients", ing.id] = ing.version
+    return versions
+
+
+def produce_confirmed(data, orders, versions):
+    """ผลิตตามคำสั่งที่ผู้ใช้ยืนยันแล้ว ภายใต้ล็อกของ storage
+
+    ถ้าสูตรหรือสต๊อคถูกแก้ไขจากเครื่องอื่นหลังจากที่แสดงให้ผู้ใช้ดู (version ไม่ตรง)
+    จะแจ้งเตือนแล้วตรวจความพอเพียงใหม่กับยอดล่าสุดก่อนตัดสต๊อค คืนค่าแบบ produce_batch
+    """
+    with transaction(data):
+        getters = {"recipes": find_recipe_by_id, "ingredients": find_ingredient_by_id}
+        if any(
+            changed_elsewhere(getters[kind](data, record_id), version)
+            for (kind, record_id), version in versions.items()
+        ):
+            print("⚠️  สูตร/สต๊อคถูกแก้ไขจากเครื่องอื่นระหว่างนี้ ตรวจสอบกับยอดล่าสุดอีกครั้ง")
+        return produce_batch(data, orders)
+
+
+def produce_order(data):
+    """ผลิตหลายสูตรตามคำสั่งผลิต (ตัดสต๊อคทั้งหมดในครั้งเดียว)"""
+    if not data.recipes:
+        print("\n(ยังไม่มีสูตรอาหาร)")
+        return
+    if len(data.recipes) <= PICK_LIST_LIMIT:
+        _show_recipe_names(data)
+
+    orders = []
+    while True:
+        recipe_input = input("\nระบุ ID หรือชื่อสูตร (หรือ Enter เพื่อเสร็จสิ้น): ").strip()
+        if not recipe_input:
+            break
+        recipe = lookup_record(data, "recipes", recipe_input)
+        if not recipe:
+            continue
+        recipe_id = recipe.id
+        try:
+            batches = int(input(f"จำนวนรอบของ '{recipe.name}': "))
+        except ValueError:
+            print("❌ จำนวนไม่ถูกต้อง")
+            continue
+        if batches <= 0:
+            print("❌ จำนวนต้องมากกว่า 0")
+            continue
+        orders.append((recipe_id, batches))
+        print(f"  + {recipe.name} {batches} รอบ")
+
+    if not orders:
+        print("❌ ไม่มีรายการผลิต")
+        return
+
+    demand, problems = production_demand(data, orders)
+    shortages = find_shortages(data, demand)
+    if problems or shortages:
+        print("\n❌ ไม่สามารถผลิตตามคำสั่งได้:")
+        for problem in problems:
+            print(f"  {problem}")
+        for ing, needed, available in shortages:
+            print(
+                f"  {ing.name}: ต้องการ {needed:.2f} | มี {available:.2f} "
+                f"| ขาด {needed - available:.2f} {ing.unit}"
+            )
+        print("กรุณาเพิ่มสต๊อควัตถุดิบก่อนผลิต")
+        return
+
+    total_cost = stock_cost(data, demand)
+    print(f"\nสรุปคำสั่งผลิต: {len(orders)} รายการ ต้นทุนรวม {total_cost:.2f} บาท")
+    versions = order_versions(data, orders)
+    confirm = input("ยืนยันการผลิตและตัดสต๊อค? (y/n): ").strip().lower()
+    if confirm != "y":
+        print("ยกเลิกการผลิต")
+        return
+
+    entries, problems = produce_confirmed(data, orders, versions)
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        return
+    print(f"\n✅ ผลิตเสร็จสิ้น {len(entries)} รายการ! ตัดสต๊อคเรียบร้อย")
+    print(f"   ต้นทุนรวม: {sum(entry.total_cost for entry in entries):.2f} บาท")
+    warn_low_stock(data, demand)
+
+
+def show_production_plan(data):
+    """วางแผนผลิตหลายสูตรจากสต๊อคที่มี ให้ได้เสิร์ฟหรือกำไรสูงสุด"""
+    if not data.recipes:
+        print("\n(ยังไม่มีสูตรอาหาร)")
+        return
+
+    print("\n===== วางแผนการผลิต =====")
+    print("1. ให้ได้จำนวนเสิร์ฟมากที่สุด")
+    print("2. ให้ได้กำไรมากที่สุด")
+    choice = input("เลือก: ").strip()
+    if choice == "1":
+        objective, margin_pct = "servings", DEFAULT_MARGIN_PCT
+    elif choice == "2":
+        objective = "margin"
+        try:
+            margin_pct = float(
+                input(f"กำไรที่ตั้งไว้ (% ของต้นทุน) [{DEFAULT_MARGIN_PCT}]: ").strip()
+                or DEFAULT_MARGIN_PCT
+            )
+        except ValueError:
+            print("❌ กรุณาระบุตัวเลขที่ถูกต้อง")
+            return
+    else:
+        print("❌ เมนูไม่ถูกต้อง")
+        return
+
+    plan = plan_production(data, objective, margin_pct)
+    if not plan["batches"]:
+        print("(สต๊อคไม่พอผลิตสูตรใดเลย)")
+        return
+
+    print(f"\n{'ID':<5} {'ชื่อสูตร':<25} {'รอบ':>6} {'เสิร์ฟ':>8} {'ต้นทุน':>12}")
+    print("-" * 60)
+    for recipe_id, batches in plan["batches"].items():
+        recipe = find_recipe_by_id(data, recipe_id)
+        print(
+            f"{recipe_id:<5} {recipe.name:<25} {batches:>6} "
+            f"{recipe.servings * batches:>8} {calculate_recipe_cost(data, recipe) * batches:>12.2f}"
+        )
+    print("-" * 60)
+    print(f"รวม {plan['servings']} เสิร์ฟ | ต้นทุน {plan['cost']:.2f} บาท")
+    if objective == "margin":
+        print(f"กำไรโดยประมาณ {plan['value']:.2f} บาท")
+
+    orders = list(plan["batches"].items())
+    versions = order_versions(data, orders)
+    confirm = input("ผลิตตามแผนนี้และตัดสต๊อค? (y/n): ").strip().lower()
+    if confirm != "y":
+        return
+    entries, problems = produce_confirmed(data, orders, versions)
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        return
+    print(f"✅ ผลิตเสร็จสิ้น {len(entries)} รายการ! ตัดสต๊อคเรียบร้อย")
+    warn_low_stock(data, production_demand(data, orders)[0])
+
+
+def max_producible(data, recipe):
+    """คำนวณจำนวนรอบสูงสุดที่สูตรผลิตได้จากสต๊อคปัจจุบัน
+
+    คืน (รอบสูงสุด, ID วัตถุดิบที่จำกัด, ID วัตถุดิบที่ถูกลบ)
+    สูตรย่อยถูกกระจายเป็นวัตถุดิบ ถ้าสูตรย่อยถูกลบจะผลิตไม่ได้ (0, None, None)
+    """
+    max_batches = float("inf")
+    limiting_id = None
+
+    demand, missing = data.recipe_demand(recipe.id)
+    if missing:
+        return 0, None, None
+    for ing_id, qty in demand.items():
+        ing = find_ingredient_by_id(data, ing_id)
+        if not ing:
+            return 0, None, ing_id
+        if qty > 0:
+            possible = ing.stock / qty
+            if possible < max_batches:
+                max_batches = possible
+                limiting_id = ing.id
+
+    max_batches = int(max_batches) if max_batches != float("inf") else 0
+    return max_batches, limiting_id, None
+
+
+@timed("render.check_producible")
 def check_producible(data):
     """ตรวจสอบว่าสูตรไหนผลิตได้กี่รอบ"""
-    if not data["recipes"]:
+    if not data.recipes:
         print("\n(ยังไม่มีสูตรอาหาร)")
         return
 
     print("\n===== ตรวจสอบความสามารถในการผลิต =====")
-    for recipe in data["recipes"]:
-        max_batches = float("inf")
-        limiting_ingredient = ""
-
-        for item in recipe["ingredients"]:
-            ing = find_ingredient_by_id(data, item["ingredient_id"])
-            if not ing:
-                max_batches = 0
-                limiting_ingredient = f"[วัตถุดิบ ID {item['ingredient_id']} ถูกลบ]"
-                break
-            if item["quantity"] > 0:
-                possible = ing["stock"] / item["quantity"]
-                if possible < max_batches:
-                    max_batches = possible
-                    limiting_ingredient = ing["name"]
-
-        max_batches = int(max_batches) if max_batches != float("inf") else 0
-        total_servings = max_batches * recipe["servings"]
-
-        print(f"\n[{recipe['name']}]")
+    engine = get_engine(data)
+    results = engine.producibility() if engine else None
+    for recipe in data.recipes.values():
+        if results is not None:
+            max_batches, limiting_id, missing_id = results[recipe.id]
+        else:
+            max_batches, limiting_id, missing_id = max_producible(data, recipe)
+
+        missing_subs = data.recipe_demand(recipe.id)[1]
+        if missing_subs:
+            limiting_ingredient = f"[สูตรย่อย ID {missing_subs[0]} ถูกลบ]"
+        elif missing_id is not None:
+            limiting_ingredient = f"[วัตถุดิบ ID {missing_id} ถูกลบ]"
+        elif limiting_id is not None:
+            limiting_ingredient = data.ingredients[limiting_id].name
+        else:
+            limiting_ingredient = ""
+        total_servings = max_batches * recipe.servings
+
+        print(f"\n[{recipe.name}]")
         print(f"  ผลิตได้สูงสุด: {max_batches} รอบ ({total_servings} เสิร์ฟ)")
         if max_batches > 0:
             print(f"  วัตถุดิบที่จำกัด: {limiting_ingredient}")
@@ -620,24 +1329,135 @@ def check_producible(data):
             print(f"  สาเหตุ: {limiting_ingredient}")
 
 
+def _read_date_range():
+    """ถามช่วงวันที่ (YYYY-MM-DD) คืน (start, end) หรือ None ถ้ารูปแบบผิด"""
+    start = input("วันที่เริ่มต้น (YYYY-MM-DD, Enter = ทั้งหมด): ").strip() or None
+    end = input("วันที่สิ้นสุด (YYYY-MM-DD, Enter = ทั้งหมด): ").strip() or None
+    try:
+        for value in (start, end):
+            if value:
+                datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        print("❌ รูปแบบวันที่ไม่ถูกต้อง")
+        return None
+    return start, end
+
+
 def show_production_log(data):
-    """แสดงประวัติการผลิต"""
+    """แสดงประวัติการผลิตทีละหน้า กรองตามช่วงวันที่ได้"""
     print("\n===== ประวัติการผลิต =====")
-    if not data["production_log"]:
+    if not data.production_log:
         print("(ยังไม่มีประวัติการผลิต)")
         return
 
-    total_all_cost = 0.0
-    print(f"{'ID':<5} {'วันที่':<22} {'สูตร':<20} {'รอบ':>5} {'เสิร์ฟ':>7} {'ต้นทุน':>12}")
-    print("-" * 75)
-    for log in data["production_log"]:
-        total_all_cost += log["total_cost"]
+    date_range = _read_date_range()
+    if date_range is None:
+        return
+    start, end = date_range
+    totals = data.production_log.range_totals(start, end)
+    if not totals["count"]:
+        print("(ไม่มีประวัติการผลิตในช่วงนี้)")
+        return
+
+    # เริ่มที่หน้าสุดท้าย (รายการล่าสุด) อ่านประวัติเก่าจากไฟล์เฉพาะช่วงของหน้าที่แสดง
+    page_no = None
+    while True:
+        rows, page_no, pages = data.production_log.page(page_no, LOG_PAGE_SIZE, start, end)
+        print(f"\n{'ID':<5} {'วันที่':<22} {'สูตร':<20} {'รอบ':>5} {'เสิร์ฟ':>7} {'ต้นทุน':>12}")
+        print("-" * 75)
+        for log in rows:
+            print(
+                f"{log.id:<5} {log.date:<22} {log.recipe_name:<20} "
+                f"{log.batches:>5} {log.total_servings:>7} {log.total_cost:>10.2f}"
+            )
+        print("-" * 75)
+        print(f"หน้า {page_no + 1}/{pages} ({totals['count']} รายการ)")
+        print(f"{'ต้นทุนรวมทั้งหมด':>62} {totals['cost']:>10.2f} บาท")
+
+        if pages == 1:
+            return
+        choice = input("[n] หน้าถัดไป [p] หน้าก่อน [Enter] กลับ: ").strip().lower()
+        if choice == "n":
+            page_no += 1
+        elif choice == "p":
+            page_no -= 1
+        else:
+            return
+
+
+def show_production_summary(data):
+    """สรุปการผลิตรายวันและรายสูตร (จากยอดรวมที่สะสมไว้)"""
+    print("\n===== สรุปการผลิต =====")
+    if not data.production_log:
+        print("(ยังไม่มีประวัติการผลิต)")
+        return
+
+    date_range = _read_date_range()
+    if date_range is None:
+        return
+    start, end = date_range
+
+    print(f"\n{'วันที่':<12} {'ครั้ง':>6} {'รอบ':>8} {'เสิร์ฟ':>10} {'ต้นทุน':>14}")
+    print("-" * 55)
+    for day, totals in data.production_log.daily_totals(start, end):
+        print(
+            f"{day:<12} {totals['count']:>6} {totals['batches']:>8} "
+            f"{totals['servings']:>10} {totals['cost']:>14.2f}"
+        )
+    totals = data.production_log.range_totals(start, end)
+    print("-" * 55)
+    print(
+        f"{'รวม':<12} {totals['count']:>6} {totals['batches']:>8} "
+        f"{totals['servings']:>10} {totals['cost']:>14.2f}"
+    )
+
+    if start is None and end is None:
+        print(f"\n{'ID':<5} {'ชื่อสูตร':<25} {'ครั้ง':>6} {'เสิร์ฟ':>10} {'ต้นทุน':>14}")
+        print("-" * 65)
+        for recipe_id, totals in data.production_log.by_recipe.items():
+            recipe = find_recipe_by_id(data, recipe_id)
+            name = recipe.name if recipe else f"[สูตร ID {recipe_id} ถูกลบ]"
+            print(
+                f"{recipe_id:<5} {name:<25} {totals['count']:>6} "
+                f"{totals['servings']:>10} {totals['cost']:>14.2f}"
+            )
+
+
+def warn_low_stock(data, ing_ids):
+    """เตือนวัตถุดิบ (จากรายการที่เพิ่งตัดสต๊อค) ที่ถึงจุดสั่งซื้อแล้ว"""
+    for alert in get_stock_monitor(data).alerts(ing_ids=ing_ids):
+        days_left = alert["days_left"]
+        print(
+            f"⚠️  {alert['name']} เหลือ {alert['stock']:.2f} {alert['unit']} "
+            f"(ใช้ได้อีกประมาณ {days_left:.1f} วัน) "
+            f"ควรสั่งเพิ่ม {alert['suggested_quantity']:.2f} {alert['unit']}"
+        )
+
+
+@timed("render.reorder_alerts")
+def show_reorder_alerts(data):
+    """แสดงวัตถุดิบที่ถึงจุดสั่งซื้อ พร้อมปริมาณที่แนะนำให้สั่ง"""
+    print("\n===== วัตถุดิบที่ควรสั่งเพิ่ม =====")
+    print(
+        f"(อัตราใช้จากการผลิต {WINDOW_DAYS} วันล่าสุด, รอของ {LEAD_TIME_DAYS} วัน, "
+        f"สั่งให้พอใช้อีก {REVIEW_DAYS} วัน)"
+    )
+    alerts = get_stock_monitor(data).alerts()
+    if not alerts:
+        print("✅ ไม่มีวัตถุดิบที่ถึงจุดสั่งซื้อ")
+        return
+
+    print(
+        f"\n{'ID':<5} {'ชื่อวัตถุดิบ':<20} {'คงเหลือ':>10} {'ใช้/วัน':>10} "
+        f"{'เหลือ (วัน)':>12} {'จุดสั่งซื้อ':>12} {'ควรสั่ง':>10} {'หน่วย':<8}"
+    )
+    print("-" * 95)
+    for alert in alerts:
         print(
-            f"{log['id']:<5} {log['date']:<22} {log['recipe_name']:<20} "
-            f"{log['batches']:>5} {log['total_servings']:>7} {log['total_cost']:>10.2f}"
+            f"{alert['ingredient_id']:<5} {alert['name']:<20} {alert['stock']:>10.2f} "
+            f"{alert['daily_usage']:>10.2f} {alert['days_left']:>12.1f} "
+            f"{alert['reorder_point']:>12.2f} {alert['suggested_quantity']:>10.2f} {alert['unit']:<8}"
         )
-    print("-" * 75)
-    print(f"{'ต้นทุนรวมทั้งหมด':>62} {total_all_cost:>10.2f} บาท")
 
 
 # ==================== เมนูหลัก ====================
@@ -653,10 +1473,15 @@ def ingredient_menu(data):
         print("║  3. แก้ไขวัตถุดิบ            ║")
         print("║  4. ลบวัตถุดิบ               ║")
         print("║  5. เพิ่มสต๊อค              ║")
+        print("║  6. ดูสูตรที่ใช้วัตถุดิบ      ║")
+        print("║  7. ประวัติราคาวัตถุดิบ       ║")
+        print("║  8. ล็อตและมูลค่าสต๊อค       ║")
         print("║  0. กลับเมนูหลัก            ║")
         print("╚══════════════════════════════╝")
 
         choice = input("เลือกเมนู: ").strip()
+        # อ่านการเปลี่ยนแปลงจากเครื่องอื่นก่อน ให้ทุกเมนูเห็นยอดล่าสุด
+        refresh_data(data)
         if choice == "1":
             list_ingredients(data)
         elif choice == "2":
@@ -667,6 +1492,12 @@ def ingredient_menu(data):
             delete_ingredient(data)
         elif choice == "5":
             restock_ingredient(data)
+        elif choice == "6":
+            show_ingredient_usage(data)
+        elif choice == "7":
+            show_price_history(data)
+        elif choice == "8":
+            show_stock_lots(data)
         elif choice == "0":
             break
         else:
@@ -687,6 +1518,8 @@ def recipe_menu(data):
         print("╚══════════════════════════════╝")
 
         choice = input("เลือกเมนู: ").strip()
+        # อ่านการเปลี่ยนแปลงจากเครื่องอื่นก่อน ให้ทุกเมนูเห็นยอดล่าสุด
+        refresh_data(data)
         if choice == "1":
             list_recipes(data)
         elif choice == "2":
@@ -709,14 +1542,22 @@ def cost_menu(data):
         print("╠══════════════════════════════╣")
         print("║  1. ดูต้นทุนรายสูตร          ║")
         print("║  2. เปรียบเทียบต้นทุนทุกสูตร ║")
+        print("║  3. ต้นทุนย้อนหลัง ณ วันที่    ║")
+        print("║  4. ตรวจต้นทุนประวัติการผลิต  ║")
         print("║  0. กลับเมนูหลัก            ║")
         print("╚══════════════════════════════╝")
 
         choice = input("เลือกเมนู: ").strip()
+        # อ่านการเปลี่ยนแปลงจากเครื่องอื่นก่อน ให้ทุกเมนูเห็นยอดล่าสุด
+        refresh_data(data)
         if choice == "1":
             show_cost_detail(data)
         elif choice == "2":
             compare_costs(data)
+        elif choice == "3":
+            show_cost_as_of(data)
+        elif choice == "4":
+            show_recost_history(data)
         elif choice == "0":
             break
         else:
@@ -732,16 +1573,30 @@ def production_menu(data):
         print("║  1. ผลิตตามสูตร (ตัดสต๊อค)   ║")
         print("║  2. ตรวจสอบผลิตได้กี่รอบ     ║")
         print("║  3. ประวัติการผลิต           ║")
+        print("║  4. ผลิตหลายสูตร (คำสั่งผลิต) ║")
+        print("║  5. วางแผนการผลิต            ║")
+        print("║  6. สรุปการผลิตรายวัน/รายสูตร ║")
+        print("║  7. วัตถุดิบที่ควรสั่งเพิ่ม     ║")
         print("║  0. กลับเมนูหลัก            ║")
         print("╚══════════════════════════════╝")
 
         choice = input("เลือกเมนู: ").strip()
+        # อ่านการเปลี่ยนแปลงจากเครื่องอื่นก่อน ให้ทุกเมนูเห็นยอดล่าสุด
+        refresh_data(data)
         if choice == "1":
             produce_recipe(data)
         elif choice == "2":
             check_producible(data)
         elif choice == "3":
             show_production_log(data)
+        elif choice == "4":
+            produce_order(data)
+        elif choice == "5":
+            show_production_plan(data)
+        elif choice == "6":
+            show_production_summary(data)
+        elif choice == "7":
+            show_reorder_alerts(data)
         elif choice == "0":
             break
         else:
@@ -786,4 +1641,15 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    import sys
+
+    # RECIPE_METRICS / RECIPE_PROFILE เปิดการวัดเวลาและ profile (ดู recipe_metrics.py)
+    with session():
+        if len(sys.argv) > 1:
+            # มีอาร์กิวเมนต์ → ทำงานแบบไม่โต้ตอบผ่าน recipe_cli
+            from recipe_cli import main as cli_main
+
+            exit_code = cli_main(sys.argv[1:])
+        else:
+            exit_code = main()
+    sys.exit(exit_code)
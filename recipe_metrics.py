@@ -0,0 +1,288 @@
+"""วัดเวลาและนับจำนวนครั้งของงานที่ใช้บ่อย (โหลด/บันทึก ค้นหา record คิดต้นทุน แสดงผล)
+
+เปิดด้วยตัวแปรสภาพแวดล้อม (อ่านครั้งเดียวตอน import):
+    RECIPE_METRICS=1            เก็บเวลาและตัวนับ แล้วพิมพ์สรุปพร้อมฮิสโตแกรมเวลาตอนจบโปรแกรม
+    RECIPE_METRICS_OUT=ไฟล์      เขียนผลเป็น JSON ด้วย
+    RECIPE_PROFILE=cprofile     จับ profile ของทั้งโปรแกรมด้วย cProfile
+    RECIPE_PROFILE=sample       สุ่มดู stack ของ thread หลักทุก SAMPLE_INTERVAL วินาที
+                                (ช้าลงน้อยกว่า cProfile มาก เหมาะกับหน้าจอที่ใช้งานจริง)
+    RECIPE_PROFILE_OUT=ไฟล์      ไฟล์ผล profile (cprofile: ไฟล์ pstats, sample: collapsed stack
+                                ที่ใช้กับ flamegraph.pl / speedscope ได้)
+
+เมื่อไม่ได้เปิด timed และ counted คืนฟังก์ชันเดิมโดยไม่ห่อ และ timer คืน object ว่างตัวเดียวกัน
+ทุกครั้ง จึงแทบไม่มีค่าใช้จ่ายเพิ่มในงานปกติ
+"""
+
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+
+ENABLED = os.environ.get("RECIPE_METRICS", "") not in ("", "0")
+METRICS_OUT = os.environ.get("RECIPE_METRICS_OUT")
+PROFILE = os.environ.get("RECIPE_PROFILE", "")
+PROFILE_OUT = os.environ.get(
+    "RECIPE_PROFILE_OUT", "recipe_profile.txt" if PROFILE == "sample" else "recipe_profile.prof"
+)
+# ระยะห่างระหว่างการสุ่มดู stack (วินาที)
+SAMPLE_INTERVAL = 0.005
+
+# ขอบบนของช่องฮิสโตแกรม (วินาที): 1µs, 2µs, 4µs, ... ประมาณ 17 วินาที
+BUCKET_BOUNDS = tuple(2.0 ** i / 1e6 for i in range(25))
+
+
+class Histogram:
+    """สถิติเวลาของงานหนึ่งชนิด เก็บจำนวนครั้งในช่องเวลาแบบยกกำลังสอง"""
+
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        # ช่องสุดท้ายคือเกิน BUCKET_BOUNDS[-1]
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+
+    def percentile(self, pct):
+        """เวลาที่ pct% ของครั้งทั้งหมดไม่เกิน (ประมาณด้วยขอบบนของช่อง)"""
+        if not self.count:
+            return 0.0
+        target = self.count * pct / 100
+        seen = 0
+        for index, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return min(BUCKET_BOUNDS[index], self.max) if index < len(BUCKET_BOUNDS) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max,
+            # [ขอบบน (วินาที, None = ไม่จำกัด), จำนวนครั้ง] เฉพาะช่องที่มีข้อมูล
+            "buckets": [
+                [BUCKET_BOUNDS[i] if i < len(BUCKET_BOUNDS) else None, n]
+                for i, n in enumerate(self.buckets) if n
+            ],
+        }
+
+
+_timings = {}
+_counters = {}
+
+
+def record(name, seconds):
+    """เพิ่มเวลาของงาน name หนึ่งครั้ง"""
+    hist = _timings.get(name)
+    if hist is None:
+        hist = _timings[name] = Histogram()
+    hist.add(seconds)
+
+
+def count(name, n=1):
+    """เพิ่มตัวนับ name (ไม่ทำอะไรเมื่อไม่ได้เปิด)"""
+    if ENABLED:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def timed(name):
+    """decorator จับเวลาทุกครั้งที่เรียกฟังก์ชัน (ไม่ได้เปิด = คืนฟังก์ชันเดิม)"""
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorate
+
+
+def counted(name):
+    """decorator นับจำนวนครั้งที่เรียกฟังก์ชัน (ไม่ได้เปิด = คืนฟังก์ชันเดิม)"""
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            _counters[name] = _counters.get(name, 0) + 1
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name):
+    """context manager จับเวลาของบล็อก: with timer("ชื่องาน"): ..."""
+    return _Timer(name) if ENABLED else _NULL_TIMER
+
+
+# ==================== ผลลัพธ์ ====================
+
+def snapshot():
+    """ผลทั้งหมดเป็น dict (แปลงเป็น JSON ได้)"""
+    return {
+        "timings": {name: hist.to_dict() for name, hist in sorted(_timings.items())},
+        "counters": dict(sorted(_counters.items())),
+    }
+
+
+def reset():
+    """ล้างเวลาและตัวนับทั้งหมด"""
+    _timings.clear()
+    _counters.clear()
+
+
+def export_json(path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f, ensure_ascii=False, indent=2)
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:.3f}"
+
+
+def report(out=None, histograms=True):
+    """พิมพ์สรุปเวลาต่องาน ตัวนับ และฮิสโตแกรมเวลาของแต่ละงาน"""
+    out = out or sys.stderr
+    print("\n===== เวลาต่องาน (ms) =====", file=out)
+    print(
+        f"{'งาน':<32} {'ครั้ง':>8} {'รวม':>10} {'เฉลี่ย':>9} {'p50':>9} "
+        f"{'p90':>9} {'p99':>9} {'สูงสุด':>9}",
+        file=out,
+    )
+    for name, hist in sorted(_timings.items(), key=lambda item: -item[1].total):
+        print(
+            f"{name:<32} {hist.count:>8} {_ms(hist.total):>10} {_ms(hist.total / hist.count):>9} "
+            f"{_ms(hist.percentile(50)):>9} {_ms(hist.percentile(90)):>9} "
+            f"{_ms(hist.percentile(99)):>9} {_ms(hist.max):>9}",
+            file=out,
+        )
+    if _counters:
+        print("\n===== ตัวนับ =====", file=out)
+        for name, value in sorted(_counters.items()):
+            print(f"{name:<32} {value:>12,}", file=out)
+    if not histograms:
+        return
+    for name, hist in sorted(_timings.items()):
+        print(f"\n{name}", file=out)
+        peak = max(hist.buckets)
+        for index, n in enumerate(hist.buckets):
+            if not n:
+                continue
+            bound = f"≤ {_ms(BUCKET_BOUNDS[index])}" if index < len(BUCKET_BOUNDS) else "> สูงสุด"
+            print(f"  {bound:>12} ms {n:>8} {'█' * max(1, round(n * 40 / peak))}", file=out)
+
+
+# ==================== profile ====================
+
+class _Sampler(threading.Thread):
+    """สุ่มดู stack ของ thread ที่เริ่ม profile แล้วนับแบบ collapsed stack"""
+
+    def __init__(self, thread_id):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+@contextmanager
+def session():
+    """ครอบโปรแกรมหลัก: เริ่ม profile (ถ้าเลือก) และพิมพ์/เขียนผลเมื่อจบ"""
+    profiler = sampler = None
+    if PROFILE == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+    elif PROFILE == "sample":
+        sampler = _Sampler(threading.get_ident())
+        sampler.start()
+    elif PROFILE:
+        print(f"⚠️  ไม่รู้จัก RECIPE_PROFILE={PROFILE} (ใช้ cprofile หรือ sample)", file=sys.stderr)
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(PROFILE_OUT)
+            print(f"บันทึก profile: {PROFILE_OUT} (ดูด้วย python -m pstats)", file=sys.stderr)
+        if sampler is not None:
+            sampler.stop()
+            with open(PROFILE_OUT, "w", encoding="utf-8") as f:
+                for stack, n in sampler.stacks.most_common():
+                    f.write(f"{stack} {n}\n")
+            print(
+                f"บันทึก profile: {PROFILE_OUT} ({sum(sampler.stacks.values())} ตัวอย่าง)",
+                file=sys.stderr,
+            )
+        if ENABLED:
+            report()
+            if METRICS_OUT:
+                export_json(METRICS_OUT)
@@ -0,0 +1,307 @@
+"""ชนิดข้อมูลของวัตถุดิบ สูตร บรรทัดในสูตร และประวัติการผลิต
+
+ใช้ __slots__ แทน dict เพื่อลดหน่วยความจำต่อรายการ ข้อมูลถูกแปลงเป็น/จาก dict
+ตามโครงสร้าง recipe_data.json เฉพาะตอนอ่าน/เขียนไฟล์ (from_dict / to_dict)
+"""
+
+from collections import deque
+
+# ปริมาณที่เหลือน้อยกว่านี้ถือว่าล็อตหมดแล้ว (กันเศษทศนิยมค้างจากการลบทีละล็อต)
+LOT_EPSILON = 1e-9
+
+
+class Record:
+    """คลาสฐานของข้อมูลแต่ละชนิด ฟิลด์ตามลำดับใน __slots__"""
+
+    __slots__ = ()
+
+    @classmethod
+    def from_dict(cls, data):
+        """สร้างจาก dict ตามโครงสร้างไฟล์"""
+        return cls(**data)
+
+    def to_dict(self):
+        """แปลงเป็น dict ตามโครงสร้างไฟล์"""
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def update(self, **fields):
+        """แก้ไขหลายฟิลด์พร้อมกัน"""
+        for field, value in fields.items():
+            setattr(self, field, value)
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ", ".join(f"{f}={getattr(self, f)!r}" for f in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class LotQueue:
+    """ล็อตวัตถุดิบที่ยังเหลือในสต๊อค เรียงตามเวลารับเข้า ตัดออกแบบเข้าก่อนออกก่อน (FIFO)
+
+    แต่ละล็อตเป็น tuple (รับเข้าเมื่อ, ปริมาณคงเหลือ, ต้นทุนต่อหน่วย) ใน deque
+    ล็อตแรกที่ถูกตัดบางส่วนถูกแทนด้วย tuple ใหม่ ล็อตที่หมดถูกนำออกทันที
+    การตัดจึงใช้เวลาตามจำนวนล็อตที่หมดในครั้งนั้น ปริมาณรวมและมูลค่ารวมถูกบวก/ลบตามทุกครั้ง
+    จึงอ่านได้ทันทีโดยไม่ต้องไล่ล็อต
+    """
+
+    __slots__ = ("_lots", "total", "value")
+
+    def __init__(self, lots=()):
+        self._lots = deque()
+        self.total = 0.0
+        self.value = 0.0
+        for received_at, quantity, unit_cost in lots:
+            self.receive(quantity, unit_cost, received_at)
+
+    def __len__(self):
+        return len(self._lots)
+
+    def __iter__(self):
+        return iter(self._lots)
+
+    def __eq__(self, other):
+        if not isinstance(other, LotQueue):
+            return NotImplemented
+        return self._lots == other._lots
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"LotQueue({self.to_list()!r})"
+
+    @property
+    def unit_cost(self):
+        """ต้นทุนเฉลี่ยต่อหน่วยของสต๊อคที่เหลือ (None ถ้าไม่มีสต๊อค)"""
+        return self.value / self.total if self.total > LOT_EPSILON else None
+
+    def receive(self, quantity, unit_cost, received_at):
+        """เพิ่มล็อตใหม่ต่อท้าย"""
+        if quantity <= LOT_EPSILON:
+            return
+        self._lots.append((received_at, quantity, unit_cost))
+        self.total += quantity
+        self.value += quantity * unit_cost
+
+    def cost_of(self, quantity, fallback_cost):
+        """ต้นทุนของการตัดปริมาณ quantity ตามลำดับล็อต โดยไม่ตัดจริง
+
+        ส่วนที่เกินสต๊อคที่มีคิดที่ fallback_cost
+        """
+        cost = 0.0
+        for _, available, unit_cost in self._lots:
+            if quantity <= LOT_EPSILON:
+                break
+            taken = min(available, quantity)
+            cost += taken * unit_cost
+            quantity -= taken
+        if quantity > LOT_EPSILON:
+            cost += quantity * fallback_cost
+        return cost
+
+    def consume(self, quantity, fallback_cost):
+        """ตัดปริมาณ quantity ออกจากล็อตแรกๆ คืนต้นทุนของส่วนที่ตัด
+
+        ส่วนที่เกินสต๊อคที่มี (ปกติเป็นเศษทศนิยม เพราะผู้เรียกตรวจสต๊อคก่อนแล้ว)
+        คิดที่ fallback_cost และสต๊อคเหลือ 0
+        """
+        lots = self._lots
+        cost = 0.0
+        while quantity > LOT_EPSILON and lots:
+            received_at, available, unit_cost = lots[0]
+            if available - quantity > LOT_EPSILON:
+                lots[0] = (received_at, available - quantity, unit_cost)
+                cost += quantity * unit_cost
+                self.total -= quantity
+                self.value -= quantity * unit_cost
+                return cost
+            lots.popleft()
+            cost += available * unit_cost
+            quantity -= available
+            self.total -= available
+            self.value -= available * unit_cost
+        if not lots:
+            self.total = 0.0
+            self.value = 0.0
+        if quantity > LOT_EPSILON:
+            cost += quantity * fallback_cost
+        return cost
+
+    def to_list(self):
+        """[[รับเข้าเมื่อ, ปริมาณคงเหลือ, ต้นทุนต่อหน่วย], ...] ตามโครงสร้างไฟล์"""
+        return [list(lot) for lot in self._lots]
+
+
+class Ingredient(Record):
+    """วัตถุดิบ (version เพิ่มขึ้นทุกครั้งที่ถูกแก้ไข ไฟล์เก่าที่ไม่มีฟิลด์นี้ถือเป็น 0)
+
+    price_history คือราคาที่เคยใช้ [[ตั้งแต่ "YYYY-MM-DD HH:MM:SS", ราคา], ...] เรียงตามเวลา
+    และเพิ่มต่อท้ายเท่านั้น รายการสุดท้ายคือราคาปัจจุบัน ตั้งแต่ "" หมายถึงก่อนเริ่มเก็บประวัติ
+    ไฟล์เก่าที่ไม่มีฟิลด์นี้ถือว่าราคาปัจจุบันใช้มาตลอด
+
+    lots คือล็อตที่ยังเหลือในสต๊อค (LotQueue) และ stock คือปริมาณรวมของทุกล็อต
+    (RecipeStore อัปเดตทั้งสองพร้อมกัน) ไฟล์เก่าที่ไม่มีฟิลด์นี้ถือว่าสต๊อคที่มีเป็นล็อตเดียว
+    ที่ต้นทุนเท่าราคาปัจจุบัน
+    """
+
+    __slots__ = (
+        "id", "name", "unit", "price_per_unit", "stock", "version", "price_history", "lots",
+    )
+
+    def __init__(
+        self, id, name, unit, price_per_unit, stock, version=0, price_history=None, lots=None,
+    ):
+        self.id = id
+        self.name = name
+        self.unit = unit
+        self.price_per_unit = price_per_unit
+        self.stock = stock
+        self.version = version
+        self.price_history = price_history if price_history is not None else []
+        if lots is None:
+            lots = [["", stock, price_per_unit]] if stock > 0 else []
+        self.lots = lots if isinstance(lots, LotQueue) else LotQueue(lots)
+
+    def price_at(self, when):
+        """ราคาต่อหน่วย ณ เวลา when ("YYYY-MM-DD" หรือ "YYYY-MM-DD HH:MM:SS")
+
+        ค้นแบบ binary search ใน price_history ก่อนราคาแรกที่บันทึกไว้ใช้ราคาแรก
+        """
+        history = self.price_history
+        if not history:
+            return self.price_per_unit
+        if len(when) == 10:
+            # ทั้งวัน: ราคาที่ใช้อยู่ตอนสิ้นวัน
+            when += " 23:59:59"
+        lo, hi = 0, len(history)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if history[mid][0] <= when:
+                lo = mid + 1
+            else:
+                hi = mid
+        return history[max(lo - 1, 0)][1]
+
+    def to_dict(self):
+        data = super().to_dict()
+        if not self.price_history:
+            del data["price_history"]
+        if self.lots:
+            data["lots"] = self.lots.to_list()
+        else:
+            del data["lots"]
+        return data
+
+
+class RecipeLine(Record):
+    """หนึ่งบรรทัดในสูตร: วัตถุดิบ (ingredient_id, ปริมาณตามหน่วยของวัตถุดิบ)
+    หรือสูตรย่อย เช่น ซอส/แป้งโด (recipe_id, ปริมาณเป็นจำนวนรอบของสูตรย่อย)
+
+    บรรทัดวัตถุดิบระบุหน่วยเองได้ (unit, amount เช่น 250 กรัม) quantity จะเป็นปริมาณ
+    ที่แปลงเป็นหน่วยของวัตถุดิบแล้ว ซึ่ง RecipeStore คำนวณให้ตอนบันทึกสูตร
+    """
+
+    __slots__ = ("ingredient_id", "quantity", "recipe_id", "unit", "amount")
+
+    def __init__(self, ingredient_id, quantity, recipe_id=None, unit=None, amount=None):
+        self.ingredient_id = ingredient_id
+        self.quantity = quantity
+        self.recipe_id = recipe_id
+        self.unit = unit
+        self.amount = amount
+
+    @classmethod
+    def measured(cls, ingredient_id, amount, unit):
+        """บรรทัดวัตถุดิบที่ระบุปริมาณเป็นหน่วยอื่น (quantity ถูกแปลงตอนบันทึกสูตร)"""
+        return cls(ingredient_id, amount, unit=unit, amount=amount)
+
+    def to_dict(self):
+        if self.recipe_id is not None:
+            return {"recipe_id": self.recipe_id, "quantity": self.quantity}
+        if self.unit is not None:
+            return {
+                "ingredient_id": self.ingredient_id,
+                "quantity": self.quantity,
+                "unit": self.unit,
+                "amount": self.amount,
+            }
+        return {"ingredient_id": self.ingredient_id, "quantity": self.quantity}
+
+
+class Recipe(Record):
+    """สูตรอาหาร (ingredients เป็นรายการ RecipeLine ซึ่งอาจเป็นสูตรย่อย, version แบบเดียวกับ Ingredient)"""
+
+    __slots__ = ("id", "name", "servings", "ingredients", "version")
+
+    def __init__(self, id, name, servings, ingredients, version=0):
+        self.id = id
+        self.name = name
+        self.servings = servings
+        self.ingredients = ingredients
+        self.version = version
+
+    @classmethod
+    def from_dict(cls, data):
+        lines = [
+            RecipeLine(
+                item.get("ingredient_id"), item["quantity"], item.get("recipe_id"),
+                item.get("unit"), item.get("amount"),
+            )
+            for item in data["ingredients"]
+        ]
+        return cls(data["id"], data["name"], data["servings"], lines, data.get("version", 0))
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "servings": self.servings,
+            "ingredients": [line.to_dict() for line in self.ingredients],
+            "version": self.version,
+        }
+
+
+class LogEntry(Record):
+    """ประวัติการผลิตหนึ่งรายการ
+
+    total_cost คือต้นทุนจริงของล็อตที่ถูกตัด (FIFO) ส่วน price_cost คือต้นทุนตามราคาวัตถุดิบ
+    ณ เวลาผลิต (ใช้ตรวจกับการคิดต้นทุนย้อนหลังใน price_history) ประวัติรุ่นเก่าไม่มี price_cost
+    """
+
+    __slots__ = (
+        "id", "recipe_id", "recipe_name", "batches", "total_servings", "total_cost", "date",
+        "price_cost",
+    )
+
+    def __init__(
+        self, id, recipe_id, recipe_name, batches, total_servings, total_cost, date,
+        price_cost=None,
+    ):
+        self.id = id
+        self.recipe_id = recipe_id
+        self.recipe_name = recipe_name
+        self.batches = batches
+        self.total_servings = total_servings
+        self.total_cost = total_cost
+        self.date = date
+        self.price_cost = price_cost
+
+
+# ชนิดข้อมูลตามชื่อตารางที่ใช้ใน journal และไฟล์
+RECORD_TYPES = {
+    "ingredients": Ingredient,
+    "recipes": Recipe,
+    "production_log": LogEntry,
+}
+
+
+def to_json(obj):
+    """ใช้เป็น default ของ json.dump เพื่อเขียน Record เป็น dict"""
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
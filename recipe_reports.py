@@ -0,0 +1,239 @@
+"""รายงานต้นทุน ความสามารถในการผลิต และกำไร จาก snapshot ของข้อมูล แบ่งงานให้หลาย process
+
+snapshot คัดลอกตารางราคา/สต๊อค (array) และบรรทัดของทุกสูตร (tuple) ครั้งเดียวจาก store
+รายงานทั้งชุดจึงคิดจากข้อมูล ณ เวลาเดียวกัน แม้ระหว่างนั้นจะมีการแก้ไขข้อมูลต่อ
+
+snapshot ถูกส่งให้แต่ละ process ครั้งเดียวตอนเริ่ม (initializer ของ ProcessPoolExecutor)
+งานที่ส่งไปแต่ละชิ้นมีแค่ช่วงลำดับสูตร (start, stop) แต่ละ process กระจายสูตรย่อย
+และคิดต้นทุนของสูตรในช่วงของตัวเอง (จำผลของสูตรย่อยไว้ใช้ซ้ำ) แล้วผลทุกช่วงถูกต่อกัน
+ตามลำดับสูตรเดิม ผลลัพธ์ตรงกับ compare_costs / check_producible / report ของ recipe_cli
+
+workers=1 คิดใน process เดียวโดยไม่สร้าง pool
+"""
+
+import csv
+import json
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from production_planner import DEFAULT_MARGIN_PCT
+from recipe_store import RecipeCycleError
+
+REPORT_KINDS = ("costs", "producible", "margin")
+# จำนวนช่วงต่อ process (ช่วงเล็กลงช่วยเกลี่ยงานเมื่อสูตรซับซ้อนไม่เท่ากัน)
+SHARDS_PER_WORKER = 4
+
+
+class ReportSnapshot:
+    """สำเนาข้อมูลที่ใช้ทำรายงาน (ไม่เปลี่ยนหลังสร้าง)"""
+
+    __slots__ = ("slots", "prices", "stocks", "recipe_ids", "recipes", "produced")
+
+    def __init__(self, store):
+        # ingredient_id → ตำแหน่งใน prices/stocks
+        self.slots = {ing_id: slot for slot, ing_id in enumerate(store.ingredients)}
+        ingredients = store.ingredients.values()
+        self.prices = array("d", (ing.price_per_unit for ing in ingredients))
+        self.stocks = array("d", (ing.stock for ing in ingredients))
+        self.recipe_ids = tuple(store.recipes)
+        # recipe_id → (ชื่อ, เสิร์ฟ, ((ingredient_id, recipe_id, ปริมาณ), ...))
+        self.recipes = {
+            recipe.id: (
+                recipe.name,
+                recipe.servings,
+                tuple((line.ingredient_id, line.recipe_id, line.quantity) for line in recipe.ingredients),
+            )
+            for recipe in store.recipes.values()
+        }
+        # ยอดผลิตสะสมรายสูตรจากประวัติ (ใช้ในรายงานกำไร)
+        self.produced = {
+            recipe_id: (totals["servings"], totals["cost"])
+            for recipe_id, totals in store.production_log.by_recipe.items()
+        }
+
+
+def take_snapshot(store):
+    return ReportSnapshot(store)
+
+
+# ==================== คิดรายงาน ====================
+
+class _ShardWorker:
+    """คิดรายงานของสูตรช่วงหนึ่งจาก snapshot (จำต้นทุน/ปริมาณของสูตรที่คิดแล้ว)"""
+
+    def __init__(self, snapshot, kinds, margin_pct):
+        self.snapshot = snapshot
+        self.kinds = kinds
+        self.margin_pct = margin_pct
+        self._rollups = {}
+
+    def rollup(self, recipe_id, _visiting=()):
+        """(ต้นทุนต่อรอบ, dict ingredient_id → ปริมาณต่อรอบ, tuple สูตรย่อยที่ถูกลบ)
+
+        คิดแบบเดียวกับ RecipeStore.recipe_cost / recipe_demand
+        """
+        result = self._rollups.get(recipe_id)
+        if result is not None:
+            return result
+        if recipe_id in _visiting:
+            raise RecipeCycleError(recipe_id)
+        snapshot = self.snapshot
+        cost = 0.0
+        demand = {}
+        missing = []
+        for ing_id, sub_id, qty in snapshot.recipes[recipe_id][2]:
+            if sub_id is None:
+                demand[ing_id] = demand.get(ing_id, 0.0) + qty
+                slot = snapshot.slots.get(ing_id)
+                if slot is not None:
+                    cost += qty * snapshot.prices[slot]
+            elif sub_id not in snapshot.recipes:
+                missing.append(sub_id)
+            else:
+                sub_cost, sub_demand, sub_missing = self.rollup(sub_id, (*_visiting, recipe_id))
+                cost += qty * sub_cost
+                for sub_ing, sub_qty in sub_demand.items():
+                    demand[sub_ing] = demand.get(sub_ing, 0.0) + sub_qty * qty
+                missing.extend(sub_missing)
+        result = self._rollups[recipe_id] = (cost, demand, tuple(missing))
+        return result
+
+    def producible(self, demand, missing):
+        """(รอบสูงสุด, ID วัตถุดิบที่จำกัด, ID วัตถุดิบที่ถูกลบ) แบบ max_producible"""
+        if missing:
+            return 0, None, None
+        max_batches = float("inf")
+        limiting_id = None
+        for ing_id, qty in demand.items():
+            slot = self.snapshot.slots.get(ing_id)
+            if slot is None:
+                return 0, None, ing_id
+            if qty > 0:
+                possible = self.snapshot.stocks[slot] / qty
+                if possible < max_batches:
+                    max_batches = possible
+                    limiting_id = ing_id
+        return (int(max_batches) if max_batches != float("inf") else 0), limiting_id, None
+
+    def run(self, start, stop):
+        """รายงานของสูตรลำดับ start..stop-1 คืน {ชนิดรายงาน: [แถว]}"""
+        snapshot = self.snapshot
+        rows = {kind: [] for kind in self.kinds}
+        for recipe_id in snapshot.recipe_ids[start:stop]:
+            name, servings, _ = snapshot.recipes[recipe_id]
+            cost, demand, missing = self.rollup(recipe_id)
+            if "costs" in rows:
+                rows["costs"].append({
+                    "id": recipe_id,
+                    "name": name,
+                    "servings": servings,
+                    "cost": round(cost, 2),
+                    "cost_per_serving": round(cost / servings, 2),
+                })
+            if "producible" in rows or "margin" in rows:
+                batches, limiting_id, missing_id = self.producible(demand, missing)
+            if "producible" in rows:
+                rows["producible"].append({
+                    "id": recipe_id,
+                    "name": name,
+                    "max_batches": batches,
+                    "max_servings": batches * servings,
+                    "limiting_ingredient_id": limiting_id,
+                    "missing_ingredient_id": missing_id,
+                })
+            if "margin" in rows:
+                margin = cost * self.margin_pct / 100
+                produced_servings, produced_cost = snapshot.produced.get(recipe_id, (0, 0.0))
+                rows["margin"].append({
+                    "id": recipe_id,
+                    "name": name,
+                    "cost": round(cost, 2),
+                    "price": round(cost + margin, 2),
+                    "price_per_serving": round((cost + margin) / servings, 2),
+                    "margin": round(margin, 2),
+                    "max_batches": batches,
+                    "potential_margin": round(margin * batches, 2),
+                    "produced_servings": produced_servings,
+                    "produced_margin": round(produced_cost * self.margin_pct / 100, 2),
+                })
+        return rows
+
+
+# worker ของแต่ละ process (ตั้งครั้งเดียวตอนเริ่ม process)
+_worker = None
+
+
+def _init_worker(snapshot, kinds, margin_pct):
+    global _worker
+    _worker = _ShardWorker(snapshot, kinds, margin_pct)
+
+
+def _run_shard(bounds):
+    return _worker.run(*bounds)
+
+
+def _shards(total, count):
+    """แบ่ง 0..total เป็นช่วงติดกันประมาณ count ช่วง"""
+    size = max(1, -(-total // count))
+    return [(start, min(start + size, total)) for start in range(0, total, size)]
+
+
+def generate_reports(snapshot, kinds=REPORT_KINDS, workers=None, margin_pct=DEFAULT_MARGIN_PCT):
+    """คิดรายงานตามชนิดที่ระบุ คืน {ชนิด: [แถว เรียงตามลำดับสูตร]}
+
+    workers = จำนวน process (None = จำนวน CPU, 1 = ไม่สร้าง pool)
+    """
+    kinds = tuple(kinds)
+    for kind in kinds:
+        if kind not in REPORT_KINDS:
+            raise ValueError(f"ไม่รู้จักรายงาน: {kind}")
+    workers = workers or os.cpu_count() or 1
+    total = len(snapshot.recipe_ids)
+    reports = {kind: [] for kind in kinds}
+    if workers == 1 or total < 2:
+        parts = [_ShardWorker(snapshot, kinds, margin_pct).run(0, total)]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker,
+            initargs=(snapshot, kinds, margin_pct),
+        ) as pool:
+            parts = list(pool.map(_run_shard, _shards(total, workers * SHARDS_PER_WORKER)))
+    for part in parts:
+        for kind in kinds:
+            reports[kind].extend(part[kind])
+    return reports
+
+
+# ==================== เขียนไฟล์ ====================
+
+def write_rows(rows, fmt, out):
+    """เขียนแถวรายงานเป็น csv, jsonl หรือ json (รายการเดียว) ลง out"""
+    if fmt == "json":
+        out.write("[")
+        for index, row in enumerate(rows):
+            out.write(",\n" if index else "\n")
+            out.write(json.dumps(row, ensure_ascii=False))
+        out.write("\n]\n")
+        return
+    writer = None
+    for row in rows:
+        if fmt == "jsonl":
+            out.write(json.dumps(row, ensure_ascii=False) + "\n")
+            continue
+        if writer is None:
+            writer = csv.DictWriter(out, fieldnames=list(row))
+            writer.writeheader()
+        writer.writerow(row)
+
+
+def write_reports(reports, out_dir, fmt="csv"):
+    """เขียนรายงานแต่ละชนิดเป็นไฟล์ <ชนิด>.<fmt> ใน out_dir คืนรายการไฟล์"""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for kind, rows in reports.items():
+        path = os.path.join(out_dir, f"{kind}.{fmt}")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            write_rows(rows, fmt, f)
+        paths.append(path)
+    return paths
@@ -0,0 +1,183 @@
+"""ค้นหาวัตถุดิบและสูตรจากชื่อ (ชื่อบางส่วนหรือพิมพ์ผิดเล็กน้อยก็หาเจอ)
+
+แต่ละประเภทมีดัชนีสองแบบ:
+    prefix trie   ชื่อเต็มและทุกคำในชื่อ (คั่นด้วยช่องว่าง) ใช้หาชื่อที่ขึ้นต้นด้วยคำค้น
+    n-gram        ตัวอักษรติดกันทีละ NGRAM ตัวของชื่อ (ตัดวรรณยุกต์ไทยออก) ใช้หาชื่อที่
+                  มีคำค้นอยู่กลางชื่อหรือสะกดต่างไปเล็กน้อย ให้คะแนนแบบ Dice coefficient
+
+ภาษาไทยไม่เว้นวรรคระหว่างคำ การหาคำกลางชื่อจึงอาศัย n-gram เป็นหลัก
+ดัชนีอัปเดตทีละรายการตามการเปลี่ยนแปลงใน RecipeStore (ไม่สร้างใหม่ทั้งหมด)
+"""
+
+import heapq
+import re
+import unicodedata
+
+# จำนวนตัวอักษรต่อ n-gram
+NGRAM = 2
+# คะแนน n-gram ขั้นต่ำที่ถือว่าตรง (0-1)
+MIN_SIMILARITY = 0.3
+DEFAULT_LIMIT = 10
+
+# วรรณยุกต์และทัณฑฆาต (ไม้เอก-ไม้จัตวา, การันต์) ไม่นับตอนเทียบ n-gram
+_THAI_MARKS = dict.fromkeys(range(0x0E48, 0x0E4D))
+_SPACES = re.compile(r"\s+")
+
+# คะแนนตามชนิดที่ตรง (มากกว่าคะแนน n-gram ซึ่งไม่เกิน 1 เสมอ)
+EXACT, NAME_PREFIX, WORD_PREFIX = 4.0, 3.0, 2.0
+
+
+def normalize(text):
+    """ทำชื่อให้อยู่รูปเดียวกัน (ตัวพิมพ์เล็ก, ช่องว่างเดียว)"""
+    return _SPACES.sub(" ", unicodedata.normalize("NFC", text).casefold()).strip()
+
+
+def ngrams(text):
+    """ชุด n-gram ของข้อความที่ normalize แล้ว (ไม่นับช่องว่างและวรรณยุกต์)"""
+    text = text.replace(" ", "").translate(_THAI_MARKS)
+    if len(text) <= NGRAM:
+        return {text} if text else set()
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+class SearchIndex:
+    """ดัชนีชื่อของข้อมูลหนึ่งประเภท (id → ชื่อ)"""
+
+    def __init__(self):
+        self.names = {}
+        # node ของ trie = [dict ตัวอักษร → node ลูก, set ID ที่มีคำผ่าน node นี้]
+        self._trie = [{}, set()]
+        self._grams = {}
+        # จำนวน n-gram ของแต่ละชื่อ (ใช้คิดคะแนน ไม่ต้องแยก n-gram ใหม่ทุกครั้งที่ค้นหา)
+        self._gram_counts = {}
+
+    def add(self, record_id, name):
+        """เพิ่มหรือแทนที่ชื่อของ record"""
+        key = normalize(name)
+        if self.names.get(record_id) == key:
+            return
+        self.remove(record_id)
+        self.names[record_id] = key
+        for word in self._words(key):
+            node = self._trie
+            for char in word:
+                node = node[0].setdefault(char, [{}, set()])
+                node[1].add(record_id)
+        grams = ngrams(key)
+        for gram in grams:
+            self._grams.setdefault(gram, set()).add(record_id)
+        self._gram_counts[record_id] = len(grams)
+
+    def remove(self, record_id):
+        """นำ record ออกจากดัชนี (ไม่มีก็ไม่เป็นไร)"""
+        key = self.names.pop(record_id, None)
+        if key is None:
+            return
+        for word in self._words(key):
+            # คำหลายคำของชื่อเดียวกันอาจใช้ node ร่วมกัน ซึ่งอาจถูกลบไปแล้วจากคำก่อนหน้า
+            path = [self._trie]
+            for char in word:
+                node = path[-1][0].get(char)
+                if node is None:
+                    break
+                path.append(node)
+            for depth in range(len(path) - 1, 0, -1):
+                node = path[depth]
+                node[1].discard(record_id)
+                if not node[1]:
+                    del path[depth - 1][0][word[depth - 1]]
+        for gram in ngrams(key):
+            ids = self._grams[gram]
+            ids.discard(record_id)
+            if not ids:
+                del self._grams[gram]
+        del self._gram_counts[record_id]
+
+    @staticmethod
+    def _words(key):
+        """คำที่ใส่ใน trie: ชื่อเต็ม และคำที่ขึ้นต้นหลังช่องว่างแต่ละช่อง"""
+        words = {key}
+        words.update(key[i + 1:] for i, char in enumerate(key) if char == " ")
+        return words
+
+    def _prefixed(self, prefix):
+        """ID ที่มีชื่อหรือคำในชื่อขึ้นต้นด้วย prefix"""
+        node = self._trie
+        for char in prefix:
+            node = node[0].get(char)
+            if node is None:
+                return set()
+        return node[1]
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """คืนรายการ ID ที่ตรงกับคำค้นมากที่สุด limit รายการ (เรียงจากตรงที่สุด)"""
+        query = normalize(query)
+        if not query:
+            return []
+        scores = {}
+        for record_id in self._prefixed(query):
+            name = self.names[record_id]
+            if name == query:
+                scores[record_id] = EXACT
+            elif name.startswith(query):
+                scores[record_id] = NAME_PREFIX
+            else:
+                scores[record_id] = WORD_PREFIX
+
+        # ชื่อที่ขึ้นต้นด้วยคำค้นได้คะแนนสูงกว่า n-gram เสมอ ถ้ามีครบ limit แล้วไม่ต้องเทียบ n-gram
+        if len(scores) < limit:
+            query_grams = ngrams(query)
+            shared = {}
+            for gram in query_grams:
+                for record_id in self._grams.get(gram, ()):
+                    shared[record_id] = shared.get(record_id, 0) + 1
+            for record_id, count in shared.items():
+                if record_id in scores:
+                    continue
+                similarity = 2 * count / (len(query_grams) + self._gram_counts[record_id])
+                if similarity >= MIN_SIMILARITY:
+                    scores[record_id] = similarity
+
+        return heapq.nsmallest(
+            limit, scores,
+            key=lambda record_id: (-scores[record_id], len(self.names[record_id]), record_id),
+        )
+
+
+class NameSearch:
+    """ดัชนีค้นหาชื่อวัตถุดิบและสูตรของ RecipeStore ที่อัปเดตตามการเปลี่ยนแปลง"""
+
+    KINDS = ("ingredients", "recipes")
+
+    def __init__(self, store):
+        self.store = store
+        self._build()
+        store.subscribe(self._on_change)
+
+    def _build(self):
+        """สร้างดัชนีทั้งหมดจากข้อมูลใน store"""
+        self.indexes = {kind: SearchIndex() for kind in self.KINDS}
+        for kind in self.KINDS:
+            index = self.indexes[kind]
+            for record in getattr(self.store, kind).values():
+                index.add(record.id, record.name)
+
+    def _on_change(self, change):
+        """อัปเดตดัชนีตามรายการเปลี่ยนแปลงของ store"""
+        op, kind = change["op"], change["kind"]
+        if op == "reload":
+            self._build()
+            return
+        index = self.indexes.get(kind)
+        if index is None:
+            return
+        if op == "delete":
+            index.remove(change["id"])
+        else:
+            record = change["record"]
+            index.add(record.id, record.name)
+
+    def search(self, kind, query, limit=DEFAULT_LIMIT):
+        """คืนรายการ record ประเภท kind ที่ชื่อตรงกับคำค้นมากที่สุด"""
+        table = getattr(self.store, kind)
+        return [table[record_id] for record_id in self.indexes[kind].search(query, limit)]
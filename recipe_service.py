@@ -0,0 +1,761 @@
+"""โหมดบริการ HTTP/JSON สำหรับระบบ POS และระบบสั่งซื้อ
+
+ใช้ asyncio ของ Python เอง (ไม่ต้องติดตั้งแพ็กเกจเพิ่ม) ข้อมูลทั้งหมดอยู่ในหน่วยความจำ
+คำขออ่านตอบจากหน่วยความจำได้พร้อมกันหลายการเชื่อมต่อ ส่วนคำขอแก้ไขถูกส่งเข้าคิว
+ให้งานเขียนงานเดียวทำตามลำดับ คำขอที่รออยู่พร้อมกันถูกบันทึกลงไฟล์ในครั้งเดียว
+(ดู WriteQueue) และตอบกลับหลังบันทึกแล้วเท่านั้น
+
+ตัวอย่าง:
+    python recipe_service.py --port 8080
+    python recipe_cli.py serve --port 8080
+
+endpoint (ส่ง/รับ JSON):
+    GET    /ingredients[?q=&limit=]         รายการวัตถุดิบ (q = ค้นหาจากชื่อ เรียงตามความตรง)
+    POST   /ingredients                     {name, unit, price_per_unit, stock}
+    GET    /ingredients/<id>
+    PATCH  /ingredients/<id>                ฟิลด์ที่ต้องการแก้ [+ version]
+    DELETE /ingredients/<id>[?force=1&version=]  ไม่ลบถ้ามีสูตรใช้อยู่ เว้นแต่ force=1
+    POST   /ingredients/<id>/restock        {quantity, [unit_cost]} เพิ่มเป็นล็อตใหม่
+    GET    /ingredients/<id>/lots           ล็อตที่ยังเหลือ (ตัดออกตามลำดับ) พร้อมมูลค่าสต๊อค
+    GET    /recipes[?q=&limit=]             รายการสูตรพร้อมต้นทุน (q แบบเดียวกัน)
+    POST   /recipes                         {name, servings, ingredients: [{ingredient_id, quantity}]}
+                                            (สูตรย่อยใช้ {recipe_id, quantity} จำนวนเป็นสูตร,
+                                             ระบุหน่วยเองได้ด้วย unit เช่น {ingredient_id, quantity: 250, unit: "กรัม"})
+    GET    /recipes/<id>
+    PATCH  /recipes/<id>                    ฟิลด์ที่ต้องการแก้ [+ version]
+    DELETE /recipes/<id>[?version=]         ไม่ลบถ้าถูกใช้เป็นสูตรย่อยอยู่
+    GET    /recipes/<id>/cost[?as_of=]      ต้นทุนแยกตามวัตถุดิบและสูตรย่อย (as_of = ตามราคา ณ วันที่)
+    GET    /costs                           ต้นทุนทุกสูตร
+    GET    /producible                      จำนวนรอบที่ผลิตได้ของทุกสูตร
+    POST   /production                      {orders: [{recipe_id, batches}]} ตัดสต๊อคทั้งหมดหรือไม่ตัดเลย
+    GET    /production[?start=&end=&page=]  ประวัติการผลิต (วันที่ YYYY-MM-DD)
+    GET    /production/summary[?start=&end=]
+    GET    /alerts                          วัตถุดิบที่ถึงจุดสั่งซื้อ พร้อมปริมาณที่แนะนำให้สั่ง
+    GET    /stats                           จำนวนคำขอแก้ไขและจำนวนครั้งที่บันทึก
+
+ข้อผิดพลาดตอบเป็น {"error": ข้อความ} พร้อม status 400/404/409
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import recipe_management as rm
+from recipe_metrics import session, timer
+from recipe_records import RecipeLine, to_json
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+# จำนวนคำขอแก้ไขสูงสุดที่บันทึกรวมกันในครั้งเดียว
+MAX_BATCH = 256
+# เมื่อ durability เป็น "full" (fsync ทุกครั้งที่บันทึก) รอคำขอแก้ไขอื่นอีกเท่านี้ (วินาที)
+# ก่อนบันทึก เพื่อรวมหลายคำขอเป็นการ fsync ครั้งเดียว (group commit)
+GROUP_COMMIT_DELAY = 0.002
+# ถ้าไม่มีคำขอแก้ไขนานเท่านี้ (วินาที) จะอ่านการเปลี่ยนแปลงจากโปรแกรมอื่น
+REFRESH_INTERVAL = 1.0
+# ขนาด body สูงสุดที่รับ (byte)
+MAX_BODY = 1 << 20
+# จำนวนรายการต่อหน้าของ GET /production
+PAGE_SIZE = 100
+
+
+class HttpError(Exception):
+    """ข้อผิดพลาดที่ตอบกลับเป็น HTTP status พร้อมข้อความ (และข้อมูลเพิ่มเติม)"""
+
+    def __init__(self, status, message, **extra):
+        super().__init__(message)
+        self.status = status
+        self.payload = {"error": message, **extra}
+
+
+# ==================== คิวคำขอแก้ไข ====================
+
+class WriteQueue:
+    """ให้การแก้ไขข้อมูลทำทีละคำขอโดยงานเดียว และบันทึกลงไฟล์เป็นชุด
+
+    submit(mutate) ส่งฟังก์ชัน mutate(data) เข้าคิวแล้วรอผล งานเขียนหยิบทุกคำขอที่รออยู่
+    (สูงสุด MAX_BATCH) มาทำตามลำดับภายใต้ล็อกของ storage ครั้งเดียว จึงเขียน journal
+    (และ fsync) ครั้งเดียวต่อชุด mutate ต้องตรวจข้อมูลให้ครบก่อนแก้ไข และโยน HttpError
+    ถ้าไม่ผ่าน ข้อผิดพลาดของคำขอหนึ่งตอบเฉพาะคำขอนั้น commit_delay คือเวลาที่รอให้
+    คำขออื่นเข้าคิวก่อนบันทึกแต่ละชุด
+
+    ขั้นที่ต้องรอ (ล็อก/BEGIN IMMEDIATE, เขียน journal/fsync, COMMIT) ทำใน thread ของ storage
+    (thread เดียว) ส่วนขั้นที่อ่าน/แก้ store (อ่านการเปลี่ยนแปลงจากโปรแกรมอื่น, แก้ไข, รวม journal
+    เข้า snapshot) ทำบน event loop คำขออ่านจึงตอบได้ระหว่างรอล็อกหรือรอ fsync และไม่เห็นข้อมูล
+    ที่กำลังถูกแก้ครึ่งทาง
+    """
+
+    def __init__(self, data, storage, commit_delay=None):
+        self.data = data
+        self.storage = storage
+        if commit_delay is None:
+            durable = getattr(storage, "durability", None) == "full"
+            commit_delay = GROUP_COMMIT_DELAY if durable else 0
+        self.commit_delay = commit_delay
+        self.queue = asyncio.Queue()
+        self.io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recipe-storage")
+        self.writes = 0
+        self.batches = 0
+
+    async def submit(self, mutate):
+        """ส่งคำขอแก้ไขเข้าคิว คืนผลของ mutate หลังบันทึกลงไฟล์แล้ว"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((mutate, future))
+        return await future
+
+    async def run(self):
+        """งานเขียน: ทำคำขอในคิวไปเรื่อย ๆ (เรียกด้วย asyncio.create_task)"""
+        while True:
+            try:
+                first = await asyncio.wait_for(self.queue.get(), REFRESH_INTERVAL)
+            except asyncio.TimeoutError:
+                # ว่างอยู่ อ่านการเปลี่ยนแปลงจากโปรแกรมอื่น ให้คำขออ่านเห็นยอดล่าสุด
+                await self._commit([])
+                continue
+            # ให้คำขอที่มาถึงพร้อมกันได้เข้าคิวก่อน แล้วบันทึกรวมในครั้งเดียว
+            await asyncio.sleep(self.commit_delay)
+            batch = [first]
+            while len(batch) < MAX_BATCH and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            await self._commit(batch)
+
+    async def _io(self, func, *args):
+        """เรียก func ใน thread ของ storage แล้วรอผล"""
+        return await asyncio.get_running_loop().run_in_executor(self.io, func, *args)
+
+    async def _commit(self, batch):
+        """ทำคำขอในชุดตามลำดับแล้วบันทึกครั้งเดียว (ไม่ยอมให้งานเขียนอื่นแทรกระหว่างนั้น)
+
+        ข้อผิดพลาดของคำขอหนึ่งตอบเฉพาะคำขอนั้น ถ้าคำขอโยนข้อผิดพลาดหลังแก้ข้อมูลไปบางส่วนแล้ว
+        (record ที่แก้ค้างอาจถูกอ้างถึงจากรายการของคำขอก่อนหน้าด้วย) จะทิ้งการแก้ไขทั้งชุด
+        โหลดข้อมูลที่บันทึกไว้ แล้วทำคำขออื่นในชุดใหม่โดยข้ามคำขอนั้น
+        ถ้าบันทึกไม่สำเร็จ ทุกคำขอในชุดได้ 503 และข้อมูลในหน่วยความจำถูกโหลดใหม่
+        """
+        storage, data = self.storage, self.data
+        try:
+            await self._io(storage.begin)
+        except Exception as e:
+            self._fail(batch, e)
+            return
+        try:
+            storage.refresh(data)
+            failed = {}
+            while True:
+                results = self._apply(batch, failed)
+                if results is not None:
+                    break
+                storage.reload(data)
+            write = storage.prepare_save(data)
+            if write is not None:
+                await self._io(write)
+        except Exception as e:
+            storage.end(commit=False)
+            self._fail(batch, e)
+            return
+        if write is not None:
+            try:
+                storage.finish_save(data)
+            except Exception as e:
+                # รายการอยู่ใน journal แล้ว (โหลดกลับได้ครบ) เพียงรวมเข้า snapshot ไม่สำเร็จ
+                print(f"❌ รวม journal ไม่สำเร็จ: {e!r}", file=sys.stderr)
+                self._reload()
+        try:
+            await self._io(storage.end)
+        except Exception as e:
+            self._fail(batch, e)
+            return
+        self.writes += len(results)
+        if results:
+            self.batches += 1
+        for future, result, error in results:
+            if future.done():  # ผู้ขอยกเลิกไปแล้ว (เช่น การเชื่อมต่อปิด)
+                continue
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def _apply(self, batch, failed):
+        """เรียก mutate ของทุกคำขอในชุดที่ไม่อยู่ใน failed (ดัชนี → HttpError) คืน [(future, ผล, error)]
+
+        คืน None ถ้าคำขอหนึ่งผิดพลาดหลังแก้ข้อมูลไปแล้ว (คำขอนั้นถูกเพิ่มเข้า failed)
+        """
+        results = []
+        for i, (mutate, future) in enumerate(batch):
+            if i in failed:
+                results.append((future, None, failed[i]))
+                continue
+            mark = self.data.change_mark()
+            try:
+                results.append((future, mutate(self.data), None))
+            except Exception as e:
+                error = _request_error(e)
+                if self.data.change_mark() != mark:
+                    failed[i] = error
+                    return None
+                results.append((future, None, error))
+        return results
+
+    def _reload(self):
+        """โหลดข้อมูลที่บันทึกไว้แทนข้อมูลในหน่วยความจำ (งานเขียนต้องทำงานต่อได้แม้โหลดไม่สำเร็จ)"""
+        try:
+            self.storage.reload(self.data)
+        except Exception as e:
+            print(f"❌ โหลดข้อมูลใหม่ไม่สำเร็จ: {e!r}", file=sys.stderr)
+
+    def _fail(self, batch, error):
+        """บันทึกชุดนี้ไม่สำเร็จ: โหลดข้อมูลใหม่ (ทิ้งการแก้ไข) แล้วตอบ 503 ทุกคำขอในชุด"""
+        print(f"❌ บันทึกไม่สำเร็จ: {error!r}", file=sys.stderr)
+        self._reload()
+        failure = HttpError(HTTPStatus.SERVICE_UNAVAILABLE, "บันทึกข้อมูลไม่สำเร็จ กรุณาลองใหม่")
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(failure)
+
+
+def _request_error(error):
+    """แปลงข้อผิดพลาดจาก mutate ของคำขอหนึ่งเป็น HttpError (ข้อมูลไม่ถูกต้อง = 400 อื่น ๆ = 500)"""
+    if isinstance(error, HttpError):
+        return error
+    if isinstance(error, ValueError):
+        return HttpError(HTTPStatus.BAD_REQUEST, str(error))
+    print(f"❌ คำขอแก้ไขผิดพลาด: {error!r}", file=sys.stderr)
+    return HttpError(HTTPStatus.INTERNAL_SERVER_ERROR, "เกิดข้อผิดพลาดภายใน")
+
+
+# ==================== อ่าน/ตรวจข้อมูลจากคำขอ ====================
+
+def _field(body, key, cast, required=True):
+    """อ่านฟิลด์ตัวเลข/ข้อความจาก body (None ถ้าไม่บังคับและไม่มี)"""
+    value = body.get(key)
+    if value is None:
+        if required:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"กรุณาระบุ {key}")
+        return None
+    if cast is str:
+        if not isinstance(value, str):
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"{key} ต้องเป็นข้อความ")
+        return value.strip()
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{key} ต้องเป็นตัวเลข")
+    if cast is int and value != int(value):
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{key} ต้องเป็นจำนวนเต็ม")
+    return cast(value)
+
+
+def _lines(body):
+    """อ่านรายการวัตถุดิบของสูตรจาก body เป็น RecipeLine (recipe_id = ใช้สูตรย่อย)"""
+    items = body.get("ingredients")
+    if not isinstance(items, list):
+        raise HttpError(HTTPStatus.BAD_REQUEST, "ingredients ต้องเป็นรายการ")
+    lines = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "ingredients ต้องเป็นรายการของ object")
+        quantity = _field(item, "quantity", float)
+        if "recipe_id" in item:
+            lines.append(RecipeLine(None, quantity, _field(item, "recipe_id", int)))
+        elif item.get("unit") is not None:
+            lines.append(RecipeLine.measured(
+                _field(item, "ingredient_id", int), quantity, _field(item, "unit", str)
+            ))
+        else:
+            lines.append(RecipeLine(_field(item, "ingredient_id", int), quantity))
+    return lines
+
+
+def _check(error):
+    """แปลงข้อความจากฟังก์ชัน validate_* เป็น HttpError"""
+    if error:
+        raise HttpError(HTTPStatus.BAD_REQUEST, error)
+
+
+def _check_version(record, body):
+    """ถ้าคำขอระบุ version ต้องตรงกับ record ปัจจุบัน (ไม่อย่างนั้นตอบ 409)"""
+    version = body.get("version")
+    if version is not None and rm.changed_elsewhere(record, version):
+        raise HttpError(
+            HTTPStatus.CONFLICT, "ข้อมูลถูกแก้ไขไปแล้ว กรุณาอ่านใหม่", version=record.version
+        )
+
+
+def _query_int(query, key):
+    """อ่านจำนวนเต็มจาก query string (None ถ้าไม่ระบุ)"""
+    value = query.get(key)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{key} ต้องเป็นจำนวนเต็ม") from None
+
+
+def _date(query, key):
+    """อ่านวันที่ YYYY-MM-DD จาก query string (None ถ้าไม่ระบุ)"""
+    value = query.get(key)
+    if value:
+        try:
+            datetime.strptime(value, "%Y-%m-%d")
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"{key} ต้องเป็นวันที่ YYYY-MM-DD") from None
+    return value or None
+
+
+# ==================== endpoint ====================
+
+class RecipeService:
+    """จับคู่ method + path กับฟังก์ชันจัดการ และอ่าน/เขียน HTTP บนการเชื่อมต่อ"""
+
+    def __init__(self, data, storage):
+        self.data = data
+        self.writes = WriteQueue(data, storage)
+        self.routes = [
+            ("GET", r"/ingredients", self.list_ingredients),
+            ("POST", r"/ingredients", self.add_ingredient),
+            ("GET", r"/ingredients/(\d+)", self.get_ingredient),
+            ("PATCH", r"/ingredients/(\d+)", self.edit_ingredient),
+            ("DELETE", r"/ingredients/(\d+)", self.delete_ingredient),
+            ("POST", r"/ingredients/(\d+)/restock", self.restock_ingredient),
+            ("GET", r"/ingredients/(\d+)/lots", self.ingredient_lots),
+            ("GET", r"/recipes", self.list_recipes),
+            ("POST", r"/recipes", self.add_recipe),
+            ("GET", r"/recipes/(\d+)", self.get_recipe),
+            ("PATCH", r"/recipes/(\d+)", self.edit_recipe),
+            ("DELETE", r"/recipes/(\d+)", self.delete_recipe),
+            ("GET", r"/recipes/(\d+)/cost", self.recipe_cost),
+            ("GET", r"/costs", self.costs),
+            ("GET", r"/producible", self.producible),
+            ("POST", r"/production", self.produce),
+            ("GET", r"/production", self.production_log),
+            ("GET", r"/production/summary", self.production_summary),
+            ("GET", r"/alerts", self.alerts),
+            ("GET", r"/stats", self.stats),
+        ]
+        self.routes = [
+            (method, re.compile(pattern + "$"), handler) for method, pattern, handler in self.routes
+        ]
+
+    # ---------- วัตถุดิบ ----------
+
+    def _ingredient(self, ing_id):
+        ingredient = rm.find_ingredient_by_id(self.data, int(ing_id))
+        if not ingredient:
+            raise HttpError(HTTPStatus.NOT_FOUND, "ไม่พบวัตถุดิบ ID นี้")
+        return ingredient
+
+    def _search(self, kind, query):
+        """ผลค้นหาตามชื่อเมื่อระบุ ?q= (None ถ้าไม่ได้ค้นหา)"""
+        if not query.get("q"):
+            return None
+        limit = _query_int(query, "limit") or rm.SEARCH_RESULTS
+        return rm.search_records(self.data, kind, query["q"], limit)
+
+    async def list_ingredients(self, query, body):
+        found = self._search("ingredients", query)
+        return found if found is not None else list(self.data.ingredients.values())
+
+    async def get_ingredient(self, query, body, ing_id):
+        return self._ingredient(ing_id)
+
+    async def add_ingredient(self, query, body):
+        fields = {
+            "name": _field(body, "name", str),
+            "unit": _field(body, "unit", str),
+            "price_per_unit": _field(body, "price_per_unit", float),
+            "stock": _field(body, "stock", float, required=False) or 0.0,
+        }
+        _check(rm.validate_ingredient(*fields.values()))
+        return HTTPStatus.CREATED, await self.writes.submit(
+            lambda data: data.insert_ingredient(fields)
+        )
+
+    async def edit_ingredient(self, query, body, ing_id):
+        changes = {}
+        for key, cast in (("name", str), ("unit", str), ("price_per_unit", float),
+                          ("stock", float)):
+            value = _field(body, key, cast, required=False)
+            if value is not None:
+                changes[key] = value
+
+        def mutate(data):
+            ingredient = self._ingredient(ing_id)
+            _check_version(ingredient, body)
+            merged = {**ingredient.to_dict(), **changes}
+            _check(rm.validate_ingredient(
+                merged["name"], merged["unit"], merged["price_per_unit"], merged["stock"]
+            ))
+            if "unit" in changes:
+                _check(rm.validate_unit_change(data, ingredient.id, changes["unit"]))
+            return data.update_ingredient(ingredient.id, **changes)
+
+        return await self.writes.submit(mutate)
+
+    async def delete_ingredient(self, query, body, ing_id):
+        version = {"version": _query_int(query, "version")}
+
+        def mutate(data):
+            ingredient = self._ingredient(ing_id)
+            _check_version(ingredient, version)
+            used_in = [r.id for r in data.recipes_using(ingredient.id)]
+            if used_in and query.get("force") != "1":
+                raise HttpError(
+                    HTTPStatus.CONFLICT, "วัตถุดิบนี้ถูกใช้ในสูตรอยู่", recipe_ids=used_in
+                )
+            return data.remove_ingredient(ingredient.id)
+
+        return await self.writes.submit(mutate)
+
+    async def restock_ingredient(self, query, body, ing_id):
+        qty = _field(body, "quantity", float)
+        unit_cost = _field(body, "unit_cost", float, required=False)
+        _check(rm.validate_restock(qty, unit_cost))
+
+        def mutate(data):
+            # เพิ่มล็อตต่อจากยอดล่าสุดในคิว จึงไม่ทับการเพิ่ม/ตัดสต๊อคของคำขออื่น
+            ingredient = self._ingredient(ing_id)
+            return data.receive_stock(ingredient.id, qty, unit_cost)
+
+        return await self.writes.submit(mutate)
+
+    async def ingredient_lots(self, query, body, ing_id):
+        ingredient = self._ingredient(ing_id)
+        lots = ingredient.lots
+        return {
+            "ingredient_id": ingredient.id,
+            "stock": ingredient.stock,
+            "value": round(lots.value, 2),
+            "unit_cost": lots.unit_cost,
+            "lots": [
+                {"received_at": received_at, "quantity": quantity, "unit_cost": unit_cost}
+                for received_at, quantity, unit_cost in lots
+            ],
+        }
+
+    # ---------- สูตรอาหาร ----------
+
+    def _recipe(self, recipe_id):
+        recipe = rm.find_recipe_by_id(self.data, int(recipe_id))
+        if not recipe:
+            raise HttpError(HTTPStatus.NOT_FOUND, "ไม่พบสูตร ID นี้")
+        return recipe
+
+    def _recipe_view(self, recipe):
+        cost = rm.calculate_recipe_cost(self.data, recipe)
+        return {
+            **recipe.to_dict(),
+            "cost": round(cost, 2),
+            "cost_per_serving": round(cost / recipe.servings, 2),
+        }
+
+    async def list_recipes(self, query, body):
+        found = self._search("recipes", query)
+        recipes = found if found is not None else self.data.recipes.values()
+        return [self._recipe_view(recipe) for recipe in recipes]
+
+    async def get_recipe(self, query, body, recipe_id):
+        return self._recipe_view(self._recipe(recipe_id))
+
+    async def add_recipe(self, query, body):
+        fields = {
+            "name": _field(body, "name", str),
+            "servings": _field(body, "servings", int),
+            "ingredients": _lines(body),
+        }
+
+        def mutate(data):
+            _check(rm.validate_recipe(data, *fields.values()))
+            return self._recipe_view(data.insert_recipe(fields))
+
+        return HTTPStatus.CREATED, await self.writes.submit(mutate)
+
+    async def edit_recipe(self, query, body, recipe_id):
+        changes = {}
+        for key, cast in (("name", str), ("servings", int)):
+            value = _field(body, key, cast, required=False)
+            if value is not None:
+                changes[key] = value
+        if "ingredients" in body:
+            changes["ingredients"] = _lines(body)
+
+        def mutate(data):
+            recipe = self._recipe(recipe_id)
+            _check_version(recipe, body)
+            merged = {
+                "name": recipe.name,
+                "servings": recipe.servings,
+                "ingredients": recipe.ingredients,
+                **changes,
+            }
+            _check(rm.validate_recipe(data, *merged.values(), recipe_id=recipe.id))
+            return self._recipe_view(data.update_recipe(recipe.id, **changes))
+
+        return await self.writes.submit(mutate)
+
+    async def delete_recipe(self, query, body, recipe_id):
+        version = {"version": _query_int(query, "version")}
+
+        def mutate(data):
+            recipe = self._recipe(recipe_id)
+            _check_version(recipe, version)
+            parents = data.recipes_containing(recipe.id)
+            if parents:
+                raise HttpError(
+                    HTTPStatus.CONFLICT, "สูตรนี้ถูกใช้เป็นสูตรย่อยในสูตรอื่น",
+                    recipe_ids=[parent.id for parent in parents],
+                )
+            return data.remove_recipe(recipe.id)
+
+        return await self.writes.submit(mutate)
+
+    # ---------- ต้นทุนและการผลิต ----------
+
+    async def recipe_cost(self, query, body, recipe_id):
+        recipe = self._recipe(recipe_id)
+        as_of = _date(query, "as_of")
+        lines = []
+        for item in recipe.ingredients:
+            if item.recipe_id is not None:
+                sub = rm.find_recipe_by_id(self.data, item.recipe_id)
+                lines.append({
+                    "recipe_id": item.recipe_id,
+                    "name": sub.name if sub else None,
+                    "quantity": item.quantity,
+                    "cost": (
+                        round(item.quantity * rm.calculate_recipe_cost(self.data, sub, as_of), 2)
+                        if sub else None
+                    ),
+                })
+                continue
+            ing = rm.find_ingredient_by_id(self.data, item.ingredient_id)
+            price = None
+            if ing:
+                price = ing.price_per_unit if as_of is None else ing.price_at(as_of)
+            lines.append({
+                "ingredient_id": item.ingredient_id,
+                "name": ing.name if ing else None,
+                "quantity": item.quantity,
+                "unit": ing.unit if ing else None,
+                "cost": round(item.quantity * price, 2) if ing else None,
+            })
+        view = self._recipe_view(recipe)
+        if as_of is not None:
+            cost = rm.calculate_recipe_cost(self.data, recipe, as_of)
+            view.update(
+                as_of=as_of, cost=round(cost, 2), cost_per_serving=round(cost / recipe.servings, 2)
+            )
+        return {**view, "lines": lines}
+
+    async def costs(self, query, body):
+        return [
+            {key: view[key] for key in ("id", "name", "servings", "cost", "cost_per_serving")}
+            for view in await self.list_recipes(query, body)
+        ]
+
+    async def producible(self, query, body):
+        engine = rm.get_engine(self.data)
+        results = engine.producibility() if engine else None
+        rows = []
+        for recipe in self.data.recipes.values():
+            if results is not None:
+                batches, limiting_id, missing_id = results[recipe.id]
+            else:
+                batches, limiting_id, missing_id = rm.max_producible(self.data, recipe)
+            rows.append({
+                "id": recipe.id,
+                "name": recipe.name,
+                "max_batches": batches,
+                "max_servings": batches * recipe.servings,
+                "limiting_ingredient_id": limiting_id,
+                "missing_ingredient_id": missing_id,
+            })
+        return rows
+
+    async def produce(self, query, body):
+        items = body.get("orders")
+        if not isinstance(items, list) or not items:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "orders ต้องเป็นรายการที่ไม่ว่าง")
+        orders = []
+        for item in items:
+            if not isinstance(item, dict):
+                raise HttpError(HTTPStatus.BAD_REQUEST, "orders ต้องเป็นรายการของ object")
+            orders.append((_field(item, "recipe_id", int), _field(item, "batches", int)))
+
+        def mutate(data):
+            # ตรวจสต๊อคกับยอดล่าสุดในคิว ไม่ผ่านก็ไม่ตัดสต๊อคเลย
+            entries, problems = rm.produce_batch(data, orders)
+            if problems:
+                raise HttpError(HTTPStatus.CONFLICT, "ไม่สามารถผลิตได้", problems=problems)
+            return entries
+
+        return HTTPStatus.CREATED, await self.writes.submit(mutate)
+
+    async def production_log(self, query, body):
+        start, end = _date(query, "start"), _date(query, "end")
+        # ไม่ระบุหน้า = หน้าสุดท้าย (รายการล่าสุด)
+        rows, page_no, pages = self.data.production_log.page(
+            _query_int(query, "page"), PAGE_SIZE, start, end
+        )
+        return {
+            "entries": rows,
+            "page": page_no,
+            "pages": pages,
+            "totals": self.data.production_log.range_totals(start, end),
+        }
+
+    async def production_summary(self, query, body):
+        start, end = _date(query, "start"), _date(query, "end")
+        log = self.data.production_log
+        summary = {
+            "daily": dict(log.daily_totals(start, end)),
+            "totals": log.range_totals(start, end),
+        }
+        if start is None and end is None:
+            summary["by_recipe"] = log.by_recipe
+        return summary
+
+    async def alerts(self, query, body):
+        return rm.get_stock_monitor(self.data).alerts()
+
+    async def stats(self, query, body):
+        return {"writes": self.writes.writes, "batches": self.writes.batches}
+
+    # ---------- HTTP ----------
+
+    async def dispatch(self, method, target, body):
+        """เรียกฟังก์ชันตาม method + path คืน (status, payload)"""
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        path = url.path.rstrip("/") or "/"
+        allowed = False
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if not match:
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+            try:
+                with timer(f"http.{method} {pattern.pattern.rstrip('$')}"):
+                    result = await handler(query, body, *match.groups())
+            except HttpError as e:
+                return e.status, e.payload
+            if isinstance(result, tuple):
+                return result
+            return HTTPStatus.OK, result
+        if allowed:
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "method ไม่รองรับ"}
+        return HTTPStatus.NOT_FOUND, {"error": "ไม่พบ endpoint"}
+
+    async def handle_connection(self, reader, writer):
+        """อ่านคำขอทีละคำขอบนการเชื่อมต่อเดียว (HTTP/1.1 keep-alive)"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": "คำขอไม่ถูกต้อง"}, False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" and (
+                    version == "HTTP/1.1" or connection == "keep-alive"
+                )
+
+                try:
+                    length = int(headers.get("content-length") or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST,
+                                        {"error": "Content-Length ไม่ถูกต้อง"}, False)
+                    break
+                if length > MAX_BODY:
+                    await self._respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                        {"error": "ข้อมูลใหญ่เกินไป"}, False)
+                    break
+                raw = await reader.readexactly(length) if length else b""
+                try:
+                    body = json.loads(raw) if raw else {}
+                    if not isinstance(body, dict):
+                        raise ValueError("body must be an object")
+                except ValueError:
+                    status, payload = HTTPStatus.BAD_REQUEST, {"error": "body ต้องเป็น JSON object"}
+                else:
+                    try:
+                        status, payload = await self.dispatch(method.upper(), target, body)
+                    except Exception as e:
+                        print(f"❌ {method} {target}: {e!r}", file=sys.stderr)
+                        status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "เกิดข้อผิดพลาดภายใน"}
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, payload, keep_alive):
+        body = json.dumps(payload, ensure_ascii=False, default=to_json).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+
+# ==================== main ====================
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, data=None):
+    """เปิดบริการจนกว่าจะถูกหยุด"""
+    data = data if data is not None else rm.load_data()
+    service = RecipeService(data, rm.get_storage())
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    writer_task = asyncio.create_task(service.writes.run())
+    print(f"✅ เปิดบริการที่ http://{host}:{port} (backend: {rm.BACKEND})", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        writer_task.cancel()
+
+
+def run(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """เรียก serve แบบ blocking คืน exit code (กด Ctrl+C เพื่อหยุด)"""
+    try:
+        asyncio.run(serve(host, port))
+    except KeyboardInterrupt:
+        print("\nหยุดบริการแล้ว 👋")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ระบบจัดการสูตรอาหาร (โหมดบริการ HTTP/JSON)")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+    return run(args.host, args.port)
+
+
+if __name__ == "__main__":
+    with session():
+        exit_code = main()
+    sys.exit(exit_code)
@@ -0,0 +1,1438 @@
+"""backend สำหรับบันทึกข้อมูล: JSON (snapshot + journal), snapshot แบบบรรทัดที่อ่านผ่าน mmap และ SQLite
+
+ทุก backend ใช้ร่วมกันได้จากหลายโปรแกรม (หลายเครื่องคิดเงิน/หน้าจอในครัว) พร้อมกัน:
+การบันทึกทำภายใต้ล็อก อ่านการเปลี่ยนแปลงที่โปรแกรมอื่นบันทึกไว้ก่อน แล้วตรวจ version
+ของ record ที่จะบันทึก ถ้าชนกันจะโยน StaleRecordError แทนการเขียนทับ
+
+ไฟล์ที่เขียนทับทั้งไฟล์ (snapshot, index) เขียนเป็นไฟล์ชั่วคราวแล้วเปลี่ยนชื่อทับ ส่วนไฟล์ที่
+เขียนต่อท้าย (journal, ประวัติรายเดือน) ทนบรรทัดที่เขียนไม่ครบ โปรแกรมที่หยุดกลางคันจึงไม่ทำให้
+ไฟล์เสีย ระดับ durability กำหนดว่าจะ fsync มากแค่ไหน (ดู DURABILITY_LEVELS)
+"""
+
+import base64
+import gzip
+import json
+import mmap
+import os
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows ใช้ msvcrt.locking แทน flock
+    fcntl = None
+    import msvcrt
+
+from production_log import (
+    LogSegment, ProductionLog, segment_key, summarize, summarize_by_recipe,
+)
+from recipe_metrics import count, timed
+from recipe_records import (
+    RECORD_TYPES, Ingredient, LogEntry, LotQueue, Recipe, RecipeLine, to_json,
+)
+from recipe_store import RecipeStore, StaleRecordError
+
+# จำนวนรายการใน journal ก่อนรวมเป็น snapshot ใหม่
+COMPACT_THRESHOLD = 1000
+
+# ระดับ durability (แลกความเร็วกับความปลอดภัยเมื่อไฟดับ/เครื่องดับ):
+#   "off"    ไม่ fsync เลย ไฟล์ไม่เสียเมื่อโปรแกรมหยุดกลางคัน แต่ถ้าเครื่องดับอาจเสียรายการล่าสุด
+#            หรือ snapshot ที่เพิ่งเขียน
+#   "normal" fsync snapshot และไฟล์ที่เขียนทับ แต่ไม่ fsync ทุกบรรทัดของ journal
+#            เครื่องดับอาจเสียรายการล่าสุดไม่กี่รายการ แต่ข้อมูลที่เหลือโหลดได้เสมอ
+#   "full"   fsync ทุกครั้งที่บันทึก รายการที่บันทึกเสร็จแล้วไม่หายแม้เครื่องดับ
+DURABILITY_LEVELS = ("off", "normal", "full")
+DEFAULT_DURABILITY = "normal"
+
+
+def _check_durability(durability):
+    if durability not in DURABILITY_LEVELS:
+        raise ValueError(f"ไม่รู้จักระดับ durability: {durability}")
+    return durability
+
+
+# ==================== เขียนไฟล์ให้ทนต่อการหยุดกลางคัน ====================
+
+def _fsync_dir(path):
+    """fsync โฟลเดอร์ของ path เพื่อให้การสร้าง/เปลี่ยนชื่อไฟล์อยู่บนดิสก์จริง"""
+    if os.name == "nt":  # Windows เปิดโฟลเดอร์เพื่อ fsync ไม่ได้ (และไม่จำเป็น)
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def _atomic_write(path, mode="w", durable=True):
+    """เปิดไฟล์ชั่วคราวให้เขียน แล้วเปลี่ยนชื่อทับ path เมื่อเขียนครบ
+
+    ถ้าโปรแกรมหยุดระหว่างเขียน path ยังเป็นไฟล์เดิมทั้งไฟล์ durable=True จะ fsync
+    ไฟล์ก่อนเปลี่ยนชื่อและ fsync โฟลเดอร์หลังเปลี่ยนชื่อ
+    """
+    tmp_file = path + ".tmp"
+    encoding = None if "b" in mode else "utf-8"
+    try:
+        with open(tmp_file, mode, encoding=encoding) as f:
+            yield f
+            f.flush()
+            if durable:
+                os.fsync(f.fileno())
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+    os.replace(tmp_file, path)
+    if durable:
+        _fsync_dir(path)
+
+
+def _append_lines(path, data, durable=False):
+    """เขียน data (หลายบรรทัด) ต่อท้ายไฟล์
+
+    ถ้าบรรทัดสุดท้ายเดิมเขียนไม่ครบ (โปรแกรมหยุดกลางคัน) จะขึ้นบรรทัดใหม่ก่อน
+    บรรทัดที่เสียจึงถูกข้ามตอนอ่าน และไม่ต่อเข้ากับบรรทัดใหม่จนเสียไปด้วย
+    """
+    with open(path, "a+b") as f:
+        end = f.seek(0, os.SEEK_END)
+        if end:
+            f.seek(end - 1)
+            if f.read(1) != b"\n":
+                data = b"\n" + data
+        f.write(data)
+        f.flush()
+        if durable:
+            os.fsync(f.fileno())
+    if durable and not end:
+        _fsync_dir(path)
+
+
+# ==================== ล็อกและตรวจ version ระหว่างหลายโปรแกรม ====================
+
+class FileLock:
+    """ล็อกแบบ advisory บนไฟล์ .lock ใช้ร่วมกันระหว่างโปรแกรมที่เปิดข้อมูลชุดเดียวกัน
+
+    ใช้ซ้อนกันได้ภายในโปรแกรมเดียว (ปลดล็อกจริงเมื่อออกจากชั้นนอกสุด)
+    ไฟล์ล็อกเปิดค้างไว้ตลอด เพื่อไม่ต้องเปิด/ปิดไฟล์ทุกครั้งที่บันทึก
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._depth = 0
+
+    def __enter__(self):
+        if self._depth == 0:
+            if self._file is None:
+                self._file = open(self.path, "a+b")
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            else:
+                self._file.seek(0)
+                while True:
+                    try:
+                        # LK_LOCK รอประมาณ 10 วินาทีแล้วโยน OSError ถ้ายังไม่ได้ล็อก
+                        msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue
+        self._depth += 1
+        return self
+
+    @property
+    def nested(self):
+        """ถูกถือซ้อนอยู่ในบล็อกชั้นนอกของโปรแกรมนี้หรือไม่ (เรียกจากภายในบล็อก)"""
+        return self._depth > 1
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# ค่าใน current ของ _check_stale: record ถูกโปรแกรมอื่นแก้ไข (ไม่ทราบ version)
+_TOUCHED = object()
+
+
+def _change_key(change):
+    """(kind, id) ของ record ที่รายการเปลี่ยนแปลงอ้างถึง (record เป็น dict หรือ Record)"""
+    record = change.get("record")
+    if record is None:
+        return change["kind"], change["id"]
+    return change["kind"], record["id"] if isinstance(record, dict) else record.id
+
+
+def _flatten(changes):
+    """แตกรายการแบบ batch ใน journal เป็นรายการย่อย"""
+    for change in changes:
+        if change["op"] == "batch":
+            yield from change["changes"]
+        else:
+            yield change
+
+
+def _check_stale(changes, current):
+    """โยน StaleRecordError ถ้ารายการที่จะบันทึกอ้าง version ที่ไม่ตรงกับข้อมูลล่าสุด
+
+    current: (kind, id) → version ล่าสุด (None ถ้าไม่มี record) เฉพาะ record ที่อาจถูกแก้ไข
+    ตรวจเฉพาะรายการแรกของแต่ละ record เพราะรายการถัดไปต่อจาก version ที่เราแก้เอง
+    """
+    seen = set()
+    for change in changes:
+        key = _change_key(change)
+        if key in seen:
+            continue
+        seen.add(key)
+        if key in current and current[key] != change.get("base"):
+            raise StaleRecordError(*key)
+
+
+def _rebase_changes(store, fresh, changes):
+    """ย้ายรายการที่ยังไม่บันทึกไปใช้กับข้อมูลที่โหลดใหม่ แล้วแทนที่ข้อมูลใน store
+
+    ถ้าชนกัน store จะถือข้อมูลที่โหลดใหม่โดยไม่มีรายการของเรา (ข้อมูลเดิมอาจอ่านไม่ได้แล้ว
+    เช่น mmap ของ snapshot เก่าถูกปิด) แล้วโยน StaleRecordError
+    """
+    try:
+        _check_stale(
+            changes, {key: fresh.version_of(*key) for key in map(_change_key, changes)}
+        )
+    except StaleRecordError:
+        store.reset(fresh)
+        raise
+    for change in changes:
+        fresh.apply_change(change)
+    store.reset(fresh)
+
+
+# ==================== ไฟล์ประวัติการผลิตรายเดือน ====================
+
+def _read_segment_file(path, last_id):
+    """อ่านประวัติจากไฟล์ช่วงเดือน (.jsonl หรือ .jsonl.gz)
+
+    ข้ามบรรทัดที่เขียนไม่ครบ รายการ ID ซ้ำ (เขียนซ้ำหลังโปรแกรมหยุดกลางคัน) และรายการ
+    ที่ ID เกิน last_id ของ index (เขียนแล้วแต่หยุดก่อนอัปเดต index ยังอยู่ใน journal)
+    """
+    if not os.path.exists(path):
+        return []
+    opener = gzip.open if path.endswith(".gz") else open
+    entries = []
+    seen = set()
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = LogEntry.from_dict(json.loads(line))
+            except ValueError:
+                continue
+            if entry.id <= last_id and entry.id not in seen:
+                seen.add(entry.id)
+                entries.append(entry)
+    return entries
+
+
+def _segment_lines(entries):
+    """แปลงประวัติเป็นบรรทัด JSON Lines (bytes) สำหรับไฟล์ช่วงเดือน"""
+    return "".join(
+        json.dumps(entry.to_dict(), ensure_ascii=False) + "\n" for entry in entries
+    ).encode("utf-8")
+
+
+class LogArchive:
+    """โฟลเดอร์เก็บประวัติการผลิตแยกไฟล์ละเดือน
+
+    เดือนล่าสุดเป็นไฟล์ .jsonl ที่เขียนต่อท้าย เดือนที่ปิดแล้วถูกบีบอัดเป็น .jsonl.gz
+    index.json เก็บชื่อไฟล์และสรุปรายวันของทุกเดือน ทำให้เปิดโปรแกรมได้โดยไม่ต้องอ่าน
+    เดือนเก่า ยอดรวมรายสูตรของเดือนที่ปิดแล้วแยกไว้อีกไฟล์ (ชื่ออยู่ใน index)
+    และอ่านเมื่อต้องใช้เท่านั้น
+    """
+
+    def __init__(self, log_dir, durable=True):
+        self.log_dir = log_dir
+        self.durable = durable
+        self.index_file = os.path.join(log_dir, "index.json")
+        self.index = {"segments": {}, "last_id": 0, "by_recipe_file": None}
+        self._by_recipe = None
+        if os.path.exists(self.index_file):
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                self.index = json.load(f)
+
+    def exists(self):
+        """มีประวัติที่แยกไฟล์ไว้แล้วหรือไม่"""
+        return bool(self.index["segments"])
+
+    def _path(self, key):
+        return os.path.join(self.log_dir, self.index["segments"][key]["file"])
+
+    def by_recipe(self):
+        """ยอดรวมรายสูตรของเดือนที่ปิดแล้ว (คีย์เป็นข้อความ)"""
+        if self._by_recipe is None:
+            self._by_recipe = {}
+            if self.index["by_recipe_file"]:
+                path = os.path.join(self.log_dir, self.index["by_recipe_file"])
+                with open(path, "r", encoding="utf-8") as f:
+                    self._by_recipe = json.load(f)
+        return self._by_recipe
+
+    def segment(self, key):
+        """LogSegment ของเดือน key ที่อ่านไฟล์เมื่อต้องใช้"""
+        info = self.index["segments"][key]
+        path = self._path(key)
+        return LogSegment(key, info["summary"], lambda: self._read(path))
+
+    def load(self):
+        """คืน ProductionLog ที่โหลดเฉพาะเดือนล่าสุด เดือนอื่นอ่านเมื่อต้องใช้"""
+        keys = sorted(self.index["segments"])
+        if not keys:
+            return ProductionLog()
+        active = self._read(self._path(keys[-1]))
+        archived = [self.segment(key) for key in keys[:-1]]
+        return ProductionLog(active, archived, self.by_recipe)
+
+    def write(self, log):
+        """เขียนประวัติใหม่ลงไฟล์เดือน ปิด/บีบอัดเดือนเก่า และย้ายออกจากหน่วยความจำ"""
+        last_id = self.index["last_id"]
+        new_entries = {}
+        for entry in log.entries:
+            if entry.id > last_id:
+                new_entries.setdefault(segment_key(entry), []).append(entry)
+        if not new_entries:
+            return
+        os.makedirs(self.log_dir, exist_ok=True)
+
+        segments = self.index["segments"]
+        closed_entries = []
+        for key, entries in sorted(new_entries.items()):
+            info = segments.setdefault(
+                key, {"file": f"{key}.jsonl", "closed": False, "summary": None}
+            )
+            path = self._path(key)
+            if info["closed"]:
+                # ประวัติย้อนหลังของเดือนที่ปิดแล้ว (เกิดไม่บ่อย) เขียนไฟล์ gzip ใหม่ทั้งไฟล์
+                self._write_gzip(path, _segment_lines(self._read(path) + entries))
+            else:
+                _append_lines(path, _segment_lines(entries), self.durable)
+            info["summary"] = summarize(entries, info["summary"])
+            if info["closed"]:
+                closed_entries.extend(entries)
+            self.index["last_id"] = max(self.index["last_id"], info["summary"]["last_id"])
+
+        # ทุกเดือนยกเว้นเดือนล่าสุดถือว่าปิดแล้ว บีบอัดแล้วอ่านเมื่อต้องใช้เท่านั้น
+        keys = sorted(segments)
+        leftovers = []
+        for key in keys[:-1]:
+            info = segments[key]
+            if info["closed"]:
+                continue
+            plain = self._path(key)
+            entries = self._read(plain)
+            closed_entries.extend(entries)
+            self._write_gzip(plain + ".gz", _segment_lines(entries))
+            info["file"] += ".gz"
+            info["closed"] = True
+            leftovers.append(plain)
+
+        if closed_entries:
+            # ให้ log รวมยอดของไฟล์เดิมก่อน เพราะเดือนที่เพิ่งปิดถูกนับจากหน่วยความจำแล้ว
+            log.by_recipe
+            # เขียนยอดรายสูตรเป็นไฟล์ชื่อใหม่ก่อน index จึงไม่มีช่วงที่ index ชี้ไฟล์ที่ยังไม่ครบ
+            by_recipe = summarize_by_recipe(closed_entries, self.by_recipe())
+            if self.index["by_recipe_file"]:
+                leftovers.append(os.path.join(self.log_dir, self.index["by_recipe_file"]))
+            self.index["by_recipe_file"] = f"by_recipe-{self.index['last_id']}.json"
+            path = os.path.join(self.log_dir, self.index["by_recipe_file"])
+            with _atomic_write(path, durable=self.durable) as f:
+                json.dump(by_recipe, f)
+
+        with _atomic_write(self.index_file, durable=self.durable) as f:
+            json.dump(self.index, f, ensure_ascii=False)
+        # ลบไฟล์เดิมหลัง index ชี้ไปที่ไฟล์ใหม่แล้วเท่านั้น
+        for path in leftovers:
+            os.remove(path)
+
+        log.archive(keys[:-1], self.segment)
+
+    def _read(self, path):
+        """อ่านไฟล์ช่วงเดือนเฉพาะรายการที่ index บันทึกไว้แล้ว"""
+        return _read_segment_file(path, self.index["last_id"])
+
+    def _write_gzip(self, path, data):
+        """เขียนไฟล์ .gz ใหม่ทั้งไฟล์ (ไฟล์เดิมยังอยู่ครบจนกว่าจะเขียนเสร็จ)"""
+        with _atomic_write(path, "wb", self.durable) as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                f.write(data)
+
+
+class JsonStorage:
+    """เก็บข้อมูลเป็น snapshot JSON และ journal ของการเปลี่ยนแปลง
+
+    เมื่อเปิด journal การแก้ไขแต่ละครั้งจะเขียนต่อท้ายเฉพาะรายการที่เปลี่ยน
+    ทำให้เวลาบันทึกไม่ขึ้นกับขนาดข้อมูล และจะรวม journal เข้า snapshot
+    เมื่อยาวเกิน compact_threshold รายการ ประวัติการผลิตไม่อยู่ใน snapshot
+    แต่แยกเป็นไฟล์รายเดือนในโฟลเดอร์ log_dir (ดู LogArchive)
+
+    หลายโปรแกรมใช้ไฟล์ชุดเดียวกันได้: ทุกการอ่าน/เขียนทำภายใต้ล็อกไฟล์ .lock
+    ก่อนบันทึกจะอ่านต่อจากตำแหน่งใน journal ที่อ่านไว้ล่าสุด (เฉพาะบรรทัดที่โปรแกรมอื่น
+    เพิ่ม) ถ้า snapshot ถูกเขียนใหม่โดยโปรแกรมอื่นจึงโหลดใหม่ทั้งหมด
+
+    การรวม journal เขียน snapshot ใหม่ก่อนแล้วจึงลบ journal ถ้าหยุดระหว่างนั้น
+    ตอนโหลดจะเล่น journal ทับ snapshot ใหม่ซึ่งให้ผลเหมือนเดิม
+    """
+
+    def __init__(self, data_file, journal_file=None, use_journal=True,
+                 compact_threshold=COMPACT_THRESHOLD, log_dir=None,
+                 durability=DEFAULT_DURABILITY):
+        self.data_file = data_file
+        self.journal_file = journal_file or os.path.splitext(data_file)[0] + ".journal"
+        self.log_dir = log_dir or os.path.splitext(data_file)[0] + "_log"
+        self.use_journal = use_journal
+        self.compact_threshold = compact_threshold
+        self.durability = _check_durability(durability)
+        self.journal_length = 0
+        self.archive = LogArchive(self.log_dir, self._durable)
+        self.lock = FileLock(os.path.splitext(data_file)[0] + ".lock")
+        # ตั้งเป็น True เมื่อ snapshot ที่อ่านอยู่ในรูปแบบเก่า ต้องเขียนใหม่หลังโหลด
+        self._convert = False
+        # ตำแหน่งใน journal ที่อ่าน/เขียนถึงแล้ว และลายเซ็นของ snapshot ที่โหลดไว้
+        self._journal_pos = 0
+        self._snapshot_stamp = None
+
+    def load(self):
+        """โหลด snapshot กับประวัติเดือนล่าสุด แล้วเล่น journal ทับ"""
+        with self.lock:
+            self._convert = False
+            raw = self._read_snapshot()
+            self._snapshot_stamp = self._stamp()
+            self.archive = archive = LogArchive(self.log_dir, self._durable)
+            production_log = archive.load()
+            # ไฟล์รูปแบบเดิมเก็บประวัติไว้ใน snapshot ย้ายไปไฟล์รายเดือนตอนรวม journal
+            legacy = [
+                LogEntry.from_dict(entry) for entry in raw.pop("production_log", [])
+                if entry["id"] > archive.index["last_id"]
+            ]
+            for entry in legacy:
+                production_log.append(entry)
+            store = RecipeStore(raw, production_log=production_log)
+            self.journal_length = self._replay(store)
+            if legacy or self._convert:
+                self.compact(store)
+            return store
+
+    @property
+    def _durable(self):
+        """fsync ไฟล์ที่เขียนทับทั้งไฟล์หรือไม่"""
+        return self.durability != "off"
+
+    def reload(self, store):
+        """โหลดข้อมูลล่าสุดจากไฟล์แทนที่ข้อมูลใน store (ทิ้งรายการที่ยังไม่บันทึก)"""
+        store.reset(self.load())
+
+    def refresh(self, store):
+        """นำการเปลี่ยนแปลงที่โปรแกรมอื่นบันทึกไว้มาใช้ (รายการที่ค้างอยู่จะถูกบันทึกไปด้วย)"""
+        self.save(store)
+
+    @contextmanager
+    def transaction(self, store):
+        """ถือล็อกตลอดบล็อก: อ่านข้อมูลล่าสุดก่อนเข้าบล็อก และบันทึกเมื่อจบบล็อก
+
+        ใช้ครอบการตรวจสต๊อคกับการแก้ไข เพื่อให้ตรวจกับยอดล่าสุดเสมอและไม่มีโปรแกรมอื่น
+        แทรกระหว่างนั้น ถ้าบล็อก (หรือการอ่าน/บันทึกก่อนและหลังบล็อก) โยนข้อผิดพลาด
+        จะทิ้งรายการที่ค้างอยู่แล้วโหลดข้อมูลใหม่
+        """
+        with self.lock:
+            try:
+                self.refresh(store)
+                yield store
+                self.save(store)
+            except BaseException:
+                self.reload(store)
+                raise
+
+    def _stamp(self):
+        """ลายเซ็นของไฟล์ snapshot (เปลี่ยนเมื่อถูกเขียนทับ) None ถ้ายังไม่มีไฟล์"""
+        try:
+            st = os.stat(self.data_file)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _catch_up(self, store, changes):
+        """นำการเปลี่ยนแปลงที่โปรแกรมอื่นบันทึกหลังจากที่เราอ่านไว้มาใช้ (ต้องถือล็อกอยู่)
+
+        changes คือรายการที่กำลังจะบันทึก ถ้าแก้ record เดียวกับที่โปรแกรมอื่นแก้ไปแล้ว
+        จะโยน StaleRecordError โดยไม่เปลี่ยนข้อมูลใน store
+        """
+        if self._stamp() != self._snapshot_stamp:
+            # journal เดิมถูกรวมเข้า snapshot ไปแล้ว อ่านต่อจากตำแหน่งเดิมไม่ได้
+            _rebase_changes(store, self.load(), changes)
+            return
+        try:
+            size = os.path.getsize(self.journal_file)
+        except FileNotFoundError:
+            size = 0
+        if size == self._journal_pos:
+            return
+        foreign, end = self._read_journal(self._journal_pos)
+        foreign = list(_flatten(foreign))
+        _check_stale(changes, {_change_key(change): _TOUCHED for change in foreign})
+        for change in foreign:
+            store.apply_change(change)
+        self._journal_pos = end
+        self.journal_length += len(foreign)
+
+    def _read_snapshot(self, path=None):
+        """อ่าน snapshot JSON ทั้งไฟล์ (คืน dict ว่างถ้ายังไม่มีไฟล์)"""
+        path = path or self.data_file
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, store):
+        """บันทึกการเปลี่ยนแปลงที่ค้างอยู่ ต่อจากการเปลี่ยนแปลงของโปรแกรมอื่น
+
+        ถ้ารายการที่จะบันทึกชนกับ record ที่โปรแกรมอื่นแก้ไปแล้ว จะโยน StaleRecordError
+        โดยไม่บันทึก และโหลดข้อมูลล่าสุดแทนการแก้ไขในหน่วยความจำ (ผู้เรียกทำรายการใหม่
+        กับข้อมูลล่าสุดได้ทันที) ถ้าถูกเรียกภายใน transaction การโหลดใหม่เป็นหน้าที่ของ transaction
+        """
+        with self.lock:
+            try:
+                write = self.prepare_save(store)
+            except StaleRecordError:
+                if not self.lock.nested:
+                    self.reload(store)
+                raise
+            if write is not None:
+                write()
+                self.finish_save(store)
+
+    # ---------- บันทึกแบบแยกขั้นตอน (ให้ recipe_service ทำส่วนที่รอดิสก์ใน thread อื่น) ----------
+    # begin → refresh/แก้ไข → prepare_save → write() → finish_save → end
+    # ทุกขั้นยกเว้น begin, write() และ end ใช้/แก้ store จึงต้องเรียกจาก thread ที่ใช้ store
+
+    def begin(self):
+        """ถือล็อกเขียนจนกว่าจะเรียก end (รอถ้าโปรแกรมอื่นถืออยู่)"""
+        self.lock.__enter__()
+
+    def end(self, commit=True):
+        """ปล่อยล็อกที่ถือไว้ด้วย begin (journal ถูกเขียนไปแล้วใน write จึงไม่มีอะไรต้องยกเลิก)"""
+        self.lock.__exit__(None, None, None)
+
+    def prepare_save(self, store):
+        """อ่านการเปลี่ยนแปลงของโปรแกรมอื่นเข้า store แล้วเตรียมบรรทัด journal ของรายการที่ค้างอยู่
+
+        คืนฟังก์ชันที่เขียนบรรทัดนั้นต่อท้าย journal (ไม่ใช้ store) หรือ None ถ้าไม่มีรายการ
+        ถ้าชนกับโปรแกรมอื่นจะโยน StaleRecordError (ผู้เรียกต้องโหลดข้อมูลใหม่เอง)
+        """
+        with self.lock:
+            changes = store.take_changes()
+            self._catch_up(store, changes)
+            if not changes:
+                return None
+            # การบันทึกหนึ่งครั้งเป็นหนึ่งบรรทัด ถ้าเขียนไม่ครบจะถูกทิ้งทั้งชุด
+            if len(changes) > 1:
+                record = {"op": "batch", "changes": changes}
+            else:
+                record = changes[0]
+            line = (json.dumps(record, ensure_ascii=False, default=to_json) + "\n").encode("utf-8")
+            count("save_changes", len(changes))
+            count("save_bytes", len(line))
+            return lambda: self._write_journal(line, len(changes))
+
+    def _write_journal(self, line, changes):
+        """เขียนบรรทัดต่อท้าย journal (fsync เมื่อ durability เป็น "full")"""
+        durable = self.durability == "full"
+        with open(self.journal_file, "ab") as f:
+            f.write(line)
+            f.flush()
+            if durable:
+                os.fsync(f.fileno())
+            self._journal_pos = f.tell()
+        if durable and self._journal_pos == len(line):
+            # journal เพิ่งถูกสร้าง fsync โฟลเดอร์ให้ชื่อไฟล์อยู่บนดิสก์ด้วย
+            _fsync_dir(self.journal_file)
+        self.journal_length += changes
+
+    def finish_save(self, store):
+        """รวม journal เข้า snapshot ถ้าถึงเกณฑ์ (ย้ายประวัติเก่าออกจาก store และ LineStorage
+        เปลี่ยนตารางไปอ่านไฟล์ใหม่ จึงต้องเรียกจาก thread ที่ใช้ store)"""
+        # use_journal=False รวมเข้า snapshot ทุกครั้ง โดยยังเขียน journal ก่อน
+        # เพื่อกู้คืนได้ถ้าหยุดระหว่างเขียน snapshot กับไฟล์ประวัติ
+        if not self.use_journal or self.journal_length >= self.compact_threshold:
+            self.compact(store)
+
+    @timed("storage.compact")
+    def compact(self, store):
+        """รวม journal เข้าเป็น snapshot และไฟล์ประวัติรายเดือน แล้วล้าง journal"""
+        with self.lock:
+            self.archive.write(store.production_log)
+            self.write_snapshot(store)
+            self._snapshot_stamp = self._stamp()
+            if os.path.exists(self.journal_file):
+                os.remove(self.journal_file)
+            self.journal_length = 0
+            self._journal_pos = 0
+
+    def write_snapshot(self, store):
+        """เขียน snapshot วัตถุดิบและสูตร (เขียนไฟล์ชั่วคราวแล้วเปลี่ยนชื่อทับ)"""
+        with _atomic_write(self.data_file, durable=self._durable) as f:
+            json.dump(store.to_dict(include_log=False), f, ensure_ascii=False, indent=2)
+            count("save_bytes", f.tell())
+
+    def _replay(self, store):
+        """เล่นรายการใน journal ทับข้อมูล คืนจำนวนรายการที่อ่านได้"""
+        changes, self._journal_pos = self._read_journal()
+        replayed = 0
+        for change in changes:
+            store.apply_change(change)
+            replayed += len(change.get("changes", (change,)))
+        return replayed
+
+    def _read_journal(self, start=0):
+        """อ่านรายการใน journal ตั้งแต่ตำแหน่ง start คืน (รายการ, ตำแหน่งท้ายบรรทัดสุดท้าย)"""
+        if not os.path.exists(self.journal_file):
+            return [], 0
+        changes = []
+        good_end = start
+        with open(self.journal_file, "rb+") as f:
+            f.seek(start)
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete journal line")
+                    change = json.loads(line)
+                except ValueError:
+                    # บรรทัดสุดท้ายอาจเขียนไม่ครบเพราะโปรแกรมหยุดกลางคัน
+                    # ตัดทิ้งเพื่อไม่ให้รายการที่เขียนต่อจากนี้สูญหาย
+                    f.truncate(good_end)
+                    break
+                changes.append(change)
+                good_end += len(line)
+        return changes, good_end
+
+
+# ==================== snapshot แบบบรรทัด (อ่านผ่าน mmap) ====================
+
+# บรรทัดสุดท้ายของไฟล์ snapshot แบบบรรทัด: จำนวน record และตำแหน่งของแต่ละ record
+LINES_FORMAT = "recipe-lines/1"
+
+
+class LazyTable(MutableMapping):
+    """ตาราง id → record ที่อ่าน record จากไฟล์ (mmap) เมื่อถูกเรียกใช้ครั้งแรก
+
+    ids/starts/ends เป็น array เรียงตาม id ของ record ที่อยู่ในไฟล์ ค้นด้วย bisect
+    record ที่อ่านแล้วหรือถูกแก้ไขเก็บใน _loaded ส่วน record ใหม่เก็บใน _added
+    """
+
+    def __init__(self, record_type, buffer, ids, starts, ends):
+        self.record_type = record_type
+        self._buffer = buffer
+        self._ids, self._starts, self._ends = ids, starts, ends
+        self._loaded = {}
+        self._added = {}
+        self._deleted = set()
+
+    def rebase(self, buffer, ids, starts, ends):
+        """ชี้ไปที่ไฟล์ชุดใหม่ (หลังเขียน snapshot ใหม่ record ทั้งหมดอยู่ในไฟล์แล้ว)"""
+        # record ใหม่ยังถูกอ้างถึงอยู่ เก็บไว้เป็น record ที่อ่านแล้ว
+        self._loaded.update(self._added)
+        self._buffer = buffer
+        self._ids, self._starts, self._ends = ids, starts, ends
+        self._added = {}
+        self._deleted = set()
+
+    def _position(self, key):
+        """ตำแหน่งของ key ใน array (None ถ้าไม่อยู่ในไฟล์)"""
+        i = bisect_left(self._ids, key)
+        if i < len(self._ids) and self._ids[i] == key:
+            return i
+        return None
+
+    def __getitem__(self, key):
+        record = self._loaded.get(key)
+        if record is not None:
+            return record
+        if key in self._added:
+            return self._added[key]
+        i = self._position(key)
+        if i is None or key in self._deleted:
+            raise KeyError(key)
+        record = self.record_type.from_dict(
+            json.loads(self._buffer[self._starts[i]:self._ends[i]])
+        )
+        self._loaded[key] = record
+        return record
+
+    def __setitem__(self, key, record):
+        if self._position(key) is None:
+            self._added[key] = record
+        else:
+            self._deleted.discard(key)
+            self._loaded[key] = record
+
+    def __delitem__(self, key):
+        if key in self._added:
+            del self._added[key]
+        elif self._position(key) is not None and key not in self._deleted:
+            self._deleted.add(key)
+            self._loaded.pop(key, None)
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in self._added:
+            return True
+        return self._position(key) is not None and key not in self._deleted
+
+    def __iter__(self):
+        deleted = self._deleted
+        for key in self._ids:
+            if key not in deleted:
+                yield key
+        yield from list(self._added)
+
+    def __len__(self):
+        return len(self._ids) - len(self._deleted) + len(self._added)
+
+    def raw_records(self):
+        """คืน (id, บรรทัด JSON เป็น bytes) ของทุก record เรียงตาม id โดยไม่แปลง record ที่ยังไม่ถูกอ่าน"""
+        for key in sorted(self):
+            record = self._loaded.get(key) or self._added.get(key)
+            if record is not None:
+                yield key, json.dumps(record.to_dict(), ensure_ascii=False).encode("utf-8")
+            else:
+                i = self._position(key)
+                yield key, self._buffer[self._starts[i]:self._ends[i]]
+
+
+def _raw_records(table):
+    """คืน (id, บรรทัด JSON) เรียงตาม id จากตาราง dict หรือ LazyTable"""
+    if isinstance(table, LazyTable):
+        yield from table.raw_records()
+        return
+    for key in sorted(table):
+        yield key, json.dumps(table[key].to_dict(), ensure_ascii=False).encode("utf-8")
+
+
+class LineStorage(JsonStorage):
+    """snapshot แบบหนึ่ง record ต่อบรรทัด ที่เปิดโปรแกรมได้โดยไม่ต้องแปลงทั้งไฟล์
+
+    บรรทัดสุดท้ายของไฟล์เก็บตำแหน่ง (byte offset) ของทุก record ตอนโหลดจะ mmap ไฟล์
+    แล้วอ่านเฉพาะบรรทัดนี้ วัตถุดิบและสูตรถูกแปลงเป็น Record เมื่อถูกเรียกใช้ครั้งแรก
+    journal และไฟล์ประวัติรายเดือนใช้ร่วมกับ JsonStorage ถ้ายังไม่มีไฟล์นี้แต่มี
+    recipe_data.json เดิม จะย้ายข้อมูลมาให้ครั้งแรกที่โหลด
+    """
+
+    def __init__(self, data_file, journal_file=None, legacy_file=None, **kwargs):
+        super().__init__(data_file, journal_file, **kwargs)
+        self.legacy_file = legacy_file or os.path.splitext(data_file)[0] + ".json"
+        self._file = None
+        self._mmap = None
+        # ตัวนับ ID ที่บันทึกไว้ในบรรทัดดัชนีของ snapshot ที่เปิดอยู่
+        self._next_ids = {}
+
+    def _read_snapshot(self, path=None):
+        """เปิดไฟล์ด้วย mmap แล้วสร้าง LazyTable จากดัชนีท้ายไฟล์"""
+        if not os.path.exists(self.data_file):
+            if os.path.exists(self.legacy_file):
+                self._convert = True
+                return super()._read_snapshot(self.legacy_file)
+            return {}
+        ingredients, recipes = self._open()
+        return {"ingredients": ingredients, "recipes": recipes, "next_ids": self._next_ids}
+
+    def _open(self):
+        """mmap ไฟล์ snapshot แล้วคืน (ids, starts, ends) ของวัตถุดิบและสูตร"""
+        self._close()
+        self._file = open(self.data_file, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        trailer_start = self._mmap.rfind(b"\n", 0, len(self._mmap) - 1) + 1
+        trailer = json.loads(self._mmap[trailer_start:])
+        if trailer.get("format") != LINES_FORMAT:
+            raise ValueError(f"{self.data_file}: ไม่ใช่ไฟล์ snapshot แบบบรรทัด")
+        offsets = array("q", base64.b64decode(trailer["index"]))
+        if trailer["byteorder"] != sys.byteorder:
+            offsets.byteswap()
+        self._next_ids = trailer.get("next_ids", {})
+        tables = []
+        pos = 0
+        for kind in ("ingredients", "recipes"):
+            n = trailer[kind]
+            ids, starts, ends = (offsets[pos + k * n:pos + (k + 1) * n] for k in range(3))
+            tables.append(LazyTable(RECORD_TYPES[kind], self._mmap, ids, starts, ends))
+            pos += 3 * n
+        return tables
+
+    def _close(self):
+        """ปิด mmap ของไฟล์เดิม (ต้องปิดก่อนเขียนทับบน Windows)"""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+            self._mmap = self._file = None
+
+    def write_snapshot(self, store):
+        """เขียนวัตถุดิบและสูตรทีละบรรทัด ตามด้วยบรรทัดดัชนีตำแหน่ง"""
+        counts = {}
+        columns = []
+        with _atomic_write(self.data_file, "wb", self._durable) as f:
+            for kind in ("ingredients", "recipes"):
+                ids, starts, ends = array("q"), array("q"), array("q")
+                for key, line in _raw_records(getattr(store, kind)):
+                    ids.append(key)
+                    starts.append(f.tell())
+                    f.write(line)
+                    ends.append(f.tell())
+                    f.write(b"\n")
+                counts[kind] = len(ids)
+                columns.extend((ids, starts, ends))
+            index = b"".join(column.tobytes() for column in columns)
+            trailer = {
+                "format": LINES_FORMAT,
+                "byteorder": sys.byteorder,
+                "index": base64.b64encode(index).decode("ascii"),
+                "next_ids": store.id_counters(),
+                **counts,
+            }
+            f.write(json.dumps(trailer).encode("utf-8") + b"\n")
+            count("save_bytes", f.tell())
+            self._close()
+
+        tables = self._open()
+        # ตารางของ store ชี้ไปที่ไฟล์เดิมซึ่งถูกปิดแล้ว เปลี่ยนให้อ่านจากไฟล์ใหม่
+        for kind, table in zip(("ingredients", "recipes"), tables):
+            current = getattr(store, kind)
+            if isinstance(current, LazyTable):
+                current.rebase(table._buffer, table._ids, table._starts, table._ends)
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingredients (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    unit TEXT NOT NULL,
+    price_per_unit REAL NOT NULL,
+    stock REAL NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS price_history (
+    ingredient_id INTEGER NOT NULL REFERENCES ingredients(id) ON DELETE CASCADE,
+    since TEXT NOT NULL,
+    price REAL NOT NULL,
+    PRIMARY KEY (ingredient_id, since)
+);
+CREATE TABLE IF NOT EXISTS stock_lots (
+    ingredient_id INTEGER NOT NULL REFERENCES ingredients(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    received_at TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    unit_cost REAL NOT NULL,
+    PRIMARY KEY (ingredient_id, position)
+);
+CREATE TABLE IF NOT EXISTS recipes (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    servings INTEGER NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS recipe_lines (
+    recipe_id INTEGER NOT NULL REFERENCES recipes(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    ingredient_id INTEGER NOT NULL,
+    quantity REAL NOT NULL,
+    unit TEXT,
+    amount REAL,
+    PRIMARY KEY (recipe_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_recipe_lines_ingredient ON recipe_lines(ingredient_id);
+CREATE TABLE IF NOT EXISTS recipe_components (
+    recipe_id INTEGER NOT NULL REFERENCES recipes(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    component_id INTEGER NOT NULL,
+    quantity REAL NOT NULL,
+    PRIMARY KEY (recipe_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_recipe_components_component ON recipe_components(component_id);
+CREATE TABLE IF NOT EXISTS production_log (
+    id INTEGER PRIMARY KEY,
+    recipe_id INTEGER NOT NULL,
+    recipe_name TEXT NOT NULL,
+    batches INTEGER NOT NULL,
+    total_servings INTEGER NOT NULL,
+    total_cost REAL NOT NULL,
+    date TEXT NOT NULL,
+    price_cost REAL
+);
+CREATE INDEX IF NOT EXISTS idx_production_log_date ON production_log(date);
+CREATE TABLE IF NOT EXISTS log_daily (
+    day TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    batches INTEGER NOT NULL,
+    servings INTEGER NOT NULL,
+    cost REAL NOT NULL,
+    first_id INTEGER NOT NULL,
+    last_id INTEGER NOT NULL,
+    first_date TEXT NOT NULL,
+    last_date TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS log_monthly_recipes (
+    month TEXT NOT NULL,
+    recipe_id INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    batches INTEGER NOT NULL,
+    servings INTEGER NOT NULL,
+    cost REAL NOT NULL,
+    PRIMARY KEY (month, recipe_id)
+);
+CREATE TABLE IF NOT EXISTS id_counters (
+    kind TEXT PRIMARY KEY,
+    next_id INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    record_id INTEGER NOT NULL
+);
+"""
+
+INGREDIENT_COLUMNS = ("id", "name", "unit", "price_per_unit", "stock", "version")
+RECIPE_COLUMNS = ("id", "name", "servings", "version")
+LOG_COLUMNS = (
+    "id", "recipe_id", "recipe_name", "batches", "total_servings", "total_cost", "date",
+    "price_cost",
+)
+# บรรทัดวัตถุดิบ (recipe_lines) และบรรทัดสูตรย่อย (recipe_components) เรียงรวมกันตาม position
+RECIPE_LINES_SQL = (
+    "SELECT recipe_id, position, ingredient_id, quantity, NULL, unit, amount "
+    "FROM recipe_lines {where} "
+    "UNION ALL "
+    "SELECT recipe_id, position, NULL, quantity, component_id, NULL, NULL "
+    "FROM recipe_components {where} "
+    "ORDER BY recipe_id, position"
+)
+PRICE_HISTORY_SQL = (
+    "SELECT ingredient_id, since, price FROM price_history {where} ORDER BY ingredient_id, since"
+)
+# ยอดสรุปของประวัติการผลิต (รายวัน และรายสูตรต่อเดือน) บวกเพิ่มทุกครั้งที่เขียนประวัติ
+# ตอนเปิดโปรแกรมจึงอ่านสรุปจากตารางเล็กๆ นี้แทนการ GROUP BY ทั้งตาราง production_log
+LOG_DAILY_SQL = (
+    "INSERT INTO log_daily VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(day) DO UPDATE SET count = count + 1, "
+    "batches = batches + excluded.batches, servings = servings + excluded.servings, "
+    "cost = cost + excluded.cost, first_id = MIN(first_id, excluded.first_id), "
+    "last_id = MAX(last_id, excluded.last_id), first_date = MIN(first_date, excluded.first_date), "
+    "last_date = MAX(last_date, excluded.last_date)"
+)
+LOG_RECIPES_SQL = (
+    "INSERT INTO log_monthly_recipes VALUES (?, ?, 1, ?, ?, ?) "
+    "ON CONFLICT(month, recipe_id) DO UPDATE SET count = count + 1, "
+    "batches = batches + excluded.batches, servings = servings + excluded.servings, "
+    "cost = cost + excluded.cost"
+)
+STOCK_LOTS_SQL = (
+    "SELECT ingredient_id, received_at, quantity, unit_cost FROM stock_lots {where} "
+    "ORDER BY ingredient_id, position"
+)
+# เวลารอ (วินาที) เมื่อโปรแกรมอื่นกำลังเขียนฐานข้อมูล
+BUSY_TIMEOUT = 30
+# จำนวนแถวล่าสุดในตาราง changes ที่เก็บไว้ให้โปรแกรมอื่นอ่านต่อ
+CHANGES_KEPT = 10000
+
+
+class SqliteStorage:
+    """เก็บข้อมูลในฐานข้อมูล SQLite โดยบันทึกเฉพาะแถวที่เปลี่ยน
+
+    การบันทึกใช้ BEGIN IMMEDIATE (ให้เขียนได้ทีละโปรแกรม) และแก้แถวแบบ
+    UPDATE ... WHERE version = ? ทุกการบันทึกเพิ่มแถวในตาราง changes
+    โปรแกรมอื่นอ่านต่อจาก seq ล่าสุดที่เคยเห็น แล้วโหลดเฉพาะแถวที่เปลี่ยน
+    ระดับ durability ใช้ PRAGMA synchronous ของ SQLite ที่ชื่อตรงกัน
+    """
+
+    def __init__(self, db_file, durability=DEFAULT_DURABILITY):
+        import sqlite3
+
+        self.db_file = db_file
+        # check_same_thread=False ให้ recipe_service เรียก begin/end จาก thread ของ storage ได้
+        # (ผู้ใช้ต้องไม่เรียกพร้อมกันหลาย thread)
+        self.conn = sqlite3.connect(
+            db_file, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False
+        )
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        # WAL ให้โปรแกรมอื่นอ่านได้ระหว่างที่มีการเขียน
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.durability = _check_durability(durability)
+        self.conn.execute(f"PRAGMA synchronous = {self.durability.upper()}")
+        self.conn.executescript(SQLITE_SCHEMA)
+        self._depth = 0
+        self._last_seq = 0
+        self._upgrade_schema()
+
+    def _upgrade_schema(self):
+        """เพิ่มคอลัมน์ที่ฐานข้อมูลรุ่นเก่ายังไม่มี (version, หน่วยของบรรทัดสูตร และ price_cost)
+
+        และสร้างยอดสรุปของประวัติการผลิตครั้งเดียว ถ้าฐานข้อมูลมีประวัติแต่ยังไม่มีสรุป
+        """
+        added = (
+            ("ingredients", "version", "INTEGER NOT NULL DEFAULT 0"),
+            ("recipes", "version", "INTEGER NOT NULL DEFAULT 0"),
+            ("recipe_lines", "unit", "TEXT"),
+            ("recipe_lines", "amount", "REAL"),
+            ("production_log", "price_cost", "REAL"),
+        )
+        for table, column, definition in added:
+            columns = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        if self.conn.execute("SELECT 1 FROM log_daily LIMIT 1").fetchone() is None:
+            with self._transaction("IMMEDIATE"):
+                # ตรวจซ้ำหลังได้สิทธิ์เขียน เผื่อโปรแกรมอื่นสร้างสรุปไปก่อนแล้ว
+                empty = self.conn.execute("SELECT 1 FROM log_daily LIMIT 1").fetchone() is None
+                if empty and self.conn.execute("SELECT 1 FROM production_log LIMIT 1").fetchone():
+                    self._rebuild_log_summaries()
+
+    def _rebuild_log_summaries(self):
+        """สร้างตารางยอดสรุปของประวัติการผลิตใหม่จากทุกแถวใน production_log"""
+        self.conn.execute("DELETE FROM log_daily")
+        self.conn.execute("DELETE FROM log_monthly_recipes")
+        self.conn.execute(
+            "INSERT INTO log_daily SELECT substr(date, 1, 10), COUNT(*), SUM(batches), "
+            "SUM(total_servings), SUM(total_cost), MIN(id), MAX(id), MIN(date), MAX(date) "
+            "FROM production_log GROUP BY 1"
+        )
+        self.conn.execute(
+            "INSERT INTO log_monthly_recipes SELECT substr(date, 1, 7), recipe_id, COUNT(*), "
+            "SUM(batches), SUM(total_servings), SUM(total_cost) "
+            "FROM production_log GROUP BY 1, 2"
+        )
+
+    def _add_log_summary(self, entry):
+        """บวกประวัติหนึ่งรายการเข้าตารางยอดสรุป"""
+        day = entry.date[:10]
+        totals = (entry.batches, entry.total_servings, entry.total_cost)
+        self.conn.execute(
+            LOG_DAILY_SQL, (day, *totals, entry.id, entry.id, entry.date, entry.date)
+        )
+        self.conn.execute(LOG_RECIPES_SQL, (day[:7], entry.recipe_id, *totals))
+
+    @contextmanager
+    def _transaction(self, mode="DEFERRED"):
+        """เปิดทรานแซกชัน (เรียกซ้อนได้ ชั้นในรวมอยู่ในทรานแซกชันชั้นนอก)"""
+        if self._depth:
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+            return
+        self.conn.execute(f"BEGIN {mode}")
+        self._depth = 1
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        else:
+            self.conn.execute("COMMIT")
+        finally:
+            self._depth = 0
+
+    def load(self):
+        """อ่านทุกตารางแล้วสร้าง RecipeStore"""
+        with self._transaction():
+            cur = self.conn.cursor()
+            ingredients = {
+                row[0]: Ingredient(*row)
+                for row in cur.execute(
+                    f"SELECT {', '.join(INGREDIENT_COLUMNS)} FROM ingredients ORDER BY id"
+                )
+            }
+            for ing_id, since, price in cur.execute(PRICE_HISTORY_SQL.format(where="")):
+                ingredients[ing_id].price_history.append([since, price])
+            lots = {}
+            for ing_id, *lot in cur.execute(STOCK_LOTS_SQL.format(where="")):
+                lots.setdefault(ing_id, []).append(lot)
+            for ing_id, ing_lots in lots.items():
+                ingredients[ing_id].lots = LotQueue(ing_lots)
+            recipes = {
+                recipe_id: Recipe(recipe_id, name, servings, [], version)
+                for recipe_id, name, servings, version in cur.execute(
+                    f"SELECT {', '.join(RECIPE_COLUMNS)} FROM recipes ORDER BY id"
+                )
+            }
+            for recipe_id, _, *line in cur.execute(RECIPE_LINES_SQL.format(where="")):
+                recipes[recipe_id].ingredients.append(RecipeLine(*line))
+            next_ids = dict(cur.execute("SELECT kind, next_id FROM id_counters"))
+            self._last_seq = self.conn.execute("SELECT MAX(seq) FROM changes").fetchone()[0] or 0
+            return RecipeStore(
+                {"ingredients": ingredients, "recipes": recipes, "next_ids": next_ids},
+                production_log=self._load_log(),
+            )
+
+    def reload(self, store):
+        """โหลดข้อมูลล่าสุดแทนที่ข้อมูลใน store (ทิ้งรายการที่ยังไม่บันทึก)"""
+        store.reset(self.load())
+
+    def refresh(self, store):
+        """นำการเปลี่ยนแปลงที่โปรแกรมอื่นบันทึกไว้มาใช้ (รายการที่ค้างอยู่จะถูกบันทึกไปด้วย)"""
+        self.save(store)
+
+    @contextmanager
+    def transaction(self, store):
+        """ทรานแซกชันเขียนตลอดบล็อก: อ่านข้อมูลล่าสุดก่อนเข้าบล็อก และบันทึกเมื่อจบบล็อก"""
+        try:
+            with self._transaction("IMMEDIATE"):
+                self.refresh(store)
+                yield store
+                self.save(store)
+        except BaseException:
+            self.reload(store)
+            raise
+
+    def _catch_up(self, store, changes):
+        """นำแถวที่โปรแกรมอื่นเปลี่ยนหลัง _last_seq มาใช้ (ต้องอยู่ในทรานแซกชัน)
+
+        ถ้า changes แก้ record เดียวกับที่ถูกเปลี่ยนไปแล้ว จะโยน StaleRecordError
+        """
+        first = self.conn.execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+        if first is not None and first > self._last_seq + 1:
+            # รายการที่ยังไม่ได้อ่านถูกลบออกจากตาราง changes แล้ว โหลดใหม่ทั้งหมด
+            _rebase_changes(store, self.load(), changes)
+            return
+        touched = {}
+        for seq, kind, record_id in self.conn.execute(
+            "SELECT seq, kind, record_id FROM changes WHERE seq > ? ORDER BY seq",
+            (self._last_seq,),
+        ):
+            touched[kind, record_id] = _TOUCHED
+            self._last_seq = seq
+        if not touched:
+            return
+        _check_stale(changes, touched)
+        for kind, record_id in touched:
+            record = self._fetch(kind, record_id)
+            if record is None:
+                store.apply_change({"op": "delete", "kind": kind, "id": record_id})
+            elif kind == "production_log":
+                store.apply_change({"op": "append", "kind": kind, "record": record})
+            else:
+                store.apply_change({"op": "put", "kind": kind, "record": record})
+
+    def _fetch(self, kind, record_id):
+        """อ่าน record ล่าสุดจากฐานข้อมูล (None ถ้าถูกลบ)"""
+        if kind == "ingredients":
+            row = self.conn.execute(
+                f"SELECT {', '.join(INGREDIENT_COLUMNS)} FROM ingredients WHERE id = ?",
+                (record_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            ingredient = Ingredient(*row)
+            ingredient.price_history = [
+                [since, price]
+                for _, since, price in self.conn.execute(
+                    PRICE_HISTORY_SQL.format(where="WHERE ingredient_id = ?"), (record_id,)
+                )
+            ]
+            lots = [
+                lot for _, *lot in self.conn.execute(
+                    STOCK_LOTS_SQL.format(where="WHERE ingredient_id = ?"), (record_id,)
+                )
+            ]
+            if lots:
+                ingredient.lots = LotQueue(lots)
+            return ingredient
+        if kind == "recipes":
+            row = self.conn.execute(
+                f"SELECT {', '.join(RECIPE_COLUMNS)} FROM recipes WHERE id = ?", (record_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            lines = [
+                RecipeLine(*line)
+                for _, _, *line in self.conn.execute(
+                    RECIPE_LINES_SQL.format(where="WHERE recipe_id = ?"),
+                    (record_id, record_id),
+                )
+            ]
+            recipe_id, name, servings, version = row
+            return Recipe(recipe_id, name, servings, lines, version)
+        row = self.conn.execute(
+            f"SELECT {', '.join(LOG_COLUMNS)} FROM production_log WHERE id = ?", (record_id,)
+        ).fetchone()
+        return row and LogEntry(*row)
+
+    def _load_log(self):
+        """โหลดประวัติเดือนล่าสุด เดือนเก่าสร้างจากตารางยอดสรุปและอ่านเมื่อต้องใช้"""
+        summaries = {}
+        for day, count, batches, servings, cost, first_id, last_id, first_date, last_date \
+                in self.conn.execute("SELECT * FROM log_daily"):
+            summary = summaries.setdefault(day[:7], summarize(()))
+            summary["daily"][day] = {
+                "count": count, "batches": batches, "servings": servings, "cost": cost,
+            }
+            summary["count"] += count
+            summary["first_id"] = min(summary["first_id"] or first_id, first_id)
+            summary["last_id"] = max(summary["last_id"], last_id)
+            summary["first_date"] = min(summary["first_date"] or first_date, first_date)
+            summary["last_date"] = max(summary["last_date"] or last_date, last_date)
+        months = sorted(summaries)
+        if not months:
+            return ProductionLog()
+        # ยอดรายสูตรของเดือนเก่า (เดือนล่าสุดถูกนับตอนโหลดเข้าหน่วยความจำ) อ่านในทรานแซกชันเดียวกับ
+        # ยอดรายวัน ประวัติที่โปรแกรมอื่นเขียนภายหลังจึงถูกนับครั้งเดียวตอน catch-up
+        by_recipe = {}
+        for month, recipe_id, count, batches, servings, cost in self.conn.execute(
+            "SELECT * FROM log_monthly_recipes WHERE month < ?", (months[-1],)
+        ):
+            totals = by_recipe.setdefault(
+                recipe_id, {"count": 0, "batches": 0, "servings": 0, "cost": 0.0}
+            )
+            totals["count"] += count
+            totals["batches"] += batches
+            totals["servings"] += servings
+            totals["cost"] += cost
+
+        archived = [
+            LogSegment(month, summaries[month], lambda month=month: self._month_entries(month))
+            for month in months[:-1]
+        ]
+        return ProductionLog(self._month_entries(months[-1]), archived, by_recipe)
+
+    def _month_entries(self, month):
+        """อ่านประวัติของเดือน month (YYYY-MM) ด้วยดัชนีวันที่"""
+        return [
+            LogEntry(*row)
+            for row in self.conn.execute(
+                f"SELECT {', '.join(LOG_COLUMNS)} FROM production_log "
+                "WHERE date >= ? AND date < ? ORDER BY id",
+                (month, month + "\uffff"),
+            )
+        ]
+
+    def save(self, store):
+        """บันทึกการเปลี่ยนแปลงที่ค้างอยู่ในทรานแซกชันเดียว ต่อจากการเปลี่ยนแปลงของโปรแกรมอื่น
+
+        ถ้าชนกับ record ที่โปรแกรมอื่นแก้ไปแล้ว จะโยน StaleRecordError โดยไม่บันทึก
+        และโหลดข้อมูลล่าสุดแทนการแก้ไขในหน่วยความจำหลัง ROLLBACK (ภายใน transaction
+        การโหลดใหม่เป็นหน้าที่ของ transaction เพราะยังไม่ได้ ROLLBACK)
+        """
+        try:
+            self.prepare_save(store)
+        except StaleRecordError:
+            if not self._depth:
+                self.reload(store)
+            raise
+
+    # ---------- บันทึกแบบแยกขั้นตอน (ใช้แบบเดียวกับ JsonStorage ดู recipe_service) ----------
+
+    def begin(self):
+        """เปิดทรานแซกชันเขียนจนกว่าจะเรียก end (BEGIN IMMEDIATE รอถ้าโปรแกรมอื่นกำลังเขียน)"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        self._depth = 1
+
+    def end(self, commit=True):
+        """COMMIT ทรานแซกชันที่เปิดด้วย begin (ส่วนที่รอดิสก์) หรือ ROLLBACK ถ้า commit=False"""
+        self._depth = 0
+        self.conn.execute("COMMIT" if commit else "ROLLBACK")
+
+    def prepare_save(self, store):
+        """อ่านการเปลี่ยนแปลงของโปรแกรมอื่นเข้า store แล้วเขียนรายการที่ค้างอยู่ลงฐานข้อมูล
+
+        ถ้าอยู่ระหว่าง begin..end ข้อมูลถึงดิสก์ตอน end จึงไม่มีขั้นตอนเขียนแยก (คืน None เสมอ)
+        ถ้าชนกับโปรแกรมอื่นจะโยน StaleRecordError (ผู้เรียกต้องโหลดข้อมูลใหม่เอง)
+        """
+        changes = store.take_changes()
+        with self._transaction("IMMEDIATE" if changes else "DEFERRED"):
+            self._catch_up(store, changes)
+            if not changes:
+                return None
+            count("save_changes", len(changes))
+            written = set()
+            for change in changes:
+                key = _change_key(change)
+                self._apply(change, check=key not in written)
+                written.add(key)
+            self._save_counters(store)
+            self.conn.executemany(
+                "INSERT INTO changes (kind, record_id) VALUES (?, ?)", written
+            )
+            self._last_seq = self.conn.execute("SELECT MAX(seq) FROM changes").fetchone()[0]
+            self.conn.execute(
+                "DELETE FROM changes WHERE seq <= ?", (self._last_seq - CHANGES_KEPT,)
+            )
+        return None
+
+    def finish_save(self, store):
+        """ไม่มีอะไรต้องทำหลังเขียน (SQLite ไม่มี journal ให้รวม)"""
+
+    def import_store(self, store):
+        """เขียนข้อมูลทั้งหมดของ store ลงฐานข้อมูล (ใช้ตอนย้ายจาก JSON)"""
+        with self._transaction("IMMEDIATE"):
+            for kind in (
+                "production_log", "recipe_lines", "recipe_components", "recipes",
+                "price_history", "stock_lots", "ingredients", "id_counters", "changes",
+            ):
+                self.conn.execute(f"DELETE FROM {kind}")
+            self.conn.executemany(
+                "INSERT INTO ingredients VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    [getattr(ing, c) for c in INGREDIENT_COLUMNS]
+                    for ing in store.ingredients.values()
+                ),
+            )
+            for ing in store.ingredients.values():
+                self._insert_prices(ing)
+                self._insert_lots(ing)
+            self.conn.executemany(
+                "INSERT INTO recipes VALUES (?, ?, ?, ?)",
+                ([getattr(r, c) for c in RECIPE_COLUMNS] for r in store.recipes.values()),
+            )
+            for recipe in store.recipes.values():
+                self._insert_lines(recipe)
+            self._save_counters(store)
+            self.conn.executemany(
+                f"INSERT INTO production_log VALUES ({', '.join('?' * len(LOG_COLUMNS))})",
+                ([getattr(e, c) for c in LOG_COLUMNS] for e in store.production_log),
+            )
+            self._rebuild_log_summaries()
+        store.take_changes()
+
+    def close(self):
+        """ปิดการเชื่อมต่อฐานข้อมูล"""
+        self.conn.close()
+
+    def _apply(self, change, check=True):
+        """แปลงรายการเปลี่ยนแปลงเป็นคำสั่ง SQL
+
+        check=True ตรวจว่าแถวในฐานข้อมูลยังเป็น version ก่อนแก้ไข (base) หรือยังไม่มี
+        แถวนี้สำหรับ record ใหม่ ถ้าไม่ตรงโยน StaleRecordError
+        """
+        op, kind = change["op"], change["kind"]
+        base = change.get("base")
+        if op == "delete":
+            sql, params = f"DELETE FROM {kind} WHERE id = ?", [change["id"]]
+            if check:
+                sql, params = sql + " AND version = ?", params + [base]
+            if self.conn.execute(sql, params).rowcount == 0 and check:
+                raise StaleRecordError(kind, change["id"])
+            return
+        record = change["record"]
+        columns = {"ingredients": INGREDIENT_COLUMNS, "recipes": RECIPE_COLUMNS}.get(
+            kind, LOG_COLUMNS
+        )
+        values = [getattr(record, c) for c in columns]
+        if base is None:
+            try:
+                self.conn.execute(
+                    f"INSERT INTO {kind} ({', '.join(columns)}) "
+                    f"VALUES ({', '.join('?' * len(columns))})",
+                    values,
+                )
+            except self.conn.IntegrityError:
+                # ID นี้ถูกโปรแกรมอื่นใช้ไปแล้ว
+                raise StaleRecordError(kind, record.id) from None
+            if kind == "production_log":
+                self._add_log_summary(record)
+        else:
+            assignments = ", ".join(f"{c} = ?" for c in columns[1:])
+            sql, params = f"UPDATE {kind} SET {assignments} WHERE id = ?", values[1:] + [record.id]
+            if check:
+                sql, params = sql + " AND version = ?", params + [base]
+            if self.conn.execute(sql, params).rowcount == 0:
+                raise StaleRecordError(kind, record.id)
+        if kind == "ingredients":
+            self._insert_prices(record)
+            self.conn.execute("DELETE FROM stock_lots WHERE ingredient_id = ?", (record.id,))
+            self._insert_lots(record)
+        if kind == "recipes":
+            self.conn.execute("DELETE FROM recipe_lines WHERE recipe_id = ?", (record.id,))
+            self.conn.execute("DELETE FROM recipe_components WHERE recipe_id = ?", (record.id,))
+            self._insert_lines(record)
+
+    def _insert_prices(self, ingredient):
+        """เขียนประวัติราคาตั้งแต่แถวล่าสุดในฐานข้อมูล
+
+        ประวัติเพิ่มต่อท้ายเท่านั้น ยกเว้นราคาที่เปลี่ยนซ้ำในวินาทีเดียวกันซึ่งแทนรายการสุดท้าย
+        (ดู RecipeStore.update_ingredient) แถวล่าสุดจึงถูกเขียนทับด้วยเสมอ
+        การแก้สต๊อคที่ราคาไม่เปลี่ยนเขียนทับแถวเดิมแถวเดียว
+        """
+        if not ingredient.price_history:
+            return
+        latest = self.conn.execute(
+            "SELECT MAX(since) FROM price_history WHERE ingredient_id = ?", (ingredient.id,)
+        ).fetchone()[0]
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO price_history VALUES (?, ?, ?)",
+            [
+                (ingredient.id, since, price)
+                for since, price in ingredient.price_history
+                if latest is None or since >= latest
+            ],
+        )
+
+    def _save_counters(self, store):
+        """บันทึกตัวนับ ID (ไม่ลดค่าที่โปรแกรมอื่นบันทึกไว้สูงกว่า)"""
+        self.conn.executemany(
+            "INSERT INTO id_counters VALUES (?, ?) "
+            "ON CONFLICT(kind) DO UPDATE SET next_id = MAX(next_id, excluded.next_id)",
+            store.id_counters().items(),
+        )
+
+    def _insert_lots(self, ingredient):
+        """เขียนล็อตที่ยังเหลือของวัตถุดิบตามลำดับรับเข้า"""
+        self.conn.executemany(
+            "INSERT INTO stock_lots VALUES (?, ?, ?, ?, ?)",
+            [
+                (ingredient.id, pos, received_at, quantity, unit_cost)
+                for pos, (received_at, quantity, unit_cost) in enumerate(ingredient.lots)
+            ],
+        )
+
+    def _insert_lines(self, recipe):
+        """เขียนบรรทัดของสูตร: วัตถุดิบลง recipe_lines และสูตรย่อยลง recipe_components"""
+        lines = list(enumerate(recipe.ingredients))
+        self.conn.executemany(
+            "INSERT INTO recipe_lines (recipe_id, position, ingredient_id, quantity, unit, amount) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (recipe.id, pos, item.ingredient_id, item.quantity, item.unit, item.amount)
+                for pos, item in lines if item.recipe_id is None
+            ],
+        )
+        self.conn.executemany(
+            "INSERT INTO recipe_components VALUES (?, ?, ?, ?)",
+            [
+                (recipe.id, pos, item.recipe_id, item.quantity)
+                for pos, item in lines if item.recipe_id is not None
+            ],
+        )
+
+
+def migrate_json_to_sqlite(data_file, db_file):
+    """ย้ายข้อมูลจากไฟล์ JSON (รวม journal) ไปยังฐานข้อมูล SQLite ครั้งเดียว"""
+    store = JsonStorage(data_file).load()
+    target = SqliteStorage(db_file)
+    try:
+        target.import_store(store)
+    finally:
+        target.close()
+    return store
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 3:
+        print("วิธีใช้: python recipe_storage.py <recipe_data.json> <recipe_data.db>")
+        sys.exit(1)
+    migrated = migrate_json_to_sqlite(sys.argv[1], sys.argv[2])
+    print(
+        f"✅ ย้ายข้อมูลเรียบร้อย: วัตถุดิบ {len(migrated.ingredients)} รายการ, "
+        f"สูตร {len(migrated.recipes)} สูตร, ประวัติการผลิต {len(migrated.production_log)} รายการ"
+    )
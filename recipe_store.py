@@ -0,0 +1,517 @@
+"""คลังข้อมูลในหน่วยความจำพร้อมดัชนี ID สำหรับระบบจัดการสูตรอาหาร"""
+
+from collections.abc import MutableMapping
+from datetime import datetime
+
+from production_log import ProductionLog
+from recipe_records import RECORD_TYPES, Ingredient, LogEntry, LotQueue, Recipe
+from recipe_units import UnitMismatchError, conversion_factor
+
+# ชื่อข้อมูลแต่ละประเภทสำหรับข้อความแจ้งผู้ใช้
+KIND_NAMES = {"ingredients": "วัตถุดิบ", "recipes": "สูตร", "production_log": "ประวัติการผลิต"}
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class StaleRecordError(Exception):
+    """record ที่กำลังบันทึกถูกโปรแกรมอื่นแก้ไข/ลบ/ใช้ ID ไปก่อนแล้ว"""
+
+    def __init__(self, kind, record_id):
+        super().__init__(f"{KIND_NAMES[kind]} ID {record_id} ถูกแก้ไขจากโปรแกรมอื่นแล้ว")
+        self.kind = kind
+        self.record_id = record_id
+
+
+class RecipeCycleError(ValueError):
+    """สูตรอ้างถึงกันเป็นวงจรผ่านสูตรย่อย (ปกติถูกกันไว้ตอนตรวจข้อมูลก่อนบันทึก)"""
+
+    def __init__(self, recipe_id):
+        super().__init__(f"สูตร ID {recipe_id} อ้างถึงตัวเองผ่านสูตรย่อย")
+        self.recipe_id = recipe_id
+
+
+class RecipeStore:
+    """ห่อข้อมูลที่โหลดจากไฟล์ พร้อมดัชนี id → record และตัวนับ ID"""
+
+    def __init__(self, raw=None, production_log=None):
+        raw = raw or {}
+        self.ingredients = self._table(Ingredient, raw.get("ingredients", []))
+        self.recipes = self._table(Recipe, raw.get("recipes", []))
+        if production_log is None:
+            production_log = ProductionLog(
+                LogEntry.from_dict(entry) for entry in raw.get("production_log", [])
+            )
+        self.production_log = production_log
+        # ดัชนีย้อนกลับ ingredient_id → {recipe_id} ของสูตรที่ใช้วัตถุดิบนั้น และ
+        # recipe_id ของสูตรย่อย → {recipe_id} ของสูตรที่ใช้สูตรย่อยนั้นโดยตรง
+        # สร้างเมื่อต้องใช้ครั้งแรก เพื่อไม่ต้องอ่านทุกสูตรตอนเปิดโปรแกรม
+        self._used_by = None
+        self._used_in = None
+        # แคชต้นทุนต่อสูตร recipe_id → ต้นทุนรวม และปริมาณวัตถุดิบต่อรอบเมื่อกระจาย
+        # สูตรย่อยแล้ว recipe_id → (dict ingredient_id → ปริมาณ, ID สูตรย่อยที่ถูกลบ)
+        # ล้างเฉพาะสูตรที่ได้รับผลและสูตรที่ใช้สูตรนั้นต่อขึ้นไป
+        self._cost_cache = {}
+        self._demand_cache = {}
+        # ตัวนับ ID ถูกบันทึกไว้กับข้อมูล (next_ids) ID ของรายการล่าสุดที่ถูกลบจึงไม่ถูกใช้ซ้ำ
+        # แม้เปิดโปรแกรมใหม่ ไฟล์เก่าที่ไม่มีตัวนับเริ่มต่อจาก ID สูงสุดที่มีอยู่
+        saved = raw.get("next_ids") or {}
+        self._next_ids = {
+            "ingredients": max(self.ingredients, default=0) + 1,
+            "recipes": max(self.recipes, default=0) + 1,
+            "production_log": self.production_log.last_id + 1,
+        }
+        for kind, next_id in saved.items():
+            self._next_ids[kind] = max(self._next_ids[kind], next_id)
+        # รายการเปลี่ยนแปลงที่ยังไม่ถูกบันทึก (ใช้เขียน journal)
+        self._pending = []
+        # ฟังก์ชันที่ต้องการรับแจ้งทุกการเปลี่ยนแปลง (เช่น engine คำนวณต้นทุน)
+        self._listeners = []
+        self.engine = None
+        # ดัชนีค้นหาชื่อ (recipe_search.NameSearch) สร้างเมื่อใช้ค้นหาครั้งแรก
+        self.name_search = None
+        # ยอดใช้วัตถุดิบและจุดสั่งซื้อ (stock_alerts.StockMonitor) สร้างเมื่อใช้ครั้งแรก
+        self.stock_monitor = None
+
+    @staticmethod
+    def _table(record_type, records):
+        """สร้าง dict id → record จากรายการ dict ในไฟล์ (ตารางแบบ lazy ใช้ได้ทันที)"""
+        if isinstance(records, MutableMapping):
+            return records
+        # dict คงลำดับการเพิ่ม จึงแสดงผลเรียงเหมือนรายการเดิมในไฟล์
+        records = (record_type.from_dict(record) for record in records)
+        return {record.id: record for record in records}
+
+    def next_id(self, kind):
+        """จอง ID ถัดไปของข้อมูลประเภท kind (ไม่ใช้ ID ซ้ำแม้ลบรายการล่าสุด)"""
+        new_id = self._next_ids[kind]
+        self._next_ids[kind] = new_id + 1
+        return new_id
+
+    def id_counters(self):
+        """ตัวนับ ID ถัดไปของข้อมูลทุกประเภท (ให้ storage บันทึกไว้)"""
+        return dict(self._next_ids)
+
+    # ---------- วัตถุดิบ ----------
+
+    def get_ingredient(self, ing_id):
+        """ค้นหาวัตถุดิบจาก ID"""
+        return self.ingredients.get(ing_id)
+
+    def insert_ingredient(self, ingredient):
+        """เพิ่มวัตถุดิบใหม่จาก dict ของฟิลด์ พร้อมกำหนด ID
+
+        ประวัติราคาเริ่มที่เวลาปัจจุบัน และสต๊อคตั้งต้นเป็นล็อตแรกที่ต้นทุนเท่าราคาต่อหน่วย
+        """
+        ingredient = Ingredient(self.next_id("ingredients"), **ingredient)
+        now = _now()
+        ingredient.price_history = [[now, ingredient.price_per_unit]]
+        ingredient.lots = LotQueue([[now, ingredient.stock, ingredient.price_per_unit]])
+        self.ingredients[ingredient.id] = ingredient
+        self._invalidate_ingredient(ingredient.id)
+        self._record("put", "ingredients", record=ingredient)
+        return ingredient
+
+    def update_ingredient(self, ing_id, changed_at=None, **fields):
+        """แก้ไขฟิลด์ของวัตถุดิบ
+
+        ถ้าราคาเปลี่ยน ราคาใหม่ถูกเพิ่มต่อท้าย price_history ตั้งแต่ changed_at (ปกติคือเวลาปัจจุบัน
+        ต้องไม่ก่อนการเปลี่ยนราคาครั้งล่าสุด ถ้าเป็นเวลาเดียวกันจะแทนราคาของเวลานั้น)
+        ถ้าสต๊อคเปลี่ยน (เช่น ปรับยอดหลังตรวจนับ) ส่วนที่เพิ่มเป็นล็อตใหม่ที่ต้นทุนเท่าราคาต่อหน่วย
+        ส่วนที่ลดถูกตัดจากล็อตที่รับเข้าก่อน การรับของเข้าที่รู้ต้นทุนจริงใช้ receive_stock
+        ถ้าหน่วยเปลี่ยน บรรทัดสูตรที่ระบุหน่วยเองจะถูกแปลงปริมาณใหม่ตามหน่วยใหม่
+        """
+        ingredient = self.ingredients[ing_id]
+        price_changed = (
+            "price_per_unit" in fields
+            and fields["price_per_unit"] != ingredient.price_per_unit
+        )
+        unit_changed = "unit" in fields and fields["unit"] != ingredient.unit
+        base = ingredient.version
+        if price_changed:
+            # สร้าง list ใหม่ (ไม่แก้ list เดิม) ให้ record ที่ส่งต่อไปแล้วไม่เปลี่ยนตาม
+            history = ingredient.price_history or [["", ingredient.price_per_unit]]
+            changed_at = changed_at or _now()
+            if changed_at < history[-1][0]:
+                raise ValueError(f"ราคาใหม่ต้องไม่ก่อนการเปลี่ยนราคาครั้งล่าสุด ({history[-1][0]})")
+            if changed_at == history[-1][0]:
+                # เปลี่ยนราคาซ้ำในวินาทีเดียวกัน: ราคาล่าสุดแทนรายการเดิม (เวลาไม่ซ้ำกันในประวัติ)
+                history = history[:-1]
+            fields["price_history"] = [*history, [changed_at, fields["price_per_unit"]]]
+        if "stock" in fields:
+            lots = ingredient.lots
+            delta = fields["stock"] - ingredient.stock
+            if delta > 0:
+                price = fields.get("price_per_unit", ingredient.price_per_unit)
+                lots.receive(delta, price, changed_at or _now())
+            elif delta < 0:
+                lots.consume(-delta, ingredient.price_per_unit)
+            fields["stock"] = lots.total
+        ingredient.update(**fields)
+        ingredient.version = base + 1
+        if price_changed:
+            self._invalidate_ingredient(ing_id)
+        self._record("put", "ingredients", record=ingredient, base=base)
+        if unit_changed:
+            for recipe in self.recipes_using(ing_id):
+                if any(item.unit is not None for item in recipe.ingredients):
+                    self.update_recipe(recipe.id, ingredients=list(recipe.ingredients))
+        return ingredient
+
+    def receive_stock(self, ing_id, quantity, unit_cost=None, received_at=None):
+        """รับวัตถุดิบเข้าสต๊อคเป็นล็อตใหม่ (ต้นทุนต่อหน่วยเริ่มต้นเท่าราคาปัจจุบัน)"""
+        ingredient = self.ingredients[ing_id]
+        if unit_cost is None:
+            unit_cost = ingredient.price_per_unit
+        ingredient.lots.receive(quantity, unit_cost, received_at or _now())
+        self._stock_changed(ingredient)
+        return ingredient
+
+    def consume_stock(self, ing_id, quantity):
+        """ตัดสต๊อคจากล็อตที่รับเข้าก่อน (FIFO) คืนต้นทุนจริงของปริมาณที่ตัด
+
+        ส่วนที่เกินสต๊อค (ผู้เรียกควรตรวจก่อน) คิดที่ราคาปัจจุบัน และสต๊อคเหลือ 0
+        """
+        ingredient = self.ingredients[ing_id]
+        cost = ingredient.lots.consume(quantity, ingredient.price_per_unit)
+        self._stock_changed(ingredient)
+        return cost
+
+    def _stock_changed(self, ingredient):
+        """ตั้ง stock ตามล็อตที่เหลือ แล้วบันทึกการแก้ไขวัตถุดิบ"""
+        base = ingredient.version
+        ingredient.stock = ingredient.lots.total
+        ingredient.version = base + 1
+        self._record("put", "ingredients", record=ingredient, base=base)
+
+    def remove_ingredient(self, ing_id):
+        """ลบวัตถุดิบ"""
+        ingredient = self.ingredients.pop(ing_id)
+        self._invalidate_ingredient(ing_id)
+        self._record("delete", "ingredients", id=ing_id, base=ingredient.version)
+        return ingredient
+
+    # ---------- สูตรอาหาร ----------
+
+    def get_recipe(self, recipe_id):
+        """ค้นหาสูตรจาก ID"""
+        return self.recipes.get(recipe_id)
+
+    def insert_recipe(self, recipe):
+        """เพิ่มสูตรใหม่จาก dict ของฟิลด์ (ingredients เป็นรายการ RecipeLine) พร้อมกำหนด ID"""
+        recipe = Recipe(self.next_id("recipes"), **recipe)
+        self._resolve_units(recipe.ingredients)
+        self.recipes[recipe.id] = recipe
+        self._index_recipe(recipe)
+        self._record("put", "recipes", record=recipe)
+        return recipe
+
+    def update_recipe(self, recipe_id, **fields):
+        """แก้ไขฟิลด์ของสูตร"""
+        recipe = self.recipes[recipe_id]
+        if "ingredients" in fields:
+            self._resolve_units(fields["ingredients"])
+            self._unindex_recipe(recipe)
+        base = recipe.version
+        recipe.update(**fields)
+        recipe.version = base + 1
+        if "ingredients" in fields:
+            self._index_recipe(recipe)
+            self._invalidate_recipe(recipe_id)
+        self._record("put", "recipes", record=recipe, base=base)
+        return recipe
+
+    def remove_recipe(self, recipe_id):
+        """ลบสูตร"""
+        recipe = self.recipes.pop(recipe_id)
+        self._unindex_recipe(recipe)
+        self._invalidate_recipe(recipe_id)
+        self._record("delete", "recipes", id=recipe_id, base=recipe.version)
+        return recipe
+
+    def _resolve_units(self, lines):
+        """แปลงปริมาณของบรรทัดที่ระบุหน่วยเองเป็นหน่วยของวัตถุดิบ (ทำครั้งเดียวตอนบันทึกสูตร)"""
+        for item in lines:
+            if item.unit is None:
+                continue
+            ing = self.ingredients.get(item.ingredient_id)
+            if ing is None:
+                continue
+            factor = conversion_factor(item.unit, ing.unit)
+            if factor is None:
+                raise UnitMismatchError(item.unit, ing.unit)
+            item.quantity = item.amount * factor
+
+    def recipes_using(self, ing_id):
+        """คืนรายการสูตรที่ใช้วัตถุดิบ ID นี้โดยตรง (เรียงตาม ID สูตร)"""
+        users = self._reverse_index().get(ing_id, ())
+        return [self.recipes[r_id] for r_id in sorted(users)]
+
+    def recipes_containing(self, recipe_id):
+        """คืนรายการสูตรที่ใช้สูตร ID นี้เป็นสูตรย่อยโดยตรง (เรียงตาม ID สูตร)"""
+        self._reverse_index()
+        return [self.recipes[r_id] for r_id in sorted(self._used_in.get(recipe_id, ()))]
+
+    def ancestors(self, recipe_id):
+        """ID ของทุกสูตรที่ใช้สูตรนี้ ทั้งโดยตรงและผ่านสูตรย่อยอีกชั้น"""
+        self._reverse_index()
+        found = set()
+        stack = [recipe_id]
+        while stack:
+            for parent_id in self._used_in.get(stack.pop(), ()):
+                if parent_id not in found:
+                    found.add(parent_id)
+                    stack.append(parent_id)
+        return found
+
+    def creates_cycle(self, recipe_id, sub_id):
+        """การใส่สูตร sub_id เป็นสูตรย่อยของ recipe_id จะทำให้สูตรอ้างถึงกันเป็นวงจรหรือไม่"""
+        return sub_id == recipe_id or sub_id in self.ancestors(recipe_id)
+
+    def sub_recipes(self, recipe_id):
+        """ID ของทุกสูตรย่อยที่สูตรนี้ใช้ ทั้งโดยตรงและผ่านสูตรย่อยอีกชั้น (ที่ยังมีอยู่)"""
+        found = []
+        stack = [recipe_id]
+        while stack:
+            recipe = self.recipes.get(stack.pop())
+            for item in recipe.ingredients if recipe else ():
+                if item.recipe_id is not None and item.recipe_id not in found:
+                    if item.recipe_id in self.recipes:
+                        found.append(item.recipe_id)
+                        stack.append(item.recipe_id)
+        return found
+
+    def _reverse_index(self):
+        """ดัชนีย้อนกลับ (สร้างจากทุกสูตรในครั้งแรกที่เรียก)"""
+        if self._used_by is None:
+            self._used_by = {}
+            self._used_in = {}
+            for recipe in self.recipes.values():
+                self._index_recipe(recipe)
+        return self._used_by
+
+    def _index_recipe(self, recipe):
+        """เพิ่มวัตถุดิบและสูตรย่อยของสูตรเข้าดัชนีย้อนกลับ"""
+        if self._used_by is None:
+            return
+        for item in recipe.ingredients:
+            if item.recipe_id is not None:
+                self._used_in.setdefault(item.recipe_id, set()).add(recipe.id)
+            else:
+                self._used_by.setdefault(item.ingredient_id, set()).add(recipe.id)
+
+    def _unindex_recipe(self, recipe):
+        """นำวัตถุดิบและสูตรย่อยของสูตรออกจากดัชนีย้อนกลับ"""
+        if self._used_by is None:
+            return
+        for item in recipe.ingredients:
+            if item.recipe_id is not None:
+                index, key = self._used_in, item.recipe_id
+            else:
+                index, key = self._used_by, item.ingredient_id
+            users = index.get(key)
+            if users is not None:
+                users.discard(recipe.id)
+                if not users:
+                    del index[key]
+
+    # ---------- ต้นทุน ----------
+
+    def recipe_cost(self, recipe_id, _visiting=()):
+        """ต้นทุนรวมของสูตร รวมต้นทุนของสูตรย่อยตามจำนวนรอบที่ใช้ (ใช้ค่าจากแคชถ้ามี)
+
+        วัตถุดิบหรือสูตรย่อยที่ถูกลบไปแล้วไม่นับต้นทุน
+        """
+        cost = self._cost_cache.get(recipe_id)
+        if cost is None:
+            if recipe_id in _visiting:
+                raise RecipeCycleError(recipe_id)
+            cost = 0.0
+            for item in self.recipes[recipe_id].ingredients:
+                if item.recipe_id is not None:
+                    if item.recipe_id in self.recipes:
+                        sub_cost = self.recipe_cost(item.recipe_id, (*_visiting, recipe_id))
+                        cost += item.quantity * sub_cost
+                    continue
+                ing = self.ingredients.get(item.ingredient_id)
+                if ing:
+                    cost += item.quantity * ing.price_per_unit
+            self._cost_cache[recipe_id] = cost
+        return cost
+
+    def recipe_cost_at(self, recipe_id, when, _visiting=()):
+        """ต้นทุนของสูตรตามราคาวัตถุดิบ ณ เวลา when (ดู Ingredient.price_at)
+
+        ใช้บรรทัดสูตรปัจจุบัน (สูตรไม่ได้เก็บประวัติ) และไม่ใช้แคช
+        ใช้เวลาตามจำนวนบรรทัด × log(จำนวนครั้งที่ราคาเปลี่ยน)
+        """
+        if recipe_id in _visiting:
+            raise RecipeCycleError(recipe_id)
+        cost = 0.0
+        for item in self.recipes[recipe_id].ingredients:
+            if item.recipe_id is not None:
+                if item.recipe_id in self.recipes:
+                    sub_cost = self.recipe_cost_at(item.recipe_id, when, (*_visiting, recipe_id))
+                    cost += item.quantity * sub_cost
+                continue
+            ing = self.ingredients.get(item.ingredient_id)
+            if ing:
+                cost += item.quantity * ing.price_at(when)
+        return cost
+
+    def recipe_demand(self, recipe_id, _visiting=()):
+        """ปริมาณวัตถุดิบต่อหนึ่งรอบของสูตร เมื่อกระจายสูตรย่อยทุกชั้นเป็นวัตถุดิบแล้ว
+
+        คืน (dict ingredient_id → ปริมาณ เรียงตามลำดับบรรทัดในสูตร, tuple ID สูตรย่อยที่ถูกลบ)
+        วัตถุดิบที่ถูกลบไปแล้วยังอยู่ใน dict ผู้เรียกต้องตรวจเอง (ใช้ค่าจากแคชถ้ามี)
+        """
+        result = self._demand_cache.get(recipe_id)
+        if result is None:
+            if recipe_id in _visiting:
+                raise RecipeCycleError(recipe_id)
+            demand = {}
+            missing = []
+            for item in self.recipes[recipe_id].ingredients:
+                if item.recipe_id is None:
+                    demand[item.ingredient_id] = demand.get(item.ingredient_id, 0.0) + item.quantity
+                elif item.recipe_id not in self.recipes:
+                    missing.append(item.recipe_id)
+                else:
+                    sub_demand, sub_missing = self.recipe_demand(
+                        item.recipe_id, (*_visiting, recipe_id)
+                    )
+                    for ing_id, qty in sub_demand.items():
+                        demand[ing_id] = demand.get(ing_id, 0.0) + qty * item.quantity
+                    missing.extend(sub_missing)
+            result = self._demand_cache[recipe_id] = (demand, tuple(missing))
+        return result
+
+    def _invalidate_ingredient(self, ing_id):
+        """ล้างแคชต้นทุนของสูตรที่ใช้วัตถุดิบนี้ และสูตรที่ใช้สูตรเหล่านั้นต่อขึ้นไป"""
+        if not self._cost_cache:
+            return
+        users = self._reverse_index().get(ing_id, ())
+        affected = set(users)
+        for recipe_id in users:
+            affected |= self.ancestors(recipe_id)
+        for recipe_id in affected:
+            self._cost_cache.pop(recipe_id, None)
+
+    def _invalidate_recipe(self, recipe_id):
+        """ล้างแคชของสูตรที่บรรทัดเปลี่ยน/ถูกลบ และสูตรที่ใช้สูตรนี้ต่อขึ้นไป"""
+        if not self._cost_cache and not self._demand_cache:
+            return
+        for affected in (recipe_id, *self.ancestors(recipe_id)):
+            self._cost_cache.pop(affected, None)
+            self._demand_cache.pop(affected, None)
+
+    # ---------- ประวัติการผลิต ----------
+
+    def append_log(self, entry):
+        """เพิ่มประวัติการผลิตจาก dict ของฟิลด์ พร้อมกำหนด ID"""
+        entry = LogEntry(self.next_id("production_log"), **entry)
+        self.production_log.append(entry)
+        self._record("append", "production_log", record=entry)
+        return entry
+
+    # ---------- บันทึกการเปลี่ยนแปลง ----------
+
+    def subscribe(self, listener):
+        """ลงทะเบียน listener(change) ให้ถูกเรียกหลังข้อมูลเปลี่ยนทุกครั้ง"""
+        self._listeners.append(listener)
+
+    def _record(self, op, kind, base=None, **payload):
+        """เก็บรายการเปลี่ยนแปลงไว้รอเขียนลง journal และแจ้ง listener
+
+        base คือ version ของ record ก่อนแก้ไข (None เมื่อเป็น record ใหม่)
+        ใช้ตรวจตอนบันทึกว่าไม่มีโปรแกรมอื่นแก้ record เดียวกันไปก่อน
+        """
+        change = {"op": op, "kind": kind, **payload}
+        if base is not None:
+            change["base"] = base
+        self._pending.append(change)
+        self._notify(change)
+
+    def _notify(self, change):
+        """แจ้ง listener ทุกตัวถึงการเปลี่ยนแปลง"""
+        for listener in self._listeners:
+            listener(change)
+
+    def version_of(self, kind, record_id):
+        """version ปัจจุบันของ record (None ถ้าไม่มี) ประวัติการผลิตไม่มี version ถือเป็น 0"""
+        if kind == "production_log":
+            return 0 if record_id < self._next_ids[kind] else None
+        record = getattr(self, kind).get(record_id)
+        return None if record is None else record.version
+
+    def reset(self, other):
+        """แทนที่ข้อมูลทั้งหมดด้วย store ที่โหลดใหม่ โดยคง listener, engine, ดัชนีค้นหา
+        และตัวติดตามสต๊อคเดิมไว้ (ทั้งหมดสร้างข้อมูลใหม่เองเมื่อได้รับแจ้ง "reload")"""
+        kept = (self._listeners, self.engine, self.name_search, self.stock_monitor)
+        self.__dict__.update(other.__dict__)
+        self._listeners, self.engine, self.name_search, self.stock_monitor = kept
+        self._notify({"op": "reload", "kind": None})
+
+    def take_changes(self):
+        """คืนรายการเปลี่ยนแปลงที่ค้างอยู่ แล้วล้างรายการ"""
+        changes, self._pending = self._pending, []
+        return changes
+
+    def change_mark(self):
+        """จำนวนรายการเปลี่ยนแปลงที่ค้างอยู่ (เทียบก่อน/หลังเพื่อดูว่ามีการแก้ไขข้อมูลหรือไม่)"""
+        return len(self._pending)
+
+    def apply_change(self, change):
+        """นำรายการเปลี่ยนแปลงจาก journal มาใช้กับข้อมูล (ไม่บันทึกซ้ำ)
+
+        record ใน journal เป็น dict ตามโครงสร้างไฟล์ จะถูกแปลงเป็น Record ก่อนใช้
+        """
+        if change["op"] == "batch":
+            for sub_change in change["changes"]:
+                self.apply_change(sub_change)
+            return
+        op, kind = change["op"], change["kind"]
+        if op != "delete" and isinstance(change["record"], dict):
+            change = {**change, "record": RECORD_TYPES[kind].from_dict(change["record"])}
+        record_id = change["id"] if op == "delete" else change["record"].id
+        if kind == "recipes" and record_id in self.recipes:
+            self._unindex_recipe(self.recipes[record_id])
+        if kind == "recipes":
+            self._invalidate_recipe(record_id)
+        elif kind == "ingredients":
+            self._invalidate_ingredient(record_id)
+        if record_id >= self._next_ids[kind]:
+            # ID นี้ถูกใช้แล้ว (แม้จะถูกลบไปแล้วก็ตาม) ห้ามใช้ซ้ำ
+            self._next_ids[kind] = record_id + 1
+        elif op == "append":
+            # บันทึกนี้อยู่ใน snapshot แล้ว (เช่น compact ค้างกลางทาง)
+            return
+        if op == "delete":
+            getattr(self, kind).pop(record_id, None)
+            self._notify(change)
+            return
+        record = change["record"]
+        if op == "append":
+            self.production_log.append(record)
+        else:
+            getattr(self, kind)[record.id] = record
+            if kind == "recipes":
+                self._index_recipe(record)
+        self._notify(change)
+
+    # ---------- แปลงกลับเป็นโครงสร้างไฟล์ ----------
+
+    def to_dict(self, include_log=True):
+        """แปลงเป็น dict ตามโครงสร้าง recipe_data.json เดิม
+
+        include_log=False ใช้เมื่อประวัติการผลิตถูกเก็บแยกเป็นไฟล์รายเดือน
+        """
+        data = {
+            "ingredients": [ing.to_dict() for ing in self.ingredients.values()],
+            "recipes": [recipe.to_dict() for recipe in self.recipes.values()],
+            "next_ids": self.id_counters(),
+        }
+        if include_log:
+            data["production_log"] = [entry.to_dict() for entry in self.production_log]
+        return data
@@ -0,0 +1,98 @@
+"""ทะเบียนหน่วยวัด: ตรวจมิติของหน่วยและแปลงปริมาณระหว่างหน่วย
+
+หน่วยที่รู้จักแบ่งเป็นมิติ (น้ำหนัก ปริมาตร จำนวนนับ) แต่ละหน่วยมีตัวคูณเทียบกับ
+หน่วยฐานของมิติ ตารางตัวคูณทุกคู่ (รวมชื่อเรียกอื่น) ถูกคำนวณไว้ครั้งเดียวตอน import
+หน่วยที่ไม่รู้จักถือเป็นมิติของตัวเอง แปลงได้เฉพาะกับหน่วยที่เขียนเหมือนกัน
+
+บรรทัดสูตรที่ระบุหน่วยเองถูกแปลงเป็นหน่วยของวัตถุดิบครั้งเดียวตอนบันทึกสูตร
+(RecipeStore) การคำนวณต้นทุนและตัดสต๊อคจึงใช้ปริมาณที่แปลงแล้วได้ทันที
+"""
+
+import re
+
+# มิติ → ชื่อที่แสดงให้ผู้ใช้
+DIMENSIONS = {"mass": "น้ำหนัก", "volume": "ปริมาตร", "count": "จำนวนนับ"}
+
+# หน่วย → (มิติ, ตัวคูณเทียบหน่วยฐาน, ชื่อเรียกอื่น)
+UNITS = {
+    "กรัม": ("mass", 1.0, ("ก.", "g", "gram", "grams")),
+    "กก.": ("mass", 1000.0, ("กิโลกรัม", "กิโล", "kg", "kilogram")),
+    "มก.": ("mass", 0.001, ("มิลลิกรัม", "mg")),
+    "ขีด": ("mass", 100.0, ()),
+    "ปอนด์": ("mass", 453.59237, ("lb", "lbs")),
+    "ออนซ์": ("mass", 28.349523125, ("oz",)),
+    "มล.": ("volume", 1.0, ("มิลลิลิตร", "ซีซี", "ml", "cc")),
+    "ลิตร": ("volume", 1000.0, ("ล.", "l", "liter", "litre")),
+    "ช้อนชา": ("volume", 5.0, ("ชช.", "tsp")),
+    "ช้อนโต๊ะ": ("volume", 15.0, ("ชต.", "tbsp")),
+    "ถ้วย": ("volume", 240.0, ("ถ้วยตวง", "cup")),
+    # หน่วยนับถือว่าเท่ากันทีละหนึ่ง (ชิ้น/ฟอง/ลูก/อัน)
+    "ชิ้น": ("count", 1.0, ("pcs", "piece")),
+    "ฟอง": ("count", 1.0, ()),
+    "ลูก": ("count", 1.0, ()),
+    "อัน": ("count", 1.0, ()),
+    "โหล": ("count", 12.0, ("dozen",)),
+}
+
+# ชื่อเรียกทุกแบบ (ตัวพิมพ์เล็ก) → ชื่อหน่วยหลัก
+ALIASES = {
+    alias.lower(): unit
+    for unit, (_, _, aliases) in UNITS.items()
+    for alias in (unit, *aliases)
+}
+
+# ตัวคูณของทุกคู่หน่วยในมิติเดียวกัน (from, to) → ตัวคูณ
+FACTORS = {
+    (a, b): UNITS[a][1] / UNITS[b][1]
+    for a in UNITS
+    for b in UNITS
+    if UNITS[a][0] == UNITS[b][0]
+}
+
+_AMOUNT = re.compile(r"^\s*([-+]?\d+(?:\.\d*)?|[-+]?\.\d+)\s*(.*?)\s*$")
+
+
+class UnitMismatchError(ValueError):
+    """แปลงหน่วยข้ามมิติไม่ได้ (ปกติถูกกันไว้ตอนตรวจข้อมูลก่อนบันทึก)"""
+
+    def __init__(self, from_unit, to_unit):
+        super().__init__(f"แปลงหน่วย '{from_unit}' เป็น '{to_unit}' ไม่ได้")
+        self.from_unit = from_unit
+        self.to_unit = to_unit
+
+
+def canonical_unit(unit):
+    """ชื่อหน่วยหลักของหน่วยที่รู้จัก (หน่วยที่ไม่รู้จักคืนข้อความเดิมที่ตัดช่องว่างแล้ว)"""
+    unit = unit.strip()
+    return ALIASES.get(unit.lower(), unit)
+
+
+def dimension(unit):
+    """มิติของหน่วย (None ถ้าไม่รู้จัก)"""
+    known = UNITS.get(canonical_unit(unit))
+    return known[0] if known else None
+
+
+def conversion_factor(from_unit, to_unit):
+    """ตัวคูณที่แปลงปริมาณจาก from_unit เป็น to_unit (None ถ้าแปลงไม่ได้)"""
+    a, b = canonical_unit(from_unit), canonical_unit(to_unit)
+    if a == b:
+        return 1.0
+    return FACTORS.get((a, b))
+
+
+def mismatch_message(from_unit, to_unit):
+    """ข้อความแจ้งว่าแปลงหน่วยไม่ได้ พร้อมมิติของแต่ละหน่วย"""
+    def describe(unit):
+        dim = dimension(unit)
+        return f"'{unit}' ({DIMENSIONS[dim]})" if dim else f"'{unit}'"
+
+    return f"แปลงหน่วย {describe(from_unit)} เป็น {describe(to_unit)} ไม่ได้"
+
+
+def parse_amount(text):
+    """แยกข้อความเช่น "250 กรัม" เป็น (ปริมาณ, หน่วย) หน่วยเป็น None ถ้าไม่ได้ระบุ"""
+    match = _AMOUNT.match(text)
+    if not match:
+        raise ValueError(f"จำนวนไม่ถูกต้อง: {text}")
+    return float(match.group(1)), match.group(2) or None
@@ -0,0 +1,145 @@
+"""แจ้งเตือนวัตถุดิบใกล้หมด และคำนวณจุดสั่งซื้อ (reorder point) จากประวัติการผลิต
+
+ปริมาณที่ใช้ของแต่ละวัตถุดิบคิดจากประวัติการผลิต × ปริมาณวัตถุดิบต่อรอบของสูตร
+(กระจายสูตรย่อยแล้ว) เก็บเป็นยอดรายวันเฉพาะช่วง WINDOW_DAYS วันล่าสุด พร้อมผลรวม
+และผลรวมกำลังสองของยอดรายวันต่อวัตถุดิบ ประวัติใหม่หนึ่งรายการจึงอัปเดตเฉพาะวัตถุดิบ
+ในสูตรนั้น และเมื่อวันเลื่อนไปจะลบเฉพาะยอดของวันที่หลุดช่วง (ไม่ต้องอ่านประวัติทั้งหมด)
+
+    อัตราใช้ต่อวัน      = ยอดใช้ในช่วง / WINDOW_DAYS
+    จุดสั่งซื้อ         = อัตราใช้ × LEAD_TIME_DAYS + SERVICE_Z × ส่วนเบี่ยงเบนรายวัน × √LEAD_TIME_DAYS
+    ปริมาณแนะนำให้สั่ง = จุดสั่งซื้อ + อัตราใช้ × REVIEW_DAYS − สต๊อคปัจจุบัน
+
+ประวัติที่บันทึกแล้วคิดตามสูตร ณ ตอนที่เพิ่มประวัติ (ตอนเปิดโปรแกรมคิดตามสูตรปัจจุบัน)
+"""
+
+import math
+from bisect import insort
+from datetime import date, datetime, timedelta
+
+# จำนวนวันย้อนหลังที่ใช้คิดอัตราใช้
+WINDOW_DAYS = 28
+# จำนวนวันตั้งแต่สั่งจนของมาถึง
+LEAD_TIME_DAYS = 3
+# จำนวนวันที่ของที่สั่งแต่ละครั้งควรพอใช้ (รอบการสั่ง)
+REVIEW_DAYS = 7
+# ค่า z ของระดับบริการ (1.65 ≈ ไม่ขาดสต๊อคระหว่างรอของ 95%)
+SERVICE_Z = 1.65
+
+
+def _day(value):
+    """แปลงวันที่ (date หรือข้อความ YYYY-MM-DD) เป็น date"""
+    if value is None:
+        return datetime.now().date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value[:10], "%Y-%m-%d").date()
+
+
+class StockMonitor:
+    """ยอดใช้วัตถุดิบรายวันในช่วงล่าสุดของ RecipeStore ที่อัปเดตตามประวัติการผลิตที่เพิ่ม"""
+
+    def __init__(self, store, window_days=WINDOW_DAYS, today=None):
+        self.store = store
+        self.window_days = window_days
+        self._build(today)
+        store.subscribe(self._on_change)
+
+    # ---------- สร้าง/อัปเดต ----------
+
+    def _build(self, today=None):
+        """คิดยอดรายวันจากประวัติในช่วงล่าสุด (อ่านเฉพาะประวัติตั้งแต่วันแรกของช่วง)"""
+        self._start = (_day(today) - timedelta(days=self.window_days - 1)).isoformat()
+        # วัน → {ingredient_id → ปริมาณที่ใช้}
+        self._daily = {}
+        self._days = []
+        self._sum = {}
+        self._sumsq = {}
+        for entry in self.store.production_log.between(self._start):
+            self._add(entry)
+
+    def _on_change(self, change):
+        """อัปเดตตามรายการเปลี่ยนแปลงของ store"""
+        if change["op"] == "reload":
+            self._build()
+        elif change["kind"] == "production_log":
+            if change["op"] == "append":
+                self._add(change["record"])
+            else:
+                self._build()
+
+    def _add(self, entry):
+        """บวกปริมาณวัตถุดิบของประวัติหนึ่งรายการเข้ายอดของวันนั้น"""
+        day = entry.date[:10]
+        if day < self._start or entry.recipe_id not in self.store.recipes:
+            return
+        bucket = self._daily.get(day)
+        if bucket is None:
+            bucket = self._daily[day] = {}
+            insort(self._days, day)
+        demand, _ = self.store.recipe_demand(entry.recipe_id)
+        for ing_id, qty in demand.items():
+            used = qty * entry.batches
+            old = bucket.get(ing_id, 0.0)
+            bucket[ing_id] = old + used
+            self._sum[ing_id] = self._sum.get(ing_id, 0.0) + used
+            self._sumsq[ing_id] = self._sumsq.get(ing_id, 0.0) + (old + used) ** 2 - old ** 2
+
+    def advance(self, today=None):
+        """เลื่อนช่วงให้สิ้นสุดที่ today และลบยอดของวันที่หลุดช่วง"""
+        start = (_day(today) - timedelta(days=self.window_days - 1)).isoformat()
+        if start < self._start:
+            # ย้อนเวลา (นาฬิกาเครื่องถอยหลัง) ต้องอ่านประวัติช่วงก่อนหน้าใหม่
+            self._build(today)
+            return
+        self._start = start
+        expired = 0
+        while expired < len(self._days) and self._days[expired] < start:
+            for ing_id, used in self._daily.pop(self._days[expired]).items():
+                self._sum[ing_id] -= used
+                self._sumsq[ing_id] -= used ** 2
+            expired += 1
+        del self._days[:expired]
+
+    # ---------- ผลลัพธ์ ----------
+
+    def daily_usage(self, ing_id):
+        """(อัตราใช้เฉลี่ยต่อวัน, ส่วนเบี่ยงเบนมาตรฐานของยอดรายวัน) ในช่วงล่าสุด"""
+        total = max(self._sum.get(ing_id, 0.0), 0.0)
+        mean = total / self.window_days
+        variance = self._sumsq.get(ing_id, 0.0) / self.window_days - mean ** 2
+        return mean, math.sqrt(max(variance, 0.0))
+
+    def status(self, ingredient):
+        """สถานะสต๊อคของวัตถุดิบหนึ่งรายการ (dict) ตามอัตราใช้ในช่วงล่าสุด"""
+        rate, spread = self.daily_usage(ingredient.id)
+        reorder_point = rate * LEAD_TIME_DAYS + SERVICE_Z * spread * math.sqrt(LEAD_TIME_DAYS)
+        target = reorder_point + rate * REVIEW_DAYS
+        return {
+            "ingredient_id": ingredient.id,
+            "name": ingredient.name,
+            "unit": ingredient.unit,
+            "stock": ingredient.stock,
+            "daily_usage": round(rate, 4),
+            "days_left": round(ingredient.stock / rate, 1) if rate > 0 else None,
+            "reorder_point": round(reorder_point, 2),
+            "suggested_quantity": round(max(target - ingredient.stock, 0.0), 2),
+        }
+
+    def alerts(self, today=None, ing_ids=None):
+        """วัตถุดิบที่สต๊อคถึงจุดสั่งซื้อแล้ว เรียงจากที่จะหมดก่อน
+
+        ing_ids จำกัดเฉพาะวัตถุดิบที่สนใจ (เช่น วัตถุดิบที่เพิ่งถูกตัดสต๊อค)
+        """
+        self.advance(today)
+        if ing_ids is None:
+            ing_ids = [ing_id for ing_id, total in self._sum.items() if total > 0]
+        result = []
+        for ing_id in ing_ids:
+            ingredient = self.store.ingredients.get(ing_id)
+            if ingredient is None:
+                continue
+            status = self.status(ingredient)
+            if status["daily_usage"] > 0 and ingredient.stock <= status["reorder_point"]:
+                result.append(status)
+        result.sort(key=lambda status: (status["days_left"], status["ingredient_id"]))
+        return result
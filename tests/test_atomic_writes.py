@@ -0,0 +1,69 @@
+"""ทดสอบการเขียนไฟล์ที่ทนต่อการหยุดกลางคันและระดับ durability"""
+
+import os
+
+import pytest
+
+import recipe_storage
+from recipe_storage import JsonStorage, SqliteStorage
+
+
+def make_storage(tmp_path, **kwargs):
+    storage = JsonStorage(str(tmp_path / "recipe_data.json"), **kwargs)
+    data = storage.load()
+    data.insert_ingredient({"name": "แป้ง", "unit": "กก.", "price_per_unit": 20.0, "stock": 1.0})
+    storage.save(data)
+    storage.compact(data)
+    return storage, data
+
+
+def test_failed_snapshot_keeps_old_file(tmp_path, monkeypatch):
+    storage, data = make_storage(tmp_path)
+    with open(storage.data_file, "rb") as f:
+        before = f.read()
+
+    def broken_dump(obj, f, **kwargs):
+        f.write('{"ingredients": [')
+        raise OSError("disk full")
+
+    data.update_ingredient(1, name="แป้งสาลี")
+    monkeypatch.setattr(recipe_storage.json, "dump", broken_dump)
+    with pytest.raises(OSError):
+        storage.write_snapshot(data)
+
+    with open(storage.data_file, "rb") as f:
+        assert f.read() == before
+    assert not os.path.exists(storage.data_file + ".tmp")
+
+
+@pytest.mark.parametrize("durability, journal_syncs", [("off", 0), ("normal", 0), ("full", 1)])
+def test_journal_fsync_by_durability(tmp_path, monkeypatch, durability, journal_syncs):
+    storage, data = make_storage(tmp_path, durability=durability)
+    synced = []
+    monkeypatch.setattr(recipe_storage.os, "fsync", synced.append)
+    monkeypatch.setattr(recipe_storage, "_fsync_dir", lambda path: None)
+    data.receive_stock(1, 1.0)
+    storage.save(data)
+    assert len(synced) == journal_syncs
+
+    synced.clear()
+    storage.compact(data)
+    # snapshot และ index ของประวัติ fsync ทุกระดับยกเว้น off
+    assert bool(synced) == (durability != "off")
+
+
+def test_unknown_durability_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        JsonStorage(str(tmp_path / "recipe_data.json"), durability="fast")
+    with pytest.raises(ValueError):
+        SqliteStorage(str(tmp_path / "recipes.db"), durability="fast")
+
+
+def test_torn_segment_line_skipped(tmp_path):
+    path = str(tmp_path / "2024-01.jsonl")
+    with open(path, "wb") as f:
+        f.write(b'{"id": 1, "recipe_id": 1, "recipe_name": "x", "batches": 1, "total_servings": 1, '
+                b'"total_cost": 1.0, "date": "2024-01-01 00:00:00"}\n{"id": 2, "reci')
+    recipe_storage._append_lines(path, b'{"id": 3, "recipe_id": 1, "recipe_name": "x", "batches": 1, '
+                                       b'"total_servings": 1, "total_cost": 1.0, "date": "2024-01-02 00:00:00"}\n')
+    assert [e.id for e in recipe_storage._read_segment_file(path, last_id=3)] == [1, 3]
@@ -0,0 +1,46 @@
+"""ทดสอบชุดวัดความเร็วแบบย่อ: ข้อมูลสังเคราะห์ ทุก scenario และการเทียบ baseline"""
+
+import json
+import os
+
+import pytest
+
+import recipe_management as rm
+from recipe_store import RecipeStore
+
+BENCH_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+TINY = ["--ingredients", "12", "--recipes", "5", "--lines", "3", "--log", "40", "--repeat", "1"]
+
+
+@pytest.fixture
+def bench(monkeypatch):
+    monkeypatch.syspath_prepend(BENCH_DIR)
+    # run_suite ตั้ง storage ของ recipe_management เอง คืนค่าเดิมหลังทดสอบ
+    monkeypatch.setattr(rm, "storage", None)
+    import bench_suite
+    return bench_suite
+
+
+def test_synthetic_data_is_deterministic(bench):
+    from bench_storage import make_raw_data
+
+    raw = make_raw_data(40, seed=7, num_ingredients=12, num_recipes=5, lines_per_recipe=3)
+    assert raw == make_raw_data(40, seed=7, num_ingredients=12, num_recipes=5, lines_per_recipe=3)
+    assert raw != make_raw_data(40, seed=8, num_ingredients=12, num_recipes=5, lines_per_recipe=3)
+    store = RecipeStore(raw)
+    assert (len(store.ingredients), len(store.recipes), len(store.production_log)) == (12, 5, 40)
+    assert all(len(recipe.ingredients) == 3 for recipe in store.recipes.values())
+
+
+@pytest.mark.parametrize("backend", ["json", "lines", "sqlite"])
+def test_suite_runs_every_scenario(bench, tmp_path, backend):
+    baseline = str(tmp_path / "baseline.json")
+    assert bench.main(TINY + ["--backend", backend, "--save-baseline", baseline]) == 0
+    with open(baseline, encoding="utf-8") as f:
+        saved = json.load(f)
+    assert set(saved["results"]) == set(bench.SCENARIOS)
+    assert saved["config"]["log"] == 40
+
+    # เกณฑ์ติดลบทำให้ทุก scenario ถือว่าถดถอย
+    assert bench.main(TINY + ["--backend", backend, "--only", "load", "--compare", baseline,
+                              "--threshold", "-1"]) == 1
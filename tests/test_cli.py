@@ -0,0 +1,120 @@
+"""ทดสอบโหมดคำสั่ง recipe_cli"""
+
+import io
+
+import recipe_cli
+import recipe_management as rm
+from recipe_store import RecipeStore
+
+
+def make_storage(tmp_path, monkeypatch):
+    """storage แบบ JSON ในโฟลเดอร์ชั่วคราว มีวัตถุดิบ ID 1 สต๊อค 10"""
+    monkeypatch.chdir(tmp_path)
+    storage = rm.create_storage("json")
+    store = RecipeStore()
+    store.insert_ingredient({"name": "แป้ง", "unit": "กก.", "price_per_unit": 20.0, "stock": 10.0})
+    storage.compact(store)
+    monkeypatch.setattr(rm, "storage", storage)
+    return storage
+
+
+def race_first_save(storage, monkeypatch):
+    """ให้โปรแกรมอื่นเพิ่มสต๊อค 100 ก่อนการบันทึกครั้งแรก (การบันทึกนั้นจะชนกัน)"""
+    original = storage.save
+    calls = []
+
+    def save(store):
+        if not calls:
+            other = rm.create_storage("json")
+            other_data = other.load()
+            other_data.update_ingredient(1, stock=other_data.ingredients[1].stock + 100)
+            other.save(other_data)
+        calls.append(store)
+        return original(store)
+
+    monkeypatch.setattr(storage, "save", save)
+    return calls
+
+
+def test_restock_retries_rows_after_stale_save(tmp_path, monkeypatch):
+    storage = make_storage(tmp_path, monkeypatch)
+    calls = race_first_save(storage, monkeypatch)
+    (tmp_path / "deliveries.csv").write_text("ingredient_id,quantity\n1,5\n", encoding="utf-8")
+
+    assert recipe_cli.main(["restock", "deliveries.csv"]) == 0
+
+    assert len(calls) == 2
+    assert rm.create_storage("json").load().ingredients[1].stock == 115
+
+
+def test_stale_save_from_stdin_fails(tmp_path, monkeypatch):
+    storage = make_storage(tmp_path, monkeypatch)
+    race_first_save(storage, monkeypatch)
+    monkeypatch.setattr("sys.stdin", io.StringIO("ingredient_id,quantity\n1,5\n"))
+
+    assert recipe_cli.main(["restock", "-", "--format", "csv"]) == 1
+
+    assert rm.create_storage("json").load().ingredients[1].stock == 110
+
+
+def test_import_ingredient_unknown_id_rejected():
+    data = RecipeStore()
+    data.insert_ingredient({"name": "แป้ง", "unit": "กก.", "price_per_unit": 20.0, "stock": 1.0})
+    names = recipe_cli.NameIndex(data)
+    row = {"id": "99", "name": "น้ำตาล", "unit": "กก.", "price_per_unit": "30"}
+
+    assert recipe_cli.import_ingredient(data, names, row) == "ไม่พบวัตถุดิบ ID 99"
+    assert list(data.ingredients) == [1]
+
+    row = {"id": "1", "name": "แป้งสาลี"}
+    assert recipe_cli.import_ingredient(data, names, row) is None
+    assert data.ingredients[1].name == "แป้งสาลี"
+
+
+def write_file(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_import_files(tmp_path, monkeypatch, capsys):
+    make_storage(tmp_path, monkeypatch)
+    ingredients = write_file(tmp_path, "ing.csv", (
+        "name,unit,price_per_unit,stock\n"
+        "แป้ง,กก.,25,\n"
+        "ไข่,ฟอง,4,30\n"
+    ))
+    recipes = write_file(tmp_path, "recipes.csv", (
+        "name,servings,ingredient_name,recipe_name,quantity,unit\n"
+        "แป้งโด,1,แป้ง,,500,กรัม\n"
+        "แป้งโด,1,ไข่,,2,\n"
+        "ขนมปัง,8,,แป้งโด,2,\n"
+    ))
+    assert recipe_cli.main(["import-ingredients", ingredients]) == 0
+    assert recipe_cli.main(["import-recipes", recipes]) == 0
+
+    data = rm.create_storage("json").load()
+    assert [(i.name, i.price_per_unit, i.stock) for i in data.ingredients.values()] == [
+        ("แป้ง", 25.0, 10.0), ("ไข่", 4.0, 30.0),
+    ]
+    assert data.recipes[1].ingredients[0].quantity == 0.5
+    assert data.recipe_cost(2) == 2 * (0.5 * 25 + 2 * 4)
+
+    capsys.readouterr()
+    assert recipe_cli.main(["report", "costs", "--format", "jsonl"]) == 0
+    assert "ขนมปัง" in capsys.readouterr().out
+
+
+def test_invalid_row_aborts_unless_skipped(tmp_path, monkeypatch, capsys):
+    make_storage(tmp_path, monkeypatch)
+    rows = write_file(tmp_path, "ing.jsonl", (
+        '{"name": "น้ำตาล", "unit": "กก.", "price_per_unit": 30}\n'
+        '{"name": "เกลือ", "unit": "กก.", "price_per_unit": -1}\n'
+    ))
+    assert recipe_cli.main(["import-ingredients", rows]) == 1
+    assert "บรรทัด 2" in capsys.readouterr().err
+    assert len(rm.create_storage("json").load().ingredients) == 1
+
+    assert recipe_cli.main(["import-ingredients", rows, "--skip-invalid"]) == 0
+    names = [i.name for i in rm.create_storage("json").load().ingredients.values()]
+    assert names == ["แป้ง", "น้ำตาล"]
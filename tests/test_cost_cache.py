@@ -0,0 +1,51 @@
+"""ทดสอบแคชต้นทุนสูตรกับการล้างแคชเฉพาะสูตรที่ได้รับผล"""
+
+from recipe_records import RecipeLine
+from recipe_store import RecipeStore
+
+
+def make_store():
+    store = RecipeStore()
+    store.insert_ingredient({"name": "แป้ง", "unit": "กก.", "price_per_unit": 20.0, "stock": 0.0})
+    store.insert_ingredient({"name": "น้ำตาล", "unit": "กก.", "price_per_unit": 30.0, "stock": 0.0})
+    store.insert_recipe({"name": "ขนมปัง", "servings": 1, "ingredients": [RecipeLine(1, 2.0)]})
+    store.insert_recipe({"name": "ลูกอม", "servings": 1, "ingredients": [RecipeLine(2, 1.0)]})
+    return store
+
+
+def test_price_edit_invalidates_only_users():
+    store = make_store()
+    assert (store.recipe_cost(1), store.recipe_cost(2)) == (40.0, 30.0)
+
+    store.update_ingredient(1, changed_at="2999-01-01 00:00:00", price_per_unit=25.0)
+    assert 1 not in store._cost_cache
+    assert store._cost_cache[2] == 30.0
+    assert store.recipe_cost(1) == 50.0
+
+
+def test_stock_edit_keeps_cache():
+    store = make_store()
+    store.recipe_cost(1)
+    store.receive_stock(1, 5.0)
+    store.update_ingredient(1, stock=2.0)
+    assert store._cost_cache[1] == 40.0
+
+
+def test_recipe_edit_and_delete_invalidate():
+    store = make_store()
+    store.recipe_cost(1)
+    store.update_recipe(1, ingredients=[RecipeLine(1, 1.0), RecipeLine(2, 1.0)])
+    assert store.recipe_cost(1) == 50.0
+
+    store.remove_ingredient(2)
+    assert store.recipe_cost(1) == 20.0
+
+
+def test_applied_price_change_invalidates():
+    store = make_store()
+    other = RecipeStore(store.to_dict())
+    store.recipe_cost(1)
+    other.update_ingredient(1, changed_at="2999-01-01 00:00:00", price_per_unit=10.0)
+    for change in other.take_changes():
+        store.apply_change(change)
+    assert store.recipe_cost(1) == 20.0
@@ -0,0 +1,63 @@
+"""ทดสอบว่า CostEngine (NumPy) ให้ผลเหมือนการคำนวณทีละสูตร"""
+
+import random
+
+import pytest
+
+import recipe_management as rm
+from recipe_records import RecipeLine
+from recipe_store import RecipeStore
+
+recipe_engine = pytest.importorskip("recipe_engine")
+
+
+def make_store(seed=1):
+    rng = random.Random(seed)
+    store = RecipeStore()
+    for i in range(20):
+        store.insert_ingredient({
+            "name": f"วัตถุดิบ {i}", "unit": "กก.",
+            "price_per_unit": rng.uniform(1, 50), "stock": rng.uniform(0, 40),
+        })
+    for i in range(30):
+        lines = [RecipeLine(rng.randint(1, 20), rng.uniform(0.1, 5)) for _ in range(rng.randint(1, 5))]
+        if i >= 5 and rng.random() < 0.4:
+            lines.append(RecipeLine(None, rng.randint(1, 3), rng.randint(1, i)))
+        store.insert_recipe({"name": f"สูตร {i}", "servings": 1, "ingredients": lines})
+    return store
+
+
+def assert_matches(store, engine):
+    costs = engine.recipe_costs()
+    assert sorted(costs) == sorted(store.recipes)
+    for recipe_id, cost in costs.items():
+        assert cost == pytest.approx(store.recipe_cost(recipe_id))
+    assert engine.producibility() == {
+        recipe_id: rm.max_producible(store, recipe) for recipe_id, recipe in store.recipes.items()
+    }
+
+
+def test_engine_matches_per_recipe():
+    store = make_store()
+    assert_matches(store, recipe_engine.CostEngine(store))
+
+
+def test_engine_follows_edits():
+    store = make_store()
+    engine = recipe_engine.CostEngine(store)
+    store.update_ingredient(3, changed_at="2999-01-01 00:00:00", price_per_unit=99.0)
+    store.consume_stock(4, 1.0)
+    store.receive_stock(5, 10.0)
+    store.update_recipe(6, ingredients=[RecipeLine(7, 2.0), RecipeLine(None, 1, 2)])
+    store.update_recipe(2, ingredients=[RecipeLine(8, 0.5)])
+    store.remove_ingredient(9)
+    store.remove_recipe(1)
+    store.insert_recipe({"name": "ใหม่", "servings": 1, "ingredients": [RecipeLine(10, 1.0)]})
+    assert_matches(store, engine)
+
+
+def test_engine_rebuilds_on_reload():
+    store = make_store()
+    engine = recipe_engine.CostEngine(store)
+    store.reset(make_store(seed=2))
+    assert_matches(store, engine)
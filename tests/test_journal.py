@@ -0,0 +1,68 @@
+"""ทดสอบการบันทึกแบบ journal ต่อท้ายและการรวมเข้า snapshot"""
+
+import os
+
+from recipe_storage import JsonStorage
+
+
+def make_storage(tmp_path, **kwargs):
+    return JsonStorage(str(tmp_path / "recipe_data.json"), **kwargs)
+
+
+def add_flour(storage):
+    data = storage.load()
+    ing = data.insert_ingredient({"name": "แป้ง", "unit": "กก.", "price_per_unit": 20.0, "stock": 5.0})
+    storage.save(data)
+    return data, ing
+
+
+def test_save_appends_one_line_per_save(tmp_path):
+    storage = make_storage(tmp_path)
+    data, ing = add_flour(storage)
+    data.receive_stock(ing.id, 1.0)
+    data.update_ingredient(ing.id, price_per_unit=22.0)
+    storage.save(data)
+
+    with open(storage.journal_file, "rb") as f:
+        assert len(f.readlines()) == 2
+    assert not os.path.exists(storage.data_file)
+    loaded = make_storage(tmp_path).load().ingredients[ing.id]
+    assert (loaded.stock, loaded.price_per_unit) == (6.0, 22.0)
+
+
+def test_compacts_at_threshold(tmp_path):
+    storage = make_storage(tmp_path, compact_threshold=3)
+    data, ing = add_flour(storage)
+    data.receive_stock(ing.id, 1.0)
+    storage.save(data)
+    assert storage.journal_length == 2
+    data.receive_stock(ing.id, 1.0)
+    storage.save(data)
+
+    assert storage.journal_length == 0
+    assert not os.path.exists(storage.journal_file)
+    assert make_storage(tmp_path).load().ingredients[ing.id].stock == 7.0
+
+
+def test_without_journal_compacts_every_save(tmp_path):
+    storage = make_storage(tmp_path, use_journal=False)
+    data, ing = add_flour(storage)
+
+    assert os.path.exists(storage.data_file)
+    assert not os.path.exists(storage.journal_file)
+    assert make_storage(tmp_path).load().ingredients[ing.id].name == "แป้ง"
+
+
+def test_incomplete_last_line_dropped(tmp_path):
+    storage = make_storage(tmp_path)
+    data, ing = add_flour(storage)
+    with open(storage.journal_file, "ab") as f:
+        f.write(b'{"op": "put", "kind": "ingre')
+
+    storage = make_storage(tmp_path)
+    data = storage.load()
+    assert list(data.ingredients) == [ing.id]
+    data.receive_stock(ing.id, 2.0)
+    storage.save(data)
+    # รายการที่เขียนหลังบรรทัดที่ไม่ครบ (ซึ่งถูกตัดทิ้งตอนโหลด) ต้องอ่านได้
+    assert make_storage(tmp_path).load().ingredients[ing.id].stock == 7.0
@@ -0,0 +1,59 @@
+"""ทดสอบ snapshot แบบบรรทัดที่อ่าน record จาก mmap เมื่อถูกเรียกใช้"""
+
+import json
+
+from recipe_storage import JsonStorage, LazyTable, LineStorage
+from recipe_store import RecipeStore
+
+
+def make_files(tmp_path, count=50):
+    store = RecipeStore()
+    for i in range(count):
+        store.insert_ingredient(
+            {"name": f"วัตถุดิบ {i}", "unit": "กก.", "price_per_unit": float(i), "stock": 1.0}
+        )
+    storage = LineStorage(str(tmp_path / "recipe_data.lines"))
+    storage.compact(store)
+    return storage
+
+
+def test_records_parsed_on_first_use(tmp_path):
+    storage = make_files(tmp_path)
+    data = LineStorage(storage.data_file).load()
+
+    table = data.ingredients
+    assert isinstance(table, LazyTable)
+    assert len(table) == 50 and table._loaded == {}
+    assert table[7].name == "วัตถุดิบ 6"
+    assert list(table._loaded) == [7]
+    assert 51 not in table and 50 in table
+
+
+def test_edits_after_lazy_load(tmp_path):
+    storage = make_files(tmp_path, count=3)
+    storage = LineStorage(storage.data_file)
+    data = storage.load()
+    data.update_ingredient(2, name="แป้ง")
+    data.remove_ingredient(3)
+    data.insert_ingredient({"name": "น้ำตาล", "unit": "กก.", "price_per_unit": 1.0, "stock": 0.0})
+    storage.save(data)
+    storage.compact(data)
+
+    # หลังเขียน snapshot ใหม่ ตารางเดิมอ่านจากไฟล์ใหม่ได้
+    assert [ing.name for ing in data.ingredients.values()] == ["วัตถุดิบ 0", "แป้ง", "น้ำตาล"]
+    loaded = LineStorage(storage.data_file).load()
+    assert [ing.name for ing in loaded.ingredients.values()] == ["วัตถุดิบ 0", "แป้ง", "น้ำตาล"]
+    assert loaded.next_id("ingredients") == 5
+
+
+def test_migrates_legacy_json(tmp_path):
+    legacy = JsonStorage(str(tmp_path / "recipe_data.json"), use_journal=False)
+    data = legacy.load()
+    data.insert_ingredient({"name": "แป้ง", "unit": "กก.", "price_per_unit": 20.0, "stock": 1.0})
+    legacy.save(data)
+
+    storage = LineStorage(str(tmp_path / "recipe_data.lines"), legacy_file=legacy.data_file)
+    assert storage.load().ingredients[1].name == "แป้ง"
+    with open(storage.data_file, "rb") as f:
+        trailer = json.loads(f.read().rstrip(b"\n").rsplit(b"\n", 1)[-1])
+    assert trailer["format"] == "recipe-lines/1" and trailer["ingredients"] == 1
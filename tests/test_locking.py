@@ -0,0 +1,58 @@
+"""ทดสอบการใช้ข้อมูลร่วมกันหลายโปรแกรม: record ที่ถูกแก้จากโปรแกรมอื่นก่อนบันทึก"""
+
+import pytest
+
+import recipe_management as rm
+from recipe_store import RecipeStore, StaleRecordError
+
+BACKENDS = ("json", "lines", "sqlite")
+
+
+def open_pair(tmp_path, monkeypatch, backend):
+    """สร้างข้อมูลตั้งต้น แล้วเปิดเป็นสองโปรแกรม คืน (storage, data) ของแต่ละโปรแกรม"""
+    monkeypatch.chdir(tmp_path)
+    store = RecipeStore()
+    store.insert_ingredient({"name": "แป้ง", "unit": "กก.", "price_per_unit": 20.0, "stock": 10.0})
+    storage = rm.create_storage(backend)
+    if backend == "sqlite":
+        storage.import_store(store)
+    else:
+        storage.compact(store)
+    other = rm.create_storage(backend)
+    return (storage, storage.load()), (other, other.load())
+
+
+def edit_elsewhere(other):
+    storage, data = other
+    data.update_ingredient(1, price_per_unit=30.0)
+    storage.save(data)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_stale_save_reloads_store(tmp_path, monkeypatch, backend):
+    (storage, data), other = open_pair(tmp_path, monkeypatch, backend)
+    edit_elsewhere(other)
+    data.update_ingredient(1, price_per_unit=25.0)
+    with pytest.raises(StaleRecordError):
+        storage.save(data)
+    # การแก้ไขที่ไม่ถูกบันทึกต้องไม่ค้างอยู่ในหน่วยความจำ
+    assert data.ingredients[1].price_per_unit == 30.0
+    assert data.take_changes() == []
+    storage.save(data)
+    assert rm.create_storage(backend).load().ingredients[1].price_per_unit == 30.0
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_stale_refresh_in_transaction_reloads_store(tmp_path, monkeypatch, backend):
+    (storage, data), other = open_pair(tmp_path, monkeypatch, backend)
+    edit_elsewhere(other)
+    data.update_ingredient(1, stock=50.0)
+    with pytest.raises(StaleRecordError):
+        with storage.transaction(data):
+            pytest.fail("บล็อกต้องไม่ทำงานเมื่ออ่านข้อมูลล่าสุดไม่สำเร็จ")
+    assert data.ingredients[1].price_per_unit == 30.0
+    assert data.ingredients[1].stock == 10.0
+    with storage.transaction(data):
+        data.receive_stock(1, 5.0)
+    loaded = rm.create_storage(backend).load().ingredients[1]
+    assert (loaded.price_per_unit, loaded.stock) == (30.0, 15.0)
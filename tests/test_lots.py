@@ -0,0 +1,82 @@
+"""ทดสอบล็อตวัตถุดิบแบบเข้าก่อนออกก่อน (FIFO) และต้นทุนจริงของการผลิต"""
+
+import pytest
+
+import recipe_management as rm
+from recipe_records import LotQueue, RecipeLine
+from recipe_store import RecipeStore
+
+
+def test_lot_queue_fifo():
+    lots = LotQueue([["2024-01-01", 2.0, 10.0], ["2024-01-02", 3.0, 20.0]])
+    assert (lots.total, lots.value, lots.unit_cost) == (5.0, 80.0, 16.0)
+    # cost_of ไม่ตัดจริง
+    assert lots.cost_of(3.0, 99.0) == 40.0
+    assert lots.cost_of(6.0, 99.0) == 80.0 + 99.0
+    assert len(lots) == 2
+
+    assert lots.consume(3.0, 99.0) == 40.0
+    assert lots.to_list() == [["2024-01-02", 2.0, 20.0]]
+    assert (lots.total, lots.value) == (2.0, 40.0)
+    lots.receive(1.0, 5.0, "2024-01-03")
+    lots.receive(0.0, 5.0, "2024-01-04")
+    assert len(lots) == 2
+
+    # ส่วนที่เกินสต๊อคคิดที่ fallback_cost และสต๊อคเหลือ 0
+    assert lots.consume(4.0, 7.0) == 40.0 + 5.0 + 7.0
+    assert (len(lots), lots.total, lots.value, lots.unit_cost) == (0, 0.0, 0.0, None)
+
+
+def test_lot_queue_float_residue_removed():
+    lots = LotQueue([["", 0.3, 10.0]])
+    lots.consume(0.1, 10.0)
+    lots.consume(0.2, 10.0)
+    assert len(lots) == 0 and lots.total == 0.0
+
+
+def make_store():
+    store = RecipeStore()
+    ing = store.insert_ingredient({"name": "แป้ง", "unit": "กก.", "price_per_unit": 20.0, "stock": 2.0})
+    store.receive_stock(ing.id, 4.0, unit_cost=30.0, received_at="2999-01-01 00:00:00")
+    store.insert_recipe({"name": "ขนมปัง", "servings": 1, "ingredients": [RecipeLine(ing.id, 1.5)]})
+    return store
+
+
+def test_store_stock_follows_lots():
+    store = make_store()
+    ing = store.ingredients[1]
+    assert ing.stock == 6.0 and ing.version == 1
+    assert store.consume_stock(1, 3.0) == 2.0 * 20.0 + 1.0 * 30.0
+    assert (ing.stock, ing.version) == (3.0, 2)
+
+    # ปรับยอดหลังตรวจนับ: ส่วนที่ลดตัดจากล็อตแรก ส่วนที่เพิ่มเป็นล็อตใหม่ที่ราคาปัจจุบัน
+    store.update_ingredient(1, stock=2.0)
+    assert ing.lots.to_list() == [["2999-01-01 00:00:00", 2.0, 30.0]]
+    store.update_ingredient(1, changed_at="2999-02-01 00:00:00", stock=3.0, price_per_unit=25.0)
+    assert ing.lots.to_list()[-1] == ["2999-02-01 00:00:00", 1.0, 25.0]
+    assert ing.stock == ing.lots.total == 3.0
+
+
+def test_batch_orders_consume_lots_in_order():
+    store = make_store()
+    entries, problems = rm.produce_batch(store, [(1, 1), (1, 2)])
+    assert problems == []
+    # คำสั่งแรกได้ล็อตเก่า (20) ก่อน คำสั่งที่สองได้ส่วนที่เหลือ
+    assert [entry.total_cost for entry in entries] == [30.0, 0.5 * 20.0 + 2.5 * 30.0]
+    assert [entry.price_cost for entry in entries] == [30.0, 60.0]
+    assert store.ingredients[1].lots.to_list() == [["2999-01-01 00:00:00", 1.5, 30.0]]
+
+
+@pytest.mark.parametrize("backend", ["json", "lines", "sqlite"])
+def test_lots_survive_reload(tmp_path, monkeypatch, backend):
+    monkeypatch.chdir(tmp_path)
+    storage = rm.create_storage(backend)
+    data = storage.load()
+    data.insert_ingredient({"name": "แป้ง", "unit": "กก.", "price_per_unit": 20.0, "stock": 2.0})
+    data.receive_stock(1, 4.0, unit_cost=30.0, received_at="2999-01-01 00:00:00")
+    data.consume_stock(1, 1.0)
+    storage.save(data)
+
+    loaded = rm.create_storage(backend).load().ingredients[1]
+    assert loaded.lots == data.ingredients[1].lots
+    assert (loaded.stock, loaded.lots.value) == (5.0, 20.0 + 4.0 * 30.0)
@@ -0,0 +1,20 @@
+"""ทดสอบการเลือก/สร้าง storage ของ recipe_management"""
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_does_not_open_storage(tmp_path):
+    env = {**os.environ, "RECIPE_BACKEND": "sqlite", "PYTHONPATH": ROOT}
+    script = (
+        "import os, recipe_management as rm\n"
+        "assert rm.storage is None\n"
+        "assert not os.listdir('.'), os.listdir('.')\n"
+        "rm.get_storage()\n"
+        "assert os.path.exists(rm.DB_FILE)\n"
+        "assert rm.get_storage() is rm.storage\n"
+    )
+    subprocess.run([sys.executable, "-c", script], cwd=tmp_path, env=env, check=True)
@@ -0,0 +1,86 @@
+"""ทดสอบการจับเวลา ตัวนับ และการเปิด/ปิดด้วยตัวแปรสภาพแวดล้อม"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import recipe_metrics as metrics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_disabled_adds_nothing(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+
+    def work():
+        return 1
+
+    assert metrics.timed("x")(work) is work
+    assert metrics.counted("x")(work) is work
+    assert metrics.timer("x") is metrics.timer("y")
+    with metrics.timer("x"):
+        metrics.count("x")
+    assert metrics.snapshot() == {"timings": {}, "counters": {}}
+
+
+def test_timings_and_counters(enabled):
+    @metrics.timed("work")
+    @metrics.counted("calls")
+    def work(n):
+        if n < 0:
+            raise ValueError(n)
+        return n
+
+    assert work(2) == 2
+    with pytest.raises(ValueError):
+        work(-1)
+    with metrics.timer("block"):
+        metrics.count("items", 5)
+    metrics.count("items")
+
+    result = metrics.snapshot()
+    assert result["counters"] == {"calls": 2, "items": 6}
+    # ครั้งที่ error ก็ถูกจับเวลา
+    assert result["timings"]["work"]["count"] == 2
+    assert result["timings"]["block"]["count"] == 1
+    assert json.loads(json.dumps(result)) == result
+
+
+def test_histogram_percentiles():
+    hist = metrics.Histogram()
+    for _ in range(9):
+        hist.add(3e-6)
+    hist.add(100.0)
+    assert hist.percentile(50) == 4e-6
+    assert hist.percentile(90) == 4e-6
+    assert hist.percentile(99) == 100.0
+    assert hist.to_dict()["buckets"] == [[4e-6, 9], [None, 1]]
+    assert metrics.Histogram().percentile(50) == 0.0
+
+
+def test_enabled_from_environment(tmp_path):
+    out = tmp_path / "metrics.json"
+    env = {**os.environ, "RECIPE_METRICS": "1", "RECIPE_METRICS_OUT": str(out), "PYTHONPATH": ROOT}
+    script = (
+        "import recipe_management as rm\n"
+        "with rm.session():\n"
+        "    data = rm.load_data()\n"
+        "    rm.save_data(data)\n"
+    )
+    subprocess.run([sys.executable, "-c", script], cwd=tmp_path, env=env, check=True,
+                   capture_output=True)
+    with open(out, encoding="utf-8") as f:
+        result = json.load(f)
+    assert result["timings"]["load_data"]["count"] == 1
+    assert result["timings"]["save_data"]["count"] == 1
@@ -0,0 +1,85 @@
+"""ทดสอบการวางแผนการผลิตหลายสูตรที่แย่งสต๊อคเดียวกัน (LP และ greedy สำรอง)"""
+
+from itertools import product
+from types import SimpleNamespace
+
+import pytest
+
+import production_planner
+from production_planner import plan_production
+from recipe_records import RecipeLine
+from recipe_store import RecipeStore
+
+
+def make_store():
+    store = RecipeStore()
+    store.insert_ingredient({"name": "แป้ง", "unit": "กก.", "price_per_unit": 20.0, "stock": 10.0})
+    store.insert_ingredient({"name": "น้ำตาล", "unit": "กก.", "price_per_unit": 30.0, "stock": 6.0})
+    store.insert_recipe({"name": "ขนมปัง", "servings": 5, "ingredients": [RecipeLine(1, 2.0)]})
+    store.insert_recipe({
+        "name": "เค้ก", "servings": 4, "ingredients": [RecipeLine(1, 1.0), RecipeLine(2, 2.0)],
+    })
+    store.insert_recipe({"name": "ลูกอม", "servings": 7, "ingredients": [RecipeLine(2, 3.0)]})
+    return store
+
+
+def best_servings(store):
+    """จำนวนเสิร์ฟสูงสุดจากการลองทุกแผน"""
+    best = 0
+    for a, b, c in product(range(6), range(4), range(3)):
+        if 2 * a + b <= 10 and 2 * b + 3 * c <= 6:
+            best = max(best, 5 * a + 4 * b + 7 * c)
+    return best
+
+
+def assert_feasible(store, batches):
+    used = {}
+    for recipe_id, count in batches.items():
+        assert count >= 1
+        for item in store.recipes[recipe_id].ingredients:
+            used[item.ingredient_id] = used.get(item.ingredient_id, 0.0) + item.quantity * count
+    for ing_id, amount in used.items():
+        assert amount <= store.ingredients[ing_id].stock + 1e-9
+
+
+@pytest.fixture(params=("lp", "no_scipy", "lp_failed"))
+def solver(request, monkeypatch):
+    if request.param == "lp":
+        if production_planner.linprog is None:
+            pytest.skip("ไม่มี scipy")
+    elif request.param == "no_scipy":
+        monkeypatch.setattr(production_planner, "linprog", None)
+    else:
+        monkeypatch.setattr(
+            production_planner, "linprog", lambda *args, **kwargs: SimpleNamespace(success=False)
+        )
+    return request.param
+
+
+def test_plan_is_feasible_and_best(solver):
+    store = make_store()
+    plan = plan_production(store)
+    assert_feasible(store, plan["batches"])
+    assert plan["value"] == plan["servings"]
+    assert plan["servings"] == best_servings(store)
+
+
+def test_targets_and_weights(solver):
+    store = make_store()
+    plan = plan_production(store, targets={1: 1}, weights={3: 100.0})
+    assert_feasible(store, plan["batches"])
+    assert plan["batches"].get(1, 0) <= 1
+    assert plan["batches"][3] == 2
+
+
+def test_margin_objective_counts_cost(solver):
+    store = make_store()
+    plan = plan_production(store, objective="margin", margin_pct=50)
+    assert plan["value"] == pytest.approx(plan["cost"] * 0.5)
+
+
+def test_recipes_with_deleted_ingredients_skipped(solver):
+    store = make_store()
+    store.remove_ingredient(2)
+    plan = plan_production(store)
+    assert plan["batches"] == {1: 5}
@@ -0,0 +1,95 @@
+"""ทดสอบประวัติราคาวัตถุดิบกับทุก backend"""
+
+import pytest
+
+import recipe_management as rm
+from recipe_store import RecipeStore
+
+BACKENDS = ("json", "lines", "sqlite")
+
+
+def save_all(storage, store):
+    if hasattr(storage, "import_store"):
+        storage.import_store(store)
+    else:
+        storage.compact(store)
+        store.take_changes()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_price_changes_in_same_second(tmp_path, monkeypatch, backend):
+    monkeypatch.chdir(tmp_path)
+    storage = rm.create_storage(backend)
+    store = RecipeStore()
+    ing = store.insert_ingredient({"name": "แป้ง", "unit": "กก.", "price_per_unit": 20.0, "stock": 0.0})
+    save_all(storage, store)
+
+    data = storage.load()
+    data.update_ingredient(ing.id, changed_at="2999-02-01 10:00:00", price_per_unit=25.0)
+    data.update_ingredient(ing.id, changed_at="2999-02-01 10:00:00", price_per_unit=30.0)
+    storage.save(data)
+
+    loaded = rm.create_storage(backend).load().ingredients[ing.id]
+    assert loaded.price_history == data.ingredients[ing.id].price_history
+    assert loaded.price_history[-1] == ["2999-02-01 10:00:00", 30.0]
+    assert loaded.price_at("2999-02-01") == loaded.price_per_unit == 30.0
+
+
+def test_price_change_before_last_rejected():
+    store = RecipeStore()
+    ing = store.insert_ingredient({"name": "แป้ง", "unit": "กก.", "price_per_unit": 20.0, "stock": 0.0})
+    store.update_ingredient(ing.id, changed_at="2999-01-01 00:00:00", price_per_unit=25.0)
+    with pytest.raises(ValueError):
+        store.update_ingredient(ing.id, changed_at="2998-01-01 00:00:00", price_per_unit=30.0)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_recost_compares_price_cost_not_fifo_cost(tmp_path, monkeypatch, backend):
+    from price_history import recost_history
+    from recipe_records import RecipeLine
+
+    monkeypatch.chdir(tmp_path)
+    store = RecipeStore()
+    ing = store.insert_ingredient({"name": "แป้ง", "unit": "กก.", "price_per_unit": 20.0, "stock": 0.0})
+    store.receive_stock(ing.id, 10.0, unit_cost=15.0)
+    store.update_ingredient(ing.id, price_per_unit=25.0)
+    recipe = store.insert_recipe({
+        "name": "ขนมปัง", "servings": 4, "ingredients": [RecipeLine(ing.id, 2.0)],
+    })
+    # ประวัติรุ่นเก่าที่ไม่มี price_cost
+    store.append_log({
+        "recipe_id": recipe.id, "recipe_name": "ขนมปัง", "batches": 1,
+        "total_servings": 4, "total_cost": 40.0, "date": "2000-01-01 00:00:00",
+    })
+    entries, problems = rm.produce_batch(store, [(recipe.id, 1)])
+    assert problems == []
+    # ล็อตเก่าต้นทุน 15 ต่างจากราคาปัจจุบัน 25
+    assert (entries[0].total_cost, entries[0].price_cost) == (30.0, 50.0)
+    storage = rm.create_storage(backend)
+    save_all(storage, store)
+
+    old, new = recost_history(rm.create_storage(backend).load())
+    assert old["logged_cost"] is None and old["difference"] is None
+    assert (new["logged_cost"], new["total_cost"], new["cost"]) == (50.0, 30.0, 50.0)
+    assert new["difference"] == 0.0
+
+
+def test_cost_as_of_past_dates():
+    from recipe_records import RecipeLine
+
+    store = RecipeStore()
+    ing = store.insert_ingredient({"name": "แป้ง", "unit": "กก.", "price_per_unit": 20.0, "stock": 0.0})
+    store.update_ingredient(ing.id, changed_at="2999-01-10 08:00:00", price_per_unit=30.0)
+    store.update_ingredient(ing.id, changed_at="2999-02-01 00:00:00", price_per_unit=40.0)
+    dough = store.insert_recipe({"name": "แป้งโด", "servings": 1, "ingredients": [RecipeLine(ing.id, 0.5)]})
+    pie = store.insert_recipe({
+        "name": "พาย", "servings": 2, "ingredients": [RecipeLine(None, 2, dough.id), RecipeLine(ing.id, 1.0)],
+    })
+
+    # ก่อนราคาแรกที่บันทึกใช้ราคาแรก วันที่อย่างเดียวหมายถึงสิ้นวัน
+    assert ing.price_at("1990-01-01") == 20.0
+    assert ing.price_at("2999-01-10") == 30.0
+    assert ing.price_at("2999-01-10 07:59:59") == 20.0
+    assert ing.price_at("2999-03-01") == 40.0
+    assert rm.calculate_recipe_cost(store, pie, as_of="2999-01-15") == pytest.approx(2 * 15 + 30)
+    assert rm.calculate_recipe_cost(store, pie) == store.recipe_cost(pie.id) == pytest.approx(2 * 20 + 40)
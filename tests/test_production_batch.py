@@ -0,0 +1,55 @@
+"""ทดสอบการผลิตหลายสูตรพร้อมกันแบบทั้งหมดหรือไม่ทำเลย"""
+
+import recipe_management as rm
+from recipe_records import RecipeLine
+from recipe_store import RecipeStore
+
+
+def make_store():
+    store = RecipeStore()
+    store.insert_ingredient({"name": "แป้ง", "unit": "กก.", "price_per_unit": 20.0, "stock": 10.0})
+    store.insert_ingredient({"name": "น้ำตาล", "unit": "กก.", "price_per_unit": 30.0, "stock": 4.0})
+    store.insert_recipe({
+        "name": "เค้ก", "servings": 8, "ingredients": [RecipeLine(1, 2.0), RecipeLine(2, 1.0)],
+    })
+    store.insert_recipe({"name": "คุกกี้", "servings": 20, "ingredients": [RecipeLine(2, 1.5)]})
+    store.take_changes()
+    return store
+
+
+def test_produces_all_orders():
+    store = make_store()
+    entries, problems = rm.produce_batch(store, [(1, 2), (2, 1)])
+
+    assert problems == []
+    assert [(e.recipe_id, e.batches, e.total_servings, e.total_cost) for e in entries] == [
+        (1, 2, 16, 140.0), (2, 1, 20, 45.0),
+    ]
+    assert entries[0].date == entries[1].date
+    assert (store.ingredients[1].stock, store.ingredients[2].stock) == (6.0, 0.5)
+    assert len(store.production_log) == 2
+
+
+def test_combined_shortage_changes_nothing():
+    store = make_store()
+    # แต่ละคำสั่งพอถ้าผลิตเดี่ยวๆ แต่รวมกันน้ำตาลไม่พอ
+    entries, problems = rm.produce_batch(store, [(1, 3), (2, 1)])
+
+    assert entries == []
+    assert problems == ["น้ำตาล: ขาด 0.50 กก."]
+    assert (store.ingredients[1].stock, store.ingredients[2].stock) == (10.0, 4.0)
+    assert store.take_changes() == []
+    assert len(store.production_log) == 0
+
+
+def test_invalid_orders_reported_together():
+    store = make_store()
+    store.remove_ingredient(1)
+    entries, problems = rm.produce_batch(store, [(1, 1), (2, 0), (9, 1)])
+
+    assert entries == []
+    assert problems == [
+        "เค้ก: วัตถุดิบ ID 1 ถูกลบไปแล้ว",
+        "คุกกี้: จำนวนรอบต้องมากกว่า 0",
+        "ไม่พบสูตร ID 9",
+    ]
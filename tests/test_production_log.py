@@ -0,0 +1,190 @@
+"""ทดสอบการค้นประวัติการผลิตตามช่วงวันที่"""
+
+import os
+
+from production_log import LogSegment, ProductionLog, summarize
+from recipe_records import LogEntry
+
+
+def make_entries(first_id, month, days):
+    return [
+        LogEntry(first_id + i, 1, "สูตร", 1, 2, 10.0, f"{month}-{day:02d} 12:00:00")
+        for i, day in enumerate(days)
+    ]
+
+
+def make_segment(key, entries, loads):
+    def loader():
+        loads.append(key)
+        return list(entries)
+
+    return LogSegment(key, summarize(entries), loader)
+
+
+def test_between_archived_segment_not_kept_in_memory():
+    loads = []
+    segment = make_segment("2024-01", make_entries(1, "2024-01", range(1, 29)), loads)
+    log = ProductionLog(make_entries(100, "2024-02", [1, 2]), [segment])
+
+    first = log.between("2024-01-10", "2024-01-12")
+    second = log.between("2024-01-27", "2024-02-01")
+    log.between("2024-02-01", "2024-02-02")
+
+    assert [e.date[:10] for e in first] == ["2024-01-10", "2024-01-11", "2024-01-12"]
+    assert [e.id for e in second] == [27, 28, 100]
+    assert loads == ["2024-01", "2024-01"]
+    assert not hasattr(segment, "_entries")
+
+
+def test_page_loads_only_segments_in_page():
+    loads = []
+    segments = [
+        make_segment("2024-01", make_entries(1, "2024-01", range(1, 11)), loads),
+        make_segment("2024-02", make_entries(11, "2024-02", range(1, 11)), loads),
+        make_segment("2024-03", make_entries(21, "2024-03", range(1, 11)), loads),
+    ]
+    log = ProductionLog(make_entries(31, "2024-04", range(1, 6)), segments)
+
+    rows, page_no, pages = log.page(1, 8)
+    assert [e.id for e in rows] == list(range(9, 17))
+    assert (page_no, pages) == (1, 5)
+    assert loads == ["2024-01", "2024-02"]
+
+    loads.clear()
+    rows, page_no, pages = log.page(None, 8)
+    assert [e.id for e in rows] == [33, 34, 35]
+    assert (page_no, pages) == (4, 5)
+    assert loads == []
+
+    rows, page_no, pages = log.page(0, 4, "2024-02-08", "2024-03-02")
+    assert [e.id for e in rows] == [18, 19, 20, 21]
+    assert pages == 2
+    assert loads == ["2024-02", "2024-03"]
+
+
+def test_between_unordered_segment():
+    entries = make_entries(1, "2024-01", [5, 3, 9, 1])
+    segment = LogSegment("2024-01", summarize(entries), lambda: list(entries))
+    log = ProductionLog(archived=[segment])
+
+    assert sorted(e.id for e in log.between("2024-01-02", "2024-01-06")) == [1, 2]
+
+
+def make_db(tmp_path):
+    from recipe_storage import SqliteStorage
+
+    storage = SqliteStorage(str(tmp_path / "recipes.db"))
+    store = storage.load()
+    for month, recipe_id in (("2024-01", 1), ("2024-01", 2), ("2024-02", 1), ("2024-03", 2)):
+        store.append_log({
+            "recipe_id": recipe_id, "recipe_name": "สูตร", "batches": 2,
+            "total_servings": 8, "total_cost": 30.0, "date": f"{month}-05 09:00:00",
+        })
+    storage.save(store)
+    storage.close()
+    return SqliteStorage, str(tmp_path / "recipes.db")
+
+
+def load_traced(storage_class, db_file):
+    storage = storage_class(db_file)
+    statements = []
+    storage.conn.set_trace_callback(statements.append)
+    return storage.load().production_log, statements
+
+
+def check_log(log):
+    assert len(log) == 4
+    assert [seg.key for seg in log.archived] == ["2024-01", "2024-02"]
+    assert log.daily["2024-01-05"]["count"] == 2
+    assert log.totals == {"count": 4, "batches": 8, "servings": 32, "cost": 120.0}
+    assert log.by_recipe[1]["count"] == 2
+    assert log.by_recipe[2]["cost"] == 60.0
+    assert [e.id for e in log.page(0, 2)[0]] == [1, 2]
+
+
+def test_sqlite_loads_log_summaries_without_grouping(tmp_path):
+    storage_class, db_file = make_db(tmp_path)
+    log, statements = load_traced(storage_class, db_file)
+
+    check_log(log)
+    assert not [sql for sql in statements if "GROUP BY" in sql]
+
+
+def test_sqlite_builds_missing_log_summaries_once(tmp_path):
+    import sqlite3
+
+    storage_class, db_file = make_db(tmp_path)
+    # ฐานข้อมูลรุ่นก่อนที่ยังไม่มีตารางสรุป
+    conn = sqlite3.connect(db_file)
+    conn.execute("DROP TABLE log_daily")
+    conn.execute("DROP TABLE log_monthly_recipes")
+    conn.commit()
+    conn.close()
+
+    check_log(load_traced(storage_class, db_file)[0])
+    log, statements = load_traced(storage_class, db_file)
+    check_log(log)
+    assert not [sql for sql in statements if "GROUP BY" in sql]
+
+
+def test_running_totals_by_day_and_recipe():
+    log = ProductionLog(make_entries(1, "2024-05", [1, 1, 2, 4]))
+    log.append(LogEntry(5, 2, "ขนม", 3, 6, 15.5, "2024-05-03 08:00:00"))
+
+    assert [day for day, _ in log.daily_totals()] == [
+        "2024-05-01", "2024-05-02", "2024-05-03", "2024-05-04",
+    ]
+    assert log.range_totals("2024-05-02", "2024-05-03") == {
+        "count": 2, "batches": 4, "servings": 8, "cost": 25.5,
+    }
+    assert log.range_totals()["count"] == 5
+    assert log.by_recipe[2]["batches"] == 3
+    assert log.last_id == 5
+
+
+def test_clock_going_backwards():
+    log = ProductionLog(make_entries(1, "2024-05", [3, 5]))
+    log.append(LogEntry(3, 1, "สูตร", 1, 2, 10.0, "2024-05-04 12:00:00"))
+
+    assert [e.id for e in log.between("2024-05-04", "2024-05-05")] == [2, 3]
+    assert [e.id for e in log.page(0, 2, "2024-05-04")[0]] == [2, 3]
+    assert [day for day, _ in log.daily_totals()] == ["2024-05-03", "2024-05-04", "2024-05-05"]
+
+
+def add_log(store, recipe_id, date):
+    return store.append_log({
+        "recipe_id": recipe_id, "recipe_name": "สูตร", "batches": 1,
+        "total_servings": 2, "total_cost": 10.0, "date": date,
+    })
+
+
+def test_json_archive_closes_old_months(tmp_path):
+    from recipe_storage import JsonStorage
+
+    storage = JsonStorage(str(tmp_path / "recipe_data.json"))
+    data = storage.load()
+    for date in ("2024-01-05 09:00:00", "2024-02-05 09:00:00", "2024-03-05 09:00:00"):
+        add_log(data, 1, date)
+    storage.save(data)
+    storage.compact(data)
+
+    files = sorted(os.listdir(storage.log_dir))
+    assert [f for f in files if f.startswith("2024")] == [
+        "2024-01.jsonl.gz", "2024-02.jsonl.gz", "2024-03.jsonl",
+    ]
+    log = JsonStorage(storage.data_file).load().production_log
+    assert [seg.key for seg in log.archived] == ["2024-01", "2024-02"]
+    assert [e.id for e in log.entries] == [3]
+    assert log.by_recipe[1]["count"] == 3
+    assert [e.id for e in log] == [1, 2, 3]
+
+    # ประวัติย้อนหลังเข้าเดือนที่ปิดแล้ว
+    data = JsonStorage(storage.data_file).load()
+    add_log(data, 2, "2024-01-20 09:00:00")
+    storage = JsonStorage(storage.data_file)
+    storage.save(data)
+    storage.compact(data)
+    log = JsonStorage(storage.data_file).load().production_log
+    assert [e.id for e in log.between("2024-01-01", "2024-01-31")] == [1, 4]
+    assert log.range_totals("2024-01-01", "2024-01-31")["count"] == 2
+    assert log.by_recipe[2]["count"] == 1
@@ -0,0 +1,41 @@
+"""ทดสอบ record แบบ __slots__ กับการแปลงเป็น/จากโครงสร้างไฟล์"""
+
+import pytest
+
+from recipe_records import Ingredient, LogEntry, Recipe, RecipeLine
+
+
+def test_round_trip_all_types():
+    records = [
+        Ingredient(1, "แป้ง", "กก.", 20.0, 3.0, 2, [["", 18.0], ["2024-01-01 00:00:00", 20.0]]),
+        Recipe(1, "ขนม", 4, [RecipeLine(1, 2.0), RecipeLine(None, 1.0, 2),
+                              RecipeLine(1, 0.25, unit="กรัม", amount=250.0)], 3),
+        LogEntry(1, 1, "ขนม", 2, 8, 40.0, "2024-01-01 10:00:00", 42.0),
+    ]
+    for record in records:
+        assert type(record).from_dict(record.to_dict()) == record
+        assert not hasattr(record, "__dict__")
+        with pytest.raises(TypeError):
+            hash(record)
+
+
+def test_old_file_format_defaults():
+    ing = Ingredient.from_dict({"id": 1, "name": "แป้ง", "unit": "กก.", "price_per_unit": 20.0, "stock": 3.0})
+    assert (ing.version, ing.price_history) == (0, [])
+    assert ing.lots.to_list() == [["", 3.0, 20.0]]
+    recipe = Recipe.from_dict({
+        "id": 1, "name": "ขนม", "servings": 4, "ingredients": [{"ingredient_id": 1, "quantity": 2.0}],
+    })
+    assert recipe.version == 0 and recipe.ingredients == [RecipeLine(1, 2.0)]
+    entry = LogEntry.from_dict({
+        "id": 1, "recipe_id": 1, "recipe_name": "ขนม", "batches": 1,
+        "total_servings": 4, "total_cost": 40.0, "date": "2024-01-01 10:00:00",
+    })
+    assert entry.price_cost is None
+
+
+def test_compact_dicts():
+    assert RecipeLine(None, 1.0, 2).to_dict() == {"recipe_id": 2, "quantity": 1.0}
+    assert RecipeLine(1, 2.0).to_dict() == {"ingredient_id": 1, "quantity": 2.0}
+    ing = Ingredient(1, "แป้ง", "กก.", 20.0, 0.0)
+    assert "lots" not in ing.to_dict() and "price_history" not in ing.to_dict()
@@ -0,0 +1,79 @@
+"""ทดสอบรายงานจาก snapshot: ผลแบบหลาย process ตรงกับ process เดียวและกับ RecipeStore"""
+
+import csv
+import json
+
+import pytest
+
+import recipe_management as rm
+from recipe_records import RecipeLine
+from recipe_reports import REPORT_KINDS, generate_reports, take_snapshot, write_reports
+from recipe_store import RecipeStore
+
+
+def make_store():
+    store = RecipeStore()
+    for i in range(1, 7):
+        store.insert_ingredient({
+            "name": f"วัตถุดิบ {i}", "unit": "กก.", "price_per_unit": 10.0 * i, "stock": 3.0 * i,
+        })
+    store.insert_recipe({"name": "ฐาน", "servings": 1, "ingredients": [RecipeLine(1, 0.5), RecipeLine(2, 0.25)]})
+    for r in range(2, 12):
+        lines = [RecipeLine(1 + r % 6, 0.1 * r), RecipeLine(None, 1.0 + r % 3, 1)]
+        store.insert_recipe({"name": f"สูตร {r}", "servings": r % 4 + 1, "ingredients": lines})
+    store.insert_recipe({"name": "ชั้นบน", "servings": 2, "ingredients": [RecipeLine(None, 2, 5)]})
+    # สูตรย่อยที่ถูกลบและวัตถุดิบที่ถูกลบ
+    store.insert_recipe({"name": "ถูกลบ", "servings": 1, "ingredients": [RecipeLine(3, 1.0)]})
+    store.insert_recipe({"name": "ขาดสูตรย่อย", "servings": 1, "ingredients": [RecipeLine(None, 1, 13)]})
+    store.remove_recipe(13)
+    store.remove_ingredient(6)
+    store.append_log({
+        "recipe_id": 2, "recipe_name": "สูตร 2", "batches": 2, "total_servings": 6,
+        "total_cost": 50.0, "date": "2024-01-01 10:00:00",
+    })
+    return store
+
+
+def test_parallel_matches_serial_and_store():
+    store = make_store()
+    snapshot = take_snapshot(store)
+    serial = generate_reports(snapshot, workers=1)
+    assert generate_reports(snapshot, workers=2) == serial
+
+    assert [row["id"] for row in serial["costs"]] == list(store.recipes)
+    for row in serial["costs"]:
+        assert row["cost"] == round(store.recipe_cost(row["id"]), 2)
+    for row in serial["producible"]:
+        batches, limiting, missing = rm.max_producible(store, store.recipes[row["id"]])
+        assert (row["max_batches"], row["limiting_ingredient_id"], row["missing_ingredient_id"]) == (
+            batches, limiting, missing,
+        )
+    margin = {row["id"]: row for row in serial["margin"]}
+    assert margin[2]["produced_servings"] == 6
+    assert margin[14]["max_batches"] == 0
+
+
+def test_snapshot_is_isolated_from_later_edits():
+    store = make_store()
+    snapshot = take_snapshot(store)
+    before = generate_reports(snapshot, kinds=["costs"], workers=1)
+    store.update_ingredient(1, changed_at="2999-01-01 00:00:00", price_per_unit=999.0)
+    assert generate_reports(snapshot, kinds=["costs"], workers=1) == before
+    assert list(before) == ["costs"]
+    with pytest.raises(ValueError):
+        generate_reports(snapshot, kinds=["profit"])
+
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl", "json"])
+def test_write_reports(tmp_path, fmt):
+    reports = generate_reports(take_snapshot(make_store()), workers=1)
+    paths = write_reports(reports, str(tmp_path / "out"), fmt)
+    assert [p.rsplit("/", 1)[1] for p in paths] == [f"{kind}.{fmt}" for kind in REPORT_KINDS]
+    with open(paths[0], encoding="utf-8") as f:
+        if fmt == "csv":
+            rows = list(csv.DictReader(f))
+            assert [int(row["id"]) for row in rows] == [row["id"] for row in reports["costs"]]
+        elif fmt == "jsonl":
+            assert [json.loads(line) for line in f] == reports["costs"]
+        else:
+            assert json.load(f) == reports["costs"]
@@ -0,0 +1,56 @@
+"""ทดสอบดัชนีย้อนกลับวัตถุดิบ/สูตรย่อย → สูตรที่ใช้"""
+
+from recipe_records import RecipeLine
+from recipe_store import RecipeStore
+
+
+def make_store():
+    store = RecipeStore()
+    for name in ("แป้ง", "น้ำตาล", "เนย"):
+        store.insert_ingredient({"name": name, "unit": "กก.", "price_per_unit": 1.0, "stock": 0.0})
+    return store
+
+
+def ids(recipes):
+    return [recipe.id for recipe in recipes]
+
+
+def test_recipes_using_follows_edits():
+    store = make_store()
+    store.recipes_using(1)  # สร้างดัชนีก่อน แล้วตรวจว่าถูกอัปเดตตามการแก้ไข
+    cake = store.insert_recipe({
+        "name": "เค้ก", "servings": 1, "ingredients": [RecipeLine(1, 1.0), RecipeLine(2, 1.0)],
+    })
+    bread = store.insert_recipe({"name": "ขนมปัง", "servings": 1, "ingredients": [RecipeLine(1, 1.0)]})
+    assert ids(store.recipes_using(1)) == [cake.id, bread.id]
+
+    store.update_recipe(cake.id, ingredients=[RecipeLine(3, 1.0)])
+    assert ids(store.recipes_using(1)) == [bread.id]
+    assert ids(store.recipes_using(2)) == []
+    assert ids(store.recipes_using(3)) == [cake.id]
+
+    store.remove_recipe(bread.id)
+    assert ids(store.recipes_using(1)) == []
+
+
+def test_index_built_lazily_from_loaded_recipes():
+    source = make_store()
+    source.insert_recipe({"name": "เค้ก", "servings": 1, "ingredients": [RecipeLine(2, 1.0)]})
+    store = RecipeStore(source.to_dict())
+
+    assert store._used_by is None
+    assert ids(store.recipes_using(2)) == [1]
+
+
+def test_apply_change_updates_index():
+    store = make_store()
+    other = RecipeStore(store.to_dict())
+    store.recipes_using(1)
+    recipe = other.insert_recipe({"name": "เค้ก", "servings": 1, "ingredients": [RecipeLine(1, 1.0)]})
+    other.update_recipe(recipe.id, ingredients=[RecipeLine(2, 1.0)])
+    for change in other.take_changes():
+        store.apply_change({**change, "record": change["record"].to_dict()})
+
+    assert ids(store.recipes_using(1)) == []
+    assert ids(store.recipes_using(2)) == [recipe.id]
+
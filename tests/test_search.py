@@ -0,0 +1,56 @@
+"""ทดสอบการค้นหาชื่อวัตถุดิบ/สูตรด้วย prefix trie และ n-gram"""
+
+from recipe_search import NameSearch, SearchIndex
+from recipe_store import RecipeStore
+
+
+def make_index(*names):
+    index = SearchIndex()
+    for record_id, name in enumerate(names, 1):
+        index.add(record_id, name)
+    return index
+
+
+def test_ranking():
+    index = make_index("น้ำตาลทราย", "น้ำตาล", "น้ำปลา", "Brown Sugar", "ซอสน้ำตาลเคี่ยว")
+    # ตรงทั้งชื่อ > ขึ้นต้นชื่อ > n-gram กลางชื่อ
+    assert index.search("น้ำตาล") == [2, 1, 5]
+    assert index.search("sugar") == [4]
+    assert index.search("  BROWN   su") == [4]
+    assert index.search("น้ำตาล", limit=1) == [2]
+    assert index.search("") == []
+
+
+def test_typos_and_tone_marks():
+    index = make_index("ไข่ไก่", "กะทิ", "พริกแกง")
+    assert index.search("ไขไก") == [1]
+    assert index.search("พริกแก") == [3]
+    assert index.search("ซีอิ๊ว") == []
+
+
+def test_rename_and_remove():
+    index = make_index("แป้ง สาลี", "สาคู")
+    index.add(1, "แป้งข้าวเจ้า")
+    assert index.search("สา") == [2]
+    index.remove(2)
+    index.remove(2)
+    assert index.search("สาคู") == []
+    assert index._trie == make_index("แป้งข้าวเจ้า")._trie
+
+
+def test_name_search_follows_store():
+    store = RecipeStore()
+    store.insert_ingredient({"name": "แป้ง", "unit": "กก.", "price_per_unit": 1.0, "stock": 0.0})
+    search = NameSearch(store)
+    sugar = store.insert_ingredient({"name": "น้ำตาล", "unit": "กก.", "price_per_unit": 1.0, "stock": 0.0})
+    assert search.search("ingredients", "น้ำตาล") == [sugar]
+
+    store.update_ingredient(sugar.id, name="น้ำตาลปี๊บ")
+    assert search.search("ingredients", "ปี๊บ") == [sugar]
+    store.remove_ingredient(sugar.id)
+    assert search.search("ingredients", "น้ำตาล") == []
+
+    other = RecipeStore()
+    other.insert_ingredient({"name": "เกลือ", "unit": "กก.", "price_per_unit": 1.0, "stock": 0.0})
+    store.reset(other)
+    assert [ing.name for ing in search.search("ingredients", "เกลือ")] == ["เกลือ"]
@@ -0,0 +1,183 @@
+"""ทดสอบโหมดบริการ recipe_service"""
+
+import asyncio
+import json
+import threading
+
+import recipe_management as rm
+from recipe_service import RecipeService
+from recipe_storage import FileLock
+from recipe_store import RecipeStore
+
+GET_INGREDIENT = b"GET /ingredients/1 HTTP/1.1\r\nConnection: close\r\n\r\n"
+
+
+def post(path, payload):
+    body = json.dumps(payload).encode()
+    return (
+        f"POST {path} HTTP/1.1\r\nConnection: close\r\nContent-Length: {len(body)}\r\n\r\n"
+    ).encode() + body
+
+
+def make_service(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    storage = rm.create_storage("json")
+    data = RecipeStore()
+    data.insert_ingredient({"name": "แป้ง", "unit": "กก.", "price_per_unit": 20.0, "stock": 10.0})
+    storage.compact(data)
+    data.take_changes()
+    return RecipeService(data, storage), storage
+
+
+async def request(port, raw):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(raw)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    body = json.loads(await reader.readexactly(length))
+    writer.close()
+    return status, body
+
+
+def run_server(service, scenario):
+    async def main():
+        server = await asyncio.start_server(service.handle_connection, "127.0.0.1", 0)
+        writer_task = asyncio.create_task(service.writes.run())
+        try:
+            return await scenario(server.sockets[0].getsockname()[1])
+        finally:
+            writer_task.cancel()
+            server.close()
+
+    return asyncio.run(main())
+
+
+def test_invalid_content_length(tmp_path, monkeypatch):
+    service, _ = make_service(tmp_path, monkeypatch)
+
+    async def scenario(port):
+        results = []
+        for length in ("abc", "-5", str(1 << 30)):
+            results.append(await request(
+                port, f"POST /ingredients HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode()
+            ))
+        return results
+
+    statuses = [status for status, _ in run_server(service, scenario)]
+    assert statuses == [400, 400, 413]
+
+
+def test_reads_answered_while_saving(tmp_path, monkeypatch):
+    service, storage = make_service(tmp_path, monkeypatch)
+    saving = threading.Event()
+    release = threading.Event()
+    original = storage._write_journal
+
+    def slow_write(line, changes):
+        saving.set()
+        release.wait(5)
+        return original(line, changes)
+
+    monkeypatch.setattr(storage, "_write_journal", slow_write)
+
+    async def scenario(port):
+        restock = asyncio.create_task(request(port, post("/ingredients/1/restock", {"quantity": 5})))
+        await asyncio.get_running_loop().run_in_executor(None, saving.wait, 5)
+        # การบันทึกยังค้างอยู่ใน thread ของ storage คำขออ่านต้องตอบได้
+        read = await asyncio.wait_for(request(port, GET_INGREDIENT), 2)
+        assert not restock.done()
+        release.set()
+        return read, await restock
+
+    (read_status, _), (restock_status, ingredient) = run_server(service, scenario)
+    assert read_status == 200
+    assert restock_status == 200
+    assert ingredient["stock"] == 15
+    assert rm.create_storage("json").load().ingredients[1].stock == 15
+
+
+def test_reads_answered_while_waiting_for_lock(tmp_path, monkeypatch):
+    service, storage = make_service(tmp_path, monkeypatch)
+    # โปรแกรมอื่น (เช่น recipe_cli ในอีกหน้าจอ) ถือล็อกอยู่
+    other = FileLock(storage.lock.path)
+    other.__enter__()
+
+    async def scenario(port):
+        restock = asyncio.create_task(request(port, post("/ingredients/1/restock", {"quantity": 5})))
+        await asyncio.sleep(0.2)
+        read = await asyncio.wait_for(request(port, GET_INGREDIENT), 2)
+        assert not restock.done()
+        other.__exit__(None, None, None)
+        return read, await asyncio.wait_for(restock, 5)
+
+    (read_status, before), (restock_status, after) = run_server(service, scenario)
+    assert (read_status, before["stock"]) == (200, 10)
+    assert (restock_status, after["stock"]) == (200, 15)
+
+
+def test_compaction_runs_on_event_loop(tmp_path, monkeypatch):
+    service, storage = make_service(tmp_path, monkeypatch)
+    storage.compact_threshold = 1
+    threads = {}
+    for name in ("_write_journal", "compact"):
+        def spy(*args, _name=name, _original=getattr(storage, name)):
+            threads[_name] = threading.current_thread()
+            return _original(*args)
+
+        monkeypatch.setattr(storage, name, spy)
+
+    async def scenario(port):
+        return await request(port, post("/ingredients/1/restock", {"quantity": 5}))
+
+    status, _ = run_server(service, scenario)
+    assert status == 200
+    assert threads["compact"] is threading.main_thread()
+    assert threads["_write_journal"] is not threading.main_thread()
+    assert storage.journal_length == 0
+
+
+def test_failed_request_does_not_fail_batch(tmp_path, monkeypatch):
+    service, _ = make_service(tmp_path, monkeypatch)
+    queue = service.writes
+
+    def restock(qty):
+        return lambda data: data.receive_stock(1, qty).stock
+
+    def invalid(data):
+        raise ValueError("ราคาไม่ถูกต้อง")
+
+    def half_done(data):
+        # แก้ข้อมูลไปแล้วบางส่วนก่อนผิดพลาด การแก้ไขนี้ต้องไม่ถูกบันทึกหรือค้างอยู่
+        data.receive_stock(1, 100)
+        raise RuntimeError("bug")
+
+    async def main():
+        writer = asyncio.create_task(queue.run())
+        try:
+            return await asyncio.gather(
+                queue.submit(restock(1)),
+                queue.submit(invalid),
+                queue.submit(restock(2)),
+                queue.submit(half_done),
+                queue.submit(restock(3)),
+                return_exceptions=True,
+            )
+        finally:
+            writer.cancel()
+
+    results = asyncio.run(main())
+    assert results[0] == 11
+    assert (results[1].status, results[1].payload["error"]) == (400, "ราคาไม่ถูกต้อง")
+    assert results[2] == 13
+    assert results[3].status == 500
+    assert results[4] == 16
+    assert queue.data.ingredients[1].stock == 16
+    assert rm.create_storage("json").load().ingredients[1].stock == 16
@@ -0,0 +1,72 @@
+"""ทดสอบการแจ้งเตือนวัตถุดิบใกล้หมดและจุดสั่งซื้อจากประวัติการผลิต"""
+
+import math
+
+import pytest
+
+from recipe_records import RecipeLine
+from recipe_store import RecipeStore
+from stock_alerts import LEAD_TIME_DAYS, REVIEW_DAYS, SERVICE_Z, StockMonitor
+
+
+def make_store(stock=5.0):
+    store = RecipeStore()
+    store.insert_ingredient({"name": "แป้ง", "unit": "กก.", "price_per_unit": 20.0, "stock": stock})
+    store.insert_ingredient({"name": "เกลือ", "unit": "กก.", "price_per_unit": 10.0, "stock": 100.0})
+    store.insert_recipe({"name": "ขนมปัง", "servings": 1, "ingredients": [RecipeLine(1, 1.0), RecipeLine(2, 0.1)]})
+    return store
+
+
+def produce(store, day, batches):
+    store.append_log({
+        "recipe_id": 1, "recipe_name": "ขนมปัง", "batches": batches,
+        "total_servings": batches, "total_cost": 21.0 * batches, "date": f"{day} 10:00:00",
+    })
+
+
+def test_reorder_point_from_history():
+    store = make_store()
+    produce(store, "2024-03-01", 50)
+    produce(store, "2024-03-08", 2)
+    produce(store, "2024-03-09", 2)
+    monitor = StockMonitor(store, window_days=4, today="2024-03-10")
+
+    # 4 กก. ใน 4 วัน: เฉลี่ย 1 กก./วัน ยอดรายวัน 0, 0, 2, 2 → ส่วนเบี่ยงเบน 1 (ประวัติ 03-01 อยู่นอกช่วง)
+    assert monitor.daily_usage(1) == pytest.approx((1.0, 1.0))
+    reorder_point = LEAD_TIME_DAYS + SERVICE_Z * math.sqrt(LEAD_TIME_DAYS)
+    alerts = monitor.alerts(today="2024-03-10")
+    assert [status["ingredient_id"] for status in alerts] == [1]
+    assert alerts[0]["days_left"] == 5.0
+    assert alerts[0]["reorder_point"] == round(reorder_point, 2)
+    assert alerts[0]["suggested_quantity"] == round(reorder_point + REVIEW_DAYS - 5.0, 2)
+    assert monitor.alerts(today="2024-03-10", ing_ids=[2]) == []
+
+
+def test_incremental_matches_rebuild():
+    store = make_store()
+    produce(store, "2024-03-08", 2)
+    monitor = StockMonitor(store, window_days=4, today="2024-03-10")
+    produce(store, "2024-03-09", 3)
+    produce(store, "2024-03-09", 1)
+    produce(store, "2024-03-12", 1)
+
+    # เลื่อนช่วงไปสิ้นสุด 03-12: ยอดของ 03-08 หลุดช่วง
+    monitor.advance("2024-03-12")
+    fresh = StockMonitor(store, window_days=4, today="2024-03-12")
+    for ing_id in (1, 2):
+        assert monitor.daily_usage(ing_id) == pytest.approx(fresh.daily_usage(ing_id))
+    assert monitor.daily_usage(1)[0] == pytest.approx(5 / 4)
+
+    # นาฬิกาถอยหลังต้องอ่านประวัติช่วงก่อนหน้ากลับมา (รวมประวัติที่บันทึกหลังวันนั้นแล้ว)
+    monitor.advance("2024-03-10")
+    assert monitor.daily_usage(1)[0] == pytest.approx(7 / 4)
+
+
+def test_no_alert_without_usage_or_with_enough_stock():
+    store = make_store(stock=50.0)
+    monitor = StockMonitor(store, window_days=4, today="2024-03-10")
+    assert monitor.alerts(today="2024-03-10") == []
+    produce(store, "2024-03-10", 2)
+    assert monitor.alerts(today="2024-03-10") == []
+    assert monitor.status(store.ingredients[1])["days_left"] == 100.0
+
@@ -0,0 +1,94 @@
+"""ทดสอบว่าทุก backend บันทึกและโหลดข้อมูลได้ครบเหมือนกัน"""
+
+import pytest
+
+import recipe_management as rm
+from recipe_records import RecipeLine
+from recipe_store import RecipeStore
+
+BACKENDS = ("json", "lines", "sqlite")
+
+
+def sample_store():
+    """ข้อมูลที่ใช้ทุกชนิด record: ล็อต ประวัติราคา หน่วย สูตรย่อย และประวัติการผลิต"""
+    store = RecipeStore()
+    flour = store.insert_ingredient({"name": "แป้ง", "unit": "กก.", "price_per_unit": 20.0, "stock": 0.0})
+    egg = store.insert_ingredient({"name": "ไข่", "unit": "ฟอง", "price_per_unit": 4.0, "stock": 30.0})
+    store.receive_stock(flour.id, 5.0, unit_cost=18.0, received_at="2024-01-01 08:00:00")
+    store.update_ingredient(flour.id, changed_at="2999-02-01 08:00:00", price_per_unit=22.0)
+    dough = store.insert_recipe({
+        "name": "แป้งโด", "servings": 1,
+        "ingredients": [RecipeLine.measured(flour.id, 500, "กรัม"), RecipeLine(egg.id, 2)],
+    })
+    store.insert_recipe({
+        "name": "ขนมปัง", "servings": 8,
+        "ingredients": [RecipeLine(None, 2, dough.id), RecipeLine(egg.id, 1)],
+    })
+    store.append_log({
+        "recipe_id": dough.id, "recipe_name": "แป้งโด", "batches": 1,
+        "total_servings": 1, "total_cost": 17.0, "date": "2024-02-02 09:00:00",
+    })
+    return store
+
+
+def save_all(storage, store):
+    if hasattr(storage, "import_store"):
+        storage.import_store(store)
+    else:
+        storage.compact(store)
+        store.take_changes()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_round_trip(tmp_path, monkeypatch, backend):
+    monkeypatch.chdir(tmp_path)
+    store = sample_store()
+    save_all(rm.create_storage(backend), store)
+
+    loaded = rm.create_storage(backend).load()
+    assert loaded.to_dict() == store.to_dict()
+    assert loaded.recipes[1].ingredients[0].quantity == 0.5
+    assert loaded.recipe_cost(2) == store.recipe_cost(2)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_incremental_saves(tmp_path, monkeypatch, backend):
+    monkeypatch.chdir(tmp_path)
+    storage = rm.create_storage(backend)
+    save_all(storage, sample_store())
+
+    data = storage.load()
+    data.consume_stock(1, 1.5)
+    data.update_recipe(2, servings=10)
+    data.remove_recipe(2)
+    data.remove_ingredient(data.insert_ingredient(
+        {"name": "เกลือ", "unit": "กรัม", "price_per_unit": 0.1, "stock": 0.0}
+    ).id)
+    storage.save(data)
+
+    loaded = rm.create_storage(backend).load()
+    assert loaded.to_dict() == data.to_dict()
+    assert list(loaded.recipes) == [1]
+    assert loaded.next_id("ingredients") == 4
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_refresh_reads_other_program_changes(tmp_path, monkeypatch, backend):
+    monkeypatch.chdir(tmp_path)
+    storage = rm.create_storage(backend)
+    save_all(storage, sample_store())
+    data = storage.load()
+
+    other = rm.create_storage(backend)
+    other_data = other.load()
+    other_data.receive_stock(2, 6.0)
+    other_data.append_log({
+        "recipe_id": 1, "recipe_name": "แป้งโด", "batches": 2,
+        "total_servings": 2, "total_cost": 34.0, "date": "2024-02-03 09:00:00",
+    })
+    other.save(other_data)
+
+    storage.refresh(data)
+    assert data.ingredients[2].stock == 36.0
+    assert [e.id for e in data.production_log] == [1, 2]
+    assert data.production_log.totals["cost"] == 51.0
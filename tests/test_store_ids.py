@@ -0,0 +1,31 @@
+"""ทดสอบว่า ID ที่ถูกลบแล้วไม่ถูกใช้ซ้ำหลังเปิดโปรแกรมใหม่"""
+
+import pytest
+
+import recipe_management as rm
+from recipe_records import RecipeLine
+
+BACKENDS = ("json", "lines", "sqlite")
+
+
+@pytest.mark.parametrize("compact", (False, True))
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_deleted_ids_not_reused_after_restart(tmp_path, monkeypatch, backend, compact):
+    monkeypatch.chdir(tmp_path)
+    storage = rm.create_storage(backend)
+    data = storage.load()
+    first = data.insert_ingredient({"name": "แป้ง", "unit": "กก.", "price_per_unit": 1.0, "stock": 0.0})
+    last = data.insert_ingredient({"name": "น้ำตาล", "unit": "กก.", "price_per_unit": 1.0, "stock": 0.0})
+    recipe = data.insert_recipe(
+        {"name": "ขนม", "servings": 1, "ingredients": [RecipeLine(first.id, 1.0)]}
+    )
+    storage.save(data)
+    data.remove_ingredient(last.id)
+    data.remove_recipe(recipe.id)
+    storage.save(data)
+    if compact and hasattr(storage, "compact"):
+        storage.compact(data)
+
+    reopened = rm.create_storage(backend).load()
+    assert reopened.next_id("ingredients") == last.id + 1
+    assert reopened.next_id("recipes") == recipe.id + 1
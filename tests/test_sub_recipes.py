@@ -0,0 +1,65 @@
+"""ทดสอบสูตรย่อยหลายชั้น: ต้นทุน ความต้องการวัตถุดิบ และการกันวงจร"""
+
+import pytest
+
+import recipe_management as rm
+from recipe_records import RecipeLine
+from recipe_store import RecipeCycleError, RecipeStore
+
+
+def make_store():
+    """แป้งโด ← พาย ← ถาดพาย และ ซอส ← พาย"""
+    store = RecipeStore()
+    store.insert_ingredient({"name": "แป้ง", "unit": "กก.", "price_per_unit": 20.0, "stock": 10.0})
+    store.insert_ingredient({"name": "เนย", "unit": "กก.", "price_per_unit": 100.0, "stock": 1.0})
+    store.insert_recipe({"name": "แป้งโด", "servings": 1, "ingredients": [RecipeLine(1, 0.5)]})
+    store.insert_recipe({"name": "ซอส", "servings": 1, "ingredients": [RecipeLine(2, 0.1)]})
+    store.insert_recipe({
+        "name": "พาย", "servings": 1,
+        "ingredients": [RecipeLine(None, 2, 1), RecipeLine(None, 1, 2), RecipeLine(1, 0.1)],
+    })
+    store.insert_recipe({"name": "ถาดพาย", "servings": 4, "ingredients": [RecipeLine(None, 4, 3)]})
+    return store
+
+
+def test_cost_and_demand_roll_up():
+    store = make_store()
+    assert store.recipe_cost(3) == pytest.approx(2 * 10 + 10 + 2)
+    assert store.recipe_cost(4) == pytest.approx(4 * 32)
+    demand, missing = store.recipe_demand(4)
+    assert demand == pytest.approx({1: 4 * 1.1, 2: 0.4})
+    assert missing == ()
+    assert sorted(store.sub_recipes(4)) == [1, 2, 3]
+    assert store.ancestors(1) == {3, 4}
+
+
+def test_sub_recipe_edit_reaches_every_parent():
+    store = make_store()
+    store.recipe_cost(4)
+    store.recipe_demand(4)
+    store.update_recipe(1, ingredients=[RecipeLine(1, 1.0)])
+    assert store.recipe_cost(4) == pytest.approx(4 * (2 * 20 + 10 + 2))
+    assert store.recipe_demand(4)[0][1] == pytest.approx(4 * 2.1)
+
+    store.update_ingredient(2, changed_at="2999-01-01 00:00:00", price_per_unit=200.0)
+    assert store.recipe_cost(4) == pytest.approx(4 * (2 * 20 + 20 + 2))
+
+
+def test_deleted_sub_recipe():
+    store = make_store()
+    store.remove_recipe(2)
+    assert store.recipe_demand(4)[1] == (2,)
+    assert rm.max_producible(store, store.recipes[4]) == (0, None, None)
+    assert store.recipe_cost(3) == pytest.approx(22)
+
+
+def test_cycles_rejected():
+    store = make_store()
+    lines = [RecipeLine(None, 1, 4)]
+    assert "วงจร" in rm.validate_recipe(store, "แป้งโด", 1, lines, recipe_id=1)
+    assert rm.validate_recipe(store, "แป้งโด", 1, lines) is None
+
+    # ข้อมูลที่อ้างถึงกันเป็นวงจร (เช่นแก้ไฟล์เอง) ไม่วนไม่รู้จบ
+    store.update_recipe(1, ingredients=lines)
+    with pytest.raises(RecipeCycleError):
+        store.recipe_cost(4)
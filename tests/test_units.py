@@ -0,0 +1,63 @@
+"""ทดสอบการแปลงหน่วยและบรรทัดสูตรที่ระบุหน่วยเอง"""
+
+import pytest
+
+import recipe_management as rm
+from recipe_records import RecipeLine
+from recipe_store import RecipeStore
+from recipe_units import (
+    UnitMismatchError, canonical_unit, conversion_factor, dimension, mismatch_message, parse_amount,
+)
+
+
+def test_conversion_factors():
+    assert conversion_factor("กรัม", "กก.") == 0.001
+    assert conversion_factor("KG", "g") == 1000.0
+    assert conversion_factor("ช้อนโต๊ะ", "ช้อนชา") == 3.0
+    assert conversion_factor("โหล", "ฟอง") == 12.0
+    assert conversion_factor("กรัม", "มล.") is None
+    # หน่วยที่ไม่รู้จักแปลงได้เฉพาะกับตัวเอง
+    assert conversion_factor(" ถุง ", "ถุง") == 1.0
+    assert conversion_factor("ถุง", "กรัม") is None
+
+
+def test_names_and_parsing():
+    assert canonical_unit("กิโลกรัม") == "กก."
+    assert dimension("cup") == "volume" and dimension("ถุง") is None
+    assert parse_amount("250 กรัม") == (250.0, "กรัม")
+    assert parse_amount(".5") == (0.5, None)
+    with pytest.raises(ValueError):
+        parse_amount("ครึ่งถ้วย")
+    assert mismatch_message("กรัม", "ลิตร") == "แปลงหน่วย 'กรัม' (น้ำหนัก) เป็น 'ลิตร' (ปริมาตร) ไม่ได้"
+
+
+def make_store():
+    store = RecipeStore()
+    store.insert_ingredient({"name": "แป้ง", "unit": "กก.", "price_per_unit": 40.0, "stock": 1.0})
+    store.insert_recipe({
+        "name": "ขนม", "servings": 1, "ingredients": [RecipeLine.measured(1, 250, "กรัม")],
+    })
+    return store
+
+
+def test_line_converted_once_when_saved():
+    store = make_store()
+    line = store.recipes[1].ingredients[0]
+    assert (line.quantity, line.amount, line.unit) == (0.25, 250, "กรัม")
+    assert store.recipe_cost(1) == 10.0
+    assert rm.max_producible(store, store.recipes[1])[0] == 4
+
+    with pytest.raises(UnitMismatchError):
+        store.insert_recipe({
+            "name": "ผิด", "servings": 1, "ingredients": [RecipeLine.measured(1, 1, "ลิตร")],
+        })
+
+
+def test_ingredient_unit_change_reconverts_lines():
+    store = make_store()
+    assert rm.validate_unit_change(store, 1, "ลิตร") == (
+        "สูตร 'ขนม': แปลงหน่วย 'กรัม' (น้ำหนัก) เป็น 'ลิตร' (ปริมาตร) ไม่ได้"
+    )
+    assert rm.validate_unit_change(store, 1, "ขีด") is None
+    store.update_ingredient(1, unit="ขีด")
+    assert store.recipes[1].ingredients[0].quantity == 2.5